@@ -0,0 +1,186 @@
+# A memory-mapped, pre-tokenized backend for GPTDatasetV1.
+#
+# GPTDatasetV1 tokenizes the whole text on every start and keeps one int64 tensor per input window
+# and per target window. With a small stride the windows overlap, so memory is about
+# 2 * max_length / stride times the size of the token ids.
+#
+# Here the text is tokenized once into a flat file of uint16 token ids (the GPT-2 vocabulary has
+# 50257 tokens, which fits in 16 bits). The dataset memory-maps that file and cuts the input/target
+# windows in __getitem__, so memory doesn't depend on stride, and a re-run only opens the file.
+#
+# build the token file (large text files are read and tokenized in chunks):
+#   python chapter2/token_dataset.py the-verdict.txt --out the-verdict.gpt2.bin
+#
+# use it:
+#   train_loader = create_dataloader_memmap("the-verdict.gpt2.bin", batch_size=2,
+#                                           max_length=256, stride=256)
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import tiktoken
+import torch
+from torch.utils.data import Dataset, DataLoader
+
+TOKEN_DTYPE = np.uint16
+
+
+# the sidecar file next to the token file that records what it was built from
+def _meta_path(token_path):
+    return token_path + ".json"
+
+
+def _source_info(text_paths):
+    return [
+        {"path": os.path.abspath(path), "size": os.path.getsize(path), "mtime": os.path.getmtime(path)}
+        for path in text_paths
+    ]
+
+
+# Read a text file in pieces of about chunk_chars characters. Each piece is cut after its last
+# newline (or before its last space if it has none), so a word is never split between two pieces.
+def iter_text_chunks(path, chunk_chars=1 << 20):
+    rest = ""
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(chunk_chars)
+            if not block:
+                break
+            text = rest + block
+            cut = text.rfind("\n") + 1 or max(text.rfind(" "), 0)
+            if cut == 0:
+                rest = text
+                continue
+            yield text[:cut]
+            rest = text[cut:]
+    if rest:
+        yield rest
+
+
+# Tokenize text files into one uint16 token file. The files are joined with <|endoftext|>.
+# Pieces are encoded in groups with tiktoken's encode_batch, which runs on num_threads threads.
+def build_token_file(text_paths, token_path, encoding="gpt2",
+                     chunk_chars=1 << 20, num_threads=8, eot_between_files=True):
+    tokenizer = tiktoken.get_encoding(encoding)
+    if tokenizer.n_vocab > np.iinfo(TOKEN_DTYPE).max + 1:
+        raise ValueError(f"{encoding} has {tokenizer.n_vocab} tokens, more than uint16 can hold")
+
+    num_tokens = 0
+    tmp_path = token_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        for file_idx, path in enumerate(text_paths):
+            if file_idx > 0 and eot_between_files:
+                np.array([tokenizer.eot_token], dtype=TOKEN_DTYPE).tofile(out)
+                num_tokens += 1
+            pieces = []
+            for piece in iter_text_chunks(path, chunk_chars):
+                pieces.append(piece)
+                if len(pieces) == num_threads:
+                    num_tokens += _write_tokens(tokenizer, pieces, out, num_threads)
+                    pieces = []
+            if pieces:
+                num_tokens += _write_tokens(tokenizer, pieces, out, num_threads)
+    # rename only when the file is complete, so an interrupted build is never used
+    os.replace(tmp_path, token_path)
+
+    with open(_meta_path(token_path), "w", encoding="utf-8") as f:
+        json.dump({"encoding": encoding, "dtype": np.dtype(TOKEN_DTYPE).name, "num_tokens": num_tokens,
+                   "sources": _source_info(text_paths)}, f, indent=2)
+    return num_tokens
+
+
+def _write_tokens(tokenizer, pieces, out, num_threads):
+    num_tokens = 0
+    for token_ids in tokenizer.encode_batch(pieces, num_threads=num_threads,
+                                            allowed_special={"<|endoftext|>"}):
+        np.asarray(token_ids, dtype=TOKEN_DTYPE).tofile(out)
+        num_tokens += len(token_ids)
+    return num_tokens
+
+
+# Build the token file only if it is missing or the text files or encoding changed since it was built.
+def ensure_token_file(text_paths, token_path, encoding="gpt2", **kwargs):
+    try:
+        with open(_meta_path(token_path), encoding="utf-8") as f:
+            meta = json.load(f)
+        if (os.path.exists(token_path) and meta["encoding"] == encoding
+                and meta["sources"] == _source_info(text_paths)):
+            return meta["num_tokens"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_token_file(text_paths, token_path, encoding=encoding, **kwargs)
+
+
+# Same windows as GPTDatasetV1 (input = tokens[i:i+max_length], target shifted by one,
+# i = 0, stride, 2*stride, ...), read from the memory-mapped token file.
+# start/end restrict the dataset to a token range, e.g. the first 90% for training
+# and the rest for validation.
+class GPTDatasetMemmap(Dataset):
+    def __init__(self, token_path, max_length, stride, start=0, end=None):
+        self.token_path = token_path
+        self.max_length = max_length
+        self.stride = stride
+        file_tokens = os.path.getsize(token_path) // np.dtype(TOKEN_DTYPE).itemsize
+        self.start = start
+        self.end = file_tokens if end is None else min(end, file_tokens)
+        num_tokens = self.end - self.start
+        self.num_windows = max(0, (num_tokens - max_length + stride - 1) // stride)
+        self._tokens = None
+
+    # opened on first use, so every DataLoader worker maps the file itself
+    # instead of receiving a pickled copy of the tokens
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = np.memmap(self.token_path, dtype=TOKEN_DTYPE, mode="r")
+        return self._tokens
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_tokens"] = None
+        return state
+
+    def __len__(self):
+        return self.num_windows
+
+    def __getitem__(self, idx):
+        start = self.start + idx * self.stride
+        # one extra token for the shifted target; only these max_length + 1 ids are read from disk
+        chunk = torch.from_numpy(self.tokens[start:start + self.max_length + 1].astype(np.int64))
+        return chunk[:-1], chunk[1:]
+
+
+def create_dataloader_memmap(token_path, batch_size=4, max_length=256,
+                             stride=128, shuffle=True, drop_Last=True,
+                             num_workers=0):
+    dataset = GPTDatasetMemmap(token_path, max_length, stride)
+    dataloader = DataLoader(dataset,
+                            batch_size=batch_size,
+                            shuffle=shuffle,
+                            drop_last=drop_Last,
+                            num_workers=num_workers)
+    return dataloader
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="tokenize text files into a uint16 token file")
+    parser.add_argument("inputs", nargs="+", help="UTF-8 text files")
+    parser.add_argument("--out", required=True, help="token file to write, e.g. corpus.gpt2.bin")
+    parser.add_argument("--encoding", default="gpt2", help="tiktoken encoding name")
+    parser.add_argument("--chunk-mb", type=float, default=1.0, help="characters read per chunk, in millions")
+    parser.add_argument("--threads", type=int, default=8, help="encode_batch threads")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the token file is up to date")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    options = dict(encoding=args.encoding, chunk_chars=int(args.chunk_mb * (1 << 20)),
+                   num_threads=args.threads)
+    if args.force:
+        num_tokens = build_token_file(args.inputs, args.out, **options)
+    else:
+        num_tokens = ensure_token_file(args.inputs, args.out, **options)
+    print(f"{args.out}: {num_tokens:,} tokens "
+          f"({num_tokens * np.dtype(TOKEN_DTYPE).itemsize / 1024 ** 2:.1f} MB) "
+          f"in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,107 @@
+# Parallel, cached tokenization for the fine-tuning datasets (SpamDataset in chapter 6,
+# InstructionDataset in chapter 7).
+#
+# Both datasets used to call tokenizer.encode row by row every time the script started.
+# encode_cached tokenizes all texts with tiktoken's encode_batch, which encodes on several
+# threads (the BPE work runs in Rust and releases the GIL). The result is saved in cache_dir
+# under a key built from the tokenizer name, the template that formatted the texts and a hash
+# of every text, so the next run with the same data only loads two .npy files.
+#
+# The token ids are kept as a ragged array: one flat buffer with all token ids and an offsets
+# array, where text i is tokens[offsets[i]:offsets[i + 1]]. That is 2 bytes per token (uint16)
+# instead of a Python list of int objects per text.
+#
+# usage:
+#   texts = [format_input(entry) + f"\n\n### Response:\n{entry['output']}" for entry in data]
+#   tokens = encode_cached(texts, tokenizer, template=INSTRUCTION_TEMPLATE)
+#   tokens[0]          # numpy array with the token ids of the first text
+#   tokens.lengths()   # token count of every text
+import hashlib
+import os
+
+import numpy as np
+
+
+class RaggedTokens:
+    def __init__(self, tokens, offsets):
+        self.tokens = tokens
+        self.offsets = offsets
+
+    @classmethod
+    def from_lists(cls, token_lists, vocab_size=None):
+        # uint16 holds the GPT-2 vocabulary (50257); larger vocabularies need int32
+        dtype = np.uint16 if vocab_size is not None and vocab_size <= 1 << 16 else np.int32
+        offsets = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in token_lists], out=offsets[1:])
+        tokens = np.empty(offsets[-1], dtype=dtype)
+        for i, ids in enumerate(token_lists):
+            tokens[offsets[i]:offsets[i + 1]] = ids
+        return cls(tokens, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def save(self, path_prefix):
+        # offsets are written last: an interrupted save leaves no offsets file and is rebuilt
+        for suffix, array in (("tokens", self.tokens), ("offsets", self.offsets)):
+            tmp_path = f"{path_prefix}-{suffix}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, f"{path_prefix}-{suffix}.npy")
+
+    @classmethod
+    def load(cls, path_prefix, mmap=True):
+        mode = "r" if mmap else None
+        return cls(np.load(f"{path_prefix}-tokens.npy", mmap_mode=mode),
+                   np.load(f"{path_prefix}-offsets.npy", mmap_mode=mode))
+
+
+def tokenizer_name(tokenizer):
+    return getattr(tokenizer, "name", type(tokenizer).__name__)
+
+
+# Key of the cache entry: the tokenizer, the template that produced the texts and the texts
+# themselves (each one length-prefixed, so ["ab", "c"] and ["a", "bc"] get different keys).
+def cache_key(texts, tokenizer, template=""):
+    digest = hashlib.sha256()
+    digest.update(tokenizer_name(tokenizer).encode("utf-8") + b"\0")
+    digest.update(template.encode("utf-8") + b"\0")
+    for text in texts:
+        data = text.encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()[:32]
+
+
+# Tokenize all texts at once. tiktoken encodings use encode_batch on num_threads threads;
+# other tokenizers (e.g. SimpleTokenizerV2 from chapter 2) fall back to encode per text.
+def encode_texts(texts, tokenizer, num_threads=8, allowed_special=frozenset()):
+    texts = list(texts)
+    if hasattr(tokenizer, "encode_batch"):
+        token_lists = tokenizer.encode_batch(texts, num_threads=num_threads,
+                                             allowed_special=allowed_special)
+    else:
+        token_lists = [tokenizer.encode(text) for text in texts]
+    return RaggedTokens.from_lists(token_lists, getattr(tokenizer, "n_vocab", None))
+
+
+# encode_texts with an on-disk cache. cache_dir=None disables the cache.
+def encode_cached(texts, tokenizer, template="", cache_dir="token_cache",
+                  num_threads=8, allowed_special=frozenset()):
+    texts = list(texts)
+    if cache_dir is None:
+        return encode_texts(texts, tokenizer, num_threads, allowed_special)
+
+    path_prefix = os.path.join(cache_dir, cache_key(texts, tokenizer, template))
+    if os.path.exists(f"{path_prefix}-offsets.npy"):
+        return RaggedTokens.load(path_prefix)
+
+    ragged = encode_texts(texts, tokenizer, num_threads, allowed_special)
+    os.makedirs(cache_dir, exist_ok=True)
+    ragged.save(path_prefix)
+    return ragged
@@ -55,4 +55,47 @@ class MultiHeadAttention(nn.Module):
         context_vec = context_vec.contiguous().view(b, num_tokens, self.d_out)
 
         context_vec = self.out_proj(context_vec)
-        return context_vec
\ No newline at end of file
+        return context_vec
+
+# The same multi-head attention with a fused QKV projection and PyTorch's
+# scaled_dot_product_attention: one matmul produces queries, keys and values, and
+# the causal masking, softmax, dropout and weighted sum run as one kernel (is_causal=True),
+# without building the (num_tokens, num_tokens) attention score matrix or a mask buffer.
+# It takes the same arguments, so it can replace MultiHeadAttention directly.
+class MultiHeadAttentionFused(nn.Module):
+    def __init__(self, d_in, d_out,
+                 context_length, dropout, num_heads, qkv_bias=False):
+        super().__init__()
+        assert (d_out % num_heads == 0), \
+            "d_out must be divisible by num_heads"
+        self.d_out = d_out
+        self.num_heads = num_heads
+        self.head_dim = d_out // num_heads
+        self.qkv = nn.Linear(d_in, 3 * d_out, bias=qkv_bias)
+        self.out_proj = nn.Linear(d_out, d_out)
+        self.dropout = dropout
+
+    # load state dicts of MultiHeadAttention: W_query, W_key and W_value are stacked into qkv
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        for suffix in ("weight", "bias"):
+            names = [f"{prefix}{layer}.{suffix}" for layer in ("W_query", "W_key", "W_value")]
+            if all(name in state_dict for name in names):
+                state_dict[f"{prefix}qkv.{suffix}"] = torch.cat(
+                    [state_dict.pop(name) for name in names], dim=0)
+        # the causal mask buffer isn't needed with is_causal
+        state_dict.pop(f"{prefix}mask", None)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def forward(self, x):
+        b, num_tokens, d_in = x.shape
+        # (b, num_tokens, 3 * d_out) -> (3, b, num_heads, num_tokens, head_dim)
+        qkv = self.qkv(x).view(b, num_tokens, 3, self.num_heads, self.head_dim)
+        queries, keys, values = qkv.permute(2, 0, 3, 1, 4).unbind(0)
+
+        context_vec = nn.functional.scaled_dot_product_attention(
+            queries, keys, values,
+            dropout_p=self.dropout if self.training else 0.0,
+            is_causal=True)
+
+        context_vec = context_vec.transpose(1, 2).contiguous().view(b, num_tokens, self.d_out)
+        return self.out_proj(context_vec)
@@ -0,0 +1,108 @@
+# Compare MultiHeadAttention with MultiHeadAttentionFused (cfg["attn_impl"] = "fused")
+# at context length 1024 on CPU: forward time and the peak memory of one forward pass.
+#
+# Each implementation runs in its own child process, so the peak RSS of one doesn't hide the other.
+# The fused layer is loaded from the state_dict of the classic one (through the W_query/W_key/W_value
+# weight-mapping shim), and the parent checks that both give the same outputs.
+#
+# usage:
+#   python chapter4/benchmark_attention.py
+#   python chapter4/benchmark_attention.py --batch-size 8 --model    # whole GPTModel instead of one layer
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chapter4.model import GPT_CONFIG_124M, GPTModel, MultiHeadAttention, MultiHeadAttentionFused
+
+IMPLS = ("classic", "fused")
+
+
+# the classic module with fixed random weights, and the same weights loaded into the requested impl
+def build(impl, cfg, model):
+    torch.manual_seed(123)
+    if model:
+        classic = GPTModel(dict(cfg, attn_impl="classic"))
+        target = GPTModel(dict(cfg, attn_impl=impl))
+    else:
+        args = dict(d_in=cfg["emb_dim"], d_out=cfg["emb_dim"], context_length=cfg["context_length"],
+                    dropout=0.0, num_heads=cfg["n_heads"], qkv_bias=cfg["qkv_bias"])
+        classic = MultiHeadAttention(**args)
+        target = (MultiHeadAttentionFused if impl == "fused" else MultiHeadAttention)(**args)
+    target.load_state_dict(classic.state_dict())
+    return target.eval()
+
+
+def make_input(cfg, batch_size, model):
+    generator = torch.Generator().manual_seed(0)
+    if model:
+        return torch.randint(0, cfg["vocab_size"], (batch_size, cfg["context_length"]), generator=generator)
+    return torch.randn(batch_size, cfg["context_length"], cfg["emb_dim"], generator=generator)
+
+
+# runs in the child process: time the forward pass and report the peak RSS of the process
+def run_child(impl, cfg, args):
+    module = build(impl, cfg, args.model)
+    x = make_input(cfg, args.batch_size, args.model)
+    with torch.inference_mode():
+        module(x)  # warm-up
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            module(x)
+            best = min(best, time.perf_counter() - start)
+    # ru_maxrss is in KB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": best, "peak_mb": peak_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="classic vs fused attention benchmark")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--context-length", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=5, help="best of N runs is reported")
+    parser.add_argument("--model", action="store_true", help="benchmark the whole GPTModel")
+    parser.add_argument("--child", choices=IMPLS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    cfg = dict(GPT_CONFIG_124M, context_length=args.context_length, drop_rate=0.0)
+    if args.child:
+        run_child(args.child, cfg, args)
+        return
+
+    x = make_input(cfg, min(args.batch_size, 2), args.model)
+    with torch.inference_mode():
+        max_diff = (build("classic", cfg, args.model)(x) - build("fused", cfg, args.model)(x)).abs().max().item()
+
+    results = {}
+    for impl in IMPLS:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", impl,
+               "--batch-size", str(args.batch_size), "--context-length", str(args.context_length),
+               "--repeat", str(args.repeat)] + (["--model"] if args.model else [])
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        results[impl] = json.loads(output.strip().splitlines()[-1])
+
+    # the (b, num_heads, T, T) float32 score matrix the classic layer materializes per call
+    scores_mb = args.batch_size * cfg["n_heads"] * args.context_length ** 2 * 4 / 1024 ** 2
+    print(f"{'GPTModel' if args.model else 'attention layer'}, batch {args.batch_size}, "
+          f"context {args.context_length}, threads {torch.get_num_threads()}")
+    print(f"attention scores materialized by the classic layer: {scores_mb:.0f} MB per layer call")
+    print(f"{'impl':<10}{'forward (s)':>14}{'tokens/sec':>14}{'peak RSS (MB)':>16}")
+    for impl in IMPLS:
+        r = results[impl]
+        tokens = args.batch_size * args.context_length
+        print(f"{impl:<10}{r['seconds']:>14.3f}{tokens / r['seconds']:>14.0f}{r['peak_mb']:>16.0f}")
+    print(f"speedup: {results['classic']['seconds'] / results['fused']['seconds']:.2f}x, "
+          f"peak memory saved: {results['classic']['peak_mb'] - results['fused']['peak_mb']:.0f} MB, "
+          f"max abs output difference: {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Compare the tokens/sec of generate_text_simple (re-runs the whole window for every new token)
+# with generate_text_cached (prefill once, then decode one token at a time with the KV cache).
+#
+# The weights are randomly initialized. Greedy decoding of both loops should still produce
+# the same tokens; the cached path only changes the order of floating point sums,
+# so a mismatch on a near-tie is reported rather than treated as an error.
+#
+# usage:
+#   python chapter4/benchmark_generation.py
+#   python chapter4/benchmark_generation.py --max-new-tokens 256 --context-length 256 --threads 8
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chapter4.model import GPT_CONFIG_124M, GPTModel, generate_text_cached, generate_text_simple
+
+
+def time_generation(generate_fn, model, idx, max_new_tokens, context_size, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = generate_fn(model, idx, max_new_tokens, context_size)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KV cache generation benchmark")
+    parser.add_argument("--prompt-len", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--context-length", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs is reported")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    cfg = dict(GPT_CONFIG_124M, context_length=args.context_length, drop_rate=0.0)
+    torch.manual_seed(123)
+    model = GPTModel(cfg)
+    model.eval()
+
+    idx = torch.randint(0, cfg["vocab_size"], (args.batch_size, args.prompt_len))
+    context_size = cfg["context_length"]
+
+    # warm up both paths once so that the first timed run is not penalized
+    generate_text_simple(model, idx, 2, context_size)
+    generate_text_cached(model, idx, 2, context_size)
+
+    out_simple, t_simple = time_generation(
+        generate_text_simple, model, idx, args.max_new_tokens, context_size, args.repeat)
+    out_cached, t_cached = time_generation(
+        generate_text_cached, model, idx, args.max_new_tokens, context_size, args.repeat)
+
+    same = torch.equal(out_simple, out_cached)
+
+    new_tokens = args.batch_size * args.max_new_tokens
+    print(f"prompt {args.prompt_len} tokens, {args.max_new_tokens} new tokens, "
+          f"batch {args.batch_size}, context {context_size}, threads {torch.get_num_threads()}")
+    print(f"{'loop':<24}{'seconds':>10}{'tokens/sec':>14}")
+    print(f"{'generate_text_simple':<24}{t_simple:>10.2f}{new_tokens / t_simple:>14.1f}")
+    print(f"{'generate_text_cached':<24}{t_cached:>10.2f}{new_tokens / t_cached:>14.1f}")
+    print(f"speedup: {t_simple / t_cached:.2f}x, outputs identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
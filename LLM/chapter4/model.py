@@ -158,12 +158,30 @@ class MultiHeadAttention(nn.Module):
         self.W_value = nn.Linear(d_in, d_out, bias=qkv_bias)
         self.out_proj = nn.Linear(d_out, d_out)
         self.dropout = nn.Dropout(dropout)
+        self.context_length = context_length
         self.register_buffer(
             "mask",
             torch.triu(torch.ones(context_length, context_length), diagonal=1)
         )
-
-    def forward(self, x):
+        # KV cache for incremental decoding. The keys and values of tokens that were
+        # already processed are kept here, so each new token only needs its own projections.
+        # persistent=False keeps the cache out of the state_dict.
+        self.register_buffer("cache_k", None, persistent=False)
+        self.register_buffer("cache_v", None, persistent=False)
+
+    def reset_cache(self):
+        self.cache_k, self.cache_v = None, None
+
+    # keep only the given batch rows of the cache, e.g. when finished sequences leave the batch
+    def select_cache(self, index):
+        if self.cache_k is not None:
+            self.cache_k = self.cache_k.index_select(0, index)
+            self.cache_v = self.cache_v.index_select(0, index)
+
+    # attn_mask is an optional boolean tensor, True where a query may attend to a key, applied on top
+    # of the causal mask. It must broadcast to (b, num_heads, num_tokens, num_keys); a padding mask
+    # of shape (b, num_keys) is passed as attn_mask[:, None, None, :].
+    def forward(self, x, use_cache=False, attn_mask=None):
         b, num_tokens, d_in = x.shape
         keys = self.W_key(x)
         queries = self.W_query(x)
@@ -184,10 +202,28 @@ class MultiHeadAttention(nn.Module):
         queries = queries.transpose(1, 2)
         values = values.transpose(1, 2)
 
+        # With the cache on, the new keys and values are appended to the ones of the earlier tokens.
+        # The cache never holds more than context_length tokens: the oldest ones are dropped first.
+        if use_cache:
+            if self.cache_k is not None:
+                keys = torch.cat((self.cache_k, keys), dim=2)
+                values = torch.cat((self.cache_v, values), dim=2)
+            keys = keys[:, :, -self.context_length:]
+            values = values[:, :, -self.context_length:]
+            self.cache_k, self.cache_v = keys, values
+        num_keys = keys.shape[2]
+
         attn_scores = queries @ keys.transpose(2, 3)
-        mask_bool = self.mask.bool()[:num_tokens, :num_tokens]
+        # The queries are the last num_tokens positions of the keys, so they use the
+        # last num_tokens rows of the causal mask. Without the cache num_keys == num_tokens.
+        mask_bool = self.mask.bool()[num_keys - num_tokens:num_keys, :num_keys]
 
         attn_scores.masked_fill_(mask_bool, -torch.inf)
+        # Masked keys get the smallest finite value instead of -inf: a left-padding query row can
+        # then still softmax over the padding keys before it instead of producing NaN, and the NaN
+        # can't leak into the real tokens through the values of the next layer.
+        if attn_mask is not None:
+            attn_scores.masked_fill_(~attn_mask, torch.finfo(attn_scores.dtype).min)
 
         attn_weights = torch.softmax(attn_scores / keys.shape[-1]**0.5, dim=-1)
         attn_weights = self.dropout(attn_weights)
@@ -198,10 +234,92 @@ class MultiHeadAttention(nn.Module):
 
         context_vec = self.out_proj(context_vec)
         return context_vec
+
+# A faster drop-in replacement for MultiHeadAttention, used when cfg["attn_impl"] == "fused".
+# Queries, keys and values come out of one fused projection (a single matmul instead of three),
+# and torch.nn.functional.scaled_dot_product_attention computes the masking, softmax and weighted
+# sum in one kernel. With is_causal=True it needs no mask buffer, and on CPU it works through the
+# sequence in blocks instead of materializing the full (num_tokens, num_tokens) score matrix.
+# The KV cache and attn_mask work exactly as in MultiHeadAttention.
+class MultiHeadAttentionFused(nn.Module):
+    def __init__(self, d_in, d_out,
+                 context_length, dropout, num_heads, qkv_bias=False):
+        super().__init__()
+        assert (d_out % num_heads == 0), \
+            "d_out must be divisible by num_heads"
+        self.d_out = d_out
+        self.num_heads = num_heads
+        self.head_dim = d_out // num_heads
+        # the rows of qkv.weight are the W_query, W_key and W_value weights stacked in this order
+        self.qkv = nn.Linear(d_in, 3 * d_out, bias=qkv_bias)
+        self.out_proj = nn.Linear(d_out, d_out)
+        self.dropout = dropout
+        self.context_length = context_length
+        self.register_buffer("cache_k", None, persistent=False)
+        self.register_buffer("cache_v", None, persistent=False)
+
+    # Weight-mapping shim: state dicts saved from MultiHeadAttention (model.pth, or a GPTModel
+    # built without attn_impl) have separate W_query/W_key/W_value weights. They are concatenated
+    # into qkv while loading, so load_state_dict works on both formats.
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        for suffix in ("weight", "bias"):
+            names = [f"{prefix}{layer}.{suffix}" for layer in ("W_query", "W_key", "W_value")]
+            if all(name in state_dict for name in names):
+                state_dict[f"{prefix}qkv.{suffix}"] = torch.cat(
+                    [state_dict.pop(name) for name in names], dim=0)
+        # the causal mask buffer isn't needed with is_causal
+        state_dict.pop(f"{prefix}mask", None)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def reset_cache(self):
+        self.cache_k, self.cache_v = None, None
+
+    def select_cache(self, index):
+        if self.cache_k is not None:
+            self.cache_k = self.cache_k.index_select(0, index)
+            self.cache_v = self.cache_v.index_select(0, index)
+
+    def forward(self, x, use_cache=False, attn_mask=None):
+        b, num_tokens, d_in = x.shape
+        # (b, num_tokens, 3 * d_out) -> (3, b, num_heads, num_tokens, head_dim)
+        qkv = self.qkv(x).view(b, num_tokens, 3, self.num_heads, self.head_dim)
+        queries, keys, values = qkv.permute(2, 0, 3, 1, 4).unbind(0)
+
+        if use_cache:
+            if self.cache_k is not None:
+                keys = torch.cat((self.cache_k, keys), dim=2)
+                values = torch.cat((self.cache_v, values), dim=2)
+            keys = keys[:, :, -self.context_length:]
+            values = values[:, :, -self.context_length:]
+            self.cache_k, self.cache_v = keys, values
+        num_keys = keys.shape[2]
+
+        dropout_p = self.dropout if self.training else 0.0
+        if attn_mask is None and num_keys == num_tokens:
+            context_vec = nn.functional.scaled_dot_product_attention(
+                queries, keys, values, dropout_p=dropout_p, is_causal=True)
+        else:
+            # is_causal assumes the queries start at key 0, which isn't true with a cache,
+            # so build the mask: query i is key position num_keys - num_tokens + i.
+            causal = torch.ones(num_tokens, num_keys, dtype=torch.bool, device=x.device).tril(
+                diagonal=num_keys - num_tokens)
+            mask = torch.zeros(num_tokens, num_keys, dtype=queries.dtype, device=x.device)
+            mask = mask.masked_fill(~causal, -torch.inf)
+            if attn_mask is not None:
+                # same finite fill value as MultiHeadAttention, so padding rows don't produce NaN
+                mask = torch.where(attn_mask, mask, torch.finfo(queries.dtype).min)
+            context_vec = nn.functional.scaled_dot_product_attention(
+                queries, keys, values, attn_mask=mask, dropout_p=dropout_p)
+
+        context_vec = context_vec.transpose(1, 2).contiguous().view(b, num_tokens, self.d_out)
+        return self.out_proj(context_vec)
+
 class TransformerBlock(nn.Module):
     def __init__(self, cfg):
         super().__init__()
-        self.att = MultiHeadAttention(
+        # cfg["attn_impl"] selects the attention: "classic" (default) or "fused"
+        attention = MultiHeadAttentionFused if cfg.get("attn_impl") == "fused" else MultiHeadAttention
+        self.att = attention(
             d_in=cfg["emb_dim"],
             d_out=cfg["emb_dim"],
             context_length=cfg["context_length"],
@@ -213,10 +331,10 @@ class TransformerBlock(nn.Module):
         self.norm2 = LayerNorm(cfg["emb_dim"])
         self.drop_shortcut = nn.Dropout(cfg["drop_rate"])
 
-    def forward(self, x):
+    def forward(self, x, use_cache=False, attn_mask=None):
         shortcut = x
         x = self.norm1(x)
-        x = self.att(x)
+        x = self.att(x, use_cache=use_cache, attn_mask=attn_mask)
         x = self.drop_shortcut(x)
         x = x + shortcut
 
@@ -241,21 +359,57 @@ class GPTModel(nn.Module):
         self.out_head = nn.Linear(
             cfg["emb_dim"], cfg["vocab_size"], bias=False
         )
+        # position of the next token when decoding with the KV cache
+        self.current_pos = 0
 
-    def forward(self, in_idx):
+    # pos_ids (b, seq_len) overrides the default positions, e.g. so that left-padded prompts
+    # start at position 0 at their first real token. attn_mask is passed to every MultiHeadAttention.
+    def forward(self, in_idx, use_cache=False, attn_mask=None, pos_ids=None):
         batch_size, seq_len = in_idx.shape
         tok_embeds = self.tok_emb(in_idx)
 
-        pos_embeds = self.pos_emb(
-            torch.arange(seq_len, device=in_idx.device)
-        )
+        # With the cache on, in_idx continues the tokens that are already cached,
+        # so its positions start at current_pos instead of 0.
+        start_pos = self.current_pos if use_cache else 0
+        if start_pos + seq_len > self.pos_emb.num_embeddings:
+            raise ValueError(
+                f"position {start_pos + seq_len} exceeds context length "
+                f"{self.pos_emb.num_embeddings}, call prefill() with the last window"
+            )
+        if pos_ids is None:
+            pos_ids = torch.arange(start_pos, start_pos + seq_len, device=in_idx.device)
+        pos_embeds = self.pos_emb(pos_ids)
+        if use_cache:
+            self.current_pos += seq_len
         x = tok_embeds + pos_embeds
         x = self.drop_emb(x)
-        x = self.trf_blocks(x)
+        # trf_blocks stays an nn.Sequential so the state_dict keys don't change,
+        # but the blocks are called one by one to pass use_cache through.
+        for block in self.trf_blocks:
+            x = block(x, use_cache=use_cache, attn_mask=attn_mask)
         x = self.final_norm(x)
         logits = self.out_head(x)
         return logits
 
+    def reset_kv_cache(self):
+        for block in self.trf_blocks:
+            block.att.reset_cache()
+        self.current_pos = 0
+
+    def select_kv_cache(self, index):
+        for block in self.trf_blocks:
+            block.att.select_cache(index)
+
+    # Prefill: drop the old cache and run the whole prompt once, filling the cache of every layer.
+    def prefill(self, in_idx, attn_mask=None, pos_ids=None):
+        self.reset_kv_cache()
+        return self(in_idx, use_cache=True, attn_mask=attn_mask, pos_ids=pos_ids)
+
+    # Incremental decode: only the new token(s) go through the model,
+    # attending to the cached keys and values.
+    def decode(self, in_idx, attn_mask=None, pos_ids=None):
+        return self(in_idx, use_cache=True, attn_mask=attn_mask, pos_ids=pos_ids)
+
 def generate_text_simple(model, idx, max_new_tokens, context_size):
     for _ in range(max_new_tokens):
         idx_cond = idx[:, -context_size:]
@@ -270,6 +424,32 @@ def generate_text_simple(model, idx, max_new_tokens, context_size):
 
     return idx
 
+# Same greedy decoding as generate_text_simple, but with the KV cache:
+# the prompt is processed once (prefill) and then only the newest token is fed per step (decode),
+# so each step costs O(n) instead of re-running the whole window.
+def generate_text_cached(model, idx, max_new_tokens, context_size):
+    with torch.no_grad():
+        logits = model.prefill(idx[:, -context_size:])
+        for step in range(max_new_tokens):
+            logits = logits[:, -1, :]
+            idx_next = torch.argmax(logits, dim=-1, keepdim=True)
+            idx = torch.cat((idx, idx_next), dim=1)
+            if step == max_new_tokens - 1:
+                break
+            logits = cached_logits(model, idx, context_size)
+    model.reset_kv_cache()
+    return idx
+
+# Logits for the last token of idx, reusing the KV cache filled by the previous steps.
+# GPTModel uses absolute position embeddings, so once the window is full every cached
+# token would move one position to the left. Then the cache is no longer valid and
+# the last context_size tokens are prefilled again, which gives exactly the same
+# logits as generate_text_simple.
+def cached_logits(model, idx, context_size):
+    if model.current_pos < context_size:
+        return model.decode(idx[:, -1:])
+    return model.prefill(idx[:, -context_size:])
+
 import tiktoken
 if __name__ == "__main__":
     # tokenize a batch consisting of two text inputs for the GPT model
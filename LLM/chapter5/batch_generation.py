@@ -0,0 +1,154 @@
+# Batched generation for prompts of different lengths.
+#
+# The prompts are left-padded to the same length, so the last column holds the last real token of
+# every prompt and the next token of every row is appended in the same column.
+# A boolean attention mask keeps the padding out of attention, and position ids start at 0 at the
+# first real token of each row, so every row gets the same logits it would get on its own.
+# Generation uses the KV cache of GPTModel. When a row produces eos_id it is finished: its tokens
+# are kept, and the row is removed from the batch and from the KV cache, so finished sequences
+# cost nothing in the following steps.
+#
+# usage:
+#   prompts = [tokenizer.encode(format_input(entry)) for entry in test_data]
+#   outputs = generate_batch(model, prompts, max_new_tokens=256, context_size=1024, eos_id=50256)
+#   responses = [tokenizer.decode(out[len(prompt):]) for prompt, out in zip(prompts, outputs)]
+#
+# python chapter5/batch_generation.py compares it with calling generate_text_cached once per prompt.
+import os
+import sys
+import time
+
+import torch
+
+
+# left-pad a list of token id lists into one (b, max_len) tensor, plus a boolean mask that is
+# True for the real tokens
+def left_pad(token_lists, pad_token_id=50256, device=None):
+    max_len = max(len(tokens) for tokens in token_lists)
+    idx = torch.full((len(token_lists), max_len), pad_token_id, dtype=torch.long)
+    mask = torch.zeros((len(token_lists), max_len), dtype=torch.bool)
+    for row, tokens in enumerate(token_lists):
+        if tokens:
+            idx[row, max_len - len(tokens):] = torch.tensor(tokens, dtype=torch.long)
+            mask[row, max_len - len(tokens):] = True
+    return idx.to(device), mask.to(device)
+
+
+# the position of every token counts only the real tokens before it, padding gets position 0
+def position_ids(mask):
+    return (mask.long().cumsum(dim=1) - 1).clamp_min(0)
+
+
+# Pick the next token of every row at once.
+# top_k keeps the k largest logits of each row. temperature is a float or a tensor with one value
+# per row; rows with temperature 0 are decoded greedily, the others are sampled.
+def sample_next_token(logits, temperature=0.0, top_k=None):
+    if top_k is not None:
+        top_logits, _ = torch.topk(logits, top_k, dim=-1)
+        logits = logits.masked_fill(logits < top_logits[:, -1:], float("-inf"))
+
+    greedy = torch.argmax(logits, dim=-1, keepdim=True)
+    temperature = torch.as_tensor(temperature, dtype=logits.dtype, device=logits.device).reshape(-1, 1)
+    if not bool((temperature > 0).any()):
+        return greedy
+
+    # clamp_min only protects the greedy rows from dividing by 0, their samples are discarded below
+    probs = torch.softmax(logits / temperature.clamp_min(1e-6), dim=-1)
+    sampled = torch.multinomial(probs, num_samples=1)
+    return torch.where(temperature > 0, sampled, greedy)
+
+
+def _prefill(model, idx, mask):
+    return model.prefill(idx, attn_mask=mask[:, None, None, :], pos_ids=position_ids(mask))
+
+
+# Generate for all prompts at once and return, for every prompt, its tokens followed by the
+# generated tokens (without the eos_id, like generate() in model_trainable.py).
+def generate_batch(model, prompts, max_new_tokens, context_size,
+                   temperature=0.0, top_k=None, eos_id=None, pad_token_id=50256):
+    device = model.pos_emb.weight.device
+    outputs = [list(tokens) for tokens in prompts]
+    if not outputs or max_new_tokens <= 0:
+        return outputs
+
+    idx, mask = left_pad([tokens[-context_size:] for tokens in outputs], pad_token_id, device)
+    temperature = torch.as_tensor(temperature, dtype=torch.float, device=device)
+    per_row_temperature = temperature.numel() > 1
+    # active[i] is the prompt that row i of the batch belongs to
+    active = torch.arange(len(outputs), device=device)
+
+    with torch.no_grad():
+        logits = _prefill(model, idx, mask)
+        for step in range(max_new_tokens):
+            idx_next = sample_next_token(logits[:, -1, :], temperature, top_k)
+
+            if eos_id is None:
+                finished = torch.zeros(idx_next.shape[0], dtype=torch.bool, device=device)
+            else:
+                finished = idx_next.squeeze(1) == eos_id
+            for prompt_id, token, done in zip(active.tolist(), idx_next.squeeze(1).tolist(),
+                                              finished.tolist()):
+                if not done:
+                    outputs[prompt_id].append(token)
+
+            if step == max_new_tokens - 1 or bool(finished.all()):
+                break
+
+            # retire the finished rows from the batch and the KV cache
+            if bool(finished.any()):
+                keep = (~finished).nonzero().squeeze(1)
+                model.select_kv_cache(keep)
+                idx, mask, idx_next, active = idx[keep], mask[keep], idx_next[keep], active[keep]
+                if per_row_temperature:
+                    temperature = temperature[keep]
+
+            idx = torch.cat((idx, idx_next), dim=1)
+            mask = torch.cat((mask, torch.ones_like(idx_next, dtype=torch.bool)), dim=1)
+            if model.current_pos < context_size:
+                # the new token sits right after the real tokens of its row
+                logits = model.decode(idx_next, attn_mask=mask[:, None, None, :],
+                                      pos_ids=mask.sum(dim=1, keepdim=True) - 1)
+            else:
+                # window full: the positions of the cached tokens shift, prefill the last window
+                # again (see chapter4.model.cached_logits)
+                idx, mask = idx[:, -context_size:], mask[:, -context_size:]
+                logits = _prefill(model, idx, mask)
+
+    model.reset_kv_cache()
+    return outputs
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from chapter4.model import GPT_CONFIG_124M, GPTModel, generate_text_cached
+
+    cfg = dict(GPT_CONFIG_124M, context_length=256, drop_rate=0.0)
+    torch.manual_seed(123)
+    model = GPTModel(cfg)
+    model.eval()
+
+    # 32 prompts of 8 to 64 tokens
+    generator = torch.Generator().manual_seed(0)
+    prompts = [
+        torch.randint(0, cfg["vocab_size"], (int(length),), generator=generator).tolist()
+        for length in torch.randint(8, 65, (32,), generator=generator)
+    ]
+    max_new_tokens = 32
+
+    start = time.perf_counter()
+    one_by_one = [
+        generate_text_cached(model, torch.tensor([prompt]), max_new_tokens, cfg["context_length"])[0].tolist()
+        for prompt in prompts
+    ]
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = generate_batch(model, prompts, max_new_tokens, cfg["context_length"])
+    t_batch = time.perf_counter() - start
+
+    new_tokens = len(prompts) * max_new_tokens
+    same = sum(a == b for a, b in zip(one_by_one, batched))
+    print(f"{len(prompts)} prompts, {max_new_tokens} new tokens each")
+    print(f"one prompt at a time: {t_loop:.2f}s, {new_tokens / t_loop:.1f} tokens/sec")
+    print(f"generate_batch:       {t_batch:.2f}s, {new_tokens / t_batch:.1f} tokens/sec")
+    print(f"speedup: {t_loop / t_batch:.2f}x, identical outputs: {same}/{len(prompts)}")
@@ -0,0 +1,51 @@
+# Scaling of ddp_train.py from 1 to N local processes.
+#
+# Each run trains for --steps optimizer steps (the first --warmup-steps are not timed) with
+# the machine's cores split evenly between the processes, so 1 process uses all cores as
+# intra-op threads and N processes use cpu_count // N threads each.
+# The batch size is per process, so N processes process N times the tokens per step (weak scaling).
+#   speedup     tokens/sec with N processes / tokens/sec with 1 process
+#   efficiency  speedup / N (1.0 = perfect linear scaling)
+#
+#   python chapter5/benchmark_ddp.py --procs 1,2,4,8 --n-layers 4
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from launch_ddp import launch
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="tokens/sec and scaling efficiency of ddp_train.py")
+    parser.add_argument("--procs", default="1,2,4", help="comma-separated process counts")
+    parser.add_argument("--text", default="the-verdict.txt")
+    parser.add_argument("--context-length", type=int, default=256)
+    parser.add_argument("--n-layers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=2, help="per process")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--warmup-steps", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for nproc in (int(n) for n in args.procs.split(",")):
+            stats_path = os.path.join(tmp_dir, f"stats-{nproc}.json")
+            code = launch(nproc, [
+                "--text", args.text, "--context-length", str(args.context_length),
+                "--n-layers", str(args.n_layers), "--batch-size", str(args.batch_size),
+                "--epochs", "1000", "--max-steps", str(args.steps + args.warmup_steps),
+                "--warmup-steps", str(args.warmup_steps), "--eval-freq", "0",
+                "--checkpoint", "", "--no-sample", "--stats-json", stats_path,
+            ])
+            if code != 0:
+                sys.exit(f"{nproc} processes: ddp_train.py failed with exit code {code}")
+            with open(stats_path, encoding="utf-8") as f:
+                results[nproc] = json.load(f)
+
+    print(f"\n{'processes':>10}{'threads':>9}{'ms/step':>10}{'tokens/sec':>13}{'speedup':>10}{'efficiency':>12}")
+    base = results[min(results)]
+    for nproc, stats in sorted(results.items()):
+        speedup = stats["tokens_per_sec"] / base["tokens_per_sec"] * base["world_size"]
+        print(f"{nproc:>10}{stats['threads']:>9}{1000 * stats['seconds'] / stats['steps']:>10.0f}"
+              f"{stats['tokens_per_sec']:>13,.0f}{speedup:>10.2f}{speedup / nproc:>12.1%}")
@@ -0,0 +1,116 @@
+# How long it takes to get the GPT-2 weights into a GPTModel:
+#   tf          load_gpt2_params_from_tf_ckpt (TensorFlow, one tf.train.load_variable per variable),
+#               then the weights are copied into the model; what download_and_load_gpt2 +
+#               load_weights_into_gpt do on every run (skipped if TensorFlow isn't installed)
+#   torch.load  a pickled state_dict (.pth) read into memory and copied with load_state_dict
+#   mmap        the converted safetensors file memory-mapped by weights_io.load_gpt2_weights
+#
+# Each mode runs in its own child process and reports the load time, the time of the first
+# forward pass (with mmap that is when the weights are actually read) and the peak RSS.
+# Run it twice: the first run downloads and converts the weights once.
+#
+# usage:
+#   python chapter5/benchmark_weights_loading.py --model-size 124M
+#   python chapter5/benchmark_weights_loading.py --model-size 355M --attn-impl fused
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chapter4.model import GPT_CONFIG_124M, GPTModel
+from chapter5.gpt_download import download_and_convert_gpt2, load_gpt2_params_from_tf_ckpt
+from chapter5.weights_io import gpt2_params_to_state_dict, load_gpt2_weights, load_into_model
+
+MODES = ("tf", "torch.load", "mmap")
+
+
+def model_config(settings, attn_impl):
+    return dict(GPT_CONFIG_124M, emb_dim=settings["n_embd"], n_layers=settings["n_layer"],
+                n_heads=settings["n_head"], context_length=settings["n_ctx"],
+                qkv_bias=True, drop_rate=0.0, attn_impl=attn_impl)
+
+
+def load(mode, model, args):
+    if mode == "tf":
+        import tensorflow as tf
+        model_dir = os.path.dirname(args.weights)
+        with open(os.path.join(model_dir, "hparams.json"), "r", encoding="utf-8") as f:
+            settings = json.load(f)
+        params = load_gpt2_params_from_tf_ckpt(tf.train.latest_checkpoint(model_dir), settings)
+        state_dict = gpt2_params_to_state_dict(params)
+        state_dict["out_head.weight"] = state_dict["tok_emb.weight"].clone()
+        load_into_model(model, state_dict)
+    elif mode == "torch.load":
+        model.load_state_dict(torch.load(args.pth, map_location="cpu", weights_only=True))
+    else:
+        load_gpt2_weights(model, args.weights)
+
+
+# runs in the child process
+def run_child(mode, cfg, args):
+    model = GPTModel(cfg).eval()
+    start = time.perf_counter()
+    load(mode, model, args)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with torch.inference_mode():
+        logits = model(torch.tensor([[6109, 3626, 6100, 345]]))  # "Every effort moves you"
+    forward_seconds = time.perf_counter() - start
+    # ru_maxrss is in KB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"load": load_seconds, "forward": forward_seconds, "peak_mb": peak_mb,
+                      "next_token": int(logits[0, -1].argmax())}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GPT-2 weight loading time: TensorFlow vs torch.load vs mmap")
+    parser.add_argument("--model-size", default="124M", choices=("124M", "355M", "774M", "1558M"))
+    parser.add_argument("--models-dir", default="gpt2")
+    parser.add_argument("--attn-impl", default="classic", choices=("classic", "fused"))
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--weights", help=argparse.SUPPRESS)
+    parser.add_argument("--pth", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    settings, weights_path = download_and_convert_gpt2(args.model_size, args.models_dir)
+    cfg = model_config(settings, args.attn_impl)
+    if args.child:
+        run_child(args.child, cfg, args)
+        return
+
+    modes = [mode for mode in MODES if mode != "tf" or importlib.util.find_spec("tensorflow")]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the same weights as a pickled state_dict, like model.pth in model_trainable.py
+        pth_path = os.path.join(tmp_dir, "model.pth")
+        torch.save(load_gpt2_weights(GPTModel(cfg), weights_path).state_dict(), pth_path)
+        for mode in modes:
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", mode,
+                   "--model-size", args.model_size, "--models-dir", args.models_dir,
+                   "--attn-impl", args.attn_impl, "--weights", weights_path, "--pth", pth_path]
+            output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"GPT-2 {args.model_size} ({args.attn_impl} attention), "
+          f"{os.path.getsize(weights_path) / 1024 ** 2:.0f} MB of weights")
+    print(f"{'mode':<12}{'load (s)':>10}{'first forward (s)':>19}{'peak RSS (MB)':>16}")
+    for mode in modes:
+        r = results[mode]
+        print(f"{mode:<12}{r['load']:>10.3f}{r['forward']:>19.3f}{r['peak_mb']:>16.0f}")
+    if len({r["next_token"] for r in results.values()}) > 1:
+        print("warning: the modes predict different next tokens:",
+              {mode: r["next_token"] for mode, r in results.items()})
+
+
+if __name__ == "__main__":
+    main()
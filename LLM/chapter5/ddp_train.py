@@ -0,0 +1,222 @@
+# Data-parallel pretraining of GPTModel on several local CPU processes.
+#
+# train_model_simple runs in one process, and on small batches PyTorch's intra-op threads stop
+# helping after a few cores. Here N processes each hold a full copy of the model:
+#   - DistributedSampler gives every process a different shard of the training windows
+#     (set_epoch reshuffles the shards every epoch)
+#   - DistributedDataParallel all-reduces (averages) the gradients over the processes in backward,
+#     so every process takes the same optimizer step and the copies stay identical
+#   - with grad_accum_steps > 1 the micro-batches before a step run under no_sync(),
+#     so the gradients are all-reduced once per optimizer step instead of once per micro-batch
+#   - only rank 0 prints, samples text and writes the checkpoint
+# batch_size is per process: with N processes one optimizer step sees N * batch_size windows.
+#
+# The processes talk over the gloo backend (works on CPU) and find each other through the
+# MASTER_ADDR, MASTER_PORT, RANK and WORLD_SIZE environment variables, set by launch_ddp.py:
+#   python chapter5/launch_ddp.py --nproc 4 -- --text the-verdict.txt --epochs 10
+# or by torchrun:
+#   torchrun --nproc_per_node 4 chapter5/ddp_train.py --text the-verdict.txt --epochs 10
+#
+# The checkpoint is written with weights_io.save_checkpoint, like model_and_optimizer.safetensors
+# in model_trainable.py.
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+
+import numpy as np
+import torch
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chapter2.token_dataset import TOKEN_DTYPE, GPTDatasetMemmap, ensure_token_file
+from chapter4.model import GPT_CONFIG_124M, GPTModel, generate_text_simple
+from chapter5.train_utils import ThroughputMeter, accum_group_size, autocast_context
+from chapter5.weights_io import save_checkpoint
+
+
+def setup_distributed():
+    dist.init_process_group(backend="gloo")
+    return dist.get_rank(), dist.get_world_size()
+
+
+# every rank gets len(dataset) / world_size windows; with drop_last=False the sampler repeats
+# a few windows so all ranks run the same number of batches (otherwise the all-reduce would hang)
+def create_distributed_loader(dataset, batch_size, shuffle, drop_last, seed=123):
+    sampler = DistributedSampler(dataset, shuffle=shuffle, seed=seed, drop_last=drop_last)
+    loader = DataLoader(dataset, batch_size=batch_size, sampler=sampler, drop_last=drop_last)
+    return loader, sampler
+
+
+def calc_loss_batch(input_batch, target_batch, model):
+    logits = model(input_batch)
+    return torch.nn.functional.cross_entropy(logits.flatten(0, 1), target_batch.flatten())
+
+
+# Mean loss over the first eval_iter batches of every rank's shard, averaged over all ranks.
+# model is the plain GPTModel (ddp_model.module): evaluation needs no gradient synchronisation.
+def evaluate_distributed(model, data_loader, eval_iter, device, autocast_dtype=None):
+    total = torch.zeros(2, dtype=torch.float64)
+    model.eval()
+    with torch.inference_mode(), autocast_context(device, autocast_dtype):
+        for i, (input_batch, target_batch) in enumerate(data_loader):
+            if i >= eval_iter:
+                break
+            loss = calc_loss_batch(input_batch.to(device), target_batch.to(device), model)
+            total[0] += loss.item()
+            total[1] += 1
+    model.train()
+    dist.all_reduce(total)
+    return (total[0] / total[1]).item() if total[1] > 0 else float("nan")
+
+
+def train_ddp(ddp_model, train_loader, train_sampler, val_loader, optimizer, device, num_epochs,
+              eval_freq, eval_iter, rank, world_size, start_context=None, tokenizer=None,
+              autocast_dtype=None, grad_accum_steps=1, max_steps=None, warmup_steps=0,
+              checkpoint_path=None):
+    model = ddp_model.module
+    global_step = -1
+    # tokens over all ranks: every rank runs the same number of equally sized batches
+    meter, bench = ThroughputMeter(), ThroughputMeter()
+
+    for epoch in range(num_epochs):
+        train_sampler.set_epoch(epoch)
+        ddp_model.train()
+        optimizer.zero_grad()
+        for micro_step, (input_batch, target_batch) in enumerate(train_loader, start=1):
+            is_step = micro_step % grad_accum_steps == 0 or micro_step == len(train_loader)
+            meter.start()
+            bench.start()
+            # skip the gradient all-reduce on micro-batches that don't end with an optimizer step
+            sync = contextlib.nullcontext() if is_step else ddp_model.no_sync()
+            with sync:
+                with autocast_context(device, autocast_dtype):
+                    loss = calc_loss_batch(input_batch.to(device), target_batch.to(device), ddp_model)
+                (loss / accum_group_size(micro_step, grad_accum_steps, len(train_loader))).backward()
+            if is_step:
+                optimizer.step()
+                optimizer.zero_grad()
+                global_step += 1
+            tokens = target_batch.numel() * world_size
+            meter.stop(tokens, steps=int(is_step))
+            bench.stop(tokens, steps=int(is_step))
+            # the first steps include one-time allocations; keep them out of the benchmark
+            if is_step and global_step + 1 == warmup_steps:
+                bench.reset()
+
+            if is_step and eval_freq and global_step % eval_freq == 0:
+                val_loss = evaluate_distributed(model, val_loader, eval_iter, device, autocast_dtype)
+                if rank == 0:
+                    print(f"EP {epoch + 1} (Step {global_step:06d}): "
+                          f"Train loss {loss.item():.3f}, "
+                          f"Val loss {val_loss:.3f}, "
+                          f"{meter.report()}")
+            if max_steps is not None and global_step + 1 >= max_steps:
+                break
+        done = max_steps is not None and global_step + 1 >= max_steps
+        if rank == 0 and start_context is not None and not done:
+            print_sample(model, tokenizer, device, start_context)
+        if rank == 0 and checkpoint_path:
+            save_checkpoint(checkpoint_path, model, optimizer)
+        # the other ranks wait, so none of them starts the next epoch (or exits) before the checkpoint is written
+        dist.barrier()
+        if done:
+            break
+    return bench
+
+
+def print_sample(model, tokenizer, device, start_context):
+    model.eval()
+    encoded = torch.tensor(tokenizer.encode(start_context)).unsqueeze(0).to(device)
+    with torch.no_grad():
+        token_ids = generate_text_simple(model, encoded, max_new_tokens=50,
+                                         context_size=model.pos_emb.weight.shape[0])
+    print(tokenizer.decode(token_ids.squeeze(0).tolist()).replace("\n", " "))
+    model.train()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="data-parallel GPTModel pretraining (gloo, CPU)")
+    parser.add_argument("--text", default="the-verdict.txt", help="UTF-8 training text")
+    parser.add_argument("--token-file", default=None, help="uint16 token file (default: <text>.gpt2.bin)")
+    parser.add_argument("--context-length", type=int, default=256)
+    parser.add_argument("--n-layers", type=int, default=GPT_CONFIG_124M["n_layers"])
+    parser.add_argument("--batch-size", type=int, default=2, help="windows per process and micro-batch")
+    parser.add_argument("--grad-accum-steps", type=int, default=1)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--lr", type=float, default=0.0004)
+    parser.add_argument("--eval-freq", type=int, default=5, help="optimizer steps between evaluations, 0 = never")
+    parser.add_argument("--eval-iter", type=int, default=5)
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast")
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads per process")
+    parser.add_argument("--max-steps", type=int, default=None, help="stop after this many optimizer steps")
+    parser.add_argument("--warmup-steps", type=int, default=0, help="steps left out of the final throughput")
+    parser.add_argument("--checkpoint", default="model_and_optimizer.safetensors", help="'' = don't save")
+    parser.add_argument("--stats-json", default=None, help="rank 0 writes the final throughput here")
+    parser.add_argument("--no-sample", action="store_true", help="don't print a sample after each epoch")
+    args = parser.parse_args()
+
+    rank, world_size = setup_distributed()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    device = torch.device("cpu")
+
+    # rank 0 tokenizes the text once, the others wait and memory-map the same file
+    token_file = args.token_file or args.text + ".gpt2.bin"
+    if rank == 0:
+        ensure_token_file([args.text], token_file)
+    dist.barrier()
+
+    cfg = dict(GPT_CONFIG_124M, context_length=args.context_length, n_layers=args.n_layers)
+    num_tokens = os.path.getsize(token_file) // np.dtype(TOKEN_DTYPE).itemsize
+    # 90% / 10% split like train_ratio in model_trainable.py, but on tokens instead of characters
+    split = int(0.90 * num_tokens)
+    train_dataset = GPTDatasetMemmap(token_file, cfg["context_length"], cfg["context_length"], end=split)
+    val_dataset = GPTDatasetMemmap(token_file, cfg["context_length"], cfg["context_length"], start=split)
+    train_loader, train_sampler = create_distributed_loader(
+        train_dataset, args.batch_size, shuffle=True, drop_last=True)
+    val_loader, _ = create_distributed_loader(
+        val_dataset, args.batch_size, shuffle=False, drop_last=False)
+    if len(train_loader) == 0:
+        raise ValueError(f"{len(train_dataset)} training windows are too few for "
+                         f"{world_size} processes x batch size {args.batch_size}")
+
+    # the same seed on every rank; DistributedDataParallel also broadcasts rank 0's weights
+    torch.manual_seed(123)
+    model = GPTModel(cfg).to(device)
+    ddp_model = DistributedDataParallel(model)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=0.1)
+
+    tokenizer = None
+    if not args.no_sample:
+        import tiktoken
+        tokenizer = tiktoken.get_encoding("gpt2")
+
+    if rank == 0:
+        print(f"{world_size} processes x {torch.get_num_threads()} threads, "
+              f"{len(train_dataset)} training windows, {len(train_loader)} batches per process and epoch")
+    bench = train_ddp(
+        ddp_model, train_loader, train_sampler, val_loader, optimizer, device, args.epochs,
+        args.eval_freq, args.eval_iter, rank, world_size,
+        start_context=None if args.no_sample else "Every effort moves you", tokenizer=tokenizer,
+        autocast_dtype=torch.bfloat16 if args.bf16 else None, grad_accum_steps=args.grad_accum_steps,
+        max_steps=args.max_steps, warmup_steps=args.warmup_steps, checkpoint_path=args.checkpoint)
+
+    if rank == 0:
+        tokens_per_sec = bench.tokens / bench.seconds if bench.seconds else math.nan
+        print(f"{bench.steps} steps, {tokens_per_sec:,.0f} tokens/sec over {world_size} processes")
+        if args.stats_json:
+            with open(args.stats_json, "w", encoding="utf-8") as f:
+                json.dump({"world_size": world_size, "threads": torch.get_num_threads(),
+                           "steps": bench.steps, "tokens": bench.tokens, "seconds": bench.seconds,
+                           "tokens_per_sec": tokens_per_sec}, f)
+    dist.destroy_process_group()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,13 @@ import urllib.request
 # import requests
 import json
 import numpy as np
-import tensorflow as tf
 from tqdm import tqdm
 
+from .weights_io import gpt2_params_to_state_dict, save_tensors
+
+# the converted weights, written into the model directory by download_and_convert_gpt2
+CONVERTED_FILENAME = "model.safetensors"
+
 
 def download_and_load_gpt2(model_size, models_dir):
     # Validate model size
@@ -39,6 +43,7 @@ def download_and_load_gpt2(model_size, models_dir):
         download_file(file_url, file_path, backup_url)
 
     # Load settings and params
+    import tensorflow as tf
     tf_ckpt_path = tf.train.latest_checkpoint(model_dir)
     settings = json.load(open(os.path.join(model_dir, "hparams.json"), "r", encoding="utf-8"))
     params = load_gpt2_params_from_tf_ckpt(tf_ckpt_path, settings)
@@ -46,6 +51,23 @@ def download_and_load_gpt2(model_size, models_dir):
     return settings, params
 
 
+# Like download_and_load_gpt2, but the TensorFlow checkpoint is converted once into
+# model_dir/model.safetensors (GPTModel's state_dict layout, see weights_io.py).
+# Later runs find that file and need neither the downloads nor TensorFlow.
+# Returns the settings and the path for weights_io.load_gpt2_weights.
+def download_and_convert_gpt2(model_size, models_dir):
+    model_dir = os.path.join(models_dir, model_size)
+    weights_path = os.path.join(model_dir, CONVERTED_FILENAME)
+    hparams_path = os.path.join(model_dir, "hparams.json")
+    if not (os.path.exists(weights_path) and os.path.exists(hparams_path)):
+        settings, params = download_and_load_gpt2(model_size, models_dir)
+        save_tensors(gpt2_params_to_state_dict(params), weights_path,
+                     metadata={"hparams": json.dumps(settings)})
+    with open(hparams_path, "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    return settings, weights_path
+
+
 def download_file(url, destination, backup_url=None):
     def _attempt_download(download_url):
         with urllib.request.urlopen(download_url) as response:
@@ -129,6 +151,8 @@ def download_file(url, destination):
 
 
 def load_gpt2_params_from_tf_ckpt(ckpt_path, settings):
+    import tensorflow as tf
+
     # Initialize parameters dictionary with empty blocks for each layer
     params = {"blocks": [{} for _ in range(settings["n_layer"])]}
 
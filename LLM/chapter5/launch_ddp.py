@@ -0,0 +1,64 @@
+# Start ddp_train.py on nproc local processes (a minimal torchrun).
+#
+# Every process gets MASTER_ADDR/MASTER_PORT (a free local port), RANK, LOCAL_RANK and WORLD_SIZE,
+# and the machine's cores are split between the processes: OMP_NUM_THREADS and --threads are
+# cpu_count // nproc, so N processes don't each start cpu_count intra-op threads and fight for cores.
+# If one process fails the others are stopped (they would otherwise wait forever in an all-reduce).
+#
+#   python chapter5/launch_ddp.py --nproc 4 -- --text the-verdict.txt --epochs 10
+# everything after "--" is passed to ddp_train.py.
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+TRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ddp_train.py")
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Returns 0 if all processes succeeded, else the first non-zero exit code.
+def launch(nproc, script_args=(), threads_per_proc=None, script=TRAIN_SCRIPT):
+    threads = threads_per_proc or max(1, (os.cpu_count() or 1) // nproc)
+    port = free_port()
+    procs = []
+    for rank in range(nproc):
+        env = dict(os.environ,
+                   MASTER_ADDR="127.0.0.1", MASTER_PORT=str(port),
+                   RANK=str(rank), LOCAL_RANK=str(rank), WORLD_SIZE=str(nproc),
+                   OMP_NUM_THREADS=str(threads))
+        procs.append(subprocess.Popen(
+            [sys.executable, script, "--threads", str(threads), *script_args], env=env))
+
+    try:
+        while True:
+            codes = [p.poll() for p in procs]
+            failed = [code for code in codes if code not in (None, 0)]
+            if failed or all(code == 0 for code in codes):
+                break
+            time.sleep(0.2)
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in procs:
+            p.wait()
+    return failed[0] if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="run ddp_train.py on several local processes")
+    parser.add_argument("--nproc", type=int, default=2, help="number of processes")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="intra-op threads per process (default: cpu_count // nproc)")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="-- arguments for ddp_train.py")
+    args = parser.parse_args()
+
+    script_args = args.script_args[1:] if args.script_args[:1] == ["--"] else args.script_args
+    sys.exit(launch(args.nproc, script_args, args.threads))
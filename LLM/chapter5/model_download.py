@@ -119,28 +119,34 @@ def assign(left, right):
 
 import numpy as np
 
+# MultiHeadAttention has separate W_query/W_key/W_value layers: split GPT-2's fused c_attn into three
+def assign_split_qkv(att, c_attn):
+    q_w, k_w, v_w = np.split(c_attn["w"], 3, axis=-1)
+    att.W_query.weight = assign(att.W_query.weight, q_w.T)
+    att.W_key.weight = assign(att.W_key.weight, k_w.T)
+    att.W_value.weight = assign(att.W_value.weight, v_w.T)
+
+    q_b, k_b, v_b = np.split(c_attn["b"], 3, axis=-1)
+    att.W_query.bias = assign(att.W_query.bias, q_b)
+    att.W_key.bias = assign(att.W_key.bias, k_b)
+    att.W_value.bias = assign(att.W_value.bias, v_b)
+
 def load_weights_into_gpt(gpt, params):
     gpt.pos_emb.weight = assign(gpt.pos_emb.weight, params['wpe'])
     gpt.tok_emb.weight = assign(gpt.tok_emb.weight, params['wte'])
 
     for b in range(len(params["blocks"])):
-        q_w, k_w, v_w = np.split(
-            (params["blocks"][b]["attn"]["c_attn"])["w"], 3, axis=-1)
-        gpt.trf_blocks[b].att.W_query.weight = assign(
-            gpt.trf_blocks[b].att.W_query.weight, q_w.T)
-        gpt.trf_blocks[b].att.W_key.weight = assign(
-            gpt.trf_blocks[b].att.W_key.weight, k_w.T)
-        gpt.trf_blocks[b].att.W_value.weight = assign(
-            gpt.trf_blocks[b].att.W_value.weight, v_w.T)
-
-        q_b, k_b, v_b = np.split(
-            (params["blocks"][b]["attn"]["c_attn"])["b"], 3, axis=-1)
-        gpt.trf_blocks[b].att.W_query.bias = assign(
-            gpt.trf_blocks[b].att.W_query.bias, q_b)
-        gpt.trf_blocks[b].att.W_key.bias = assign(
-            gpt.trf_blocks[b].att.W_key.bias, k_b)
-        gpt.trf_blocks[b].att.W_value.bias = assign(
-            gpt.trf_blocks[b].att.W_value.bias, v_b)
+        # GPT-2 stores the query, key and value weights fused in c_attn, which is exactly
+        # the layout of MultiHeadAttentionFused (attn_impl "fused"): assign it directly
+        if hasattr(gpt.trf_blocks[b].att, "qkv"):
+            gpt.trf_blocks[b].att.qkv.weight = assign(
+                gpt.trf_blocks[b].att.qkv.weight,
+                params["blocks"][b]["attn"]["c_attn"]["w"].T)
+            gpt.trf_blocks[b].att.qkv.bias = assign(
+                gpt.trf_blocks[b].att.qkv.bias,
+                params["blocks"][b]["attn"]["c_attn"]["b"])
+        else:
+            assign_split_qkv(gpt.trf_blocks[b].att, params["blocks"][b]["attn"]["c_attn"])
 
         gpt.trf_blocks[b].att.out_proj.weight = assign(
             gpt.trf_blocks[b].att.out_proj.weight, 
@@ -23,7 +23,10 @@ model = GPTModel(GPT_CONFIG_124M)
 model.eval()
 
 import tiktoken
-from chapter4.model import generate_text_simple
+from chapter4.model import generate_text_simple, cached_logits
+from chapter5.train_utils import (ThroughputMeter, accum_group_size, autocast_context, cache_batches,
+                                  maybe_compile)
+from chapter5.weights_io import load_checkpoint, save_checkpoint
 
 def text_to_token_ids(text, tokenizer):
     encoded = tokenizer.encode(text, allowed_special={'<|endoftext|>'})
@@ -145,10 +148,16 @@ print("\nValidation loader:")
 for x,y in val_loader:
     print(x.shape, y.shape)
 
+# A batch is either a tensor of token ids or, for packed sequences (chapter7/packing.py),
+# a dict of GPTModel.forward arguments: in_idx, pos_ids and attn_mask.
+def model_inputs(input_batch, device):
+    if isinstance(input_batch, dict):
+        return {name: tensor.to(device) for name, tensor in input_batch.items()}
+    return {"in_idx": input_batch.to(device)}
+
 def calc_loss_batch(input_batch, target_batch, model, device):
-    input_batch = input_batch.to(device)
     target_batch = target_batch.to(device)
-    logits = model(input_batch)
+    logits = model(**model_inputs(input_batch, device))
     loss = torch.nn.functional.cross_entropy(
         logits.flatten(0,1),
         target_batch.flatten()
@@ -182,42 +191,67 @@ print("Training loss:", train_loss)
 print("Validation loss:", val_loss)
 
 # implement the training loop code.
+# Optional CPU speed-ups (helpers in train_utils.py), all off by default:
+#   autocast_dtype    e.g. torch.bfloat16 to run the forward pass under bf16 autocast
+#   grad_accum_steps  micro-batches per optimizer step, for a larger effective batch
+#                     (global_step and eval_freq count optimizer steps)
+#   compile_model     torch.compile the model for the training and evaluation passes
+# Evaluation always uses the same first eval_iter batches of each loader, cached once.
 def train_model_simple(model, train_loader, val_loader,
                        optimizer, device, num_epochs,
-                       eval_freq, eval_iter, start_context, tokenizer):
+                       eval_freq, eval_iter, start_context, tokenizer,
+                       autocast_dtype=None, grad_accum_steps=1, compile_model=False):
     train_losses, val_losses, track_tokens_seen = [], [], []
     tokens_seen, global_step = 0, -1
+    train_eval_batches = cache_batches(train_loader, eval_iter, device)
+    val_eval_batches = cache_batches(val_loader, eval_iter, device)
+    step_model = maybe_compile(model, compile_model,
+                               train_eval_batches[0][0] if train_eval_batches else None,
+                               device, autocast_dtype)
+    meter = ThroughputMeter()
 
     for epoch in range(num_epochs):
         model.train()
-        for input_batch, target_batch in train_loader:
-            optimizer.zero_grad()
-            loss = calc_loss_batch(
-                input_batch, target_batch, model, device
-            )
-            loss.backward()
-            optimizer.step()
-            tokens_seen += input_batch.numel()
-            global_step += 1
-
-            if global_step % eval_freq == 0:
+        optimizer.zero_grad()
+        for micro_step, (input_batch, target_batch) in enumerate(train_loader, start=1):
+            meter.start()
+            with autocast_context(device, autocast_dtype):
+                loss = calc_loss_batch(
+                    input_batch, target_batch, step_model, device
+                )
+            # average the gradients over the micro-batches of one optimizer step
+            (loss / accum_group_size(micro_step, grad_accum_steps, len(train_loader))).backward()
+            tokens_seen += target_batch.numel()
+            # the last micro-batches of an epoch are stepped even if they are fewer than grad_accum_steps
+            is_step = micro_step % grad_accum_steps == 0 or micro_step == len(train_loader)
+            if is_step:
+                optimizer.step()
+                optimizer.zero_grad()
+                global_step += 1
+            meter.stop(target_batch.numel(), steps=int(is_step))
+
+            if is_step and global_step % eval_freq == 0:
                 train_loss, val_loss = evaluate_model(
-                    model, train_loader, val_loader, device, eval_iter)
+                    step_model, train_eval_batches, val_eval_batches, device, eval_iter,
+                    autocast_dtype)
                 train_losses.append(train_loss)
                 val_losses.append(val_loss)
                 track_tokens_seen.append(tokens_seen)
                 print(f"EP {epoch + 1} (Step {global_step:06d}): "
                       f"Train loss {train_loss:.3f},"
-                      f"Val loss {val_loss:.3f}"
+                      f"Val loss {val_loss:.3f}, "
+                      f"{meter.report()}"
                 )
         generate_and_print_sample(
             model, tokenizer, device, start_context
         )
     return train_losses, val_losses, track_tokens_seen
 
-def evaluate_model(model, train_loader, val_loader, device, eval_iter):
+# train_loader/val_loader can also be lists of cached batches (train_utils.cache_batches).
+# inference_mode is cheaper than no_grad: tensors skip the version counter and autograd bookkeeping.
+def evaluate_model(model, train_loader, val_loader, device, eval_iter, autocast_dtype=None):
     model.eval()
-    with torch.no_grad():
+    with torch.inference_mode(), autocast_context(device, autocast_dtype):
         train_loss = calc_loss_loader(
             train_loader, model, device, num_batches=eval_iter
         )
@@ -355,16 +389,24 @@ print(new_logits)
 topk_probas = torch.softmax(new_logits, dim=0)
 print(topk_probas)
 
+# use_cache=True decodes with the KV cache of GPTModel (see chapter4.model.generate_text_cached):
+# the prompt is prefilled once and afterwards only the newest token is fed to the model.
 def generate(model, idx, max_new_tokens, context_size,
-             temperature=0.0, top_k=None, eos_id=None):
-    for _ in range(max_new_tokens):
+             temperature=0.0, top_k=None, eos_id=None, use_cache=False):
+    for step in range(max_new_tokens):
         idx_cond = idx[:, -context_size:]
         with torch.no_grad():
-            logits = model(idx_cond)
+            if not use_cache:
+                logits = model(idx_cond)
+            elif step == 0:
+                logits = model.prefill(idx_cond)
+            else:
+                logits = cached_logits(model, idx, context_size)
         logits = logits[:, -1, :]
         if top_k is not None:
             top_logits, _ = torch.topk(logits, top_k)
-            min_val = top_logits[:, -1]
+            # keep the last dimension so that every row is compared with its own k-th logit
+            min_val = top_logits[:, -1:]
             logits = torch.where(
                 logits < min_val,
                 torch.tensor(float('-inf')).to(logits.device),
@@ -376,9 +418,13 @@ def generate(model, idx, max_new_tokens, context_size,
             idx_next = torch.multinomial(probs, num_samples=1)
         else:
             idx_next = torch.argmax(logits, dim=-1, keepdim=True)
-        if idx_next == eos_id:
+        # generate() stops the whole batch; chapter5.batch_generation.generate_batch
+        # stops every sequence on its own EOS and also supports prompts of different lengths.
+        if eos_id is not None and bool((idx_next == eos_id).all()):
             break
         idx = torch.cat((idx, idx_next), dim=1)
+    if use_cache:
+        model.reset_kv_cache()
     return idx
     
 torch.manual_seed(123)
@@ -393,23 +439,23 @@ token_ids = generate(
 print("Output text:\n", token_ids_to_text(token_ids, tokenizer))
 
 # sava model
-torch.save(model.state_dict(), "model.pth")
+# save_checkpoint writes a safetensors file (see weights_io.py) instead of pickling with torch.save;
+# load_checkpoint memory-maps it, so the weights are read from disk only when they're used
+save_checkpoint("model.safetensors", model)
 
 # load model
 model = GPTModel(GPT_CONFIG_124M)
-model.load_state_dict(torch.load("model.pth", map_location=device))
+load_checkpoint("model.safetensors", model)
+model.to(device)
 model.eval()
 
 # save model and optimizer
-torch.save({
-    "model_state_dict" : model.state_dict(),
-    "optimizer_state_dict": optimizer.state_dict(),
-}, "model_and_optimizer.pth")
+save_checkpoint("model_and_optimizer.safetensors", model, optimizer)
 
-checkpoint = torch.load("model_and_optimizer.pth", map_location=device)
 model = GPTModel(GPT_CONFIG_124M)
-model.load_state_dict(checkpoint["model_state_dict"])
+optimizer_state = load_checkpoint("model_and_optimizer.safetensors", model)
+model.to(device)
+# the optimizer is created after loading: load_checkpoint replaces the parameter objects
 optimizer = torch.optim.AdamW(model.parameters(), lr=5e-4, weight_decay=0.1)
-optimizer.load_state_dict(checkpoint["optimizer_state_dict"]) 
+optimizer.load_state_dict(optimizer_state)
 model.train()
-
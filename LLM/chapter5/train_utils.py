@@ -0,0 +1,100 @@
+# Helpers that make the training loops (train_model_simple in model_trainable.py,
+# train_classifier_simple in chapter6.py) usable on CPU-only machines.
+#
+#   autocast_context   bf16 autocast: matmuls run in bfloat16, which recent CPUs (AVX512-BF16/AMX)
+#                      execute much faster than float32; the weights stay float32
+#   maybe_compile      torch.compile the model and run one warm-up training pass on an example batch
+#                      (falls back to eager if compiling isn't supported)
+#   cache_batches      take the first num_batches batches of a loader once, so every evaluation
+#                      uses the same fixed subset instead of re-iterating (and re-shuffling) the loader
+#   ThroughputMeter    step time and tokens/sec between two log lines
+#
+# Gradient accumulation is done in the loops themselves: optimizer.step() runs once every
+# grad_accum_steps micro-batches, and the loss of each micro-batch is divided by the number of
+# micro-batches in its group (accum_group_size), so every step uses the mean gradient.
+import contextlib
+import time
+
+import torch
+
+
+def autocast_context(device, dtype=None):
+    if dtype is None:
+        return contextlib.nullcontext()
+    return torch.autocast(device_type=torch.device(device).type, dtype=dtype)
+
+
+# torch.compile only wraps the model: the graph is compiled on the first call. So with an
+# example_batch (an input batch already on the device, a tensor or a dict of forward arguments)
+# one training forward and backward pass runs here, and a compiler error (e.g. no C++ compiler)
+# falls back to eager mode instead of stopping the training loop. The warm-up gradients are cleared.
+# Without example_batch compile errors only show up at the first training step.
+def maybe_compile(model, enabled=False, example_batch=None, device="cpu", autocast_dtype=None):
+    if not enabled:
+        return model
+    was_training = model.training
+    try:
+        compiled = torch.compile(model)
+        if example_batch is not None:
+            model.train()
+            with autocast_context(device, autocast_dtype):
+                if isinstance(example_batch, dict):
+                    output = compiled(**example_batch)
+                else:
+                    output = compiled(example_batch)
+            output.float().sum().backward()
+        return compiled
+    except Exception as error:  # e.g. no C++ compiler or an unsupported Python version
+        print(f"torch.compile not available, training in eager mode: {error}")
+        return model
+    finally:
+        model.zero_grad(set_to_none=True)
+        model.train(was_training)
+
+
+# Number of micro-batches in the accumulation group of micro_step (1-based): grad_accum_steps,
+# except for the last group of an epoch, which can be shorter.
+def accum_group_size(micro_step, grad_accum_steps, num_micro_steps):
+    group_start = (micro_step - 1) // grad_accum_steps * grad_accum_steps
+    return min(grad_accum_steps, num_micro_steps - group_start)
+
+
+def cache_batches(data_loader, num_batches, device):
+    batches = []
+    for i, (input_batch, target_batch) in enumerate(data_loader):
+        if i >= num_batches:
+            break
+        if isinstance(input_batch, dict):
+            input_batch = {name: tensor.to(device) for name, tensor in input_batch.items()}
+        else:
+            input_batch = input_batch.to(device)
+        batches.append((input_batch, target_batch.to(device)))
+    return batches
+
+
+class ThroughputMeter:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.steps = 0
+        self.tokens = 0
+        self.seconds = 0.0
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+
+    def stop(self, tokens, steps=1):
+        self.seconds += time.perf_counter() - self._start
+        self.tokens += tokens
+        self.steps += steps
+
+    # e.g. "212 ms/step, 1,207 tokens/sec", then starts a new window
+    def report(self):
+        if self.steps == 0 or self.seconds == 0:
+            return "no steps"
+        text = (f"{1000 * self.seconds / self.steps:.0f} ms/step, "
+                f"{self.tokens / self.seconds:,.0f} tokens/sec")
+        self.reset()
+        return text
@@ -0,0 +1,181 @@
+# A memory-mapped weights file for GPTModel, in the safetensors format.
+#
+# torch.save/torch.load pickle the state_dict, and loading reads every tensor into RAM
+# before load_state_dict copies it again into the model. The GPT-2 weights are worse: every run
+# starts TensorFlow and reads each variable with tf.train.load_variable (load_gpt2_params_from_tf_ckpt).
+#
+# A safetensors file is an 8-byte header length, a JSON header (name -> dtype, shape, byte range)
+# and the raw tensor bytes. load_tensors memory-maps the file and returns tensors that are views
+# of the mapping, and load_state_dict(..., assign=True) makes them the model's parameters, so
+# nothing is read or copied up front: the OS pages the weights in when they're first used.
+# The mapping is copy-on-write, so training the loaded model never modifies the file.
+# Only numpy and torch are needed to read and write it; the files also open with the safetensors package.
+#
+# GPT-2 weights are converted once (gpt_download.download_and_convert_gpt2), already split
+# and transposed into GPTModel's state_dict layout:
+#   settings, weights_path = download_and_convert_gpt2("124M", "gpt2")
+#   load_gpt2_weights(model, weights_path)
+#
+# Training checkpoints (model.pth / model_and_optimizer.pth in model_trainable.py):
+#   save_checkpoint("model_and_optimizer.safetensors", model, optimizer)
+#   optimizer_state = load_checkpoint("model_and_optimizer.safetensors", model)
+#   optimizer = torch.optim.AdamW(model.parameters(), lr=5e-4, weight_decay=0.1)
+#   optimizer.load_state_dict(optimizer_state)
+import json
+import os
+
+import numpy as np
+import torch
+
+_DTYPE_NAMES = {
+    torch.float64: "F64", torch.float32: "F32", torch.float16: "F16", torch.bfloat16: "BF16",
+    torch.int64: "I64", torch.int32: "I32", torch.int16: "I16", torch.int8: "I8",
+    torch.uint8: "U8", torch.bool: "BOOL",
+}
+_TORCH_DTYPES = {name: dtype for dtype, name in _DTYPE_NAMES.items()}
+
+
+# tensors: dict name -> tensor. metadata: dict of strings stored in the header.
+def save_tensors(tensors, path, metadata=None):
+    tensors = {name: tensor.detach().cpu().contiguous() for name, tensor in tensors.items()}
+    # largest element size first: with the header padded to 8 bytes every tensor starts
+    # aligned to its own element size, so the mapped views need no copy
+    names = sorted(tensors, key=lambda name: (-tensors[name].element_size(), name))
+
+    header, offset = {}, 0
+    for name in names:
+        tensor = tensors[name]
+        nbytes = tensor.numel() * tensor.element_size()
+        header[name] = {"dtype": _DTYPE_NAMES[tensor.dtype], "shape": list(tensor.shape),
+                        "data_offsets": [offset, offset + nbytes]}
+        offset += nbytes
+    if metadata:
+        header["__metadata__"] = {key: str(value) for key, value in metadata.items()}
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-len(header_bytes) % 8)
+
+    # rename only when the file is complete, so an interrupted save never replaces a good file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name in names:
+            if tensors[name].numel():
+                tensors[name].reshape(-1).view(torch.uint8).numpy().tofile(f)
+    os.replace(tmp_path, path)
+
+
+# Returns (tensors, metadata). With mmap=False the whole file is read into memory instead.
+def load_tensors(path, mmap=True):
+    with open(path, "rb") as f:
+        header_length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_length))
+    metadata = header.pop("__metadata__", {})
+
+    data_start = 8 + header_length
+    if os.path.getsize(path) == data_start:
+        buffer = np.empty(0, dtype=np.uint8)
+    elif mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode="c", offset=data_start)
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8, offset=data_start)
+
+    tensors = {}
+    for name, info in header.items():
+        start, end = info["data_offsets"]
+        raw = torch.from_numpy(buffer[start:end])
+        tensors[name] = raw.view(_TORCH_DTYPES[info["dtype"]]).reshape(info["shape"])
+    return tensors, metadata
+
+
+# load_state_dict with assign=True, so the mapped tensors become the parameters without a copy.
+# Buffers the file doesn't have (e.g. the causal mask) keep the values the model was built with.
+def load_into_model(model, state_dict):
+    result = model.load_state_dict(state_dict, strict=False, assign=True)
+    buffers = dict(model.named_buffers())
+    missing = [name for name in result.missing_keys if name not in buffers]
+    if missing or result.unexpected_keys:
+        raise ValueError(f"weights don't match the model: missing {missing}, "
+                         f"unexpected {result.unexpected_keys}")
+    return model
+
+
+# GPT-2 params (the nested dict of load_gpt2_params_from_tf_ckpt) in GPTModel's state_dict layout,
+# the same mapping as load_weights_into_gpt in model_download.py. c_attn is split into
+# W_query/W_key/W_value; MultiHeadAttentionFused concatenates them back into qkv when loading.
+# out_head.weight is left out: GPT-2 ties it to the token embedding (see load_gpt2_weights).
+def gpt2_params_to_state_dict(params):
+    def tensor(array):
+        return torch.from_numpy(np.ascontiguousarray(array, dtype=np.float32))
+
+    state_dict = {
+        "tok_emb.weight": tensor(params["wte"]),
+        "pos_emb.weight": tensor(params["wpe"]),
+        "final_norm.scale": tensor(params["g"]),
+        "final_norm.shift": tensor(params["b"]),
+    }
+    for b, block in enumerate(params["blocks"]):
+        prefix = f"trf_blocks.{b}."
+        q_w, k_w, v_w = np.split(block["attn"]["c_attn"]["w"], 3, axis=-1)
+        q_b, k_b, v_b = np.split(block["attn"]["c_attn"]["b"], 3, axis=-1)
+        state_dict.update({
+            prefix + "att.W_query.weight": tensor(q_w.T),
+            prefix + "att.W_key.weight": tensor(k_w.T),
+            prefix + "att.W_value.weight": tensor(v_w.T),
+            prefix + "att.W_query.bias": tensor(q_b),
+            prefix + "att.W_key.bias": tensor(k_b),
+            prefix + "att.W_value.bias": tensor(v_b),
+            prefix + "att.out_proj.weight": tensor(block["attn"]["c_proj"]["w"].T),
+            prefix + "att.out_proj.bias": tensor(block["attn"]["c_proj"]["b"]),
+            prefix + "ff.layers.0.weight": tensor(block["mlp"]["c_fc"]["w"].T),
+            prefix + "ff.layers.0.bias": tensor(block["mlp"]["c_fc"]["b"]),
+            prefix + "ff.layers.2.weight": tensor(block["mlp"]["c_proj"]["w"].T),
+            prefix + "ff.layers.2.bias": tensor(block["mlp"]["c_proj"]["b"]),
+            prefix + "norm1.scale": tensor(block["ln_1"]["g"]),
+            prefix + "norm1.shift": tensor(block["ln_1"]["b"]),
+            prefix + "norm2.scale": tensor(block["ln_2"]["g"]),
+            prefix + "norm2.shift": tensor(block["ln_2"]["b"]),
+        })
+    return state_dict
+
+
+# Map converted GPT-2 weights into a GPTModel (built with qkv_bias=True and the matching size).
+def load_gpt2_weights(model, path):
+    state_dict, _ = load_tensors(path)
+    if "out_head.weight" not in state_dict:
+        # a copy, not a second view of the same pages: fine-tuning updates the
+        # output head and the token embedding separately, as load_weights_into_gpt does
+        state_dict["out_head.weight"] = state_dict["tok_emb.weight"].clone()
+    return load_into_model(model, state_dict)
+
+
+# model_and_optimizer.pth as one safetensors file: the model tensors under "model.", the
+# optimizer state tensors under "optimizer.<param index>.<name>" and the param_groups
+# (learning rate, betas, ...) as JSON in the metadata.
+def save_checkpoint(path, model, optimizer=None):
+    tensors = {f"model.{name}": tensor for name, tensor in model.state_dict().items()}
+    metadata = {}
+    if optimizer is not None:
+        optimizer_state = optimizer.state_dict()
+        for index, state in optimizer_state["state"].items():
+            for name, value in state.items():
+                tensors[f"optimizer.{index}.{name}"] = torch.as_tensor(value)
+        metadata["param_groups"] = json.dumps(optimizer_state["param_groups"])
+    save_tensors(tensors, path, metadata)
+
+
+# Loads the model tensors and returns the optimizer state_dict (None if the file has none).
+# Build the optimizer only after this: assign=True replaces the model's parameter objects,
+# so an optimizer created before would still hold the old ones.
+def load_checkpoint(path, model):
+    tensors, metadata = load_tensors(path)
+    load_into_model(model, {name[len("model."):]: tensor for name, tensor in tensors.items()
+                            if name.startswith("model.")})
+    if "param_groups" not in metadata:
+        return None
+    state = {}
+    for name, tensor in tensors.items():
+        if name.startswith("optimizer."):
+            _, index, key = name.split(".", 2)
+            state.setdefault(int(index), {})[key] = tensor
+    return {"state": state, "param_groups": json.loads(metadata["param_groups"])}
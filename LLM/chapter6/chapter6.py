@@ -73,49 +73,38 @@ print(tokenizer.encode("<|endoftext|>", allowed_special={"<|endoftext|>"}))
 
 import torch
 from torch.utils.data import Dataset
+from chapter2.tokenize_cache import encode_cached
 
 class SpamDataset(Dataset):
+    # The texts are tokenized all at once on several threads and cached in cache_dir
+    # (see chapter2/tokenize_cache.py), so re-running the script skips the tokenization.
+    # encoded_texts is a ragged array; truncation and padding happen in __getitem__.
     def __init__(self, csv_file, tokenizer, max_length=None,
-                 pad_token_id=50256):
+                 pad_token_id=50256, cache_dir="token_cache"):
         self.data = pd.read_csv(csv_file)
-        
-        self.encoded_texts = [
-            tokenizer.encode(text) for text in self.data["text"]
-        ]
+        self.labels = torch.tensor(self.data["Label"].values, dtype=torch.long)
+        self.pad_token_id = pad_token_id
+
+        self.encoded_texts = encode_cached(
+            self.data["text"], tokenizer, cache_dir=cache_dir
+        )
 
         if max_length is None:
             self.max_length = self._longest_encoded_length()
         else:
             self.max_length = max_length
 
-            self.encoded_texts = [
-                encoded_text[:self.max_length]
-                for encoded_text in self.encoded_texts
-            ]
-
-        self.encoded_texts = [
-            encoded_text + [pad_token_id] *
-            (self.max_length - len(encoded_text))
-            for encoded_text in self.encoded_texts
-        ]
-
     def __getitem__(self, index):
-        encoded = self.encoded_texts[index]
-        label = self.data.iloc[index]["Label"]
-    
-        return (
-            torch.tensor(encoded, dtype=torch.long),
-            torch.tensor(label, dtype=torch.long)
-        )
+        encoded = self.encoded_texts[index][:self.max_length]
+        padded = torch.full((self.max_length,), self.pad_token_id, dtype=torch.long)
+        padded[:len(encoded)] = torch.from_numpy(encoded.astype("int64"))
+        return padded, self.labels[index]
 
     def __len__(self):
         return len(self.data)
 
     def _longest_encoded_length(self):
-        max_length = 0
-        for encoded_text in self.encoded_texts:
-            max_length = max(max_length, len(encoded_text))
-        return max_length  
+        return int(self.encoded_texts.lengths().max())
 
 train_dataset = SpamDataset(
     csv_file="train.csv", 
@@ -188,16 +177,19 @@ model_configs = {
 }
 BASE_CONFIG.update(model_configs[CHOOSE_MODEL])
 
-from chapter5.gpt_download import download_and_load_gpt2
+from chapter5.gpt_download import download_and_convert_gpt2
 from chapter5.model_trainable import GPTModel, evaluate_model
-from chapter5.model_download import load_weights_into_gpt
+from chapter5.train_utils import (ThroughputMeter, accum_group_size, autocast_context, cache_batches,
+                                  maybe_compile)
+from chapter5.weights_io import load_gpt2_weights
 
 model_size = CHOOSE_MODEL.split(" ")[-1].lstrip("(").rstrip(")")
-settings, params = download_and_load_gpt2(
+# the TensorFlow checkpoint is converted once; later runs memory-map the converted file
+settings, weights_path = download_and_convert_gpt2(
     model_size=model_size, models_dir="gpt2"
 )
 model = GPTModel(BASE_CONFIG)
-load_weights_into_gpt(model, params)
+load_gpt2_weights(model, weights_path)
 model.eval()
 
 from chapter4.model import generate_text_simple
@@ -276,7 +268,7 @@ def calc_accuracy_loader(data_loader, model, device, num_batches=None):
             input_batch = input_batch.to(device)
             target_batch = target_batch.to(device)
 
-            with torch.no_grad():
+            with torch.inference_mode():
                 logits = model(input_batch)[:, -1, :]
             predicted_labels = torch.argmax(logits, dim=1)
 
@@ -392,42 +384,59 @@ print(f"Test loss: {test_loss:.3f}")
     
 #     return train_losses, val_losses, train_accs, val_accs, examples_seen
 
+# The same optional CPU speed-ups as train_model_simple in chapter 5 (see chapter5/train_utils.py):
+# bf16 autocast, gradient accumulation, torch.compile, and evaluation on fixed cached batches.
 def train_classifier_simple(
         model, train_loader, val_loader, optimizer, device,
-        num_epochs, eval_freq, eval_iter):
+        num_epochs, eval_freq, eval_iter,
+        autocast_dtype=None, grad_accum_steps=1, compile_model=False):
     train_losses, val_losses, train_accs, val_accs = [], [], [], []
     examples_seen, global_step = 0, -1
+    train_eval_batches = cache_batches(train_loader, eval_iter, device)
+    val_eval_batches = cache_batches(val_loader, eval_iter, device)
+    step_model = maybe_compile(model, compile_model,
+                               train_eval_batches[0][0] if train_eval_batches else None,
+                               device, autocast_dtype)
+    meter = ThroughputMeter()
 
     for epoch in range(num_epochs):
         model.train()
+        optimizer.zero_grad()
 
-        for input_batch, target_batch in train_loader:
-            optimizer.zero_grad()
-            loss = calc_loss_batch(
-                input_batch, target_batch, model, device
-            )
-            loss.backward()
-            optimizer.step()
+        for micro_step, (input_batch, target_batch) in enumerate(train_loader, start=1):
+            meter.start()
+            with autocast_context(device, autocast_dtype):
+                loss = calc_loss_batch(
+                    input_batch, target_batch, step_model, device
+                )
+            (loss / accum_group_size(micro_step, grad_accum_steps, len(train_loader))).backward()
             examples_seen += input_batch.shape[0]
-            global_step += 1
+            is_step = micro_step % grad_accum_steps == 0 or micro_step == len(train_loader)
+            if is_step:
+                optimizer.step()
+                optimizer.zero_grad()
+                global_step += 1
+            meter.stop(input_batch.numel(), steps=int(is_step))
 
 
-            if global_step % eval_freq == 0:
+            if is_step and global_step % eval_freq == 0:
                 train_loss, val_loss = evaluate_model(
-                    model, train_loader, val_loader, device, eval_iter)
+                    step_model, train_eval_batches, val_eval_batches, device, eval_iter,
+                    autocast_dtype)
                 train_losses.append(train_loss)
                 val_losses.append(val_loss)
                 print(f"Ep {epoch+1} (Step {global_step:06d}): "
                       f"Train loss {train_loss:.3f}, "
-                      f"Val loss {val_loss:.3f}"
+                      f"Val loss {val_loss:.3f}, "
+                      f"{meter.report()}"
                 )
 
 
         train_accuracy = calc_accuracy_loader(
-            train_loader, model, device, num_batches=eval_iter
+            train_eval_batches, step_model, device, num_batches=eval_iter
         )
         val_accuracy = calc_accuracy_loader(
-            val_loader, model, device, num_batches=eval_iter
+            val_eval_batches, step_model, device, num_batches=eval_iter
         )
 
         print(f"Training accuracy: {train_accuracy*100:.2f}% | ", end="")
@@ -449,9 +458,9 @@ def train_classifier_simple(
 #     model.train()
 #     return train_loss, val_loss
 
-def evaluate_model(model, train_loader, val_loader, device, eval_iter):
+def evaluate_model(model, train_loader, val_loader, device, eval_iter, autocast_dtype=None):
     model.eval()
-    with torch.no_grad():
+    with torch.inference_mode(), autocast_context(device, autocast_dtype):
         train_loss = calc_loss_loader(
             train_loader, model, device, num_batches=eval_iter
         )
@@ -1,4 +1,5 @@
 from cgi import test
+import inspect
 import json
 from turtle import end_fill
 import urllib.request
@@ -77,20 +78,28 @@ from tensorflow.python.eager.context import execution_mode
 import torch
 from torch.utils.data import Dataset
 
+from chapter2.tokenize_cache import encode_cached
+
+# The template that turns an entry into the training text: format_input plus the response.
+# It is part of the tokenization cache key, so changing the prompt format never reuses old tokens.
+RESPONSE_TEMPLATE = "\n\n### Response:\n{output}"
+INSTRUCTION_TEMPLATE = inspect.getsource(format_input) + RESPONSE_TEMPLATE
+
 class InstructionDataset(Dataset):
-    def __init__(self, data, tokenizer):
+    # All entries are tokenized at once on several threads and cached in cache_dir
+    # (see chapter2/tokenize_cache.py); encoded_texts is a ragged array of token ids.
+    def __init__(self, data, tokenizer, cache_dir="token_cache"):
         self.data = data
-        self.encoded_texts = []
-        for entry in data:
-            instruction_plus_input = format_input(entry)
-            response_text = f"\n\n### Response:\n{entry['output']}"
-            full_text = instruction_plus_input + response_text
-            self.encoded_texts.append(
-                tokenizer.encode(full_text)
-            )
-    
+        full_texts = [
+            format_input(entry) + RESPONSE_TEMPLATE.format(output=entry["output"])
+            for entry in data
+        ]
+        self.encoded_texts = encode_cached(
+            full_texts, tokenizer, template=INSTRUCTION_TEMPLATE, cache_dir=cache_dir
+        )
+
     def __getitem__(self, index):
-        return self.encoded_texts[index]
+        return self.encoded_texts[index].tolist()
 
     def __len__(self):
         return len(self.data)
@@ -232,9 +241,12 @@ device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print("Using device:", device)
 
 from functools import partial
+from instruction_batching import LengthBucketBatchSampler, vectorized_collate_fn
 
+# vectorized_collate_fn returns the same batches as custom_collate_fn without the per-item loop
+# (see instruction_batching.py)
 customized_collate_fn = partial(
-    custom_collate_fn,
+    vectorized_collate_fn,
     device=device,
     allowed_max_length=1024
 )
@@ -247,15 +259,32 @@ batch_size = 8
 torch.manual_seed(123)
 
 train_dataset = InstructionDataset(train_data, tokenizer)
+# batches of examples with similar length, so little compute goes into padding
 train_loader = DataLoader(
    train_dataset,
-   batch_size=batch_size,
+   batch_sampler=LengthBucketBatchSampler(
+       train_dataset.encoded_texts.lengths(), batch_size,
+       shuffle=True, drop_last=True
+   ),
    collate_fn=customized_collate_fn,
-   shuffle=True,
-   drop_last=True,
    num_workers=num_workers, 
 )
 
+# Packing puts several examples into each 1024-token row, with per-example position ids and
+# a block-diagonal attention mask (see packing.py), so almost no compute goes into padding.
+# A packed row holds many examples, so it uses a smaller batch size.
+PACK_SEQUENCES = False
+if PACK_SEQUENCES:
+    from packing import PackedDataset, packed_collate_fn
+    train_loader = DataLoader(
+        PackedDataset(train_dataset.encoded_texts, context_length=1024),
+        batch_size=2,
+        collate_fn=partial(packed_collate_fn, device=device),
+        shuffle=True,
+        drop_last=True,
+        num_workers=num_workers,
+    )
+
 val_dataset = InstructionDataset(val_data, tokenizer)
 val_loader = DataLoader(
     val_dataset,
@@ -281,9 +310,9 @@ for inputs, targets in train_loader:
     print(inputs.shape, targets.shape)
 
 
-from chapter5.gpt_download import download_and_load_gpt2
+from chapter5.gpt_download import download_and_convert_gpt2
 from chapter4.model import GPTModel
-from chapter5.model_download import load_weights_into_gpt
+from chapter5.weights_io import load_gpt2_weights
 
 BASE_CONFIG = {
     "vocab_size": 50257,     # Vocabulary size
@@ -304,13 +333,14 @@ BASE_CONFIG.update(model_configs[CHOOSE_MODEL])
 
 model_size = CHOOSE_MODEL.split(" ")[-1].lstrip("(").rstrip(")")
 
-settings, params = download_and_load_gpt2(
+# the TensorFlow checkpoint is converted once; later runs memory-map the converted file
+settings, weights_path = download_and_convert_gpt2(
     model_size=model_size,
     models_dir="gpt2"
 )
 
 model = GPTModel(BASE_CONFIG)
-load_weights_into_gpt(model, params)
+load_gpt2_weights(model, weights_path)
 model.eval
 
 torch.manual_seed(123)
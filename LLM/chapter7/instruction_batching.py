@@ -0,0 +1,221 @@
+# Faster batching for instruction fine-tuning.
+#
+# vectorized_collate_fn builds the same (inputs, targets) as custom_collate_fn in chapter7.py,
+# but without a Python list and two tensors per item: all token ids are scattered into one
+# preallocated (batch, max_len + 1) tensor, and the ignore_index mask for the padding comes from
+# one comparison of the column positions with the item lengths, instead of torch.nonzero per item.
+#
+# LengthBucketBatchSampler groups examples of similar length into the same batch. With random
+# batching every batch is padded to its longest example, and most positions are padding.
+#
+# python chapter7/instruction_batching.py reports the padding-waste ratio and tokens/sec of
+# random batching + custom_collate_fn against bucketing + vectorized_collate_fn on instruction-data.json
+# (add --model to also time GPTModel forward passes on the batches).
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+
+def vectorized_collate_fn(
+    batch,
+    pad_token_id=50256,
+    ignore_index=-100,
+    allowed_max_length=None,
+    device="cpu",
+):
+    # items can be lists or numpy arrays (e.g. slices of a chapter2.tokenize_cache.RaggedTokens)
+    lengths = torch.tensor([len(item) for item in batch], dtype=torch.long)
+    # +1: every item gets at least one pad token, the <|endoftext|> the model should learn to emit
+    batch_max_length = int(lengths.max()) + 1
+
+    padded = torch.full((len(batch), batch_max_length), pad_token_id, dtype=torch.long)
+    flat = torch.from_numpy(np.concatenate([np.asarray(item, dtype=np.int64) for item in batch]))
+    # row and column of every token id in flat
+    rows = torch.repeat_interleave(torch.arange(len(batch)), lengths)
+    starts = torch.repeat_interleave(torch.cumsum(lengths, dim=0) - lengths, lengths)
+    cols = torch.arange(flat.numel()) - starts
+    padded[rows, cols] = flat
+
+    inputs = padded[:, :-1]
+    targets = padded[:, 1:].clone()
+    # target position j holds padded[j + 1]: position len - 1 is the first pad token and is kept,
+    # all positions after it are padding and are ignored by the loss
+    positions = torch.arange(batch_max_length - 1)
+    targets[positions[None, :] >= lengths[:, None]] = ignore_index
+
+    if allowed_max_length is not None:
+        inputs = inputs[:, :allowed_max_length]
+        targets = targets[:, :allowed_max_length]
+
+    return inputs.to(device), targets.to(device)
+
+
+# Yields lists of indices (use it as DataLoader(batch_sampler=...)).
+# Each epoch the indices are shuffled and split into pools of batch_size * bucket_multiplier
+# examples; every pool is sorted by length and cut into batches, and the batches are shuffled.
+# So a batch holds examples of similar length, but which examples meet still changes every epoch.
+# Without shuffle the whole dataset is sorted by length once.
+class LengthBucketBatchSampler(Sampler):
+    def __init__(self, lengths, batch_size, shuffle=True, drop_last=False,
+                 bucket_multiplier=50, generator=None):
+        self.lengths = torch.as_tensor(np.asarray(lengths), dtype=torch.long)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.pool_size = batch_size * bucket_multiplier
+        self.generator = generator
+
+    def __iter__(self):
+        if not self.shuffle:
+            order = torch.argsort(self.lengths, stable=True)
+            yield from self._batches(order)
+            return
+
+        # like RandomSampler: without a generator, seed from torch's global RNG,
+        # so torch.manual_seed makes the batches reproducible
+        generator = self.generator
+        if generator is None:
+            generator = torch.Generator()
+            generator.manual_seed(int(torch.empty((), dtype=torch.int64).random_().item()))
+
+        order = torch.randperm(len(self.lengths), generator=generator)
+        pools = [
+            pool[torch.argsort(self.lengths[pool], stable=True)]
+            for pool in torch.split(order, self.pool_size)
+        ]
+        batches = list(self._batches(torch.cat(pools)))
+        for i in torch.randperm(len(batches), generator=generator).tolist():
+            yield batches[i]
+
+    def _batches(self, order):
+        for batch in torch.split(order, self.batch_size):
+            if len(batch) < self.batch_size and self.drop_last:
+                continue
+            yield batch.tolist()
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+
+# share of the input positions that are padding, over all batches
+def padding_waste(batch_lengths, allowed_max_length=None):
+    real, total = 0, 0
+    for lengths in batch_lengths:
+        if allowed_max_length is not None:
+            lengths = [min(length, allowed_max_length) for length in lengths]
+        real += sum(lengths)
+        total += len(lengths) * max(lengths)
+    return 1 - real / total
+
+
+# custom_collate_fn from chapter7.py, kept here as the reference (chapter7.py runs the whole
+# fine-tuning script when imported)
+def _reference_collate_fn(batch, pad_token_id=50256, ignore_index=-100,
+                          allowed_max_length=None, device="cpu"):
+    batch_max_length = max(len(item)+1 for item in batch)
+    inputs_lst, targets_lst = [], []
+    for item in batch:
+        new_item = item.copy()
+        new_item += [pad_token_id]
+        padded = new_item + [pad_token_id] * (batch_max_length - len(new_item))
+        inputs = torch.tensor(padded[:-1])
+        targets = torch.tensor(padded[1:])
+        mask = targets == pad_token_id
+        indices = torch.nonzero(mask).squeeze()
+        if indices.numel() > 1:
+            targets[indices[1:]] = ignore_index
+        if allowed_max_length is not None:
+            inputs = inputs[:allowed_max_length]
+            targets = targets[:allowed_max_length]
+        inputs_lst.append(inputs)
+        targets_lst.append(targets)
+    return torch.stack(inputs_lst).to(device), torch.stack(targets_lst).to(device)
+
+
+# same as format_input in chapter7.py
+def format_input(entry):
+    instruction_text = (
+        f"Below is an instruction that describes a task. "
+        f"Write a response that appropriately completes the request."
+        f"\n\n### Instruction:\n{entry['instruction']}"
+    )
+    input_text = (
+        f"\n\n### Input:\n{entry['input']}" if entry["input"] else ""
+    )
+    return instruction_text + input_text
+
+
+def run_epoch(token_lists, batches, collate_fn, model=None):
+    real_tokens, collate_time, forward_time = 0, 0.0, 0.0
+    for batch_indices in batches:
+        batch = [token_lists[i] for i in batch_indices]
+        start = time.perf_counter()
+        inputs, targets = collate_fn(batch, allowed_max_length=1024)
+        collate_time += time.perf_counter() - start
+        real_tokens += int((targets != -100).sum())
+        if model is not None:
+            start = time.perf_counter()
+            with torch.inference_mode():
+                model(inputs)
+            forward_time += time.perf_counter() - start
+    return real_tokens, collate_time, forward_time
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import tiktoken
+    from chapter2.tokenize_cache import encode_cached
+
+    parser = argparse.ArgumentParser(description="padding waste and tokens/sec of instruction batching")
+    parser.add_argument("--data", default="instruction-data.json", help="Alpaca-style JSON file")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--model", action="store_true", help="also time GPTModel forward passes")
+    parser.add_argument("--n-layers", type=int, default=4, help="layers of the GPTModel used with --model")
+    parser.add_argument("--max-batches", type=int, default=None, help="limit the batches per mode")
+    args = parser.parse_args()
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    tokenizer = tiktoken.get_encoding("gpt2")
+    texts = [format_input(entry) + f"\n\n### Response:\n{entry['output']}" for entry in data]
+    ragged = encode_cached(texts, tokenizer)
+    token_lists = [ragged[i].tolist() for i in range(len(ragged))]
+    lengths = ragged.lengths()
+
+    model = None
+    if args.model:
+        from chapter4.model import GPT_CONFIG_124M, GPTModel
+        torch.manual_seed(123)
+        model = GPTModel(dict(GPT_CONFIG_124M, n_layers=args.n_layers, drop_rate=0.0)).eval()
+
+    torch.manual_seed(123)
+    modes = {
+        "random + custom_collate_fn": (
+            list(torch.utils.data.BatchSampler(torch.utils.data.RandomSampler(token_lists),
+                                               args.batch_size, drop_last=True)),
+            _reference_collate_fn),
+        "bucketed + vectorized_collate_fn": (
+            list(LengthBucketBatchSampler(lengths, args.batch_size, shuffle=True, drop_last=True)),
+            vectorized_collate_fn),
+    }
+
+    print(f"{len(data)} examples, batch size {args.batch_size}, "
+          f"lengths {int(lengths.min())}-{int(lengths.max())} tokens (mean {lengths.mean():.0f})")
+    header = f"{'mode':<34}{'padding waste':>15}{'collate tok/s':>16}"
+    print(header + (f"{'forward tok/s':>16}" if model is not None else ""))
+    for name, (batches, collate_fn) in modes.items():
+        used = batches[:args.max_batches] if args.max_batches else batches
+        waste = padding_waste([[int(lengths[i]) for i in batch] for batch in used], 1024)
+        real_tokens, collate_time, forward_time = run_epoch(token_lists, used, collate_fn, model)
+        line = f"{name:<34}{waste:>14.1%}{real_tokens / collate_time:>16,.0f}"
+        if model is not None:
+            line += f"{real_tokens / forward_time:>16,.0f}"
+        print(line)
@@ -0,0 +1,158 @@
+# Sequence packing for instruction fine-tuning.
+#
+# Most instruction examples are much shorter than context_length, so even bucketed batches
+# spend compute on padding. PackedDataset puts several examples into one row of up to
+# context_length tokens (first-fit decreasing, so rows are nearly full).
+#
+# The examples in a row must not see each other. Every row carries:
+#   pos_ids    the position of each token inside its own example, restarting at 0,
+#              so pos_emb is the same as if the example were alone
+#   attn_mask  block-diagonal: a token may only attend to tokens of the same example
+#              (the causal mask inside MultiHeadAttention is applied on top)
+# and the targets are built per example: the last target of an example is its <|endoftext|>,
+# never the first token of the next example, and the padding at the end of a row is ignore_index.
+# So the loss is the same as for the unpacked examples.
+#
+# packed_collate_fn returns (inputs, targets) where inputs is a dict of GPTModel.forward
+# arguments; calc_loss_batch in chapter5/model_trainable.py accepts both forms.
+#
+# python chapter7/packing.py compares the real (non-padding) tokens per second of a training
+# step with bucketed padded batches and with packed rows.
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+
+# Assign examples to rows of at most capacity tokens, longest examples first, each into the first
+# row that still has room. Returns a list of rows, each a list of example indices.
+def pack_first_fit(lengths, capacity):
+    rows, free = [], []
+    for index in sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True):
+        length = min(lengths[index], capacity)
+        for row, room in enumerate(free):
+            if length <= room:
+                rows[row].append(index)
+                free[row] -= length
+                break
+        else:
+            rows.append([index])
+            free.append(capacity - length)
+    return rows
+
+
+class PackedDataset(Dataset):
+    # token_lists: one token id list/array per example (e.g. InstructionDataset.encoded_texts).
+    # Each example contributes inputs = tokens and targets = tokens[1:] + [eos_id],
+    # truncated to context_length like allowed_max_length in custom_collate_fn.
+    def __init__(self, token_lists, context_length, eos_id=50256,
+                 pad_token_id=50256, ignore_index=-100):
+        self.token_lists = token_lists
+        self.context_length = context_length
+        self.eos_id = eos_id
+        self.pad_token_id = pad_token_id
+        self.ignore_index = ignore_index
+        lengths = [len(token_lists[i]) for i in range(len(token_lists))]
+        self.rows = pack_first_fit(lengths, context_length)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        inputs = torch.full((self.context_length,), self.pad_token_id, dtype=torch.long)
+        targets = torch.full((self.context_length,), self.ignore_index, dtype=torch.long)
+        pos_ids = torch.zeros(self.context_length, dtype=torch.long)
+        # padding at the end of the row gets segment -1: it only attends to other padding
+        segment_ids = torch.full((self.context_length,), -1, dtype=torch.long)
+
+        start = 0
+        for segment, example in enumerate(self.rows[index]):
+            tokens = torch.as_tensor(np.asarray(self.token_lists[example], dtype=np.int64))
+            length = min(len(tokens), self.context_length)
+            if length == 0:
+                continue
+            end = start + length
+            inputs[start:end] = tokens[:length]
+            targets[start:end - 1] = tokens[1:length]
+            targets[end - 1] = tokens[length] if length < len(tokens) else self.eos_id
+            pos_ids[start:end] = torch.arange(length)
+            segment_ids[start:end] = segment
+            start = end
+        return inputs, targets, pos_ids, segment_ids
+
+
+def packed_collate_fn(batch, device="cpu"):
+    inputs, targets, pos_ids, segment_ids = (torch.stack(column) for column in zip(*batch))
+    # (b, 1, T, T): query i may attend to key j only inside the same example
+    attn_mask = (segment_ids[:, :, None] == segment_ids[:, None, :]).unsqueeze(1)
+    model_inputs = {
+        "in_idx": inputs.to(device),
+        "pos_ids": pos_ids.to(device),
+        "attn_mask": attn_mask.to(device),
+    }
+    return model_inputs, targets.to(device)
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import tiktoken
+    from chapter2.tokenize_cache import encode_cached
+    from chapter4.model import GPT_CONFIG_124M, GPTModel
+    from instruction_batching import LengthBucketBatchSampler, format_input, vectorized_collate_fn
+
+    parser = argparse.ArgumentParser(description="padded vs packed training throughput")
+    parser.add_argument("--data", default="instruction-data.json", help="Alpaca-style JSON file")
+    parser.add_argument("--context-length", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=8, help="rows per batch when padding")
+    parser.add_argument("--n-layers", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=10, help="training steps timed per mode")
+    args = parser.parse_args()
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    tokenizer = tiktoken.get_encoding("gpt2")
+    texts = [format_input(entry) + f"\n\n### Response:\n{entry['output']}" for entry in data]
+    ragged = encode_cached(texts, tokenizer)
+
+    cfg = dict(GPT_CONFIG_124M, context_length=args.context_length, n_layers=args.n_layers, drop_rate=0.0)
+    torch.manual_seed(123)
+    model = GPTModel(cfg)
+    model.train()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=5e-5)
+
+    packed = PackedDataset(ragged, args.context_length)
+    # the packed batch holds about as many real tokens as a padded batch of batch_size examples
+    mean_length = float(ragged.lengths().mean())
+    packed_batch_size = max(1, round(args.batch_size * mean_length / args.context_length))
+    padded_batches = torch.utils.data.DataLoader(
+        [ragged[i] for i in range(len(ragged))],
+        batch_sampler=LengthBucketBatchSampler(ragged.lengths(), args.batch_size, drop_last=True),
+        collate_fn=lambda batch: vectorized_collate_fn(batch, allowed_max_length=args.context_length))
+    packed_batches = torch.utils.data.DataLoader(
+        packed, batch_size=packed_batch_size, shuffle=True, drop_last=True, collate_fn=packed_collate_fn)
+
+    print(f"{len(ragged)} examples, mean {mean_length:.0f} tokens; "
+          f"{len(packed)} packed rows of {args.context_length} tokens")
+    print(f"{'mode':<10}{'batch':>8}{'padding':>10}{'real tokens/sec':>18}")
+    for name, loader in (("padded", padded_batches), ("packed", packed_batches)):
+        real_tokens, total_tokens, elapsed = 0, 0, 0.0
+        for step, (inputs, targets) in enumerate(loader):
+            if step >= args.steps:
+                break
+            model_kwargs = inputs if isinstance(inputs, dict) else {"in_idx": inputs}
+            start = time.perf_counter()
+            optimizer.zero_grad()
+            logits = model(**model_kwargs)
+            loss = torch.nn.functional.cross_entropy(logits.flatten(0, 1), targets.flatten())
+            loss.backward()
+            optimizer.step()
+            elapsed += time.perf_counter() - start
+            real_tokens += int((targets != -100).sum())
+            total_tokens += targets.numel()
+        print(f"{name:<10}{loader.batch_size or args.batch_size:>8}"
+              f"{1 - real_tokens / total_tokens:>10.1%}{real_tokens / elapsed:>18,.0f}")
@@ -3,11 +3,14 @@ import json
 import re
 import psycopg2
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from queue import Queue
 from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
+from dataset_exporter import ShardedDatasetWriter, load_tokenizer
+from processing_metrics import ProcessorMetrics
 """
 按照盘古训练格式以下格式进行简历的格式化
 """
@@ -351,22 +354,25 @@ class DatabaseProcessor:
         self.translator = JSONTranslator()
         self.training_builder = TrainingDataBuilder()
         self._lock = threading.Lock()
+        self.metrics = ProcessorMetrics('database_processor')
+        self.metrics_summary_file: Optional[str] = None  # process_table结束后写出的指标汇总文件
     
     def get_connection(self) -> psycopg2.extensions.connection:
         """获取数据库连接"""
         return psycopg2.connect(**self.db_config)
     
-    def _process_single_record(self, record_data: tuple, config: TableConfig) -> Optional[tuple]:
-        """处理单条记录"""
-        try:
-            record_id, json_data, description = record_data
-            
-            # 解析JSON数据
+    def _build_training_example(self, record_data: tuple) -> tuple:
+        """将单条记录转换为 (记录ID, 中文JSON字符串, 训练数据字典)"""
+        record_id, json_data, description = record_data
+        
+        # 解析JSON数据
+        with self.metrics.stage('parse'):
             if isinstance(json_data, str):
                 parsed_data = json.loads(json_data)
             else:
                 parsed_data = json_data
-            
+        
+        with self.metrics.stage('transform'):
             # 1. 转换JSON键为中文
             translated_json = self.translator.translate_json_keys(parsed_data)
             translated_json_str = json.dumps(translated_json, ensure_ascii=False, indent=2)
@@ -379,11 +385,20 @@ class DatabaseProcessor:
             training_data = self.training_builder.build_training_data(
                 system_content, context_content, target_content
             )
-            training_data_str = json.dumps(training_data, ensure_ascii=False, indent=2)
+        return record_id, translated_json_str, training_data
+    
+    def _process_single_record(self, record_data: tuple, config: TableConfig) -> Optional[tuple]:
+        """处理单条记录"""
+        try:
+            with self.metrics.track_record():
+                record_id, translated_json_str, training_data = self._build_training_example(record_data)
+                training_data_str = json.dumps(training_data, ensure_ascii=False, indent=2)
             
+            self.metrics.record_result('success')
             return (record_id, translated_json_str, training_data_str)
             
         except Exception as e:
+            self.metrics.record_result('error')
             print(f"处理记录 {record_data[0] if record_data else 'unknown'} 时出错: {str(e)}")
             return None
     
@@ -407,16 +422,19 @@ class DatabaseProcessor:
                 WHERE {config.id_field} = %s
             """
             
+            wait_start = time.perf_counter()
             with self._lock:
-                for record_id, translated_json_str, training_data_str in results:
-                    cursor.execute(update_sql, (
-                        translated_json_str,
-                        training_data_str,
-                        record_id
-                    ))
-                    updated_count += 1
-                
-                connection.commit()
+                self.metrics.observe_stage('claim_wait', time.perf_counter() - wait_start)
+                with self.metrics.stage('db_write'):
+                    for record_id, translated_json_str, training_data_str in results:
+                        cursor.execute(update_sql, (
+                            translated_json_str,
+                            training_data_str,
+                            record_id
+                        ))
+                        updated_count += 1
+                    
+                    connection.commit()
                 
         except Exception as e:
             print(f"批量更新数据库时出错: {str(e)}")
@@ -460,8 +478,9 @@ class DatabaseProcessor:
             #     LIMIT {config.batch_size}
             # """
 
-            cursor.execute(select_sql)
-            rows = cursor.fetchall()
+            with self.metrics.stage('fetch'):
+                cursor.execute(select_sql)
+                rows = cursor.fetchall()
             
             print(f"开始多线程处理表 {config.table_name}，共 {len(rows)} 条数据，使用 {max_workers} 个线程")
             
@@ -505,6 +524,9 @@ class DatabaseProcessor:
                 cursor.close()
             if connection:
                 connection.close()
+            if self.metrics_summary_file:
+                summary = self.metrics.write_summary(self.metrics_summary_file)
+                print(f"指标汇总已写入 {self.metrics_summary_file}，耗时最多的阶段: {summary['bottleneck_stage']}")
     
     def process_table_single_thread(self, config: TableConfig, 
                                    system_generator: Optional[Callable[[Dict], str]] = None,
@@ -597,6 +619,80 @@ class DatabaseProcessor:
             if connection:
                 connection.close()
 
+    
+    def export_training_dataset(self, config: TableConfig, writer: ShardedDatasetWriter,
+                                fetch_size: int = 1000, limit: Optional[int] = None) -> int:
+        """
+        将训练数据流式导出到分片数据集，不再回写 train_data 字段
+        
+        Args:
+            config: 表配置
+            writer: 分片写入器，从 writer.last_id 之后继续导出（断点续写）
+            fetch_size: 服务端游标每次拉取的行数
+            limit: 本次最多导出的条数，None表示全部
+            
+        Returns:
+            本次写入的记录数
+            
+        Raises:
+            Exception: 查询或写入分片失败；已封存的分片保留，重新运行时从断点继续
+        """
+        connection = None
+        cursor = None
+        written_count = 0
+        failed_count = 0
+        last_id = writer.last_id if writer.last_id is not None else -1
+        
+        try:
+            connection = self.get_connection()
+            # 使用服务端命名游标逐批拉取，避免一次性加载全部数据
+            cursor = connection.cursor(name=f"export_{config.table_name}")
+            cursor.itersize = fetch_size
+            
+            select_sql = f"""
+                SELECT {config.id_field}, {config.json_source_field}, {config.description_field}
+                FROM {config.table_name}
+                WHERE {config.json_source_field} IS NOT NULL
+                AND {config.id_field} > %s
+                ORDER BY {config.id_field}
+            """
+            if limit:
+                select_sql += f" LIMIT {int(limit)}"
+            
+            cursor.execute(select_sql, (last_id,))
+            print(f"开始导出表 {config.table_name} 的训练数据，起始ID > {last_id}")
+            
+            # 正常结束时封存最后一个分片；出错时关闭并删除未封片的临时文件，
+            # 已封存的分片和 manifest 保留，重新运行时从断点继续
+            with writer:
+                for row in cursor:
+                    try:
+                        record_id, _, training_data = self._build_training_example(row)
+                    except Exception as e:
+                        failed_count += 1
+                        print(f"处理记录 {row[0]} 时出错: {str(e)}")
+                        continue
+                    
+                    if writer.write(record_id, training_data):
+                        written_count += 1
+                        if written_count % 10000 == 0:
+                            print(f"已导出 {written_count} 条记录")
+            
+            print(f"表 {config.table_name} 导出完成，本次导出 {written_count} 条，失败 {failed_count} 条，"
+                  f"数据集累计 {writer.total_count} 条，分片 {len(writer.manifest['shards'])} 个")
+            
+        except Exception as e:
+            # 未封片的临时文件已由 writer 删除；抛出异常，调用方据此区分导出失败和数据本身较少
+            print(f"导出表 {config.table_name} 时出错（本次已导出 {written_count} 条）: {str(e)}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+        
+        return written_count
+
 
 class ResumeProcessor(DatabaseProcessor):
     """简历处理器"""
@@ -611,8 +707,8 @@ class ResumeProcessor(DatabaseProcessor):
         }
         super().__init__(db_config)
     
-    def process_zhilian_resume(self, batch_size: int = 5, max_workers: int = 4, use_multithread: bool = True):
-        """处理智联招聘简历表"""
+    def _build_table_config(self, batch_size: int) -> TableConfig:
+        """根据当前平台构建表配置"""
         if platform == "zhilian_resume":
             config = TableConfig(
                 table_name="zhilian_resume",
@@ -643,11 +739,47 @@ class ResumeProcessor(DatabaseProcessor):
                 description_field="job_description_detail",
                 batch_size=batch_size
             )
+        return config
+    
+    def process_zhilian_resume(self, batch_size: int = 5, max_workers: int = 4, use_multithread: bool = True):
+        """处理智联招聘简历表"""
+        config = self._build_table_config(batch_size)
 
         if use_multithread:
             self.process_table(config, max_workers=max_workers)
         else:
             self.process_table_single_thread(config)
+    
+    def export_zhilian_resume_dataset(self, output_dir: str, shard_format: str = "jsonl",
+                                      max_shard_mb: int = 256, tokenize: bool = False,
+                                      limit: Optional[int] = None) -> int:
+        """
+        导出当前平台的训练数据集分片
+        
+        Args:
+            output_dir: 数据集输出目录，已存在时从断点继续
+            shard_format: jsonl 或 parquet
+            max_shard_mb: 单个分片大小上限(MB)
+            tokenize: 是否同时写出 gpt2 预分词 token 数组
+            limit: 本次最多导出的条数
+            
+        Returns:
+            本次写入的记录数
+            
+        Raises:
+            Exception: 导出失败，见 export_training_dataset
+        """
+        config = self._build_table_config(batch_size=0)
+        tokenizer = load_tokenizer("gpt2") if tokenize else None
+        writer = ShardedDatasetWriter(
+            output_dir,
+            shard_format=shard_format,
+            max_shard_bytes=max_shard_mb * 1024 * 1024,
+            tokenizer=tokenizer,
+            tokenizer_name="gpt2" if tokenize else "",
+            name_prefix=platform
+        )
+        return self.export_training_dataset(config, writer, limit=limit)
 
 
 def main():
@@ -662,6 +794,14 @@ def main():
         use_multithread=True # 使用多线程
     )
     
+    # 直接导出训练数据集分片（不回写 train_data_ch 字段，可断点续写）
+    # processor.export_zhilian_resume_dataset(
+    #     output_dir=f"./dataset/{platform}",
+    #     shard_format="jsonl",
+    #     max_shard_mb=256,
+    #     tokenize=True
+    # )
+    
     # 单线程处理（如果需要的话）
     # print("\n=== 单线程处理模式 ===")
     # processor.process_zhilian_resume(
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试合成语料生成器
+按 zhilian_resume.resume_processed_info 与 zhilian_job.processed_info 的结构生成可复现的合成数据，
+用于 benchmark_suite.py 对真实的清洗、过滤、去重、翻译、工龄计算和比对代码计时。
+
+可配置项：
+- 数据量（简历数、岗位数）
+- 嵌套规模（每份简历的教育/工作/项目经历条数）
+- 重复经历比例
+- "至今"时间标签比例
+- HTML噪声比例（标签、实体、零宽字符）
+"""
+
+import argparse
+import copy
+import gzip
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Tuple
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN_NAMES = ["伟", "芳", "娜", "敏", "静", "强", "磊", "洋", "艳", "勇", "军", "杰", "娟", "涛", "明", "超", "秀英", "晓东"]
+CITIES = ["北京", "上海", "广州", "深圳", "杭州", "成都", "武汉", "西安", "南京", "重庆"]
+DISTRICTS = ["朝阳区", "海淀区", "浦东新区", "天河区", "南山区", "西湖区", "高新区", "江汉区"]
+SCHOOLS = ["北京大学", "浙江大学", "四川大学", "武汉大学", "华中科技大学", "西安交通大学", "南京大学", "某某职业技术学院"]
+MAJORS = ["计算机科学与技术", "软件工程", "市场营销", "会计学", "机械设计制造及其自动化", "汉语言文学", "电子商务"]
+EDUCATIONS = ["大专", "本科", "硕士", "博士", "高中"]
+COMPANIES = ["北京某某科技有限公司", "上海某某网络科技有限公司", "深圳某某电子有限公司", "杭州某某信息技术有限公司",
+             "成都某某软件有限公司", "广州某某贸易有限公司", "武汉某某物流有限公司"]
+JOB_TITLES = ["Java开发工程师", "前端开发工程师", "产品经理", "销售代表", "会计", "运维工程师", "测试工程师", "客服专员"]
+PROJECT_NAMES = ["电商平台重构", "CRM系统", "数据中台建设", "移动端APP", "供应链管理系统", "智能客服", "财务共享中心"]
+CERTIFICATES = ["英语四级", "英语六级", "计算机二级", "会计从业资格证", "PMP", "软件设计师", "驾驶证C1"]
+WELFARE = ["五险一金", "带薪年假", "年终奖", "餐补", "交通补助", "定期体检", "弹性工作", "节日福利"]
+WORK_TYPES = ["全职", "兼职", "实习"]
+WORKING_EXP = ["经验不限", "1-3年", "3-5年", "5-10年", "无经验"]
+SENTENCES = [
+    "负责核心业务系统的设计与开发", "参与需求分析和技术方案评审", "带领团队完成项目交付",
+    "优化系统性能，接口响应时间降低50%", "负责客户关系维护与拓展", "编写技术文档和单元测试",
+    "协助完成月度财务报表", "推动跨部门协作，提升交付效率", "熟练使用SQL进行数据分析",
+]
+HTML_NOISE = [
+    "<p>{}</p>", "<br/>{}", "{}&nbsp;", "<span style=\"color:red\">{}</span>", "{}&amp;", "&lt;b&gt;{}&lt;/b&gt;",
+    "{}​", "<div><strong>{}</strong></div>", "{}&#xa;",
+]
+
+
+@dataclass
+class CorpusConfig:
+    """语料生成配置"""
+    resume_count: int = 1000
+    job_count: int = 1000
+    seed: int = 42
+    education_per_resume: int = 2  # 每份简历的教育经历条数（不含重复）
+    work_per_resume: int = 4  # 每份简历的工作经历条数（不含重复）
+    project_per_resume: int = 3  # 每份简历的项目经历条数（不含重复）
+    duplicate_rate: float = 0.2  # 每条经历被重复一次的概率
+    zhijin_rate: float = 0.3  # 最近一段经历使用"至今"时间标签的概率
+    html_noise_rate: float = 0.3  # 文本字段带HTML噪声的概率
+    description_sentences: int = 4  # 描述类字段的句子数
+
+
+@dataclass
+class Corpus:
+    """合成语料"""
+    config: CorpusConfig
+    resumes: List[Dict[str, Any]] = field(default_factory=list)
+    jobs: List[Dict[str, Any]] = field(default_factory=list)
+    job_comparisons: List[Tuple[Dict[str, Any], str]] = field(default_factory=list)
+
+    def fresh_resumes(self) -> List[Dict[str, Any]]:
+        """返回简历数据的深拷贝，供会原地修改数据的处理函数使用"""
+        return copy.deepcopy(self.resumes)
+
+    def fresh_jobs(self) -> List[Dict[str, Any]]:
+        """返回岗位数据的深拷贝"""
+        return copy.deepcopy(self.jobs)
+
+
+class CorpusGenerator:
+    """合成语料生成器，相同配置（含seed）生成的数据完全一致"""
+
+    def __init__(self, config: CorpusConfig = None):
+        self.config = config or CorpusConfig()
+        self.rng = random.Random(self.config.seed)
+
+    def generate(self) -> Corpus:
+        """生成简历、岗位以及岗位比对数据"""
+        corpus = Corpus(config=self.config)
+        corpus.resumes = [self.generate_resume() for _ in range(self.config.resume_count)]
+        corpus.jobs = [self.generate_job() for _ in range(self.config.job_count)]
+        corpus.job_comparisons = [self.generate_job_comparison() for _ in range(self.config.job_count)]
+        return corpus
+
+    # ------------------------------------------------------------------
+    # 基础字段
+    # ------------------------------------------------------------------
+
+    def _noisy(self, text: str) -> str:
+        """按配置的概率给文本加上HTML噪声"""
+        if self.rng.random() < self.config.html_noise_rate:
+            return self.rng.choice(HTML_NOISE).format(text)
+        return text
+
+    def _description(self) -> str:
+        sentences = self.rng.sample(SENTENCES, k=min(self.config.description_sentences, len(SENTENCES)))
+        return self._noisy("；".join(sentences) + "。")
+
+    def _name(self) -> str:
+        return self.rng.choice(SURNAMES) + self.rng.choice(GIVEN_NAMES)
+
+    def _month(self, year: int) -> str:
+        return f"{year}.{self.rng.randint(1, 12):02d}"
+
+    def _periods(self, count: int, start_year: int) -> List[Tuple[str, str]]:
+        """生成按时间先后排列、可能互相重叠的时间段"""
+        periods = []
+        year = start_year
+        for _ in range(count):
+            start = self._month(year)
+            year += self.rng.randint(0, 3)
+            end = self._month(min(year, 2025))
+            if end < start:
+                start, end = end, start
+            periods.append((start, end))
+        return periods
+
+    @staticmethod
+    def _duration_text(start: str, end: str) -> str:
+        start_year, start_month = map(int, start.split('.'))
+        end_year, end_month = map(int, end.split('.'))
+        months = max((end_year - start_year) * 12 + end_month - start_month, 1)
+        years, months = divmod(months, 12)
+        if years and months:
+            return f"{years}年 {months}个月"
+        return f"{years}年" if years else f"{months}个月"
+
+    def _time_label(self, start: str, end: str, zhijin: bool) -> str:
+        if zhijin:
+            return f"{start} - 至今 ({self._duration_text(start, '2025.05')})"
+        return f"{start} - {end} ({self._duration_text(start, end)})"
+
+    def _with_duplicates(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按重复率插入重复经历（深拷贝，与原条目内容一致）"""
+        result = []
+        for item in items:
+            result.append(item)
+            if self.rng.random() < self.config.duplicate_rate:
+                result.append(copy.deepcopy(item))
+        return result
+
+    # ------------------------------------------------------------------
+    # 简历
+    # ------------------------------------------------------------------
+
+    def generate_resume(self) -> Dict[str, Any]:
+        """生成一份 resume_processed_info 结构的简历"""
+        config = self.config
+        age = self.rng.randint(22, 50)
+        start_year = 2025 - age + 22
+
+        education = []
+        for start, end in self._periods(config.education_per_resume, start_year - 4):
+            education.append({
+                "schoolName": self.rng.choice(SCHOOLS),
+                "major": self.rng.choice(MAJORS),
+                "educationLabel": self.rng.choice(EDUCATIONS),
+                "educationTimeLabel": f"{start} - {end}",
+                "schoolTags": ["985", "211"] if self.rng.random() < 0.2 else [],
+            })
+        if education and self.rng.random() < config.zhijin_rate / 3:
+            education[-1]["educationTimeLabel"] = education[-1]["educationTimeLabel"].split(' - ')[0] + " - 至今"
+
+        work = []
+        work_periods = self._periods(config.work_per_resume, start_year)
+        for index, (start, end) in enumerate(work_periods):
+            zhijin = index == len(work_periods) - 1 and self.rng.random() < config.zhijin_rate
+            work.append({
+                "orgName": self.rng.choice(COMPANIES),
+                "jobTitle": self.rng.choice(JOB_TITLES),
+                "timeLabel": self._time_label(start, end, zhijin),
+                "description": self._description(),
+                "salaryLabel": f"{self.rng.randrange(5000, 30000, 1000) + 1}-{self.rng.randrange(30000, 60000, 1000)}",
+                "industryLabel": None if self.rng.random() < 0.3 else "互联网",
+            })
+
+        projects = []
+        project_periods = self._periods(config.project_per_resume, start_year)
+        for index, (start, end) in enumerate(project_periods):
+            zhijin = index == len(project_periods) - 1 and self.rng.random() < config.zhijin_rate
+            name = self.rng.choice(PROJECT_NAMES)
+            projects.append({
+                "name": name + ("（一期）" if self.rng.random() < 0.2 else ""),
+                "timeLabel": self._time_label(start, end, zhijin),
+                "description": self._description(),
+                "responsibility": self._description(),
+            })
+
+        certificate_names = self.rng.sample(CERTIFICATES, k=self.rng.randint(1, 4))
+        if len(certificate_names) > 1 and self.rng.random() < 0.5:
+            # 多个证书写在一起，需要分割
+            certificates = [{"name": self.rng.choice(["、", "，", ";"]).join(certificate_names)}]
+        else:
+            certificates = [{"name": name} for name in certificate_names]
+
+        return {
+            "user": {
+                "name": self._name(),
+                "genderLabel": self.rng.choice(["男", "女"]),
+                "age": age,
+                "maxEducationLabel": self.rng.choice(EDUCATIONS),
+                "workYears": self.rng.randint(0, age - 22),
+                "cityLabel": "现居" + self.rng.choice(CITIES),
+                "unlockedPhone": f"1{self.rng.randint(3, 9)}{self.rng.randint(0, 999999999):09d}",
+                "email": "null" if self.rng.random() < 0.1 else f"user{self.rng.randint(1, 99999)}@example.com",
+                "avatar": "",
+            },
+            "resume": {
+                "skillTags": self.rng.sample(["Java", "Python", "SQL", "Excel", "Linux", "Vue"], k=3),
+                "educationExperiences": self._with_duplicates(education),
+                "workExperiences": self._with_duplicates(work),
+                "projectExperiences": self._with_duplicates(projects),
+                "languageSkills": [{"name": "英语", "readWriteSkill": "良好", "hearSpeakSkill": "一般"}],
+                "certificates": certificates,
+                "purposes": [{
+                    "industryLabel": "互联网",
+                    "jobTypeLabel": self.rng.choice(JOB_TITLES),
+                    "jobNatureLabel": self.rng.choice(WORK_TYPES),
+                    "location": self.rng.choice(CITIES),
+                    "salaryLabel": f"{self.rng.randrange(5000, 20000, 1000)}-{self.rng.randrange(20000, 40000, 1000)}",
+                }],
+                "selfEvaluation": self._description(),
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # 岗位
+    # ------------------------------------------------------------------
+
+    def _salary(self) -> str:
+        roll = self.rng.random()
+        if roll < 0.05:
+            return "0-0"
+        low = self.rng.randrange(3000, 50000, 1000) + self.rng.choice([0, 1])
+        return f"{low}-{low - low % 1000 + self.rng.randrange(1000, 30000, 1000)}"
+
+    def generate_job(self) -> Dict[str, Any]:
+        """生成一条 zhilian_job 原始岗位信息（job_info）"""
+        city = self.rng.choice(CITIES)
+        return {
+            "name": self.rng.choice(JOB_TITLES),
+            "companyName": self.rng.choice(COMPANIES),
+            "cityDistrict": f"{city}-{self.rng.choice(DISTRICTS)}",
+            "education": self.rng.choice(EDUCATIONS),
+            "jobSummary": self._description(),
+            "recruitNumber": self.rng.randint(1, 10),
+            "salaryReal": self._salary(),
+            "welfareTagList": self.rng.sample(WELFARE, k=self.rng.randint(0, 5)),
+            "workType": self.rng.choice(WORK_TYPES),
+            "workingExp": self.rng.choice(WORKING_EXP),
+            "companySize": self.rng.choice(["20-99人", "100-299人", "1000-9999人"]),
+            "industryName": "互联网",
+            "cardCustomJson": json.dumps({"address": f"{city}{self.rng.choice(DISTRICTS)}某某路{self.rng.randint(1, 999)}号"},
+                                         ensure_ascii=False),
+            "staffCard": {"staffName": self._name() + "经理", "staffId": self.rng.randint(1, 10 ** 6)},
+            "needMajor": self.rng.sample(MAJORS, k=2),
+        }
+
+    def generate_job_comparison(self) -> Tuple[Dict[str, Any], str]:
+        """生成 (job_processed_info_ch, job_description_detail)，描述文本覆盖大部分字段值"""
+        salary = self._salary()
+        job = {
+            "岗位名称": self.rng.choice(JOB_TITLES),
+            "公司名称": self.rng.choice(COMPANIES),
+            "工作地点": self.rng.choice(CITIES),
+            "学历要求": self.rng.choice(EDUCATIONS + ["学历不限"]),
+            "薪资": salary,
+            "工作经验": self.rng.choice(WORKING_EXP),
+            "福利": self.rng.sample(WELFARE, k=3),
+            "招聘人数": self.rng.randint(1, 10),
+            "岗位描述": self._description(),
+        }
+        parts = []
+        for key, value in job.items():
+            if key == "岗位描述" or self.rng.random() < 0.1:
+                continue
+            parts.append(f"{key}：{'、'.join(value) if isinstance(value, list) else value}")
+        parts.append(self.rng.choice(SENTENCES) * 5)
+        return job, "\n".join(parts)
+
+
+def generate_corpus(**kwargs) -> Corpus:
+    """按关键字参数（CorpusConfig字段）生成语料"""
+    return CorpusGenerator(CorpusConfig(**kwargs)).generate()
+
+
+def save_corpus(corpus: Corpus, path: str):
+    """将语料保存为gzip压缩的JSON Lines（每行一条，带type字段）"""
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({'type': 'config', 'data': asdict(corpus.config)}, ensure_ascii=False) + '\n')
+        for resume in corpus.resumes:
+            f.write(json.dumps({'type': 'resume', 'data': resume}, ensure_ascii=False) + '\n')
+        for job in corpus.jobs:
+            f.write(json.dumps({'type': 'job', 'data': job}, ensure_ascii=False) + '\n')
+        for job, text in corpus.job_comparisons:
+            f.write(json.dumps({'type': 'job_comparison', 'data': [job, text]}, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成智联简历/岗位合成语料')
+    parser.add_argument('--resumes', type=int, default=1000, help='简历数量')
+    parser.add_argument('--jobs', type=int, default=1000, help='岗位数量')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--duplicate-rate', type=float, default=0.2, help='重复经历比例')
+    parser.add_argument('--zhijin-rate', type=float, default=0.3, help='"至今"标签比例')
+    parser.add_argument('--html-noise-rate', type=float, default=0.3, help='HTML噪声比例')
+    parser.add_argument('--output', type=str, default='synthetic_corpus.jsonl.gz', help='输出路径')
+    args = parser.parse_args()
+
+    corpus = generate_corpus(resume_count=args.resumes, job_count=args.jobs, seed=args.seed,
+                             duplicate_rate=args.duplicate_rate, zhijin_rate=args.zhijin_rate,
+                             html_noise_rate=args.html_noise_rate)
+    save_corpus(corpus, args.output)
+    print(f"已生成 {len(corpus.resumes)} 份简历、{len(corpus.jobs)} 条岗位，保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,775 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据处理基准测试套件
+
+使用 benchmark_corpus.py 生成的可复现合成语料，对真实的处理代码计时：
+简历清洗/过滤/去重/翻译/工龄计算，岗位过滤/HTML清洗/薪资标准化/比对。
+结果以JSON保存，可作为基线（baseline），后续运行与基线对比，超过阈值即判定为性能回退。
+
+用法：
+    python benchmark_suite.py                                  # 运行全部基准并与默认基线对比
+    python benchmark_suite.py --filter resume. --repeat 7      # 只运行简历相关基准
+    python benchmark_suite.py --update-baseline                # 用本次结果更新基线
+    python benchmark_suite.py --list                           # 列出全部基准
+    python benchmark_suite.py --memory                         # 测量每10万条在途记录的RSS占用
+    python benchmark_suite.py --startup                        # 测量各入口模块的导入耗时（-X importtime）
+
+新增基准：在本文件（或其他模块）中用 @register_benchmark 注册一个 setup 函数，
+setup 接收语料，返回 (输入数据, 计时函数, 记录数)。
+"""
+
+import argparse
+import contextlib
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmark_corpus import Corpus, CorpusConfig, CorpusGenerator
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+for _sub_dir in ('resume', 'job'):
+    _path = os.path.join(BASE_DIR, _sub_dir)
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+DEFAULT_BASELINE_FILE = os.path.join(BASE_DIR, 'benchmark_baselines.json')
+DEFAULT_THRESHOLD = 0.25  # 中位耗时比基线慢25%以上判定为回退
+
+SetupResult = Tuple[Any, Callable[[Any], Any], int]
+
+
+@dataclass
+class BenchmarkSpec:
+    """已注册的基准"""
+    name: str
+    setup: Callable[[Corpus], SetupResult]
+    description: str = ""
+    mutates_input: bool = False  # 计时函数会原地修改输入时，每轮使用输入的深拷贝
+    threshold: float = DEFAULT_THRESHOLD
+
+
+@dataclass
+class BenchmarkResult:
+    """单个基准的运行结果"""
+    name: str
+    status: str  # ok / skipped / error
+    records: int = 0
+    repeat: int = 0
+    min_seconds: Optional[float] = None
+    median_seconds: Optional[float] = None
+    mean_seconds: Optional[float] = None
+    per_record_us: Optional[float] = None
+    message: str = ""
+    samples: List[float] = field(default_factory=list)
+
+
+_BENCHMARKS: Dict[str, BenchmarkSpec] = {}
+
+
+def register_benchmark(name: str, description: str = "", mutates_input: bool = False,
+                       threshold: float = DEFAULT_THRESHOLD):
+    """
+    注册基准的装饰器
+
+    Args:
+        name: 基准名称，按"分组.名称"命名，如 resume.dedup
+        description: 说明
+        mutates_input: 计时函数是否原地修改输入
+        threshold: 回退阈值（相对基线中位耗时的增幅）
+    """
+    def decorator(setup: Callable[[Corpus], SetupResult]):
+        if name in _BENCHMARKS:
+            raise ValueError(f"基准 {name} 已注册")
+        _BENCHMARKS[name] = BenchmarkSpec(name, setup, description, mutates_input, threshold)
+        return setup
+    return decorator
+
+
+def get_benchmarks(name_filter: Optional[str] = None) -> List[BenchmarkSpec]:
+    """获取已注册的基准，name_filter 为名称子串"""
+    return [spec for name, spec in sorted(_BENCHMARKS.items()) if not name_filter or name_filter in name]
+
+
+def run_benchmark(spec: BenchmarkSpec, corpus: Corpus, repeat: int = 5, warmup: int = 1) -> BenchmarkResult:
+    """
+    运行单个基准
+
+    setup 阶段抛出 ImportError（依赖的模块或第三方包不可用）时记为 skipped，其他异常记为 error。
+    """
+    try:
+        data, func, records = spec.setup(corpus)
+    except ImportError as e:
+        return BenchmarkResult(spec.name, 'skipped', message=f"依赖不可用: {e}")
+    except Exception as e:
+        return BenchmarkResult(spec.name, 'error', message=f"setup失败: {e!r}")
+
+    rounds = [copy.deepcopy(data) if spec.mutates_input else data for _ in range(warmup + repeat)]
+    samples = []
+    try:
+        # 部分处理代码在热路径中直接print，计时期间输出重定向到空设备，保留格式化开销但不刷屏
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            for index, round_data in enumerate(rounds):
+                start = time.perf_counter()
+                func(round_data)
+                elapsed = time.perf_counter() - start
+                if index >= warmup:
+                    samples.append(elapsed)
+    except Exception as e:
+        return BenchmarkResult(spec.name, 'error', records=records, message=f"运行失败: {e!r}")
+
+    median = statistics.median(samples)
+    return BenchmarkResult(
+        name=spec.name,
+        status='ok',
+        records=records,
+        repeat=repeat,
+        min_seconds=round(min(samples), 6),
+        median_seconds=round(median, 6),
+        mean_seconds=round(statistics.fmean(samples), 6),
+        per_record_us=round(median / records * 1e6, 3) if records else None,
+        samples=[round(sample, 6) for sample in samples],
+    )
+
+
+def run_suite(corpus_config: CorpusConfig, name_filter: Optional[str] = None,
+              repeat: int = 5, warmup: int = 1, verbose: bool = True) -> Dict[str, Any]:
+    """
+    生成语料并运行匹配的全部基准
+
+    Returns:
+        dict: 包含 meta（环境与语料配置）和 benchmarks（各基准结果）的报告
+    """
+    start = time.perf_counter()
+    corpus = CorpusGenerator(corpus_config).generate()
+    if verbose:
+        print(f"语料生成完成: {len(corpus.resumes)} 份简历, {len(corpus.jobs)} 条岗位, "
+              f"耗时 {time.perf_counter() - start:.2f}s")
+
+    results = {}
+    for spec in get_benchmarks(name_filter):
+        result = run_benchmark(spec, corpus, repeat=repeat, warmup=warmup)
+        results[spec.name] = asdict(result)
+        if verbose:
+            if result.status == 'ok':
+                print(f"  {spec.name:<28} 中位 {result.median_seconds * 1000:9.2f} ms  "
+                      f"单条 {result.per_record_us:9.2f} us  ({result.records} 条)")
+            else:
+                print(f"  {spec.name:<28} {result.status}: {result.message}")
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'warmup': warmup,
+            'corpus': asdict(corpus_config),
+        },
+        'benchmarks': results,
+    }
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    与基线对比
+
+    Returns:
+        list: 每个可对比基准的 {name, baseline, current, ratio, threshold, regressed}
+    """
+    if baseline.get('meta', {}).get('corpus') != report['meta']['corpus']:
+        print("警告: 语料配置与基线不一致，对比结果仅供参考")
+
+    comparisons = []
+    for name, current in report['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if current['status'] != 'ok' or not base or base.get('status') != 'ok':
+            continue
+        spec = _BENCHMARKS.get(name)
+        threshold = base.get('threshold', spec.threshold if spec else DEFAULT_THRESHOLD)
+        ratio = current['median_seconds'] / base['median_seconds'] if base['median_seconds'] else None
+        comparisons.append({
+            'name': name,
+            'baseline': base['median_seconds'],
+            'current': current['median_seconds'],
+            'ratio': round(ratio, 3) if ratio is not None else None,
+            'threshold': threshold,
+            'regressed': ratio is not None and ratio > 1 + threshold,
+        })
+    return comparisons
+
+
+def load_json(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(data: Dict[str, Any], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def merge_baseline(baseline: Optional[Dict[str, Any]], report: Dict[str, Any]) -> Dict[str, Any]:
+    """用本次成功的结果更新基线，保留未运行基准的旧基线和已有的自定义阈值"""
+    merged = {'meta': report['meta'], 'benchmarks': dict((baseline or {}).get('benchmarks', {}))}
+    for name, result in report['benchmarks'].items():
+        if result['status'] != 'ok':
+            continue
+        entry = {key: value for key, value in result.items() if key != 'samples'}
+        old = merged['benchmarks'].get(name, {})
+        spec = _BENCHMARKS.get(name)
+        entry['threshold'] = old.get('threshold', spec.threshold if spec else DEFAULT_THRESHOLD)
+        merged['benchmarks'][name] = entry
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# 简历基准
+# ---------------------------------------------------------------------------
+
+def _resume_processor(**overrides):
+    """创建关闭日志输出的 ZhilianResumeProcessor"""
+    from zhilian_resume_processor import ZhilianResumeProcessor, ZhilianResumeProcessorConfig
+
+    config = ZhilianResumeProcessorConfig()
+    config.log_file = None
+    config.enable_console_log = False
+    config.structured_log_file = None
+    config.metrics_summary_file = None
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return ZhilianResumeProcessor(config)
+
+
+@register_benchmark('resume.pipeline', "ZhilianResumeProcessor.process_resume_data 全流程", mutates_input=True)
+def _bench_resume_pipeline(corpus: Corpus) -> SetupResult:
+    processor = _resume_processor()
+    return corpus.resumes, lambda resumes: [processor.process_resume_data(resume) for resume in resumes], len(corpus.resumes)
+
+
+@register_benchmark('resume.dedup', "教育/工作/项目经历去重（含至今处理）与证书分割", mutates_input=True)
+def _bench_resume_dedup(corpus: Corpus) -> SetupResult:
+    processor = _resume_processor()
+
+    def run(resumes):
+        for resume in resumes:
+            data = resume['resume']
+            processor.deduplicate_education_experiences(data['educationExperiences'])
+            processor.deduplicate_work_experiences(data['workExperiences'])
+            processor.deduplicate_project_experiences(data['projectExperiences'])
+            processor.process_certificates(data['certificates'])
+
+    return corpus.resumes, run, len(corpus.resumes)
+
+
+@register_benchmark('resume.filter', "filter_resume_data 字段过滤")
+def _bench_resume_filter(corpus: Corpus) -> SetupResult:
+    processor = _resume_processor()
+    fields = processor.config.retain_fields
+    return corpus.resumes, lambda resumes: [processor.filter_resume_data(resume, fields) for resume in resumes], len(corpus.resumes)
+
+
+@register_benchmark('resume.html_clean', "递归HTML清洗")
+def _bench_resume_html_clean(corpus: Corpus) -> SetupResult:
+    processor = _resume_processor()
+    return corpus.resumes, lambda resumes: [processor._apply_html_cleaning(resume) for resume in resumes], len(corpus.resumes)
+
+
+@register_benchmark('resume.format_clean', "deep_clean + None替换 + 空字段删除")
+def _bench_resume_format_clean(corpus: Corpus) -> SetupResult:
+    processor = _resume_processor()
+    return corpus.resumes, lambda resumes: [processor._apply_format_cleaning(resume) for resume in resumes], len(corpus.resumes)
+
+
+@register_benchmark('resume.translate', "JSONTranslator 英文键翻译为中文键")
+def _bench_resume_translate(corpus: Corpus) -> SetupResult:
+    from abstract_db_processor import JSONTranslator
+
+    translator = JSONTranslator()
+    return corpus.resumes, lambda resumes: [translator.translate_json_keys(resume) for resume in resumes], len(corpus.resumes)
+
+
+@register_benchmark('resume.tenure', "WorkExperienceProcessor 时间段解析、合并与总工龄计算")
+def _bench_resume_tenure(corpus: Corpus) -> SetupResult:
+    from work_experience_processor import WorkExperienceProcessor
+
+    processor = WorkExperienceProcessor()
+    work_lists = [resume['resume']['workExperiences'] for resume in corpus.resumes]
+
+    def run(items):
+        for work_experiences in items:
+            periods = processor.get_work_experience_periods(work_experiences)
+            processor.calculate_total_duration(processor.merge_overlapping_periods(periods))
+
+    return work_lists, run, len(work_lists)
+
+
+@register_benchmark('resume.json_roundtrip', "简历JSON解析与序列化（数据库读写格式）")
+def _bench_resume_json(corpus: Corpus) -> SetupResult:
+    texts = [json.dumps(resume, ensure_ascii=False) for resume in corpus.resumes]
+    return texts, lambda items: [json.dumps(json.loads(text), ensure_ascii=False) for text in items], len(texts)
+
+
+# ---------------------------------------------------------------------------
+# 岗位基准
+# ---------------------------------------------------------------------------
+
+@register_benchmark('job.filter', "job_process.filter_job_data 字段过滤")
+def _bench_job_filter(corpus: Corpus) -> SetupResult:
+    from job_process import filter_job_data, retain_fields
+
+    return corpus.jobs, lambda jobs: [filter_job_data(job, retain_fields) for job in jobs], len(corpus.jobs)
+
+
+@register_benchmark('job.html_clean', "job_process.clean_html 岗位描述清洗")
+def _bench_job_html_clean(corpus: Corpus) -> SetupResult:
+    from job_process import clean_html
+
+    summaries = [job['jobSummary'] for job in corpus.jobs]
+    return summaries, lambda items: [clean_html(text) for text in items], len(summaries)
+
+
+@register_benchmark('job.salary_scalar', "normalize_salary_range 逐条薪资标准化")
+def _bench_job_salary_scalar(corpus: Corpus) -> SetupResult:
+    from salary_normalizer import normalize_salary_range
+
+    salaries = [job['salaryReal'] for job in corpus.jobs]
+    return salaries, lambda items: [normalize_salary_range(value) for value in items], len(salaries)
+
+
+@register_benchmark('job.salary_column', "normalize_salary_column 整列薪资标准化")
+def _bench_job_salary_column(corpus: Corpus) -> SetupResult:
+    from salary_normalizer import normalize_salary_column
+
+    salaries = [job['salaryReal'] for job in corpus.jobs]
+    return salaries, normalize_salary_column, len(salaries)
+
+
+@register_benchmark('job.compare', "job_compare.compare_json_with_text 岗位JSON与描述文本比对")
+def _bench_job_compare(corpus: Corpus) -> SetupResult:
+    from job_compare import compare_json_with_text
+
+    pairs = corpus.job_comparisons
+    return pairs, lambda items: [compare_json_with_text(job, text) for job, text in items], len(pairs)
+
+
+# ---------------------------------------------------------------------------
+# 智能体调用基准（本地模拟网关，见 mock_llm_gateway.py）
+# ---------------------------------------------------------------------------
+
+GATEWAY_REQUESTS = 200
+GATEWAY_WORKERS = 20
+
+
+def _gateway_coze_setup(corpus: Corpus, latency, hedge: bool = False, packing: bool = False) -> SetupResult:
+    from concurrent.futures import ThreadPoolExecutor
+    from multithread_job_processor import JobProcessor, JobProcessorConfig
+    from mock_llm_gateway import MockGatewayConfig, start_mock_gateway
+    from prompt_packing import build_packed_prompt, pack_records, split_packed_answer
+
+    server = start_mock_gateway(MockGatewayConfig(latency=latency, seed=1))
+    config = JobProcessorConfig()
+    config.coze_api_url = server.base_url + '/open_api/v2/chat'
+    config.log_file = None
+    config.structured_log_file = None
+    config.bot_stats_file = None
+    config.journal_file = None
+    config.max_workers = GATEWAY_WORKERS
+    config.hedge_enabled = hedge
+    config.hedge_min_delay = 0.01
+    config.packing_enabled = packing
+    processor = JobProcessor(config)
+    processor.logger.disabled = True
+    queries = [json.dumps(job, ensure_ascii=False) for job in corpus.jobs[:GATEWAY_REQUESTS]]
+
+    def call(query):
+        content, success, _ = processor.call_agent(query, processor.get_next_bot_id(), 'bench')
+        return content, success
+
+    def call_packed(batch):
+        prompt = build_packed_prompt(batch)
+        content, success, _ = processor.call_agent(prompt, processor.get_next_bot_id(), 'bench')
+        results, failed_ids = split_packed_answer(content, [record_id for record_id, _ in batch])
+        return content, success and not failed_ids
+
+    def run(items):
+        if packing:
+            items = pack_records(list(enumerate(items)), config.packing_max_tokens, config.packing_max_records)
+        with ThreadPoolExecutor(max_workers=GATEWAY_WORKERS) as executor:
+            results = list(executor.map(call_packed if packing else call, items))
+        if not all(success for _, success in results):
+            raise RuntimeError("模拟网关调用失败")
+
+    return queries, run, len(queries)
+
+
+@register_benchmark('gateway.coze_threaded', "JobProcessor.call_coze_api 经模拟网关的20线程端到端调用（固定20ms延迟）")
+def _bench_gateway_coze_threaded(corpus: Corpus) -> SetupResult:
+    from mock_llm_gateway import LatencyModel
+
+    return _gateway_coze_setup(corpus, LatencyModel('fixed', median_ms=20))
+
+
+@register_benchmark('gateway.coze_hedged', "开启请求对冲的20线程调用（对数正态延迟，中位数20ms，长尾至1s）")
+def _bench_gateway_coze_hedged(corpus: Corpus) -> SetupResult:
+    from mock_llm_gateway import LatencyModel
+
+    return _gateway_coze_setup(corpus, LatencyModel('lognormal', median_ms=20, sigma=1.2, max_ms=1000), hedge=True)
+
+
+@register_benchmark('gateway.coze_packed', "多记录打包后的20线程调用（固定20ms延迟，每个提示词最多5条）")
+def _bench_gateway_coze_packed(corpus: Corpus) -> SetupResult:
+    from mock_llm_gateway import LatencyModel
+
+    return _gateway_coze_setup(corpus, LatencyModel('fixed', median_ms=20), packing=True)
+
+
+# ---------------------------------------------------------------------------
+# JSON列字典压缩基准（见 json_codec.py）
+# ---------------------------------------------------------------------------
+
+def _codec_texts(corpus: Corpus) -> List[str]:
+    """与数据库中一致的缩进格式JSON文本"""
+    return [json.dumps(item, ensure_ascii=False, indent=4) for item in corpus.resumes + corpus.jobs]
+
+
+def _codec(corpus: Corpus, algorithm: str):
+    """在语料上训练字典并创建编解码器，zstd 未安装时抛出 ImportError（基准记为 skipped）"""
+    import tempfile
+    from json_codec import DictionaryStore, JsonCodec, train_dictionary
+
+    with tempfile.TemporaryDirectory(prefix='codec_bench_') as directory:
+        store = DictionaryStore(directory)
+        store.add(algorithm, train_dictionary(_codec_texts(corpus), algorithm))
+        return JsonCodec(store, min_size=0)  # 字典已加载到缓存，目录可以删除
+
+
+def _codec_fetch_setup(corpus: Corpus, algorithm: Optional[str]) -> SetupResult:
+    """模拟抓取：从SQLite表读出整列、解压并解析JSON（本地库没有网络开销，收益以实际库为准）"""
+    import sqlite3
+
+    codec = _codec(corpus, algorithm) if algorithm else None
+    texts = _codec_texts(corpus)
+    connection = sqlite3.connect(':memory:', check_same_thread=False)
+    connection.execute('CREATE TABLE records (id INTEGER PRIMARY KEY, info TEXT)')
+    connection.executemany('INSERT INTO records (info) VALUES (?)',
+                           [(codec.encode(text) if codec else text,) for text in texts])
+
+    def run(_):
+        rows = connection.execute('SELECT id, info FROM records').fetchall()
+        return [json.loads(codec.decode(info) if codec else info) for _, info in rows]
+
+    return None, run, len(texts)
+
+
+@register_benchmark('codec.zlib_encode', "json_codec zlib预置字典压缩（缩进JSON）")
+def _bench_codec_zlib_encode(corpus: Corpus) -> SetupResult:
+    codec = _codec(corpus, 'zlib')
+    texts = _codec_texts(corpus)
+    return texts, lambda items: [codec.encode(text) for text in items], len(texts)
+
+
+@register_benchmark('codec.zlib_decode', "json_codec zlib预置字典解压")
+def _bench_codec_zlib_decode(corpus: Corpus) -> SetupResult:
+    codec = _codec(corpus, 'zlib')
+    encoded = [codec.encode(text) for text in _codec_texts(corpus)]
+    return encoded, lambda items: [codec.decode(value) for value in items], len(encoded)
+
+
+@register_benchmark('codec.zstd_encode', "json_codec zstd训练字典压缩（需要zstandard）")
+def _bench_codec_zstd_encode(corpus: Corpus) -> SetupResult:
+    codec = _codec(corpus, 'zstd')
+    texts = _codec_texts(corpus)
+    return texts, lambda items: [codec.encode(text) for text in items], len(texts)
+
+
+@register_benchmark('codec.zstd_decode', "json_codec zstd训练字典解压（需要zstandard）")
+def _bench_codec_zstd_decode(corpus: Corpus) -> SetupResult:
+    codec = _codec(corpus, 'zstd')
+    encoded = [codec.encode(text) for text in _codec_texts(corpus)]
+    return encoded, lambda items: [codec.decode(value) for value in items], len(encoded)
+
+
+@register_benchmark('codec.fetch_plain', "抓取普通文本列并解析JSON（对照组）")
+def _bench_codec_fetch_plain(corpus: Corpus) -> SetupResult:
+    return _codec_fetch_setup(corpus, None)
+
+
+@register_benchmark('codec.fetch_zlib', "抓取zlib压缩列、解压并解析JSON")
+def _bench_codec_fetch_zlib(corpus: Corpus) -> SetupResult:
+    return _codec_fetch_setup(corpus, 'zlib')
+
+
+@register_benchmark('codec.fetch_zstd', "抓取zstd压缩列、解压并解析JSON（需要zstandard）")
+def _bench_codec_fetch_zstd(corpus: Corpus) -> SetupResult:
+    return _codec_fetch_setup(corpus, 'zstd')
+
+
+# ---------------------------------------------------------------------------
+# 在途记录内存占用：每个变体在独立子进程中构造 count 条记录，以构造前后的RSS差值计算
+# ---------------------------------------------------------------------------
+
+MEMORY_RECORD_COUNT = 100_000
+_MEMORY_TEXT = '{"jobName": "数据分析师", "jobSummary": "负责业务数据分析"}'
+
+
+def _job_result_values(i: int) -> tuple:
+    return (i, _MEMORY_TEXT, 'bot', '2024-01-01 00:00:00.000', '2024-01-01 00:00:01.000', i * 0.001, True)
+
+
+def _memory_builders() -> Dict[str, Callable[[int], list]]:
+    """变体名 -> 构造 count 条在途记录的函数；名称按 "记录类型.before/after" 命名"""
+    from record_types import JobRecord, JobResult, JobSummaryRecord
+    result_fields = JobResult.__slots__
+    return {
+        'job_row.before': lambda count: [(i, _MEMORY_TEXT) for i in range(count)],
+        'job_row.after': lambda count: [JobRecord(i, _MEMORY_TEXT) for i in range(count)],
+        'jobsummary_row.before': lambda count: [(i, _MEMORY_TEXT, _MEMORY_TEXT) for i in range(count)],
+        'jobsummary_row.after': lambda count: [JobSummaryRecord(i, _MEMORY_TEXT, _MEMORY_TEXT) for i in range(count)],
+        'job_result.before': lambda count: [dict(zip(result_fields, _job_result_values(i))) for i in range(count)],
+        'job_result.after': lambda count: [JobResult(*_job_result_values(i)) for i in range(count)],
+    }
+
+
+def _current_rss() -> int:
+    """当前进程RSS（字节），读取 /proc/self/statm，不可用时返回0"""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _memory_child(variant: str, count: int):
+    """子进程入口：构造记录并以JSON输出RSS增量"""
+    import gc
+    builder = _memory_builders()[variant]
+    builder(10)  # 预先加载类型与代码对象，避免计入首次构造的开销
+    gc.collect()
+    before = _current_rss()
+    records = builder(count)
+    gc.collect()
+    after = _current_rss()
+    print(json.dumps({'variant': variant, 'count': len(records), 'rss_bytes': after - before}))
+
+
+def measure_inflight_memory(count: int = MEMORY_RECORD_COUNT, name_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    测量各在途记录类型的RSS占用（每个变体一个子进程，互不干扰）
+
+    Args:
+        count: 每个变体构造的记录数
+        name_filter: 只测量名称包含该子串的变体
+
+    Returns:
+        List[Dict]: 每项包含 variant、rss_bytes、per_100k_mb、bytes_per_record；无法读取RSS时 rss_bytes 为0
+    """
+    import subprocess
+    results = []
+    for variant in _memory_builders():
+        if name_filter and name_filter not in variant:
+            continue
+        code = f"import benchmark_suite; benchmark_suite._memory_child({variant!r}, {count})"
+        output = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout
+        item = json.loads(output.strip().splitlines()[-1])
+        item['per_100k_mb'] = round(item['rss_bytes'] / count * 100_000 / 1024 / 1024, 2)
+        item['bytes_per_record'] = round(item['rss_bytes'] / count, 1)
+        results.append(item)
+    return results
+
+
+def print_memory_report(results: List[Dict[str, Any]]):
+    """打印在途记录内存占用，并给出同一记录类型 before/after 的比值"""
+    print("\n=== 在途记录内存占用（RSS） ===")
+    by_name = {item['variant']: item for item in results}
+    for item in results:
+        line = (f"  {item['variant']:<24} 每10万条 {item['per_100k_mb']:8.2f} MB  "
+                f"每条 {item['bytes_per_record']:7.1f} B")
+        before = by_name.get(item['variant'].replace('.after', '.before'))
+        if item['variant'].endswith('.after') and before and before['rss_bytes']:
+            line += f"  为before的 {item['rss_bytes'] / before['rss_bytes']:.0%}"
+        print(line)
+
+
+# ---------------------------------------------------------------------------
+# 启动耗时：python -X importtime 导入各入口模块，统计累计导入耗时与最重的直接依赖
+# ---------------------------------------------------------------------------
+
+STARTUP_MODULES = (
+    'pipeline_cli',
+    'zhilian_resume_processor',
+    'resume_process',
+    'job_process',
+    'multithread_job_processor',
+    'job_compare',
+    'pg_to_excel',
+    'data_syn',
+)
+
+
+def parse_importtime(stderr: str, module: str, top: int = 5) -> Dict[str, Any]:
+    """
+    解析 -X importtime 输出
+
+    Args:
+        stderr: 子进程标准错误输出
+        module: 被测模块名
+        top: 返回累计耗时最多的直接依赖个数
+
+    Returns:
+        Dict: total_us（被测模块累计导入耗时，微秒）、heaviest（[(模块名, 累计微秒), ...]）
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = len(name) - len(name.lstrip(' '))
+        entries.append((name.strip(), int(cumulative_us), depth))
+
+    total_us, root_depth, root_index = None, None, None
+    for index, (name, cumulative_us, depth) in enumerate(entries):
+        if name == module:
+            total_us, root_depth, root_index = cumulative_us, depth, index
+    if total_us is None:
+        return {'total_us': None, 'heaviest': []}
+
+    # importtime 先输出子模块再输出父模块，被测模块之前、缩进更深一层的连续条目是它的直接依赖
+    children = []
+    for name, cumulative_us, depth in reversed(entries[:root_index]):
+        if depth <= root_depth:
+            break
+        if depth == root_depth + 2:
+            children.append((name, cumulative_us))
+    children.sort(key=lambda item: item[1], reverse=True)
+    return {'total_us': total_us, 'heaviest': children[:top]}
+
+
+def measure_startup(modules=STARTUP_MODULES, repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    每个模块在新的解释器中用 -X importtime 导入 repeat 次，取累计耗时的中位数
+
+    导入失败（依赖未安装）的模块记为 skipped，message 为错误的最后一行。
+    """
+    import subprocess
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([BASE_DIR, os.path.join(BASE_DIR, 'resume'), os.path.join(BASE_DIR, 'job')] +
+                                        ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    results = []
+    for module in modules:
+        runs = []
+        message = ''
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                  cwd=BASE_DIR, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                message = (proc.stderr.strip().splitlines() or [''])[-1]
+                break
+            runs.append(parse_importtime(proc.stderr, module))
+        if message or not runs or runs[0]['total_us'] is None:
+            results.append({'module': module, 'status': 'skipped', 'message': message or '未找到导入记录'})
+            continue
+        median_us = statistics.median(run['total_us'] for run in runs)
+        results.append({'module': module, 'status': 'ok', 'import_ms': round(median_us / 1000, 2),
+                        'heaviest': [(name, round(us / 1000, 2)) for name, us in runs[0]['heaviest']]})
+    return results
+
+
+def print_startup_report(results: List[Dict[str, Any]]):
+    """打印启动耗时"""
+    print("\n=== 模块导入耗时（-X importtime，中位数） ===")
+    for item in results:
+        if item['status'] != 'ok':
+            print(f"  {item['module']:<28} 跳过: {item['message']}")
+            continue
+        heaviest = ', '.join(f"{name} {ms:.1f}ms" for name, ms in item['heaviest'][:3])
+        print(f"  {item['module']:<28} {item['import_ms']:9.2f} ms  最重依赖: {heaviest}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据处理基准测试套件')
+    parser.add_argument('--resumes', type=int, default=500, help='简历数量')
+    parser.add_argument('--jobs', type=int, default=2000, help='岗位数量')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--duplicate-rate', type=float, default=0.2, help='重复经历比例')
+    parser.add_argument('--zhijin-rate', type=float, default=0.3, help='"至今"标签比例')
+    parser.add_argument('--html-noise-rate', type=float, default=0.3, help='HTML噪声比例')
+    parser.add_argument('--repeat', type=int, default=5, help='每个基准的计时轮数')
+    parser.add_argument('--warmup', type=int, default=1, help='预热轮数')
+    parser.add_argument('--filter', type=str, help='只运行名称包含该子串的基准')
+    parser.add_argument('--output', type=str, help='本次结果保存路径（JSON）')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE_FILE, help='基线文件路径')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果更新基线')
+    parser.add_argument('--list', action='store_true', help='列出全部基准')
+    parser.add_argument('--memory', action='store_true',
+                        help=f'测量在途记录的RSS占用（每个变体 {MEMORY_RECORD_COUNT} 条），不运行计时基准')
+    parser.add_argument('--startup', action='store_true',
+                        help='用 -X importtime 测量各入口模块的导入耗时，不运行计时基准')
+    args = parser.parse_args()
+
+    if args.list:
+        for spec in get_benchmarks(args.filter):
+            print(f"{spec.name:<28} {spec.description}")
+        return 0
+
+    if args.startup:
+        modules = [module for module in STARTUP_MODULES if not args.filter or args.filter in module]
+        results = measure_startup(modules, repeat=args.repeat)
+        print_startup_report(results)
+        if args.output:
+            save_json({'startup': results}, args.output)
+            print(f"结果已保存到 {args.output}")
+        return 0
+
+    if args.memory:
+        results = measure_inflight_memory(name_filter=args.filter)
+        print_memory_report(results)
+        if args.output:
+            save_json({'memory': results}, args.output)
+            print(f"结果已保存到 {args.output}")
+        return 0
+
+    corpus_config = CorpusConfig(resume_count=args.resumes, job_count=args.jobs, seed=args.seed,
+                                 duplicate_rate=args.duplicate_rate, zhijin_rate=args.zhijin_rate,
+                                 html_noise_rate=args.html_noise_rate)
+    report = run_suite(corpus_config, args.filter, repeat=args.repeat, warmup=args.warmup)
+
+    if args.output:
+        save_json(report, args.output)
+        print(f"结果已保存到 {args.output}")
+
+    baseline = load_json(args.baseline)
+    if args.update_baseline:
+        save_json(merge_baseline(baseline, report), args.baseline)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"未找到基线文件 {args.baseline}，可使用 --update-baseline 生成")
+        return 0
+
+    comparisons = compare_with_baseline(report, baseline)
+    regressions = [item for item in comparisons if item['regressed']]
+    print("\n=== 与基线对比 ===")
+    for item in comparisons:
+        flag = "回退" if item['regressed'] else "正常"
+        print(f"  {item['name']:<28} 基线 {item['baseline'] * 1000:9.2f} ms  本次 {item['current'] * 1000:9.2f} ms  "
+              f"比值 {item['ratio']:.2f}  阈值 +{item['threshold']:.0%}  {flag}")
+    if regressions:
+        print(f"发现 {len(regressions)} 项性能回退")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+Coze Bot 负载均衡器
+替代按顺序轮询 bot_ids 的做法，根据各Bot的实时表现分配请求：
+
+- 选择策略：
+  - ewma（默认）：按 EWMA延迟 ×（在途请求数 + 1）打分，选择分数最低的Bot，
+    没有延迟数据的Bot优先试用；按 explore_rate 的概率随机选择，避免慢Bot恢复后一直分不到请求
+  - least_outstanding：选择在途请求数最少的Bot
+  - round_robin：与原来的轮询一致
+- 熔断：连续失败 failure_threshold 次后熔断（open），open_seconds 后进入半开（half_open），
+  只放行 half_open_probes 个探测请求，探测成功则恢复（closed），失败则重新熔断并加倍等待时间
+- 统计持久化：各Bot的EWMA延迟、成功/失败次数和熔断截止时间写入 state_file，下次运行时加载
+
+使用示例：
+    balancer = BotBalancer(bot_ids, state_file='job_processor_bot_stats.json')
+    with balancer.lease() as lease:
+        content, success = call_coze_api(query, lease.bot_id, user_id, conversation_id)
+        lease.success = success
+    balancer.save_state()
+"""
+
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from processing_metrics import MetricsRegistry, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('ewma', 'least_outstanding', 'round_robin')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class BotStats:
+    """单个Bot的统计信息与熔断状态"""
+
+    def __init__(self, bot_id: str):
+        self.bot_id = bot_id
+        self.ewma_latency: Optional[float] = None  # 秒
+        self.outstanding = 0
+        self.success_count = 0
+        self.failure_count = 0
+        self.latency_sum = 0.0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.open_until = 0.0  # time.time()，熔断截止时间
+        self.open_seconds = 0.0  # 当前熔断等待时长，半开探测失败时加倍
+        self.probes_in_flight = 0
+        self.half_open_epoch = 0  # 每次进入半开状态加1，区分本轮探测请求与熔断前发出的请求
+
+    def to_dict(self) -> Dict[str, object]:
+        total = self.success_count + self.failure_count
+        return {
+            'ewma_latency': round(self.ewma_latency, 4) if self.ewma_latency is not None else None,
+            'outstanding': self.outstanding,
+            'success_count': self.success_count,
+            'failure_count': self.failure_count,
+            'success_rate': round(self.success_count / total, 4) if total else None,
+            'avg_latency': round(self.latency_sum / total, 4) if total else None,
+            'consecutive_failures': self.consecutive_failures,
+            'state': self.state,
+            'open_until': self.open_until,
+            'open_seconds': self.open_seconds,
+        }
+
+
+class AcquiredBot(str):
+    """
+    acquire 返回的bot_id，可当作普通字符串使用
+
+    Attributes:
+        probe_epoch: 作为半开探测请求时对应的 half_open_epoch，非探测请求为None
+    """
+
+    def __new__(cls, bot_id: str, probe_epoch: Optional[int] = None):
+        acquired = super().__new__(cls, bot_id)
+        acquired.probe_epoch = probe_epoch
+        return acquired
+
+    @property
+    def is_probe(self) -> bool:
+        return self.probe_epoch is not None
+
+
+class BotLease:
+    """
+    一次Bot调用的租约
+
+    Attributes:
+        bot_id: 本次使用的Bot
+        success: 调用是否成功，调用方根据接口返回设置，默认True
+    """
+
+    def __init__(self, bot_id: str):
+        self.bot_id = bot_id
+        self.success = True
+        self.started = time.perf_counter()
+
+
+class BotBalancer:
+    """
+    按延迟和在途请求数选择Bot，带熔断和统计持久化（线程安全）
+
+    Args:
+        bot_ids: 可用Bot列表
+        policy: 选择策略 ewma / least_outstanding / round_robin
+        ewma_alpha: EWMA平滑系数，越大越看重最近的延迟
+        explore_rate: ewma策略下随机选择的概率
+        failure_threshold: 连续失败多少次后熔断
+        open_seconds: 首次熔断时长（秒）
+        max_open_seconds: 熔断时长上限（秒）
+        half_open_probes: 半开状态下同时放行的探测请求数
+        state_file: 统计持久化文件，None表示不持久化
+        save_every: 每完成多少次调用自动保存一次统计
+        name: 均衡器名称，作为指标的 balancer 标签
+        registry: 指标注册表，默认使用全局 REGISTRY
+    """
+
+    def __init__(self, bot_ids: Iterable[str], policy: str = 'ewma', ewma_alpha: float = 0.3,
+                 explore_rate: float = 0.05, failure_threshold: int = 5, open_seconds: float = 30.0,
+                 max_open_seconds: float = 600.0, half_open_probes: int = 1,
+                 state_file: Optional[str] = None, save_every: int = 50, name: str = 'coze',
+                 registry: Optional[MetricsRegistry] = None):
+        self.bot_ids: List[str] = list(dict.fromkeys(bot_ids))
+        if not self.bot_ids:
+            raise ValueError("bot_ids 不能为空")
+        if policy not in POLICIES:
+            raise ValueError(f"不支持的选择策略: {policy}，可选: {POLICIES}")
+        self.policy = policy
+        self.ewma_alpha = ewma_alpha
+        self.explore_rate = explore_rate
+        self.failure_threshold = failure_threshold
+        self.initial_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self.state_file = state_file
+        self.save_every = save_every
+        self.name = name
+
+        self._stats: Dict[str, BotStats] = {bot_id: BotStats(bot_id) for bot_id in self.bot_ids}
+        self._lock = threading.Lock()
+        self._rr_index = 0
+        self._completed_since_save = 0
+        self._rng = random.Random()
+        self._save_lock = threading.Lock()  # 串行化并发的 save_state
+
+        registry = registry or REGISTRY
+        self._requests = registry.counter(
+            'bot_requests_total', 'Bot调用次数', ('balancer', 'bot_id', 'status'))
+        self._latency = registry.histogram(
+            'bot_request_duration_seconds', 'Bot调用耗时（秒）', ('balancer', 'bot_id'))
+        self._outstanding = registry.gauge(
+            'bot_outstanding_requests', 'Bot在途请求数', ('balancer', 'bot_id'))
+        self._circuit_state = registry.gauge(
+            'bot_circuit_state', 'Bot熔断状态（0=closed，1=half_open，2=open）', ('balancer', 'bot_id'))
+        self._transitions = registry.counter(
+            'bot_circuit_transitions_total', 'Bot熔断状态切换次数', ('balancer', 'bot_id', 'state'))
+
+        if state_file:
+            self.load_state(state_file)
+        for stats in self._stats.values():
+            self._circuit_state.set(CIRCUIT_STATE_VALUES[stats.state], balancer=self.name, bot_id=stats.bot_id)
+
+    # ------------------------------------------------------------------
+    # 选择
+    # ------------------------------------------------------------------
+
+    def _set_state(self, stats: BotStats, state: str):
+        if stats.state == state:
+            return
+        stats.state = state
+        if state == HALF_OPEN:
+            stats.half_open_epoch += 1
+            stats.probes_in_flight = 0
+        self._transitions.inc(balancer=self.name, bot_id=stats.bot_id, state=state)
+        self._circuit_state.set(CIRCUIT_STATE_VALUES[state], balancer=self.name, bot_id=stats.bot_id)
+        if state == OPEN:
+            logger.warning(f"Bot {stats.bot_id} 熔断 {stats.open_seconds:.0f} 秒"
+                           f"（连续失败 {stats.consecutive_failures} 次）")
+        else:
+            logger.info(f"Bot {stats.bot_id} 熔断状态: {state}")
+
+    def _available(self, stats: BotStats, now: float) -> bool:
+        if stats.state == OPEN and now >= stats.open_until:
+            self._set_state(stats, HALF_OPEN)
+        if stats.state == OPEN:
+            return False
+        if stats.state == HALF_OPEN:
+            return stats.probes_in_flight < self.half_open_probes
+        return True
+
+    def _score(self, stats: BotStats) -> float:
+        if self.policy == 'least_outstanding':
+            return stats.outstanding
+        if stats.ewma_latency is None:
+            return -1.0 / (stats.outstanding + 1)  # 未试用的Bot优先，在途请求少的更优先
+        return stats.ewma_latency * (stats.outstanding + 1)
+
+    def _choose(self, candidates: List[BotStats]) -> BotStats:
+        if self.policy == 'round_robin':
+            for offset in range(len(self.bot_ids)):
+                bot_id = self.bot_ids[(self._rr_index + offset) % len(self.bot_ids)]
+                chosen = next((stats for stats in candidates if stats.bot_id == bot_id), None)
+                if chosen is not None:
+                    self._rr_index = (self._rr_index + offset + 1) % len(self.bot_ids)
+                    return chosen
+        if self.policy == 'ewma' and len(candidates) > 1 and self._rng.random() < self.explore_rate:
+            return self._rng.choice(candidates)
+        best = min(self._score(stats) for stats in candidates)
+        return self._rng.choice([stats for stats in candidates if self._score(stats) == best])
+
+    def acquire(self, exclude: Iterable[str] = ()) -> AcquiredBot:
+        """
+        选择一个Bot并计入在途请求，调用结束后必须调用 release
+
+        Args:
+            exclude: 本次不考虑的Bot（如对冲请求要避开的原Bot）
+
+        Returns:
+            AcquiredBot: 选中的bot_id（str子类），原样传给 release；
+            所有Bot都熔断时返回最早恢复的Bot，作为半开探测
+        """
+        excluded = set(exclude)
+        with self._lock:
+            now = time.time()
+            pool = [self._stats[bot_id] for bot_id in self.bot_ids if bot_id not in excluded]
+            if not pool:
+                pool = [self._stats[bot_id] for bot_id in self.bot_ids]
+            candidates = [stats for stats in pool if self._available(stats, now)]
+            if candidates:
+                chosen = self._choose(candidates)
+            else:
+                chosen = min(pool, key=lambda stats: stats.open_until)
+                logger.warning(f"所有Bot均处于熔断状态，提前探测 Bot {chosen.bot_id}")
+                self._set_state(chosen, HALF_OPEN)
+            probe_epoch = None
+            if chosen.state == HALF_OPEN:
+                chosen.probes_in_flight += 1
+                probe_epoch = chosen.half_open_epoch
+            chosen.outstanding += 1
+            self._outstanding.set(chosen.outstanding, balancer=self.name, bot_id=chosen.bot_id)
+            return AcquiredBot(chosen.bot_id, probe_epoch)
+
+    def release(self, bot_id: str, elapsed: float, success: bool):
+        """
+        记录一次调用结果，更新EWMA延迟和熔断状态
+
+        熔断期间只有本轮半开探测请求的结果会改变熔断状态，
+        熔断前发出、熔断后才返回的请求只计入统计
+
+        Args:
+            bot_id: acquire 返回的Bot（需原样传入，用于识别探测请求）
+            elapsed: 调用耗时（秒）
+            success: 调用是否成功
+        """
+        probe_epoch = getattr(bot_id, 'probe_epoch', None)
+        bot_id = str(bot_id)
+        save = False
+        with self._lock:
+            stats = self._stats[bot_id]
+            stats.outstanding = max(0, stats.outstanding - 1)
+            is_probe = (stats.state == HALF_OPEN and probe_epoch is not None
+                        and probe_epoch == stats.half_open_epoch)
+            if is_probe and stats.probes_in_flight:
+                stats.probes_in_flight -= 1
+            stats.latency_sum += elapsed
+            if stats.ewma_latency is None:
+                stats.ewma_latency = elapsed
+            else:
+                stats.ewma_latency += self.ewma_alpha * (elapsed - stats.ewma_latency)
+
+            if success:
+                stats.success_count += 1
+                stats.consecutive_failures = 0
+                if is_probe:
+                    stats.open_seconds = 0.0
+                    self._set_state(stats, CLOSED)
+            else:
+                stats.failure_count += 1
+                stats.consecutive_failures += 1
+                if is_probe or (stats.state == CLOSED and
+                                stats.consecutive_failures >= self.failure_threshold):
+                    stats.open_seconds = min(self.max_open_seconds,
+                                             stats.open_seconds * 2 or self.initial_open_seconds)
+                    stats.open_until = time.time() + stats.open_seconds
+                    self._set_state(stats, OPEN)
+
+            self._outstanding.set(stats.outstanding, balancer=self.name, bot_id=bot_id)
+            self._completed_since_save += 1
+            if self.state_file and self.save_every and self._completed_since_save >= self.save_every:
+                self._completed_since_save = 0
+                save = True
+
+        self._requests.inc(balancer=self.name, bot_id=bot_id, status='success' if success else 'failed')
+        self._latency.observe(elapsed, balancer=self.name, bot_id=bot_id)
+        if save:
+            self.save_state()
+
+    @contextmanager
+    def lease(self, exclude: Iterable[str] = ()):
+        """选择Bot的上下文管理器，块结束时按 lease.success 记录结果，抛出异常时记为失败"""
+        lease = BotLease(self.acquire(exclude))
+        try:
+            yield lease
+        except BaseException:
+            lease.success = False
+            raise
+        finally:
+            self.release(lease.bot_id, time.perf_counter() - lease.started, lease.success)
+
+    # ------------------------------------------------------------------
+    # 统计与持久化
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """返回各Bot的统计信息"""
+        with self._lock:
+            return {bot_id: self._stats[bot_id].to_dict() for bot_id in self.bot_ids}
+
+    def save_state(self, path: Optional[str] = None):
+        """
+        把各Bot统计写入JSON文件
+
+        先写同目录下的唯一临时文件再替换，避免中途退出写坏文件；
+        多个线程同时 release 触发保存时按顺序写入，后保存的统计覆盖先保存的
+        """
+        path = path or self.state_file
+        if not path:
+            return
+        with self._save_lock:
+            data = {'policy': self.policy, 'saved_at': time.time(), 'bots': self.snapshot()}
+            temp_path = None
+            try:
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                                 prefix=os.path.basename(path) + '.', suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning(f"保存Bot统计失败 {path}: {e}")
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def load_state(self, path: str):
+        """从JSON文件加载上次运行的统计，不在当前 bot_ids 中的Bot忽略，已过期的熔断不恢复"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding='utf-8') as f:
+                bots = json.load(f).get('bots', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取Bot统计失败 {path}: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for bot_id, saved in bots.items():
+                stats = self._stats.get(bot_id)
+                if stats is None:
+                    continue
+                stats.ewma_latency = saved.get('ewma_latency')
+                stats.success_count = int(saved.get('success_count') or 0)
+                stats.failure_count = int(saved.get('failure_count') or 0)
+                stats.latency_sum = float(saved.get('avg_latency') or 0) * (stats.success_count + stats.failure_count)
+                if saved.get('state') == OPEN and float(saved.get('open_until') or 0) > now:
+                    stats.consecutive_failures = int(saved.get('consecutive_failures') or 0)
+                    stats.state = OPEN
+                    stats.open_until = float(saved['open_until'])
+                    stats.open_seconds = float(saved.get('open_seconds') or self.initial_open_seconds)
+        logger.info(f"已加载Bot统计: {path}")
@@ -10,6 +10,8 @@ import logging
 from typing import List, Dict, Any, Optional, Callable, Tuple
 from abc import ABC, abstractmethod
 from db_connection import DatabaseConnection, get_db_connection, close_db_connection
+from json_projection import build_json_projection
+from json_codec import JsonCodec
 
 
 class BaseQueryProcessor(ABC):
@@ -18,14 +20,16 @@ class BaseQueryProcessor(ABC):
     定义通用的查询和更新接口
     """
     
-    def __init__(self, db_connection: Optional[DatabaseConnection] = None):
+    def __init__(self, db_connection: Optional[DatabaseConnection] = None, codec: Optional[JsonCodec] = None):
         """
         初始化处理器
         
         Args:
             db_connection: 数据库连接实例，如果为None则使用默认连接
+            codec: JSON列编解码器，提供时读取自动解压、写入自动压缩（见 json_codec.py）
         """
         self.db_connection = db_connection or DatabaseConnection()
+        self.codec = codec
         self.logger = logging.getLogger(self.__class__.__name__)
     
     def get_connection(self):
@@ -36,6 +40,14 @@ class BaseQueryProcessor(ABC):
         """关闭数据库连接"""
         self.db_connection.close_connection(cursor, connection)
     
+    def decode_value(self, value):
+        """解压读取到的列值，未配置编解码器或不是压缩值时原样返回"""
+        return self.codec.decode(value) if self.codec else value
+    
+    def encode_value(self, value):
+        """压缩待写入的列值，未配置编解码器时原样返回"""
+        return self.codec.encode(value) if self.codec else value
+    
     @abstractmethod
     def process_record(self, record: tuple) -> Optional[tuple]:
         """
@@ -222,8 +234,8 @@ class JSONProcessor(BaseQueryProcessor):
     专门处理包含JSON字段的数据库记录
     """
     
-    def __init__(self, db_connection: Optional[DatabaseConnection] = None):
-        super().__init__(db_connection)
+    def __init__(self, db_connection: Optional[DatabaseConnection] = None, codec: Optional[JsonCodec] = None):
+        super().__init__(db_connection, codec)
     
     def process_record(self, record: tuple) -> Optional[tuple]:
         """
@@ -238,7 +250,7 @@ class JSONProcessor(BaseQueryProcessor):
         """
         try:
             record_id = record[0]
-            json_data = record[1] if len(record) > 1 else None
+            json_data = self.decode_value(record[1]) if len(record) > 1 else None
             
             if json_data:
                 # 如果是字符串，尝试解析为JSON
@@ -251,7 +263,7 @@ class JSONProcessor(BaseQueryProcessor):
                 processed_data = self.process_json_data(parsed_data)
                 processed_json_str = json.dumps(processed_data, ensure_ascii=False)
                 
-                return (record_id, processed_json_str)
+                return (record_id, self.encode_value(processed_json_str))
             
         except Exception as e:
             self.logger.error(f"处理JSON记录失败: {record[0] if record else 'unknown'}, 错误: {str(e)}")
@@ -408,4 +420,19 @@ class CommonQueryBuilder:
         """
         fields_str = ", ".join(fields)
         placeholders = ", ".join(["%s"] * len(fields))
-        return f"INSERT INTO {table_name} ({fields_str}) VALUES ({placeholders})"
\ No newline at end of file
+        return f"INSERT INTO {table_name} ({fields_str}) VALUES ({placeholders})"
+
+    @staticmethod
+    def build_json_projection(column: str, required_fields: Dict, alias: str = None) -> str:
+        """
+        构建JSON列的投影表达式，在数据库端只取出保留字段模板中的字段
+
+        Args:
+            column: JSON列名
+            required_fields: 保留字段模板（格式同 filter_resume_data）
+            alias: 结果列别名，默认与列名相同
+
+        Returns:
+            SELECT中的表达式，结果为文本
+        """
+        return build_json_projection(column, required_fields, alias)
\ No newline at end of file
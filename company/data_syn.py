@@ -1,19 +1,18 @@
 from datetime import datetime
 
-import cx_Oracle
-import psycopg2
 from db_connection import get_db_connection
+from lazy_import import lazy_module
 
-# 连接 Oracle 数据库
-dsn = cx_Oracle.makedsn('192.168.26.10', '1521', service_name='rsjydev')
-ora_conn = cx_Oracle.connect(user="yhaimq", password="yhaimq", dsn=dsn)
-# 连接 PostgreSQL 数据库
-pg_conn = get_db_connection()
+# 驱动按需导入，导入本模块时不连接数据库（连接在 main 中建立）
+cx_Oracle = lazy_module('cx_Oracle')
+psycopg2 = lazy_module('psycopg2')
 
-i = 0
-# 创建游标
-ora_cursor = ora_conn.cursor()
-pg_cursor = pg_conn.cursor()
+# Oracle 数据库连接配置
+ORACLE_HOST = '192.168.26.10'
+ORACLE_PORT = '1521'
+ORACLE_SERVICE_NAME = 'rsjydev'
+ORACLE_USER = 'yhaimq'
+ORACLE_PASSWORD = 'yhaimq'
 
 def get_oracle_table_columns(ora_cursor, table_name):
     """
@@ -395,7 +394,7 @@ def sync_tables(target_cursor, source_cursor, table_names, source_db_type, targe
             i += 1
 
         # 提交事务
-        ora_conn.commit()
+        target_cursor.connection.commit()
         print(f"Data synced for table: {table_name}")
 
 
@@ -474,11 +473,43 @@ table_names = [
     # 可以继续添加其他表
 ]
 
-# 同步数据
-sync_tables(target_cursor=ora_cursor, source_cursor=pg_cursor, table_names=table_names, source_db_type='postgresql', target_db_type='oracle')
 
-# 关闭连接
-ora_cursor.close()
-ora_conn.close()
-pg_cursor.close()
-pg_conn.close()
+
+def connect_oracle():
+    """
+    连接 Oracle 数据库。
+
+    :return: Oracle 连接对象
+    """
+    dsn = cx_Oracle.makedsn(ORACLE_HOST, ORACLE_PORT, service_name=ORACLE_SERVICE_NAME)
+    return cx_Oracle.connect(user=ORACLE_USER, password=ORACLE_PASSWORD, dsn=dsn)
+
+
+def main(names=None, source_db_type='postgresql', target_db_type='oracle'):
+    """
+    连接 Oracle 和 PostgreSQL，按方向同步表数据。
+
+    :param names: 表名列表，默认使用 table_names
+    :param source_db_type: 源数据库类型，'oracle' 或 'postgresql'
+    :param target_db_type: 目标数据库类型，'oracle' 或 'postgresql'
+    """
+    ora_conn = connect_oracle()
+    pg_conn = get_db_connection()
+    ora_cursor = ora_conn.cursor()
+    pg_cursor = pg_conn.cursor()
+    cursors = {'oracle': ora_cursor, 'postgresql': pg_cursor}
+    try:
+        # 同步数据
+        sync_tables(target_cursor=cursors[target_db_type], source_cursor=cursors[source_db_type],
+                    table_names=names or table_names, source_db_type=source_db_type,
+                    target_db_type=target_db_type)
+    finally:
+        # 关闭连接
+        ora_cursor.close()
+        ora_conn.close()
+        pg_cursor.close()
+        pg_conn.close()
+
+
+if __name__ == '__main__':
+    main()
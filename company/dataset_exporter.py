@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+训练数据集分片导出器
+将 TrainingDataBuilder 构建的训练样本直接流式写入按大小切分的压缩分片（JSONL.gz 或 Parquet），
+并维护 manifest.json（条数、哈希、源数据ID范围），支持断点续写，
+可选同时写出预分词的 token id 数组供 LLM 训练代码直接加载。
+
+分片文件先写入 .tmp 临时文件，封片时计算哈希并重命名，再原子更新 manifest，
+因此进程中断后只会丢失未封片的部分，重新运行时从 manifest 记录的最大ID之后继续。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+SUPPORTED_FORMATS = ("jsonl", "parquet")
+
+
+def example_to_text(example: Dict[str, Any]) -> str:
+    """将训练样本拼接为用于预分词的纯文本（system、context、target 以空行分隔）"""
+    system = example.get("system") or [""]
+    context = example.get("context") or [""]
+    parts = [system[0] if isinstance(system, list) else system,
+             context[0] if isinstance(context, list) else context,
+             example.get("target", "")]
+    return "\n\n".join(part for part in parts if part)
+
+
+def load_tokenizer(name: str = "gpt2"):
+    """加载 tiktoken 分词器（与 LLM 目录下训练代码使用的 gpt2 编码一致）"""
+    import tiktoken
+    return tiktoken.get_encoding(name)
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算文件的 sha256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ShardedDatasetWriter:
+    """
+    分片数据集写入器
+
+    使用方式:
+        with ShardedDatasetWriter("./dataset/zhilian_resume") as writer:
+            for record_id, example in rows:
+                writer.write(record_id, example)
+
+    写入的记录ID必须单调递增（查询时 ORDER BY id），断点续写依赖这一点。
+    """
+
+    def __init__(self,
+                 output_dir: str,
+                 shard_format: str = "jsonl",
+                 max_shard_bytes: int = 256 * 1024 * 1024,
+                 compression_level: int = 6,
+                 tokenizer: Any = None,
+                 tokenizer_name: str = "",
+                 name_prefix: str = "train"):
+        """
+        初始化写入器
+
+        Args:
+            output_dir: 输出目录
+            shard_format: 分片格式，jsonl（gzip压缩）或 parquet（zstd压缩，需要pyarrow）
+            max_shard_bytes: 单个分片的大小上限，按写入的未压缩JSON字节数计算（压缩器内部有缓冲，压缩后大小无法实时得到）
+            compression_level: gzip 压缩级别
+            tokenizer: 带 encode 方法的分词器（如 tiktoken 编码），为None时不写 token 文件
+            tokenizer_name: 分词器名称，写入manifest用于校验
+            name_prefix: 分片文件名前缀
+        """
+        if shard_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的分片格式: {shard_format}，可选: {', '.join(SUPPORTED_FORMATS)}")
+
+        self.output_dir = output_dir
+        self.shard_format = shard_format
+        self.max_shard_bytes = max_shard_bytes
+        self.compression_level = compression_level
+        self.tokenizer = tokenizer
+        self.tokenizer_name = tokenizer_name or getattr(tokenizer, "name", "")
+        self.name_prefix = name_prefix
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self._remove_stale_tmp_files()
+
+        # 当前分片状态
+        self._raw_file = None
+        self._gzip_file = None
+        self._parquet_rows: List[Dict[str, Any]] = []
+        self._pending_bytes = 0
+        self._shard_count = 0
+        self._shard_min_id = None
+        self._shard_max_id = None
+        self._tokens = array("H")
+        self._token_offsets = array("q", [0])
+
+    # ------------------------------------------------------------------
+    # manifest
+    # ------------------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.output_dir, MANIFEST_FILE)
+
+    @property
+    def last_id(self) -> Optional[int]:
+        """已封片数据中的最大源数据ID，用于断点续写"""
+        return self.manifest.get("last_id")
+
+    @property
+    def total_count(self) -> int:
+        return self.manifest.get("total_count", 0)
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """读取已有 manifest，不存在时创建新的"""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("format") != self.shard_format:
+                raise ValueError(f"输出目录已存在 {manifest.get('format')} 格式的数据集，与当前格式 {self.shard_format} 不一致")
+            if manifest.get("tokenizer", "") != self.tokenizer_name and manifest.get("shards"):
+                raise ValueError(f"输出目录已有分片使用分词器 '{manifest.get('tokenizer', '')}'，与当前 '{self.tokenizer_name}' 不一致")
+            return manifest
+
+        return {
+            "version": MANIFEST_VERSION,
+            "format": self.shard_format,
+            "tokenizer": self.tokenizer_name,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "updated_at": None,
+            "total_count": 0,
+            "last_id": None,
+            "shards": []
+        }
+
+    def _save_manifest(self):
+        """原子写入 manifest"""
+        self.manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def _remove_stale_tmp_files(self):
+        """删除上次中断时遗留的未封片临时文件"""
+        for file_name in os.listdir(self.output_dir):
+            if file_name.endswith(".tmp"):
+                os.remove(os.path.join(self.output_dir, file_name))
+
+    # ------------------------------------------------------------------
+    # 分片写入
+    # ------------------------------------------------------------------
+
+    def _shard_base_name(self) -> str:
+        return f"{self.name_prefix}-{len(self.manifest['shards']):05d}"
+
+    def _shard_file_name(self) -> str:
+        suffix = "jsonl.gz" if self.shard_format == "jsonl" else "parquet"
+        return f"{self._shard_base_name()}.{suffix}"
+
+    def _open_shard(self):
+        """打开新的分片"""
+        if self.shard_format == "jsonl":
+            tmp_path = os.path.join(self.output_dir, self._shard_file_name() + ".tmp")
+            self._raw_file = open(tmp_path, "wb")
+            self._gzip_file = gzip.GzipFile(fileobj=self._raw_file, mode="wb",
+                                            compresslevel=self.compression_level, mtime=0)
+        self._shard_count = 0
+        self._pending_bytes = 0
+        self._shard_min_id = None
+        self._shard_max_id = None
+
+    def write(self, record_id: int, example: Dict[str, Any]) -> bool:
+        """
+        写入一条训练样本
+
+        Args:
+            record_id: 源数据ID
+            example: TrainingDataBuilder.build_training_data 的返回值
+
+        Returns:
+            bool: 是否写入（已导出过的ID返回False）
+        """
+        if self.last_id is not None and record_id <= self.last_id:
+            return False
+        if self._shard_max_id is not None and record_id <= self._shard_max_id:
+            raise ValueError(f"记录ID必须递增: {record_id} <= {self._shard_max_id}")
+
+        if self._shard_count == 0:
+            self._open_shard()
+
+        row = {"id": record_id}
+        row.update(example)
+
+        if self.shard_format == "jsonl":
+            payload = (json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            self._gzip_file.write(payload)
+        else:
+            data = json.dumps(example, ensure_ascii=False, separators=(",", ":"))
+            self._parquet_rows.append({"id": record_id, "data": data})
+            payload = data.encode("utf-8")
+        self._pending_bytes += len(payload)
+
+        if self.tokenizer is not None:
+            self._tokens.extend(self.tokenizer.encode(example_to_text(example), allowed_special="all"))
+            self._token_offsets.append(len(self._tokens))
+
+        self._shard_count += 1
+        if self._shard_min_id is None:
+            self._shard_min_id = record_id
+        self._shard_max_id = record_id
+
+        if self._pending_bytes >= self.max_shard_bytes:
+            self.flush_shard()
+        return True
+
+    def flush_shard(self):
+        """封片：落盘当前分片、计算哈希并更新 manifest"""
+        if self._shard_count == 0:
+            return
+
+        file_name = self._shard_file_name()
+        final_path = os.path.join(self.output_dir, file_name)
+        tmp_path = final_path + ".tmp"
+
+        if self.shard_format == "jsonl":
+            self._gzip_file.close()
+            self._raw_file.flush()
+            os.fsync(self._raw_file.fileno())
+            self._raw_file.close()
+            self._gzip_file = None
+            self._raw_file = None
+        else:
+            self._write_parquet(tmp_path)
+            self._parquet_rows = []
+
+        shard_info = {
+            "file": file_name,
+            "count": self._shard_count,
+            "bytes": os.path.getsize(tmp_path),
+            "raw_bytes": self._pending_bytes,
+            "sha256": file_sha256(tmp_path),
+            "min_id": self._shard_min_id,
+            "max_id": self._shard_max_id
+        }
+
+        if self.tokenizer is not None:
+            shard_info.update(self._write_token_files())
+
+        os.replace(tmp_path, final_path)
+
+        self.manifest["shards"].append(shard_info)
+        self.manifest["total_count"] += self._shard_count
+        self.manifest["last_id"] = self._shard_max_id
+        self._save_manifest()
+
+        self._shard_count = 0
+        self._shard_min_id = None
+        self._shard_max_id = None
+
+    def _write_parquet(self, tmp_path: str):
+        """将缓冲的行写为 Parquet 文件"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist(self._parquet_rows, schema=pa.schema([
+            ("id", pa.int64()),
+            ("data", pa.string())
+        ]))
+        pq.write_table(table, tmp_path, compression="zstd")
+
+    def _write_token_files(self) -> Dict[str, Any]:
+        """
+        写出当前分片的 token 数组：
+        *.tokens.bin 为连续的 uint16 token id，*.offsets.bin 为每条样本的 int64 起止偏移（长度 count+1）
+        """
+        base_name = self._shard_base_name()
+        token_file = f"{base_name}.tokens.bin"
+        offset_file = f"{base_name}.offsets.bin"
+
+        for file_name, values in ((token_file, self._tokens), (offset_file, self._token_offsets)):
+            with open(os.path.join(self.output_dir, file_name), "wb") as f:
+                values.tofile(f)
+
+        token_info = {
+            "token_file": token_file,
+            "offset_file": offset_file,
+            "token_count": len(self._tokens)
+        }
+        self._tokens = array("H")
+        self._token_offsets = array("q", [0])
+        return token_info
+
+    def close(self):
+        """封存最后一个分片"""
+        self.flush_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # 出错时不封片，保留已完成的分片，重新运行时从断点继续
+        if exc_type is None:
+            self.close()
+        else:
+            self._abort_shard()
+        return False
+
+    def _abort_shard(self):
+        """丢弃未封片的数据"""
+        if self._gzip_file is not None:
+            self._gzip_file.close()
+            self._raw_file.close()
+            os.remove(os.path.join(self.output_dir, self._shard_file_name() + ".tmp"))
+            self._gzip_file = None
+            self._raw_file = None
+        self._parquet_rows = []
+        self._tokens = array("H")
+        self._token_offsets = array("q", [0])
+        self._shard_count = 0
+
+
+def iter_jsonl_dataset(output_dir: str):
+    """按 manifest 顺序读取 jsonl 数据集中的全部样本"""
+    with open(os.path.join(output_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        with gzip.open(os.path.join(output_dir, shard["file"]), "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def load_shard_tokens(output_dir: str, shard: Dict[str, Any]) -> List[List[int]]:
+    """读取分片的预分词结果，返回每条样本的 token id 列表"""
+    tokens = array("H")
+    offsets = array("q")
+    with open(os.path.join(output_dir, shard["token_file"]), "rb") as f:
+        tokens.fromfile(f, shard["token_count"])
+    with open(os.path.join(output_dir, shard["offset_file"]), "rb") as f:
+        offsets.fromfile(f, shard["count"] + 1)
+    return [tokens[offsets[i]:offsets[i + 1]].tolist() for i in range(shard["count"])]
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+HiAgent 会话复用池
+批处理脚本原先每处理一条数据都要先调用 create_conversation 再调用 chat_query，
+请求数和单条耗时都翻倍。会话池按线程（槽位）复用 AppConversationID：
+
+- 每个槽位持有一个会话，连续处理 max_turns 条后轮换，调用出错时立即轮换
+- 后台线程预先创建空闲会话，轮换时直接取用，创建会话不占用处理线程的时间
+- 空闲会话不足时才在处理线程内同步创建（计为未命中）
+
+默认 max_turns=1：每条数据仍使用独立的新会话，与原先逐条创建会话的结果一致，
+只是创建会话移到了后台。智能体会带上会话内的多轮上下文，同一会话处理多条数据时
+前面记录的内容会影响后面的抽取结果，所以 max_turns>1 需要显式开启，
+且只适用于不依赖会话上下文的智能体。
+
+HiAgent 要求 chat_query 的 UserID 与创建会话时一致，所以会话和 user_id 成对保存。
+
+使用示例：
+    pool = create_script_pool(api_key='d13tc102gkoadkll1qgg', user_prefix='Resume')
+    with pool.lease() as conversation:
+        result = api_call(row, conversation.conversation_id, lock, conversation.user_id, counter)
+    if result[1] == '无':
+        pool.report_error()
+    print(pool.stats())
+"""
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from processing_metrics import MetricsRegistry, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'http://10.163.21.201:32300/api/proxy/api/v1'
+
+# 会话创建耗时分桶（秒）
+CREATE_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class ConversationCreateError(RuntimeError):
+    """创建 HiAgent 会话失败"""
+
+
+@dataclass
+class PooledConversation:
+    """
+    池中的一个会话
+
+    Attributes:
+        conversation_id: AppConversationID
+        user_id: 创建会话时使用的 UserID，调用 chat_query 时必须一致
+        turns: 已处理的对话轮数
+        created_at: 创建时间戳
+    """
+    conversation_id: str
+    user_id: str
+    turns: int = 0
+    created_at: float = field(default_factory=time.time)
+
+
+def create_conversation(base_url: str, api_key: str, user_id: str,
+                        inputs: Optional[Dict[str, str]] = None, timeout: float = 30) -> str:
+    """
+    调用 HiAgent create_conversation 接口创建会话
+
+    Args:
+        base_url: 接口前缀，如 http://host:port/api/proxy/api/v1
+        api_key: 智能体 Apikey
+        user_id: 会话所属用户
+        inputs: 会话变量
+        timeout: 超时时间（秒）
+
+    Returns:
+        str: AppConversationID
+
+    Raises:
+        ConversationCreateError: 请求失败或响应中没有会话ID
+    """
+    payload = {
+        'Apikey': api_key,
+        'Inputs': inputs if inputs is not None else {'var': 'variable'},
+        'UserID': user_id,
+    }
+    request = urllib.request.Request(
+        base_url.rstrip('/') + '/create_conversation',
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'Apikey': api_key},
+        method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = json.loads(response.read().decode('utf-8'))
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise ConversationCreateError(f"创建会话失败: {e}") from e
+
+    conversation_id = (body.get('Conversation') or {}).get('AppConversationID')
+    if not conversation_id:
+        raise ConversationCreateError(f"创建会话响应中没有AppConversationID: {body}")
+    return conversation_id
+
+
+class HiAgentConversationPool:
+    """
+    HiAgent 会话复用池（线程安全）
+
+    Args:
+        api_key: 智能体 Apikey
+        base_url: 接口前缀
+        max_turns: 单个会话最多处理的条数，达到后轮换；默认1，每条数据都使用预创建的新会话
+        prefill: 后台保持的空闲会话数量，一般与处理线程数相同
+        user_prefix: 预创建会话的 UserID 前缀
+        name: 池名称，作为指标的 pool 标签
+        timeout: 创建会话超时时间（秒）
+        create_func: 自定义创建函数 (user_id) -> AppConversationID，默认调用 create_conversation
+        registry: 指标注册表，默认使用全局 REGISTRY
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, max_turns: int = 1,
+                 prefill: int = 4, user_prefix: str = 'pool', name: str = 'hiagent',
+                 timeout: float = 30, create_func: Optional[Callable[[str], str]] = None,
+                 registry: Optional[MetricsRegistry] = None):
+        if max_turns < 1:
+            raise ValueError("max_turns 必须大于等于1")
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_turns = max_turns
+        self.prefill = max(0, prefill)
+        self.user_prefix = user_prefix
+        self.name = name
+        self.timeout = timeout
+        self._create_func = create_func or self._default_create
+
+        self._slots: Dict[str, PooledConversation] = {}
+        self._slots_lock = threading.Lock()
+        self._idle: "queue.Queue[PooledConversation]" = queue.Queue()
+        self._refill_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._refill_thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        registry = registry or REGISTRY
+        self._acquires = registry.counter(
+            'hiagent_conversation_acquire_total',
+            '获取会话次数（reuse=复用槽位会话，prefilled=取用预创建会话，created=同步创建）',
+            ('pool', 'result'))
+        self._creations = registry.counter(
+            'hiagent_conversation_create_total', '创建会话次数', ('pool', 'status'))
+        self._create_seconds = registry.histogram(
+            'hiagent_conversation_create_seconds', '创建会话耗时（秒）', ('pool',),
+            buckets=CREATE_LATENCY_BUCKETS)
+        self._rotations = registry.counter(
+            'hiagent_conversation_rotations_total', '会话轮换次数', ('pool', 'reason'))
+        self._idle_gauge = registry.gauge(
+            'hiagent_conversation_pool_idle', '预创建的空闲会话数', ('pool',))
+
+    # ------------------------------------------------------------------
+    # 会话创建
+    # ------------------------------------------------------------------
+
+    def _default_create(self, user_id: str) -> str:
+        return create_conversation(self.base_url, self.api_key, user_id, timeout=self.timeout)
+
+    def _new_user_id(self, prefix: str) -> str:
+        return prefix + str(random.randint(1_000_000, 9_999_999))
+
+    def _create(self, prefix: str) -> PooledConversation:
+        user_id = self._new_user_id(prefix)
+        start = time.perf_counter()
+        try:
+            conversation_id = self._create_func(user_id)
+            if not conversation_id:
+                raise ConversationCreateError(f"创建会话返回空ID, user_id: {user_id}")
+        except Exception:
+            self._creations.inc(pool=self.name, status='failed')
+            raise
+        finally:
+            self._create_seconds.observe(time.perf_counter() - start, pool=self.name)
+        self._creations.inc(pool=self.name, status='success')
+        return PooledConversation(conversation_id=conversation_id, user_id=user_id)
+
+    # ------------------------------------------------------------------
+    # 后台补充
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """启动后台补充线程（首次获取会话时会自动启动）"""
+        with self._start_lock:
+            if self._refill_thread is not None or self.prefill == 0:
+                return
+            self._stop_event.clear()
+            self._refill_thread = threading.Thread(
+                target=self._refill_loop, name=f'{self.name}-conversation-refill', daemon=True)
+            self._refill_thread.start()
+            self._refill_event.set()
+
+    def close(self, timeout: float = 5):
+        """停止后台补充线程，丢弃空闲会话"""
+        with self._start_lock:
+            thread, self._refill_thread = self._refill_thread, None
+        self._stop_event.set()
+        self._refill_event.set()
+        if thread is not None:
+            thread.join(timeout)
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        self._idle_gauge.set(0, pool=self.name)
+
+    def _refill_loop(self):
+        failures = 0
+        while not self._stop_event.is_set():
+            self._refill_event.wait()
+            self._refill_event.clear()
+            while not self._stop_event.is_set() and self._idle.qsize() < self.prefill:
+                try:
+                    conversation = self._create(self.user_prefix)
+                except Exception as e:
+                    failures += 1
+                    backoff = min(30.0, 0.5 * 2 ** min(failures, 6))
+                    logger.warning(f"预创建会话失败（第{failures}次），{backoff:.1f}秒后重试: {e}")
+                    self._stop_event.wait(backoff)
+                    continue
+                failures = 0
+                self._idle.put(conversation)
+                self._idle_gauge.set(self._idle.qsize(), pool=self.name)
+
+    # ------------------------------------------------------------------
+    # 获取与轮换
+    # ------------------------------------------------------------------
+
+    def acquire(self, slot: Optional[str] = None) -> PooledConversation:
+        """
+        获取槽位当前会话并计一轮，达到 max_turns 的会话先轮换
+
+        Args:
+            slot: 槽位名称，默认使用当前线程名
+
+        Returns:
+            PooledConversation: 本次调用应使用的会话
+
+        Raises:
+            ConversationCreateError: 没有空闲会话且同步创建失败
+        """
+        slot = slot or threading.current_thread().name
+        if self._refill_thread is None:
+            self.start()
+
+        with self._slots_lock:
+            conversation = self._slots.get(slot)
+            if conversation is not None and conversation.turns >= self.max_turns:
+                del self._slots[slot]
+                self._rotations.inc(pool=self.name, reason='max_turns')
+                conversation = None
+            if conversation is not None:
+                conversation.turns += 1
+                self._acquires.inc(pool=self.name, result='reuse')
+                return conversation
+
+        try:
+            conversation = self._idle.get_nowait()
+            result = 'prefilled'
+            self._idle_gauge.set(self._idle.qsize(), pool=self.name)
+        except queue.Empty:
+            conversation = self._create(slot)
+            result = 'created'
+        self._refill_event.set()
+
+        conversation.turns = 1
+        with self._slots_lock:
+            self._slots[slot] = conversation
+        self._acquires.inc(pool=self.name, result=result)
+        return conversation
+
+    def report_error(self, slot: Optional[str] = None):
+        """调用失败时丢弃槽位当前会话，下一次获取时换新会话"""
+        slot = slot or threading.current_thread().name
+        with self._slots_lock:
+            if self._slots.pop(slot, None) is not None:
+                self._rotations.inc(pool=self.name, reason='error')
+
+    @contextmanager
+    def lease(self, slot: Optional[str] = None):
+        """获取会话的上下文管理器，块内抛出异常时自动轮换该槽位的会话"""
+        slot = slot or threading.current_thread().name
+        conversation = self.acquire(slot)
+        try:
+            yield conversation
+        except BaseException:
+            self.report_error(slot)
+            raise
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, object]:
+        """
+        汇总会话池统计信息
+
+        Returns:
+            dict: 获取次数（按结果分类）、命中率、创建次数、创建耗时分位数、轮换次数、空闲会话数
+        """
+        acquires = {result: int(self._acquires.get(pool=self.name, result=result))
+                    for result in ('reuse', 'prefilled', 'created')}
+        total = sum(acquires.values())
+        return {
+            'pool': self.name,
+            'acquires': acquires,
+            'hit_rate': round((acquires['reuse'] + acquires['prefilled']) / total, 4) if total else None,
+            'creations': {status: int(self._creations.get(pool=self.name, status=status))
+                          for status in ('success', 'failed')},
+            'create_latency': self._create_seconds.summarize(pool=self.name),
+            'rotations': {reason: int(self._rotations.get(pool=self.name, reason=reason))
+                          for reason in ('max_turns', 'error')},
+            'idle': self._idle.qsize(),
+            'slots': len(self._slots),
+        }
+
+
+def create_script_pool(api_key: str, user_prefix: str, prefill: int = 10,
+                       max_turns: int = 1) -> HiAgentConversationPool:
+    """
+    创建批处理脚本（resume_coze.py、分析脚本.py、job_sc_process.py）使用的会话池
+
+    Args:
+        api_key: 智能体 Apikey
+        user_prefix: 预创建会话的 UserID 前缀
+        prefill: 后台保持的空闲会话数量，与脚本的线程数相同
+        max_turns: 单个会话最多处理的条数，默认1（每条数据一个独立会话）
+
+    Returns:
+        HiAgentConversationPool: 会话池
+    """
+    return HiAgentConversationPool(api_key=api_key, max_turns=max_turns, prefill=prefill,
+                                   user_prefix=user_prefix)
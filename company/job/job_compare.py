@@ -1,7 +1,7 @@
-import psycopg2
 import json
 from concurrent.futures import ThreadPoolExecutor
 from db_connection import get_db_connection, close_db_connection
+from salary_normalizer import convert_salary_to_wan_format
 
 def compare_json_with_text(json_data, text_data):
     """比对JSON数据和文本内容，返回不在文本中的key-value对"""
@@ -15,45 +15,6 @@ def compare_json_with_text(json_data, text_data):
         # 将文本转换为小写并去除所有空格，用于比对
         text_normalized = text.replace(' ', '').lower()
         
-        def convert_salary_to_wan_format(salary_str):
-            """将薪资范围转换为万元格式，如240000-250000转换为24-25万，0-0转换为面议，5000-5000转换为5000"""
-            import re
-            # 匹配薪资范围格式：数字-数字
-            pattern = r'(\d+)-(\d+)'
-            match = re.match(pattern, salary_str.strip())
-            
-            if match:
-                min_salary = int(match.group(1))
-                max_salary = int(match.group(2))
-                
-                # 特殊处理：0-0 转换为面议
-                if min_salary == 0 and max_salary == 0:
-                    return "面议"
-                
-                # 特殊处理：相同数值的范围，如5000-5000转换为5000，17600-17600转换为17600
-                if min_salary == max_salary:
-                    return str(min_salary)
-                
-                # 如果薪资大于等于10000，转换为万元格式
-                if min_salary >= 10000 and max_salary >= 10000:
-                    min_wan = min_salary / 10000
-                    max_wan = max_salary / 10000
-                    
-                    # 格式化为合适的显示格式
-                    if min_wan == int(min_wan):
-                        min_str = str(int(min_wan))
-                    else:
-                        min_str = f"{min_wan:.1f}"
-                    
-                    if max_wan == int(max_wan):
-                        max_str = str(int(max_wan))
-                    else:
-                        max_str = f"{max_wan:.1f}"
-                    
-                    return f"{min_str}-{max_str}万"
-            
-            return None
-        
         if isinstance(value, str) and value.strip():
             # 特殊处理：学历不限不做匹配，直接返回True
             if value.strip() == "学历不限":
@@ -1,22 +1,19 @@
 import re
-import psycopg2
 from datetime import datetime
 from db_connection import get_db_connection, close_db_connection
+from salary_normalizer import normalize_salary_range
+from lazy_import import lazy_module
 
-import pandas as pd
-from openpyxl import Workbook
 import os
-from openpyxl.styles import Font
-import requests
 import json
 import threading
 import logging
 import time
 import random
 
-import logging
-
-logging.basicConfig(level=logging.INFO)
+# pandas、requests 只在Excel处理和智能体调用中使用，按需导入
+pd = lazy_module('pandas')
+requests = lazy_module('requests')
 
 retain_fields = {
     "companyName": "",
@@ -156,25 +153,7 @@ def process_jobs():
 
 def process_salary_range(salary_range):
     """处理薪资范围格式，将类似5001-10000转换为5000-10000"""
-    if not salary_range or not isinstance(salary_range, str):
-        return salary_range
-    
-    # 匹配薪资范围格式，如：5001-10000, 10001-25000
-    pattern = r'(\d+)-(\d+)'
-    match = re.match(pattern, salary_range.strip())
-    
-    if match:
-        min_salary = int(match.group(1))
-        max_salary = int(match.group(2))
-        
-        # 将最小薪资调整为千位整数
-        # 如果是x001格式，改为x000
-        if min_salary % 1000 == 1:
-            min_salary = min_salary - 1
-        
-        return f"{min_salary}-{max_salary}"
-    
-    return salary_range
+    return normalize_salary_range(salary_range)
 
 def process_job_batch(cursor, connection, batch_size=20000):
     """处理一批岗位数据"""
@@ -651,6 +630,7 @@ def process_excel_file(file_path):
         close_db_connection(cursor, connection)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     # clean_job_data()
     process_jobs()
     # process_sc_jobs()
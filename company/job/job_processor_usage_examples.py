@@ -6,6 +6,7 @@
 本脚本展示了如何使用多线程岗位处理器的各种功能和配置选项。
 """
 
+import json
 import time
 import logging
 from multithread_job_processor import JobProcessor, JobProcessorConfig
@@ -67,19 +68,25 @@ def example_custom_config():
 
 
 def example_bot_id_rotation():
-    """示例3: Bot ID轮询演示"""
+    """示例3: Bot ID选择演示"""
     print("\n" + "=" * 50)
-    print("示例3: Bot ID轮询演示")
+    print("示例3: Bot ID选择演示")
     print("=" * 50)
     
-    processor = JobProcessor()
+    config = JobProcessorConfig()
+    config.bot_stats_file = None
+    config.journal_file = None
+    processor = JobProcessor(config)
     
-    print("演示Bot ID轮询机制:")
+    print("演示Bot ID选择机制（模拟第一个Bot响应较慢）:")
+    slow_bot_id = config.bot_ids[0]
     for i in range(10):
         bot_id = processor.get_next_bot_id()
+        processor.release_bot_id(bot_id, 8.0 if bot_id == slow_bot_id else 1.0, True)
         print(f"  第{i+1}次调用: {bot_id}")
     
-    print("\n可以看到Bot ID按顺序轮询使用")
+    print("\n可以看到试用过一次后，慢Bot很少再被选中")
+    print(json.dumps(processor.bot_balancer.snapshot(), ensure_ascii=False, indent=2))
 
 
 def example_random_id_generation():
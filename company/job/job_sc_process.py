@@ -4,6 +4,8 @@ import re
 import psycopg2
 from datetime import datetime
 from db_connection import get_db_connection, close_db_connection
+from hiagent_conversation_pool import create_script_pool
+from salary_normalizer import normalize_salary_range, normalize_salary_column
 
 import pandas as pd
 import os
@@ -16,6 +18,8 @@ import random
 import logging
 logging.basicConfig(level=logging.INFO)
 
+conversation_pool = create_script_pool(api_key='d14l347sbfv9olu4aerg', user_prefix='Job')
+
 
 retain_fields = {
     "companyName": "",
@@ -175,25 +179,7 @@ def deep_clean(data):
 
 def process_salary_range(salary_range):
     """处理薪资范围格式，将类似5001-10000转换为5000-10000"""
-    if not salary_range or not isinstance(salary_range, str):
-        return salary_range
-    
-    # 匹配薪资范围格式，如：5001-10000, 10001-25000
-    pattern = r'(\d+)-(\d+)'
-    match = re.match(pattern, salary_range.strip())
-    
-    if match:
-        min_salary = int(match.group(1))
-        max_salary = int(match.group(2))
-        
-        # 将最小薪资调整为千位整数
-        # 如果是x001格式，改为x000
-        if min_salary % 1000 == 1:
-            min_salary = min_salary - 1
-        
-        return f"{min_salary}-{max_salary}"
-    
-    return salary_range
+    return normalize_salary_range(salary_range)
 
 def process_sc_jobs():
     """处理岗位主函数"""
@@ -214,14 +200,15 @@ def process_sc_jobs():
 
         columns = [desc[0] for desc in cursor.description]
 
+        # 整列处理salaryReal字段格式，避免逐行解析
+        salary_index = columns.index('salaryReal')
+        salary_real = normalize_salary_column([job_info[salary_index] for job_info in zhilian_job]).tolist()
+
         i = 0
-        for job_info in zhilian_job:
+        for job_info, salary in zip(zhilian_job, salary_real):
             try:
                 row_dict = dict(zip(columns, job_info))
-                
-                # 处理salaryReal字段格式
-                if 'salaryReal' in row_dict:
-                    row_dict['salaryReal'] = process_salary_range(row_dict['salaryReal'])
+                row_dict['salaryReal'] = salary
                 
                 processed_info = json.dumps(row_dict, ensure_ascii=False)
 
@@ -296,10 +283,10 @@ def process_chunk(chunk, threadName, lock, output_dir):
                 logging.info(f"ID {row['id']} 已存在，跳过处理")
                 continue
 
-            user_id = threadName + str(random.randint(1_000_000, 9_999_999))
-            AppConversationID = getApplicationId(user_id)
-            # AppConversationID = getApplicationId(threadName)
-            result = api_call(row, AppConversationID, lock, user_id, counter)
+            with conversation_pool.lease(threadName) as conversation:
+                result = api_call(row, conversation.conversation_id, lock, conversation.user_id, counter)
+            if result[1] == '无':
+                conversation_pool.report_error(threadName)
 
 
             current_row = row.to_list()
@@ -416,30 +403,6 @@ def api_call(row, AppConversationID, lock, user_id, counter):
     return [counter,introduce, threading.current_thread().name,start_time, end_time, format_time(start_time), format_time(end_time), elapsed_time]
 
 
-def getApplicationId(user_id):
-    url = 'http://10.163.21.201:32300/api/proxy/api/v1/create_conversation'
-    data1 = {
-        'Apikey': 'd14l347sbfv9olu4aerg',
-        "Inputs": {
-            "var": "variable"
-        },
-        "UserID": user_id
-    }
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Apikey': 'd14l347sbfv9olu4aerg'
-    }
-
-    response1 = requests.post(url, json=data1, headers=headers)
-
-    if response1.status_code == 200:
-        AppConversationID = response1.json().get("Conversation").get('AppConversationID')
-    else:
-        AppConversationID = ''
-        print('Failed to post data:', response1.status_code)
-    return AppConversationID
-
 def job_main(output_dir):
     # 确保输出目录存在
     if not os.path.exists(output_dir):
@@ -576,10 +539,10 @@ def worker_thread(lock, batch_size=100):
             info = row[1]  # 第二个字段是 processed_info
             call_data = {'id': id, 'info': info}
             try:
-                user_id = threading.current_thread().name + str(random.randint(1_000_000, 9_999_999))
-                AppConversationID = getApplicationId(user_id)
-                # AppConversationID = getApplicationId(threadName)
-                result = api_call(call_data, AppConversationID, lock, user_id, 0)
+                with conversation_pool.lease() as conversation:
+                    result = api_call(call_data, conversation.conversation_id, lock, conversation.user_id, 0)
+                if result[1] == '无':
+                    conversation_pool.report_error()
                 update_result_in_db(id, result)  # 将结果写回数据库
             except Exception as e:
                 logging.error(f"Error processing ID {id}: {e}")
@@ -8,14 +8,16 @@
 
 功能特性:
 - 多线程并发处理
-- Bot ID轮询调用
+- 按延迟/在途请求数选择Bot ID，连续失败的Bot自动熔断
+- 可选请求对冲，降低慢请求造成的长尾耗时
+- 可选多记录打包，短记录合并为一次调用
 - 自动重试机制
 - 详细日志记录
 - 数据库事务管理
 """
 
 import json
-import logging
+import os
 import random
 import threading
 import time
@@ -25,13 +27,21 @@ from typing import List, Tuple, Optional, Dict, Any
 
 import requests
 from db_connection import get_db_connection, close_db_connection
+from structured_logging import SamplingRule, StageTimer, log_extra, setup_queue_logging
+from processing_metrics import ProcessorMetrics, start_metrics_server, stop_metrics_server
+from bot_balancer import BotBalancer
+from request_hedging import HedgePolicy, RequestHedger
+from prompt_packing import build_packed_prompt, pack_records, split_packed_answer
+from result_journal import JournalEntry, JournalReplayer, ResultJournal
+from json_codec import JsonCodec
+from record_types import JobRecord, JobResult
 
 
 class JobProcessorConfig:
     """处理器配置类"""
     
     def __init__(self):
-        # Bot IDs 轮询列表
+        # Bot IDs 列表
         self.bot_ids = [
             '7522851405448265762',
             '7522871546680000552', 
@@ -41,6 +51,35 @@ class JobProcessorConfig:
             '7522873474025947179'
         ]
         
+        # Bot选择配置
+        self.bot_selection_policy = 'ewma'  # ewma / least_outstanding / round_robin
+        self.bot_failure_threshold = 5  # 连续失败多少次后熔断
+        self.bot_open_seconds = 30  # 首次熔断时长（秒），半开探测失败时加倍
+        self.bot_stats_file = 'job_processor_bot_stats.json'  # 各Bot统计，跨次运行保留，None表示不保存
+        
+        # 请求对冲配置：主请求超过近期耗时的分位数仍未返回时，向另一个Bot发送相同请求
+        self.hedge_enabled = False
+        self.hedge_percentile = 0.95  # 对冲延迟取最近有效响应耗时的该分位数
+        self.hedge_min_delay = 2.0  # 对冲延迟下限（秒）
+        self.hedge_budget_ratio = 0.1  # 对冲请求最多占主请求的比例
+        self.hedge_max_losers = 5  # 已发出、仍在执行的落选请求达到该数量时暂停对冲
+        
+        # 多记录打包配置：多条短记录拼成一个提示词调用一次，需要Bot能按分隔符逐条输出结果
+        self.packing_enabled = False
+        self.packing_max_tokens = 3000  # 每个打包提示词的估算token上限
+        self.packing_max_records = 5  # 每个打包提示词最多包含的记录数
+        
+        # 结果日志配置：智能体结果先写入本地日志再由后台线程批量写回数据库，None表示直接写库。
+        # 默认放在本模块目录下，不随运行时的工作目录变化，重启后能找到上次遗留的结果。
+        # 回放线程在第一次保存结果时启动，不经过 start_processing 使用时需调用 close()（或用 with）写回剩余结果
+        self.journal_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'job_processor_journal.db')
+        self.journal_flush_batch = 200  # 每批写回的结果数
+        self.journal_flush_interval = 1.0  # 后台写回间隔（秒）
+        
+        # 字典压缩存储（见 json_codec.py）：读取 processed_info 时自动解压，job_description_detail 压缩后写入。
+        # 只有所有读取方都支持解压时才能开启，None表示按普通文本读写
+        self.json_codec_dir = None
+        
         # Coze API配置
         self.coze_api_url = 'https://api.coze.cn/open_api/v2/chat'
         self.coze_token = 'Bearer pat_Gg8YY6O4kYqiZiFOU20ZwvTLlIh8c6IdtDW2F2n20rfPexIXdgcBVnVTk4hOQCP0'
@@ -54,6 +93,18 @@ class JobProcessorConfig:
         # 数据库配置
         self.table_name = 'zhilian_job'
         self.train_type = '3'
+        
+        # 日志配置
+        self.log_file = 'job_processor.log'
+        self.structured_log_file = 'job_processor.jsonl'  # JSON Lines，包含各阶段耗时，None表示不输出
+        self.log_sampling_rules = {
+            'record_start': SamplingRule(sample_every=10),
+            'record_done': SamplingRule(max_per_second=20),
+        }
+        
+        # 指标配置
+        self.metrics_port = None  # 指标HTTP端口（如9108），None表示不启动
+        self.metrics_summary_file = 'job_processor_metrics.json'  # 处理结束后写出的指标汇总，None表示不写
 
 
 class JobProcessor:
@@ -61,42 +112,61 @@ class JobProcessor:
     
     def __init__(self, config: Optional[JobProcessorConfig] = None):
         self.config = config or JobProcessorConfig()
-        self.bot_id_index = 0
-        self.bot_id_lock = threading.Lock()
+        self.metrics = ProcessorMetrics('job_processor')
         self.setup_logging()
-    
-    def setup_logging(self):
-        """设置日志配置"""
-        self.logger = logging.getLogger('JobProcessor')
-        self.logger.setLevel(logging.INFO)
-        
-        # 避免重复添加handler
-        if not self.logger.handlers:
-            # 文件handler
-            file_handler = logging.FileHandler('job_processor.log', encoding='utf-8')
-            file_handler.setLevel(logging.INFO)
-            file_formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        self.bot_balancer = BotBalancer(
+            self.config.bot_ids,
+            policy=self.config.bot_selection_policy,
+            failure_threshold=self.config.bot_failure_threshold,
+            open_seconds=self.config.bot_open_seconds,
+            state_file=self.config.bot_stats_file,
+            name='job_processor'
+        )
+        self.hedger = None
+        if self.config.hedge_enabled:
+            self.hedger = RequestHedger(
+                HedgePolicy(
+                    delay_percentile=self.config.hedge_percentile,
+                    min_delay=self.config.hedge_min_delay,
+                    max_delay=self.config.request_timeout,
+                    budget_ratio=self.config.hedge_budget_ratio,
+                    max_losers=self.config.hedge_max_losers
+                ),
+                # 每个处理线程最多同时占用主请求、对冲请求两个线程，另留出落选请求占用的线程
+                max_workers=self.config.max_workers * 2 + self.config.hedge_max_losers,
+                name='job_processor'
             )
-            file_handler.setFormatter(file_formatter)
-            
-            # 控制台handler
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(logging.INFO)
-            console_formatter = logging.Formatter(
-                '%(levelname)s - %(message)s'
+        self.codec = JsonCodec.from_directory(self.config.json_codec_dir) if self.config.json_codec_dir else None
+        self.journal = None
+        self.journal_replayer = None
+        if self.config.journal_file:
+            self.journal = ResultJournal(self.config.journal_file)
+            self.journal_replayer = JournalReplayer(
+                self.journal,
+                flush_batch=self.bulk_update_results,
+                flush_one=lambda entry: self.update_result_to_db(**entry.payload),
+                batch_size=self.config.journal_flush_batch,
+                interval=self.config.journal_flush_interval,
+                name='job_processor',
+                is_available=self._db_available
             )
-            console_handler.setFormatter(console_formatter)
-            
-            self.logger.addHandler(file_handler)
-            self.logger.addHandler(console_handler)
+    
+    def setup_logging(self):
+        """设置日志配置：后台线程写日志，逐条记录的高频日志按类别采样/限速"""
+        self.logger = setup_queue_logging(
+            'JobProcessor',
+            log_file=self.config.log_file,
+            json_log_file=self.config.structured_log_file,
+            sampling_rules=self.config.log_sampling_rules
+        )
     
     def get_next_bot_id(self) -> str:
-        """轮询获取下一个bot_id"""
-        with self.bot_id_lock:
-            current_bot_id = self.config.bot_ids[self.bot_id_index]
-            self.bot_id_index = (self.bot_id_index + 1) % len(self.config.bot_ids)
-            return current_bot_id
+        """按选择策略获取下一个bot_id，调用结束后需调用 release_bot_id"""
+        return self.bot_balancer.acquire()
+    
+    def release_bot_id(self, bot_id: str, elapsed: float, success: bool) -> None:
+        """记录bot_id的调用耗时和结果，用于后续选择和熔断"""
+        self.bot_balancer.release(bot_id, elapsed, success)
     
     def generate_random_ids(self, thread_name: str) -> Tuple[str, str]:
         """生成随机的用户ID和对话ID"""
@@ -179,15 +249,53 @@ class JobProcessor:
             self.logger.error(f"处理响应时出错: {str(e)}")
             return f"处理响应时出错: {str(e)}", False
     
-    def fetch_unprocessed_data(self, batch_size: int) -> List[Tuple[int, str]]:
+    def _call_with_bot(self, processed_info: str, bot_id: str, thread_name: str) -> Tuple[str, bool, str]:
+        """使用指定Bot调用一次Coze API，并记录该Bot的耗时和结果"""
+        user_id, conversation_id = self.generate_random_ids(thread_name)
+        api_start = time.perf_counter()
+        success = False
+        try:
+            content, success = self.call_coze_api(processed_info, bot_id, user_id, conversation_id)
+        finally:
+            self.release_bot_id(bot_id, time.perf_counter() - api_start, success)
+        return content, success, bot_id
+    
+    def call_agent(self, processed_info: str, bot_id: str, thread_name: str) -> Tuple[str, bool, str]:
+        """调用智能体，开启对冲时主请求超过对冲延迟仍未返回，则向另一个Bot发送相同请求并取先返回的有效结果
+        
+        Args:
+            processed_info: 处理的信息内容
+            bot_id: 主请求使用的Bot ID
+            thread_name: 工作线程名称，用于生成用户ID
+            
+        Returns:
+            Tuple[str, bool, str]: (响应内容, 是否成功, 实际采用结果的Bot ID)
+        """
+        if self.hedger is None or len(self.config.bot_ids) < 2:
+            return self._call_with_bot(processed_info, bot_id, thread_name)
+        
+        result = self.hedger.call(
+            lambda cancel: self._call_with_bot(processed_info, bot_id, thread_name),
+            lambda cancel: self._call_with_bot(
+                processed_info, self.bot_balancer.acquire(exclude=[bot_id]), thread_name),
+            is_good=lambda value: value[1]
+        )
+        return result.value
+    
+    def fetch_unprocessed_data(self, batch_size: int) -> List[JobRecord]:
         """从数据库获取未处理的数据
         
         Args:
             batch_size: 批次大小
             
         Returns:
-            List[Tuple[int, str]]: [(id, processed_info), ...]
+            List[JobRecord]: [JobRecord(id, processed_info), ...]，可按 (id, processed_info) 解包
         """
+        with self.metrics.stage('fetch'):
+            return self._claim_unprocessed_data(batch_size)
+    
+    def _claim_unprocessed_data(self, batch_size: int) -> List[JobRecord]:
+        """查询未处理的数据并标记为正在处理"""
         connection = get_db_connection()
         cursor = connection.cursor()
         
@@ -206,9 +314,13 @@ class JobProcessor:
             
             cursor.execute(query, (self.config.train_type, batch_size))
             rows = cursor.fetchall()
+            if self.codec:
+                rows = [JobRecord(record_id, self.codec.decode(processed_info)) for record_id, processed_info in rows]
+            else:
+                rows = JobRecord.from_rows(rows)
             
             if rows:
-                ids = [row[0] for row in rows]
+                ids = [row.id for row in rows]
                 # 标记这些数据为正在处理
                 update_query = f"""
                     UPDATE {self.config.table_name} 
@@ -250,9 +362,42 @@ class JobProcessor:
         cursor = connection.cursor()
         
         try:
-            process_type = '2' if success else '3'  # 2=成功, 3=失败
+            cursor.execute(self._result_update_query(), self._result_update_params(JobResult(
+                record_id, job_description_detail, bot_id, start_time, end_time, elapsed_time, success
+            )))
             
-            update_query = f"""
+            connection.commit()
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"更新数据库失败 (ID: {record_id}): {str(e)}")
+            connection.rollback()
+            return False
+        finally:
+            close_db_connection(cursor, connection)
+    
+    def bulk_update_results(self, entries: List[JournalEntry]) -> None:
+        """在一个事务中批量写回结果日志条目，失败时回滚并抛出异常（由回放线程重试）
+        
+        Args:
+            entries: 结果日志条目，payload 为 update_result_to_db 的参数
+        """
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        
+        try:
+            update_query = self._result_update_query()
+            for entry in entries:
+                cursor.execute(update_query, self._result_update_params(JobResult.from_payload(entry.payload)))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            close_db_connection(cursor, connection)
+    
+    def _result_update_query(self) -> str:
+        return f"""
                 UPDATE {self.config.table_name} 
                 SET job_description_detail = %s,
                     process_type = %s,
@@ -262,34 +407,75 @@ class JobProcessor:
                     time_consume = %s
                 WHERE id = %s
             """
-            
-            cursor.execute(update_query, (
-                job_description_detail,
-                process_type,
-                bot_id,
-                start_time,
-                end_time,
-                elapsed_time,
-                record_id
-            ))
-            
-            connection.commit()
-            
-            status = "成功" if success else "失败"
-            self.logger.info(
-                f"线程 {threading.current_thread().name} 更新记录 {record_id} {status}, "
-                f"耗时: {elapsed_time:.2f}s, Bot ID: {bot_id}"
-            )
-            
+    
+    def _result_update_params(self, result: JobResult) -> tuple:
+        process_type = '2' if result.success else '3'  # 2=成功, 3=失败
+        job_description_detail = result.job_description_detail
+        if self.codec:
+            job_description_detail = self.codec.encode(job_description_detail)
+        return (job_description_detail, process_type, result.bot_id, result.start_time, result.end_time,
+                result.elapsed_time, result.record_id)
+    
+    def _db_available(self) -> bool:
+        """检查数据库是否可用，结果日志逐条回放全部失败时用于区分数据库不可用和问题条目"""
+        try:
+            connection = get_db_connection()
+        except Exception:
+            return False
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
             return True
-            
-        except Exception as e:
-            self.logger.error(f"更新数据库失败 (ID: {record_id}): {str(e)}")
-            connection.rollback()
+        except Exception:
             return False
         finally:
             close_db_connection(cursor, connection)
     
+    def save_result(self, record_id: int, job_description_detail: str,
+                    bot_id: str, start_time: str, end_time: str,
+                    elapsed_time: float, success: bool) -> bool:
+        """保存处理结果：启用结果日志时先落盘到本地日志，由后台线程批量写回数据库（回放线程未启动时在此启动）；否则直接写库
+        
+        参数同 update_result_to_db。
+        
+        Returns:
+            bool: 结果是否已保存（写入日志或数据库）
+        """
+        if self.journal is None:
+            return self.update_result_to_db(record_id, job_description_detail, bot_id,
+                                            start_time, end_time, elapsed_time, success)
+        try:
+            self.journal.append(str(record_id), JobResult(
+                record_id, job_description_detail, bot_id, start_time, end_time, elapsed_time, success
+            ).to_payload())
+        except Exception as e:
+            self.logger.error(f"写入结果日志失败 (ID: {record_id})，改为直接写库: {str(e)}")
+            return self.update_result_to_db(record_id, job_description_detail, bot_id,
+                                            start_time, end_time, elapsed_time, success)
+        self.journal_replayer.start()
+        self.journal_replayer.notify()
+        return True
+    
+    def close(self) -> None:
+        """停止结果日志回放线程并写回剩余结果，关闭本地日志；之后的结果直接写库
+        
+        写回失败的结果保留在本地日志中，下次启动时回放。
+        """
+        if self.journal_replayer is None:
+            return
+        self.journal_replayer.stop(flush=True)
+        self.logger.info(f"结果日志统计: {self.journal.counts()}")
+        self.journal.close()
+        self.journal = None
+        self.journal_replayer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+    
     def format_timestamp(self, timestamp: float) -> str:
         """格式化时间戳"""
         dt = datetime.fromtimestamp(timestamp)
@@ -308,17 +494,19 @@ class JobProcessor:
         """
         start_time = time.time()
         thread_name = threading.current_thread().name
+        timer = StageTimer()
         
-        # 获取Bot ID和生成随机ID
+        # 获取Bot ID
         bot_id = self.get_next_bot_id()
-        user_id, conversation_id = self.generate_random_ids(thread_name)
         
-        self.logger.info(f"线程 {thread_name} 开始处理记录 {record_id}, Bot ID: {bot_id}")
+        self.logger.info(f"线程 {thread_name} 开始处理记录 {record_id}, Bot ID: {bot_id}",
+                         extra=log_extra('record_start', record_id=record_id, bot_id=bot_id))
         
-        # 调用API
-        job_description_detail, success = self.call_coze_api(
-            processed_info, bot_id, user_id, conversation_id
-        )
+        # 调用API（对冲胜出时bot_id为对冲请求使用的Bot）
+        with timer.stage('api'), self.metrics.track_record():
+            job_description_detail, success, bot_id = self.call_agent(
+                processed_info, bot_id, thread_name
+            )
         
         end_time = time.time()
         elapsed_time = end_time - start_time
@@ -328,13 +516,95 @@ class JobProcessor:
         end_time_str = self.format_timestamp(end_time)
         
         # 更新数据库
-        update_success = self.update_result_to_db(
-            record_id, job_description_detail, bot_id,
-            start_time_str, end_time_str, elapsed_time, success
-        )
+        with timer.stage('db_write'):
+            update_success = self.save_result(
+                record_id, job_description_detail, bot_id,
+                start_time_str, end_time_str, elapsed_time, success
+            )
+        
+        self.metrics.observe_timer(timer)
+        self.metrics.record_result('success' if success and update_success else 'failed')
+        
+        if update_success:
+            status = "成功" if success else "失败"
+            self.logger.info(
+                f"线程 {thread_name} 更新记录 {record_id} {status}, "
+                f"耗时: {elapsed_time:.2f}s, Bot ID: {bot_id}",
+                extra=log_extra('record_done', timer, record_id=record_id, bot_id=bot_id, success=success)
+            )
         
         return success and update_success
     
+    def process_packed_records(self, rows: List[Tuple[int, str]]) -> int:
+        """按token预算打包处理一批记录，拆分校验失败的记录回退为单条调用
+        
+        Args:
+            rows: (记录ID, 处理信息) 列表
+            
+        Returns:
+            int: 处理成功的记录数
+        """
+        thread_name = threading.current_thread().name
+        success_count = 0
+        batches = pack_records(rows, self.config.packing_max_tokens, self.config.packing_max_records)
+        for batch in batches:
+            try:
+                if len(batch) == 1:
+                    success_count += self.process_single_record(*batch[0])
+                    continue
+                
+                succeeded, failed_ids = self._process_packed_batch(batch)
+                success_count += succeeded
+                
+                processed_infos = dict(batch)
+                for record_id in failed_ids:
+                    success_count += self.process_single_record(record_id, processed_infos[record_id])
+            except Exception as e:
+                self.metrics.record_result('error')
+                self.logger.error(f"线程 {thread_name} 打包处理记录 {[record_id for record_id, _ in batch]} 时出错: {str(e)}")
+        return success_count
+    
+    def _process_packed_batch(self, batch: List[Tuple[int, str]]) -> Tuple[int, List[int]]:
+        """一次调用处理一组记录，返回 (写库成功条数, 需要回退单条处理的记录ID)"""
+        start_time = time.time()
+        thread_name = threading.current_thread().name
+        timer = StageTimer()
+        record_ids = [record_id for record_id, _ in batch]
+        
+        with timer.stage('transform'):
+            prompt = build_packed_prompt(batch)
+        
+        bot_id = self.get_next_bot_id()
+        with timer.stage('api'), self.metrics.track_record():
+            answer, success, bot_id = self.call_agent(prompt, bot_id, thread_name)
+        
+        with timer.stage('parse'):
+            results, failed_ids = split_packed_answer(answer, record_ids) if success else ({}, record_ids)
+        
+        end_time = time.time()
+        elapsed_time = end_time - start_time
+        start_time_str = self.format_timestamp(start_time)
+        end_time_str = self.format_timestamp(end_time)
+        
+        succeeded = 0
+        with timer.stage('db_write'):
+            for record_id, job_description_detail in results.items():
+                if self.save_result(record_id, job_description_detail, bot_id,
+                                    start_time_str, end_time_str, elapsed_time, True):
+                    succeeded += 1
+        
+        self.metrics.observe_timer(timer)
+        self.metrics.record_result('success', succeeded)
+        self.metrics.record_result('failed', len(results) - succeeded)
+        self.metrics.record_result('packed_fallback', len(failed_ids))
+        self.logger.info(
+            f"线程 {thread_name} 打包处理 {len(batch)} 条记录, 成功 {succeeded} 条, "
+            f"回退单条 {len(failed_ids)} 条, 耗时: {elapsed_time:.2f}s, Bot ID: {bot_id}",
+            extra=log_extra('packed_done', timer, record_ids=record_ids, bot_id=bot_id,
+                            fallback_ids=failed_ids)
+        )
+        return succeeded, failed_ids
+    
     def worker_thread(self, lock: threading.Lock) -> None:
         """工作线程函数
         
@@ -346,17 +616,25 @@ class JobProcessor:
         
         while True:
             # 获取数据需要加锁
+            wait_start = time.perf_counter()
             with lock:
+                self.metrics.observe_stage('claim_wait', time.perf_counter() - wait_start)
                 rows = self.fetch_unprocessed_data(self.config.batch_size)
             
             if not rows:
                 self.logger.info(f"线程 {thread_name} 没有更多数据，退出")
                 break
             
+            if self.config.packing_enabled:
+                processed_count += self.process_packed_records(rows)
+                self.logger.info(f"线程 {thread_name} 已成功处理 {processed_count} 条记录")
+                continue
+            
             # 处理每条记录
-            for record_id, processed_info in rows:
+            for row in rows:
+                record_id = row.id
                 try:
-                    success = self.process_single_record(record_id, processed_info)
+                    success = self.process_single_record(record_id, row.processed_info)
                     if success:
                         processed_count += 1
                     
@@ -365,6 +643,7 @@ class JobProcessor:
                         self.logger.info(f"线程 {thread_name} 已成功处理 {processed_count} 条记录")
                         
                 except Exception as e:
+                    self.metrics.record_result('error')
                     self.logger.error(f"线程 {thread_name} 处理记录 {record_id} 时出错: {str(e)}")
         
         self.logger.info(f"线程 {thread_name} 完成，共处理 {processed_count} 条记录")
@@ -374,6 +653,10 @@ class JobProcessor:
         self.logger.info(f"开始多线程处理，线程数: {self.config.max_workers}, 批次大小: {self.config.batch_size}")
         
         lock = threading.Lock()
+        metrics_server = None
+        if self.config.metrics_port:
+            metrics_server = start_metrics_server(self.config.metrics_port)
+            self.logger.info(f"指标接口: http://127.0.0.1:{self.config.metrics_port}/metrics")
         
         def run_task_with_retry(retry_count: int = 0) -> None:
             """带重试的任务执行"""
@@ -382,20 +665,37 @@ class JobProcessor:
                 return
             
             try:
-                self.worker_thread(lock)
+                with self.metrics.track_worker():
+                    self.worker_thread(lock)
             except Exception as e:
                 self.logger.error(f"任务失败，第 {retry_count} 次重试: {str(e)}")
                 run_task_with_retry(retry_count + 1)
         
-        # 使用线程池执行任务
-        with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-            futures = [executor.submit(run_task_with_retry, 0) for _ in range(self.config.max_workers)]
-            
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    self.logger.error(f"任务执行失败: {str(e)}")
+        if self.journal_replayer:
+            # 先回放上次运行遗留在本地日志中的结果
+            self.journal_replayer.start()
+        
+        try:
+            # 使用线程池执行任务
+            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+                futures = [executor.submit(run_task_with_retry, 0) for _ in range(self.config.max_workers)]
+                
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.logger.error(f"任务执行失败: {str(e)}")
+        finally:
+            self.close()
+            self.bot_balancer.save_state()
+            if self.hedger:
+                self.logger.info(f"请求对冲统计: {self.hedger.stats()}")
+                self.hedger.close()
+            stop_metrics_server(metrics_server)
+            if self.config.metrics_summary_file:
+                summary = self.metrics.write_summary(self.config.metrics_summary_file)
+                self.logger.info(f"指标汇总已写入 {self.config.metrics_summary_file}，"
+                                 f"耗时最多的阶段: {summary['bottleneck_stage']}")
         
         self.logger.info("所有数据处理完成")
     
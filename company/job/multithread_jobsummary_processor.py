@@ -19,6 +19,8 @@ from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 from db_connection import DatabaseConnection
+from processing_metrics import ProcessorMetrics, start_metrics_server, stop_metrics_server
+from record_types import JobSummaryRecord, ThreadLocalStats, UpdateResult
 
 # 配置日志
 logging.basicConfig(
@@ -39,6 +41,8 @@ class ProcessConfig:
     max_workers: int = 8   # 最大线程数
     train_type: str = '3'  # 训练类型
     table_name: str = 'zhilian_job'  # 表名
+    metrics_port: Optional[int] = None  # 指标HTTP端口，None表示不启动
+    metrics_summary_file: Optional[str] = None  # 处理结束后写出的指标汇总文件
     
 
 class JobSummaryProcessor:
@@ -56,15 +60,24 @@ class JobSummaryProcessor:
         else:
             self.db_connection = DatabaseConnection()
         
-        self._lock = threading.Lock()
-        self.processed_count = 0
-        self.error_count = 0
+        self.stats = ThreadLocalStats(('processed', 'errors'))
+        self.metrics = ProcessorMetrics('jobsummary_processor')
         
+    @property
+    def processed_count(self) -> int:
+        """成功处理的记录数（合并各线程计数）"""
+        return self.stats['processed']
+    
+    @property
+    def error_count(self) -> int:
+        """处理失败的记录数（合并各线程计数）"""
+        return self.stats['errors']
+    
     def get_connection(self):
         """获取数据库连接"""
         return self.db_connection.get_connection()
     
-    def fetch_data_to_process(self, config: ProcessConfig) -> List[Tuple[int, str, str]]:
+    def fetch_data_to_process(self, config: ProcessConfig) -> List[JobSummaryRecord]:
         """
         获取需要处理的数据
         
@@ -72,7 +85,7 @@ class JobSummaryProcessor:
             config: 处理配置
             
         Returns:
-            List[Tuple[int, str, str]]: (id, processed_info, processed_jobsummary)的列表
+            List[JobSummaryRecord]: (id, processed_info, processed_jobsummary)记录的列表
         """
         connection = None
         cursor = None
@@ -93,8 +106,9 @@ class JobSummaryProcessor:
                 ORDER BY id
             """
             
-            cursor.execute(sql, (config.train_type,))
-            data = cursor.fetchall()
+            with self.metrics.stage('fetch'):
+                cursor.execute(sql, (config.train_type,))
+                data = JobSummaryRecord.from_rows(cursor.fetchall())
             
             logger.info(f"查询到 {len(data)} 条需要处理的记录")
             
@@ -109,45 +123,47 @@ class JobSummaryProcessor:
                 
         return data
     
-    def process_single_record(self, record_data: Tuple[int, str, str]) -> Optional[Tuple[int, str]]:
+    def process_single_record(self, record_data: JobSummaryRecord) -> Optional[UpdateResult]:
         """
         处理单条记录
         
         Args:
-            record_data: (id, processed_info, processed_jobsummary)
+            record_data: (id, processed_info, processed_jobsummary)，记录或元组均可
             
         Returns:
-            Optional[Tuple[int, str]]: (id, updated_processed_info) 或 None（如果处理失败）
+            Optional[UpdateResult]: (id, updated_processed_info) 或 None（如果处理失败）
         """
         try:
             record_id, processed_info, processed_jobsummary = record_data
             
             # 解析processed_info JSON
-            if isinstance(processed_info, str):
-                info_data = json.loads(processed_info)
-            else:
-                info_data = processed_info
-            
-            # 将processed_jobsummary替换到jobSummary字段
-            info_data['jobSummary'] = processed_jobsummary
+            with self.metrics.stage('parse'):
+                if isinstance(processed_info, str):
+                    info_data = json.loads(processed_info)
+                else:
+                    info_data = processed_info
             
-            # 转换回JSON字符串
-            updated_info = json.dumps(info_data, ensure_ascii=False, indent=2)
+            with self.metrics.stage('transform'):
+                # 将processed_jobsummary替换到jobSummary字段
+                info_data['jobSummary'] = processed_jobsummary
+                
+                # 转换回JSON字符串
+                updated_info = json.dumps(info_data, ensure_ascii=False, indent=2)
             
-            with self._lock:
-                self.processed_count += 1
-                if self.processed_count % 100 == 0:
-                    logger.info(f"已处理 {self.processed_count} 条记录")
+            self.metrics.record_result('success')
+            thread_processed = self.stats.inc('processed')
+            if thread_processed % 100 == 0:
+                logger.info(f"线程 {threading.current_thread().name} 已处理 {thread_processed} 条记录")
             
-            return (record_id, updated_info)
+            return UpdateResult(record_id, updated_info)
             
         except Exception as e:
-            with self._lock:
-                self.error_count += 1
+            self.metrics.record_result('error')
+            self.stats.inc('errors')
             logger.error(f"处理记录 {record_data[0] if record_data else 'unknown'} 时出错: {str(e)}")
             return None
     
-    def batch_update_database(self, results: List[Tuple[int, str]], config: ProcessConfig) -> int:
+    def batch_update_database(self, results: List[UpdateResult], config: ProcessConfig) -> int:
         """
         批量更新数据库
         
@@ -177,11 +193,12 @@ class JobSummaryProcessor:
             """
             
             # 执行批量更新
-            for record_id, updated_info in results:
-                cursor.execute(update_sql, (updated_info, record_id))
-                updated_count += 1
-            
-            connection.commit()
+            with self.metrics.stage('db_write'):
+                for record_id, updated_info in results:
+                    cursor.execute(update_sql, (updated_info, record_id))
+                    updated_count += 1
+                
+                connection.commit()
             logger.info(f"批量更新 {updated_count} 条记录成功")
             
         except Exception as e:
@@ -210,6 +227,17 @@ class JobSummaryProcessor:
         start_time = datetime.now()
         logger.info(f"开始多线程处理，配置: 批次大小={config.batch_size}, 最大线程数={config.max_workers}")
         
+        metrics_server = None
+        if config.metrics_port:
+            metrics_server = start_metrics_server(config.metrics_port)
+            logger.info(f"指标接口: http://127.0.0.1:{config.metrics_port}/metrics")
+        try:
+            return self._process_batches_multithread(config, start_time)
+        finally:
+            stop_metrics_server(metrics_server)
+    
+    def _process_batches_multithread(self, config: ProcessConfig, start_time: datetime) -> Dict[str, int]:
+        """分批多线程处理并返回统计信息"""
         # 获取需要处理的数据
         data_to_process = self.fetch_data_to_process(config)
         
@@ -260,8 +288,15 @@ class JobSummaryProcessor:
         }
         
         logger.info(f"处理完成！统计信息: {stats}")
+        self._write_metrics_summary(config)
         return stats
     
+    def _write_metrics_summary(self, config: ProcessConfig):
+        """按配置写出指标汇总文件"""
+        if config.metrics_summary_file:
+            summary = self.metrics.write_summary(config.metrics_summary_file)
+            logger.info(f"指标汇总已写入 {config.metrics_summary_file}，耗时最多的阶段: {summary['bottleneck_stage']}")
+    
     def process_data_single_thread(self, config: ProcessConfig) -> Dict[str, int]:
         """
         单线程处理数据（用于对比测试）
@@ -317,6 +352,7 @@ class JobSummaryProcessor:
         }
         
         logger.info(f"处理完成！统计信息: {stats}")
+        self._write_metrics_summary(config)
         return stats
 
 
@@ -8,11 +8,14 @@
 """
 
 import json
+import os
+import tempfile
 import time
 import unittest
 from unittest.mock import Mock, patch
 
 from company.job.multithread_job_processor import JobProcessor, JobProcessorConfig
+from company.result_journal import ResultJournal
 
 
 class TestJobProcessor(unittest.TestCase):
@@ -23,6 +26,8 @@ class TestJobProcessor(unittest.TestCase):
         self.config = JobProcessorConfig()
         self.config.max_workers = 2  # 测试时使用较少线程
         self.config.batch_size = 5
+        self.config.bot_stats_file = None  # 测试时不写Bot统计文件
+        self.config.journal_file = None  # 测试时直接写库，不使用本地结果日志
         self.processor = JobProcessor(self.config)
     
     def test_config_initialization(self):
@@ -33,11 +38,15 @@ class TestJobProcessor(unittest.TestCase):
         self.assertEqual(self.config.table_name, 'zhilian_job')
     
     def test_bot_id_rotation(self):
-        """测试Bot ID轮询"""
+        """测试Bot ID轮询（round_robin策略）"""
+        self.config.bot_selection_policy = 'round_robin'
+        processor = JobProcessor(self.config)
+        
         # 获取所有Bot ID，验证轮询
         bot_ids = []
         for i in range(len(self.config.bot_ids) * 2):  # 测试两轮
-            bot_id = self.processor.get_next_bot_id()
+            bot_id = processor.get_next_bot_id()
+            processor.release_bot_id(bot_id, 0.1, True)
             bot_ids.append(bot_id)
         
         # 验证前6个和后6个Bot ID相同（轮询效果）
@@ -49,6 +58,26 @@ class TestJobProcessor(unittest.TestCase):
         for bot_id in self.config.bot_ids:
             self.assertIn(bot_id, unique_bot_ids)
     
+    def test_bot_selection_avoids_slow_and_failing_bots(self):
+        """测试默认策略避开慢Bot，连续失败的Bot被熔断"""
+        self.config.bot_ids = ['fast', 'slow', 'broken']
+        self.config.bot_failure_threshold = 2
+        processor = JobProcessor(self.config)
+        processor.bot_balancer.explore_rate = 0
+        
+        processor.release_bot_id(processor.bot_balancer.acquire(exclude=['slow', 'broken']), 0.1, True)
+        processor.release_bot_id(processor.bot_balancer.acquire(exclude=['fast', 'broken']), 5.0, True)
+        for _ in range(2):
+            processor.release_bot_id(processor.bot_balancer.acquire(exclude=['fast', 'slow']), 0.1, False)
+        
+        chosen = []
+        for _ in range(10):
+            bot_id = processor.get_next_bot_id()
+            processor.release_bot_id(bot_id, 0.1, True)
+            chosen.append(bot_id)
+        self.assertEqual(set(chosen), {'fast'})
+        self.assertEqual(processor.bot_balancer.snapshot()['broken']['state'], 'open')
+    
     def test_random_id_generation(self):
         """测试随机ID生成"""
         thread_name = "TestThread"
@@ -253,6 +282,85 @@ class TestJobProcessor(unittest.TestCase):
         self.assertEqual(stats['failed_count'], 50)
         self.assertEqual(stats['success_rate'], 75.0)
 
+    def test_packed_records_fall_back_to_single_calls(self):
+        """测试打包处理：校验失败的记录回退单条调用"""
+        self.config.packing_max_records = 3
+        answer = ("<<<RESULT id=1>>>\n结果1\n<<<END id=1>>>\n"
+                  "<<<RESULT id=3>>>\n结果3\n<<<END id=3>>>")
+        rows = [(1, '岗位1'), (2, '岗位2'), (3, '岗位3')]
+
+        with patch.object(self.processor, 'call_agent', return_value=(answer, True, 'bot')) as mock_call, \
+                patch.object(self.processor, 'update_result_to_db', return_value=True) as mock_update, \
+                patch.object(self.processor, 'process_single_record', return_value=True) as mock_single:
+            success_count = self.processor.process_packed_records(rows)
+
+        self.assertEqual(success_count, 3)
+        self.assertEqual(mock_call.call_count, 1)
+        self.assertIn('<<<RECORD id=2>>>', mock_call.call_args[0][0])
+        self.assertEqual([call[0][:2] for call in mock_update.call_args_list], [(1, '结果1'), (3, '结果3')])
+        mock_single.assert_called_once_with(2, '岗位2')
+
+    def test_json_codec_hooks(self):
+        """测试字典压缩：读取时解压 processed_info，写入时压缩 job_description_detail"""
+        from json_codec import DictionaryStore, JsonCodec, train_dictionary
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            samples = [json.dumps({'jobTitle': f'岗位{i}', 'jobSummary': '负责数据处理与分析' * 20},
+                                  ensure_ascii=False) for i in range(20)]
+            DictionaryStore(tmpdir).add('zlib', train_dictionary(samples, 'zlib'))
+            self.config.json_codec_dir = tmpdir
+            processor = JobProcessor(self.config)
+            stored = JsonCodec.from_directory(tmpdir).encode(samples[0])
+
+            with patch(f'{JobProcessor.__module__}.get_db_connection') as mock_get_connection:
+                cursor = mock_get_connection.return_value.cursor.return_value
+                cursor.fetchall.return_value = [(1, stored)]
+                self.assertEqual(processor.fetch_unprocessed_data(1), [(1, samples[0])])
+
+                self.assertTrue(processor.update_result_to_db(1, samples[1], 'bot', 's', 'e', 1.0, True))
+                written = cursor.execute.call_args[0][1][0]
+            self.assertTrue(JsonCodec.is_encoded(written))
+            self.assertEqual(processor.codec.decode(written), samples[1])
+
+    def test_results_go_through_journal(self):
+        """测试结果日志：结果先落盘，由回放线程在一个事务中批量写库，写库失败时保留在日志中"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.config.journal_file = os.path.join(tmpdir, 'journal.db')
+            processor = JobProcessor(self.config)
+
+            with patch.object(processor, 'call_agent', side_effect=lambda info, bot, thread: (info + '结果', True, bot)), \
+                    patch(f'{JobProcessor.__module__}.get_db_connection', side_effect=ConnectionError('数据库不可用')):
+                self.assertTrue(processor.process_single_record(1, '岗位1'))
+                self.assertTrue(processor.process_single_record(2, '岗位2'))
+                processor.journal_replayer.stop(flush=True)
+            self.assertEqual(processor.journal.counts()['pending'], 2)
+
+            with patch(f'{JobProcessor.__module__}.get_db_connection') as mock_get_connection:
+                processor.journal_replayer.stop(flush=True)
+            mock_connection = mock_get_connection.return_value
+            params = [call[0][1] for call in mock_connection.cursor.return_value.execute.call_args_list]
+            self.assertEqual([(p[-1], p[0], p[1]) for p in params], [(1, '岗位1结果', '2'), (2, '岗位2结果', '2')])
+            mock_connection.commit.assert_called_once()
+            self.assertEqual(processor.journal.counts()['pending'], 0)
+            processor.journal.close()
+
+    def test_close_flushes_results_of_direct_calls(self):
+        """测试不经过 start_processing 直接处理记录：回放线程自动启动，close() 时写回剩余结果"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.config.journal_file = os.path.join(tmpdir, 'journal.db')
+            with patch(f'{JobProcessor.__module__}.get_db_connection') as mock_get_connection:
+                with JobProcessor(self.config) as processor:
+                    with patch.object(processor, 'call_agent',
+                                      side_effect=lambda info, bot, thread: (info + '结果', True, bot)):
+                        self.assertTrue(processor.process_single_record(1, '岗位1'))
+                self.assertIsNone(processor.journal)
+            params = [call[0][1] for call in mock_get_connection.return_value.cursor.return_value.execute.call_args_list]
+            self.assertEqual([(p[-1], p[0]) for p in params], [(1, '岗位1结果')])
+
+            reopened = ResultJournal(self.config.journal_file)
+            self.assertEqual(reopened.counts()['pending'], 0)
+            reopened.close()
+
 
 class TestJobProcessorIntegration:
     """集成测试类（需要真实数据库连接）"""
@@ -9,6 +9,8 @@ import random
 import uuid
 import psycopg2
 from db_connection import get_db_connection, close_db_connection
+from json_projection import fetch_with_json_projection
+from bot_balancer import BotBalancer
 from datetime import datetime
 
 # 创建 logger 对象
@@ -32,7 +34,7 @@ logger.addHandler(file_handler)
 logger.addHandler(console_handler)
 
 # Coze API配置
-COZE_BOT_ID = '7522477054722572288'
+COZE_BOT_IDS = ['7522477054722572288']
 COZE_API_URL = 'https://api.coze.cn/open_api/v2/chat'
 COZE_HEADERS = {
     "Content-Type": "application/json",
@@ -43,6 +45,9 @@ COZE_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
 }
 
+# 按延迟和在途请求数选择Bot，连续失败的Bot自动熔断，各Bot统计跨次运行保留
+bot_balancer = BotBalancer(COZE_BOT_IDS, state_file='job_analysis_bot_stats.json', name='job_analysis')
+
 def format_time(timestamp):
     """格式化时间戳"""
     dt = datetime.fromtimestamp(timestamp)
@@ -57,6 +62,9 @@ def generate_user_id(thread_name):
     """生成随机的user_id"""
     return thread_name + str(random.randint(1_000_000, 9_999_999))
 
+# processed_info 中只有 jobSummary 会发送给智能体，开启 use_sql_projection 时查询只在数据库端取出该字段
+JOB_SUMMARY_FIELDS = {'jobSummary': True}
+
 def extract_job_summary(processed_info):
     """从processed_info JSON中提取jobSummary"""
     try:
@@ -74,10 +82,11 @@ def extract_job_summary(processed_info):
 def call_coze_api(job_summary, conversation_id, user_id):
     """调用Coze API处理jobSummary数据"""
     start_time = time.time()
+    bot_id = bot_balancer.acquire()
     
     data = {
         "conversation_id": conversation_id,
-        "bot_id": COZE_BOT_ID,
+        "bot_id": bot_id,
         "user": user_id,
         "query": job_summary,
         "stream": False,
@@ -122,31 +131,36 @@ def call_coze_api(job_summary, conversation_id, user_id):
     
     end_time = time.time()
     elapsed_time = round(end_time - start_time, 2)
+    bot_balancer.release(bot_id, end_time - start_time, result != '无')
     
     return {
         'result': result,
         'start_time': format_time(start_time),
         'end_time': format_time(end_time),
-        'elapsed_time': elapsed_time
+        'elapsed_time': elapsed_time,
+        'bot_id': bot_id
     }
 
-def fetch_job_data_from_db(batch_size=100):
-    """从数据库获取岗位数据"""
+def fetch_job_data_from_db(batch_size=100, use_sql_projection=False):
+    """从数据库获取岗位数据（use_sql_projection=True 时在数据库端只取出 jobSummary）"""
     connection = get_db_connection()
     cursor = connection.cursor()
     
     try:
         # 查询未处理的岗位数据并标记为正在处理
-        cursor.execute("""
-            SELECT id, processed_info FROM zhilian_job
+        query = """
+            SELECT id, {column} FROM zhilian_job
             WHERE train_type = '3'
             AND processed_jobsummary IS NULL
             AND process_type IS NULL
             ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
-        """, (batch_size,))
-
-        
-        rows = cursor.fetchall()
+        """
+        if use_sql_projection:
+            rows = fetch_with_json_projection(cursor, connection, query, (batch_size,),
+                                              'processed_info', JOB_SUMMARY_FIELDS, logger)
+        else:
+            cursor.execute(query.format(column='processed_info'), (batch_size,))
+            rows = cursor.fetchall()
         
         if rows:
             ids = [row[0] for row in rows]
@@ -186,7 +200,7 @@ def update_job_result_in_db(job_id, api_result):
             api_result['start_time'],
             api_result['end_time'],
             api_result['elapsed_time'],
-            COZE_BOT_ID,
+            api_result['bot_id'],
             job_id
         ))
         
@@ -272,6 +286,7 @@ def start_job_processing(num_threads=10, batch_size=50):
     for thread in threads:
         thread.join()
     
+    bot_balancer.save_state()
     logging.info("所有岗位数据处理完成")
 
 if __name__ == "__main__":
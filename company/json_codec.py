@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+大JSON列的字典压缩存储
+resume_info、resume_processed_info、train_data_ch、job_description_detail 等列是高度重复的中文JSON文本，
+用在样本上训练的字典压缩后体积通常只有原来的几分之一。
+
+- 算法：zstd（需要 pip install zstandard，使用训练得到的字典）；未安装时可用标准库 zlib 的预置字典（zdict）
+- 存储格式：压缩结果经base64编码后加前缀 "zd1:<字典ID>:" 存入原来的文本列，不需要修改表结构；
+  读取时没有前缀的值原样返回，新旧数据可以混存
+- 字典版本：DictionaryStore 把字典和 manifest.json 保存在同一目录，字典ID包含算法和内容校验值，
+  训练新字典后旧字典仍保留，用旧字典压缩的数据照常解压
+
+注意：只有当一列的所有读取方都使用本编解码器时，才能对该列开启压缩写入。
+SQL端的JSON投影（json_projection.py）遇到压缩值会回退为查询整列。
+
+命令行：
+    python json_codec.py train --source corpus --algorithm zlib --dict-dir codec_dicts
+    python json_codec.py train --source db --table zhilian_resume --column resume_info --limit 5000
+    python json_codec.py list --dict-dir codec_dicts
+    python json_codec.py evaluate --source corpus --dict-dir codec_dicts
+
+使用示例：
+    codec = JsonCodec.from_directory('codec_dicts')
+    stored = codec.encode(json.dumps(resume, ensure_ascii=False))
+    resume = json.loads(codec.decode(stored))
+"""
+
+import argparse
+import base64
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时只能使用 zlib
+    zstandard = None
+
+ENCODED_PREFIX = 'zd1:'
+ALGORITHMS = ('zstd', 'zlib')
+DEFAULT_DICT_SIZE = 110 * 1024
+ZLIB_MAX_DICT_SIZE = 32 * 1024  # zlib 窗口大小，预置字典超出部分无效
+MANIFEST_FILE = 'manifest.json'
+
+# zlib字典候选片段：JSON键（含冒号）和较短的字符串值
+_FRAGMENT_PATTERN = re.compile(rb'"[^"\\\n]{1,64}"\s*:\s*|"[^"\\\n]{1,48}"')
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise ImportError("zstd压缩需要安装 zstandard（pip install zstandard），或改用 algorithm='zlib'")
+
+
+def default_algorithm() -> str:
+    """已安装 zstandard 时使用 zstd，否则使用 zlib"""
+    return 'zstd' if zstandard is not None else 'zlib'
+
+
+def train_dictionary(samples: Iterable[str], algorithm: Optional[str] = None,
+                     dict_size: int = DEFAULT_DICT_SIZE) -> bytes:
+    """
+    在样本上训练压缩字典
+
+    Args:
+        samples: 样本文本（建议几千条，覆盖简历和岗位）
+        algorithm: zstd 或 zlib，默认按是否安装 zstandard 选择
+        dict_size: 字典大小上限（字节），zlib 最多使用32KB
+
+    Returns:
+        bytes: 字典内容
+    """
+    algorithm = algorithm or default_algorithm()
+    encoded = [sample.encode('utf-8') for sample in samples if sample]
+    if not encoded:
+        raise ValueError("没有可用于训练字典的样本")
+    if algorithm == 'zstd':
+        _require_zstd()
+        return zstandard.train_dictionary(dict_size, encoded).as_bytes()
+    if algorithm == 'zlib':
+        return _build_zlib_dictionary(encoded, min(dict_size, ZLIB_MAX_DICT_SIZE))
+    raise ValueError(f"不支持的压缩算法: {algorithm}")
+
+
+def _build_zlib_dictionary(samples: List[bytes], size: int) -> bytes:
+    """按 出现文档数 × 长度 选出收益最高的片段拼成预置字典，收益高的放在末尾（距离越近编码越短）"""
+    counter = Counter()
+    for sample in samples:
+        counter.update(set(_FRAGMENT_PATTERN.findall(sample)))
+    fragments = sorted((fragment for fragment, count in counter.items() if count > 1),
+                       key=lambda fragment: counter[fragment] * len(fragment), reverse=True)
+    chosen, total = [], 0
+    for fragment in fragments:
+        if total + len(fragment) <= size:
+            chosen.append(fragment)
+            total += len(fragment)
+    return b''.join(reversed(chosen))
+
+
+class DictionaryStore:
+    """
+    压缩字典目录：每个字典一个文件，manifest.json 记录各版本元数据和当前版本
+
+    Args:
+        directory: 字典目录
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple[str, bytes]] = {}
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def manifest(self) -> Dict:
+        """读取 manifest，目录不存在时返回空清单"""
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return {'current': None, 'dictionaries': {}}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def add(self, algorithm: str, data: bytes, make_current: bool = True, **meta) -> str:
+        """
+        保存字典并（默认）设为当前版本
+
+        Args:
+            algorithm: zstd 或 zlib
+            data: 字典内容
+            make_current: 是否设为当前版本
+            **meta: 额外元数据（如样本来源、样本数）
+
+        Returns:
+            str: 字典ID，形如 zstd-1a2b3c4d
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"不支持的压缩算法: {algorithm}")
+        dict_id = f"{algorithm}-{zlib.crc32(data):08x}"
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"{dict_id}.dict"
+        with open(os.path.join(self.directory, file_name), 'wb') as f:
+            f.write(data)
+
+        with self._lock:
+            manifest = self.manifest()
+            manifest['dictionaries'][dict_id] = {
+                'algorithm': algorithm,
+                'file': file_name,
+                'size': len(data),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                **meta,
+            }
+            if make_current or not manifest.get('current'):
+                manifest['current'] = dict_id
+            tmp_path = self._manifest_path() + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._manifest_path())
+        return dict_id
+
+    def current_id(self) -> Optional[str]:
+        """当前版本的字典ID"""
+        return self.manifest().get('current')
+
+    def get(self, dict_id: str) -> Tuple[str, bytes]:
+        """
+        按ID读取字典（带缓存）
+
+        Returns:
+            Tuple[str, bytes]: (算法, 字典内容)
+
+        Raises:
+            KeyError: 字典不存在
+        """
+        cached = self._cache.get(dict_id)
+        if cached is not None:
+            return cached
+        entry = self.manifest()['dictionaries'].get(dict_id)
+        if entry is None:
+            raise KeyError(f"字典 {dict_id} 不存在于 {self.directory}")
+        with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+            cached = (entry['algorithm'], f.read())
+        self._cache[dict_id] = cached
+        return cached
+
+
+class JsonCodec:
+    """
+    文本列编解码器（线程安全）
+
+    Args:
+        store: 字典目录
+        dict_id: 写入时使用的字典，默认为当前版本
+        level: 压缩级别，默认 zstd=3、zlib=6
+        min_size: 小于该字节数的文本不压缩
+    """
+
+    def __init__(self, store: DictionaryStore, dict_id: Optional[str] = None,
+                 level: Optional[int] = None, min_size: int = 256):
+        self.store = store
+        self.dict_id = dict_id or store.current_id()
+        if self.dict_id is None:
+            raise ValueError(f"{store.directory} 中没有可用的字典，请先运行 python json_codec.py train")
+        self.algorithm, self._dict_data = store.get(self.dict_id)
+        if self.algorithm == 'zstd':
+            _require_zstd()
+        self.level = level if level is not None else (3 if self.algorithm == 'zstd' else 6)
+        self.min_size = min_size
+        self._prefix = f"{ENCODED_PREFIX}{self.dict_id}:"
+        self._local = threading.local()
+
+    @classmethod
+    def from_directory(cls, directory: str, **kwargs) -> 'JsonCodec':
+        """从字典目录创建编解码器"""
+        return cls(DictionaryStore(directory), **kwargs)
+
+    @staticmethod
+    def is_encoded(value) -> bool:
+        """是否为本编解码器写入的压缩值"""
+        return isinstance(value, str) and value.startswith(ENCODED_PREFIX)
+
+    def encode(self, text: Optional[str]) -> Optional[str]:
+        """
+        压缩文本，返回可直接写入文本列的字符串；None、短文本和已压缩的值原样返回
+        """
+        if not isinstance(text, str) or self.is_encoded(text):
+            return text
+        raw = text.encode('utf-8')
+        if len(raw) < self.min_size:
+            return text
+        if self.algorithm == 'zstd':
+            compressed = self._zstd_compressor().compress(raw)
+        else:
+            compressor = zlib.compressobj(self.level, zdict=self._dict_data)
+            compressed = compressor.compress(raw) + compressor.flush()
+        return self._prefix + base64.b64encode(compressed).decode('ascii')
+
+    def decode(self, value):
+        """
+        解压 encode 的结果；不是压缩值（普通文本、dict、None）时原样返回
+
+        Raises:
+            ValueError: 压缩值使用的字典不存在或数据损坏
+        """
+        if not self.is_encoded(value):
+            return value
+        try:
+            dict_id, payload = value[len(ENCODED_PREFIX):].split(':', 1)
+            algorithm, dict_data = self.store.get(dict_id)
+            compressed = base64.b64decode(payload)
+            if algorithm == 'zstd':
+                _require_zstd()
+                raw = self._zstd_decompressor(dict_id, dict_data).decompress(compressed)
+            else:
+                decompressor = zlib.decompressobj(zdict=dict_data)
+                raw = decompressor.decompress(compressed) + decompressor.flush()
+        except (KeyError, ValueError, zlib.error) as e:
+            raise ValueError(f"压缩值解码失败: {e}") from e
+        return raw.decode('utf-8')
+
+    def _zstd_compressor(self):
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            dictionary = zstandard.ZstdCompressionDict(self._dict_data)
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+            self._local.compressor = compressor
+        return compressor
+
+    def _zstd_decompressor(self, dict_id: str, dict_data: bytes):
+        decompressors = getattr(self._local, 'decompressors', None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dict_data))
+            decompressors[dict_id] = decompressor
+        return decompressor
+
+
+# ---------------------------------------------------------------------------
+# 命令行：训练、查看、评估字典
+# ---------------------------------------------------------------------------
+
+def load_samples(source: str, limit: int, table: Optional[str] = None, column: Optional[str] = None,
+                 seed: int = 42) -> List[str]:
+    """
+    读取训练/评估样本
+
+    Args:
+        source: corpus（benchmark_corpus 合成语料）或 db（从数据库随机抽样）
+        limit: 样本数
+        table: source=db 时的表名
+        column: source=db 时的列名
+        seed: 合成语料随机种子
+    """
+    if source == 'corpus':
+        from benchmark_corpus import CorpusConfig, CorpusGenerator
+
+        corpus = CorpusGenerator(CorpusConfig(resume_count=limit // 2, job_count=limit - limit // 2,
+                                              seed=seed)).generate()
+        return [json.dumps(item, ensure_ascii=False, indent=4) for item in corpus.resumes + corpus.jobs]
+
+    if not table or not column:
+        raise ValueError("source=db 时需要指定 --table 和 --column")
+    from db_connection import get_db_connection, close_db_connection
+
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY random() LIMIT %s",
+                       (limit,))
+        return [value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+                for (value,) in cursor.fetchall()]
+    finally:
+        close_db_connection(cursor, connection)
+
+
+def evaluate(codec: JsonCodec, samples: List[str]) -> Dict[str, float]:
+    """统计压缩率和编解码速度"""
+    start = time.perf_counter()
+    encoded = [codec.encode(sample) for sample in samples]
+    encode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = [codec.decode(value) for value in encoded]
+    decode_seconds = time.perf_counter() - start
+    if decoded != samples:
+        raise RuntimeError("解码结果与原文不一致")
+
+    plain_bytes = sum(len(sample.encode('utf-8')) for sample in samples)
+    stored_bytes = sum(len(value.encode('utf-8')) for value in encoded)
+    megabytes = plain_bytes / 1024 / 1024
+    return {
+        'samples': len(samples),
+        'plain_bytes': plain_bytes,
+        'stored_bytes': stored_bytes,
+        'ratio': round(plain_bytes / stored_bytes, 2) if stored_bytes else 0.0,
+        'encode_mb_per_s': round(megabytes / encode_seconds, 1) if encode_seconds else 0.0,
+        'decode_mb_per_s': round(megabytes / decode_seconds, 1) if decode_seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON列压缩字典工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_source_arguments(sub):
+        sub.add_argument('--source', choices=('corpus', 'db'), default='corpus', help='样本来源')
+        sub.add_argument('--table', type=str, help='source=db 时的表名')
+        sub.add_argument('--column', type=str, help='source=db 时的列名')
+        sub.add_argument('--limit', type=int, default=2000, help='样本数')
+        sub.add_argument('--dict-dir', type=str, default='codec_dicts', help='字典目录')
+
+    train_parser = subparsers.add_parser('train', help='训练新字典并设为当前版本')
+    add_source_arguments(train_parser)
+    train_parser.add_argument('--algorithm', choices=ALGORITHMS, default=default_algorithm(), help='压缩算法')
+    train_parser.add_argument('--dict-size', type=int, default=DEFAULT_DICT_SIZE, help='字典大小（字节）')
+
+    list_parser = subparsers.add_parser('list', help='列出字典版本')
+    list_parser.add_argument('--dict-dir', type=str, default='codec_dicts', help='字典目录')
+
+    evaluate_parser = subparsers.add_parser('evaluate', help='用当前字典评估压缩率和编解码速度')
+    add_source_arguments(evaluate_parser)
+    evaluate_parser.add_argument('--dict-id', type=str, help='评估指定版本的字典')
+
+    args = parser.parse_args()
+    store = DictionaryStore(args.dict_dir)
+
+    if args.command == 'train':
+        samples = load_samples(args.source, args.limit, args.table, args.column)
+        data = train_dictionary(samples, args.algorithm, args.dict_size)
+        dict_id = store.add(args.algorithm, data, source=args.source, table=args.table,
+                            column=args.column, samples=len(samples))
+        print(f"字典 {dict_id} 已保存到 {args.dict_dir}（{len(data)} 字节，{len(samples)} 条样本）")
+    elif args.command == 'list':
+        manifest = store.manifest()
+        for dict_id, entry in manifest['dictionaries'].items():
+            flag = '*' if dict_id == manifest.get('current') else ' '
+            print(f"{flag} {dict_id:<20} {entry['size']:>8} 字节  {entry['created_at']}  "
+                  f"样本 {entry.get('samples', '-')}  {entry.get('table') or entry.get('source', '')}")
+    else:
+        samples = load_samples(args.source, args.limit, args.table, args.column, seed=7)
+        result = evaluate(JsonCodec(store, dict_id=args.dict_id, min_size=0), samples)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
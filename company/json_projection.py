@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+JSON字段投影下推
+简历、岗位的JSON列很宽，而处理时只用到其中一部分字段（如 retain_fields、jobSummary）。
+这里把保留字段模板转换为PostgreSQL的json投影表达式（json_each、json_object_agg），
+在数据库端只取出需要的子文档，减少网络传输和Python端的JSON解析开销。
+投影结果与 filter_resume_data 一致（保留值为null的字段和原有字段顺序）；投影后未保留的字段
+在Python端不再可见（如变化检测），因此各调用方默认关闭，按需开启。
+
+模板格式与 filter_resume_data 相同：
+    {
+        "user": {"name": True, "age": True},            # 值为字典：继续向下筛选
+        "resume": {"workExperiences": {"orgName": True}}  # 字段为数组时对每个对象元素筛选
+    }
+
+使用示例：
+    rows = fetch_with_json_projection(
+        cursor, connection,
+        "SELECT id, {column} FROM zhilian_resume WHERE resume_processed_info IS NULL LIMIT %s",
+        (100,), 'resume_info', retain_fields
+    )
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional
+
+_JSON_KEY_PATTERN = re.compile(r'^\w+$')
+
+
+def build_json_projection(column: str, required_fields: Dict, alias: Optional[str] = None) -> str:
+    """
+    把保留字段模板转换为json投影表达式
+
+    与 filter_resume_data 的结果一致：列本身应为JSON对象，只保留模板中存在于文档里的字段，
+    值为null的字段照常保留，字段保持文档中的原有顺序；嵌套字段为数组时对每个对象元素分别筛选
+    （非对象元素原样保留）。按 json（而不是 jsonb）处理，jsonb 会重排字段顺序。
+    结果转换为文本，与直接查询文本列时的返回类型一致。投影后仍需在Python端做清洗和字段重命名。
+
+    Args:
+        column: JSON列名（text、json或jsonb；jsonb列本身不保存原有字段顺序）
+        required_fields: 保留字段模板
+        alias: 结果列别名，默认与列名相同
+
+    Returns:
+        str: SELECT中的表达式，如 (CASE json_typeof(...) ... END)::text AS resume_info
+
+    Raises:
+        ValueError: 字段名包含字母、数字、下划线以外的字符
+    """
+    document = f"({column})::json"
+    projection = (f"CASE json_typeof({document}) "
+                  f"WHEN 'object' THEN {_filter_object(document, required_fields, 1)} "
+                  f"ELSE {document} END")
+    return f"({projection})::text AS {alias or column}"
+
+
+def _project(expr: str, fields: Dict, depth: int) -> str:
+    """expr 按 fields 筛选：对象按字段筛选，数组逐个筛选对象元素，其他值（包括null）原样保留"""
+    element = f"e{depth}"
+    return (
+        f"CASE json_typeof({expr}) "
+        f"WHEN 'object' THEN {_filter_object(expr, fields, depth + 1)} "
+        f"WHEN 'array' THEN (SELECT COALESCE(json_agg("
+        f"CASE WHEN json_typeof({element}) = 'object' "
+        f"THEN {_filter_object(element, fields, depth + 1)} ELSE {element} END "
+        f"ORDER BY o{depth}), '[]'::json) "
+        f"FROM json_array_elements({expr}) WITH ORDINALITY AS t{depth}({element}, o{depth})) "
+        f"ELSE {expr} END"
+    )
+
+
+def _filter_object(expr: str, fields: Dict, depth: int) -> str:
+    """用 json_each 按原有顺序取出对象中模板里的字段，字典模板的字段继续向下筛选"""
+    key, value, position = f"k{depth}", f"v{depth}", f"p{depth}"
+    names, cases = [], []
+    for name, sub_fields in fields.items():
+        if not _JSON_KEY_PATTERN.match(name):
+            raise ValueError(f"不支持的JSON字段名: {name!r}")
+        names.append(f"'{name}'")
+        if isinstance(sub_fields, dict):
+            cases.append(f"WHEN '{name}' THEN {_project(value, sub_fields, depth)}")
+    projected = f"CASE {key} {' '.join(cases)} ELSE {value} END" if cases else value
+    return (f"(SELECT COALESCE(json_object_agg({key}, {projected} ORDER BY {position}), '{{}}'::json) "
+            f"FROM json_each({expr}) WITH ORDINALITY AS f{depth}({key}, {value}, {position}) "
+            f"WHERE {key} IN ({', '.join(names)}))")
+
+
+def fetch_with_json_projection(cursor, connection, sql_template: str, params: tuple,
+                               column: str, required_fields: Dict,
+                               logger: Optional[logging.Logger] = None) -> List[tuple]:
+    """
+    执行带JSON投影的查询，批次中有无法转换为json的脏数据时回滚并改为查询整列，
+    由调用方按原有逻辑逐条处理解析失败
+
+    Args:
+        cursor: 数据库游标
+        connection: 数据库连接
+        sql_template: SQL模板，用 {column} 表示JSON列在SELECT中的位置
+        params: 查询参数
+        column: JSON列名
+        required_fields: 保留字段模板
+        logger: 日志记录器
+
+    Returns:
+        List[tuple]: 查询结果，JSON列为文本
+    """
+    try:
+        cursor.execute(sql_template.format(column=build_json_projection(column, required_fields)), params)
+        return cursor.fetchall()
+    except Exception as e:
+        # SQLSTATE 22xxx：数据异常（如 invalid input syntax for type json）
+        if not str(getattr(e, 'pgcode', None) or '').startswith('22'):
+            raise
+        (logger or logging.getLogger(__name__)).warning(f"JSON投影查询失败，改为查询整列 {column}: {str(e).strip()}")
+        connection.rollback()
+        cursor.execute(sql_template.format(column=column), params)
+        return cursor.fetchall()
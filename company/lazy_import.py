@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+按需导入重量级依赖
+
+pandas、openpyxl、requests 等包导入一次要几百毫秒到数秒，而多数处理脚本只在个别函数里用到。
+模块顶层写 pd = lazy_module('pandas')，第一次访问属性时才真正导入；包未安装时在使用处抛出 ImportError，
+不影响模块中其他不依赖该包的功能。
+
+使用示例：
+    from lazy_import import lazy_module
+    pd = lazy_module('pandas')
+
+    def export(rows):
+        pd.DataFrame(rows).to_excel('out.xlsx')  # 此时才导入 pandas
+"""
+
+import importlib
+import threading
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule:
+    """
+    模块代理，第一次访问属性时导入真实模块并缓存
+
+    Args:
+        name: 模块名，如 pandas、openpyxl.styles
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def is_loaded(self) -> bool:
+        """真实模块是否已导入"""
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    """
+    返回按需导入的模块代理
+
+    Args:
+        name: 模块名
+
+    Returns:
+        LazyModule: 访问属性时才导入的模块代理
+    """
+    return LazyModule(name)
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟大模型网关
+在本机模拟Coze、HiAgent、Ollama三种接口的请求/响应格式，用于压测和延迟测试，
+避免压测时直接请求线上智能体。
+
+支持的接口：
+- Coze v2:     POST /open_api/v2/chat（stream=true 时返回SSE）
+- HiAgent:     POST .../create_conversation、POST .../chat_query（ResponseMode=streaming 时返回多条SSE）
+- Ollama:      POST /api/chat（默认NDJSON流式，stream=false 时返回单个JSON）
+- 统计信息:     GET /stats
+
+可配置延迟分布（固定/均匀/指数/对数正态）、错误率、429限流率和最大并发、流式分块速度，
+以及固定回答或模板回答（模板可使用 {query}、{query_len}、{bot_id}、{request_no} 占位符）。
+查询为打包提示词（见 prompt_packing.py）时，按记录分别生成回答并用 RESULT 分隔符包裹。
+
+使用示例：
+    python mock_llm_gateway.py --port 8089 --latency-ms 1500 --sigma 0.6 --throttle-rate 0.02
+
+    # 让岗位处理器请求模拟网关
+    config = JobProcessorConfig()
+    config.coze_api_url = 'http://127.0.0.1:8089/open_api/v2/chat'
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+COZE_CHAT_PATH = '/open_api/v2/chat'
+HIAGENT_CREATE_CONVERSATION_SUFFIX = '/create_conversation'
+HIAGENT_CHAT_QUERY_SUFFIX = '/chat_query'
+OLLAMA_CHAT_PATH = '/api/chat'
+PACKED_RECORD_PATTERN = re.compile(r'<<<RECORD id=([^>\s]+)>>>\n(.*?)\n<<<END id=\1>>>', re.S)
+
+
+@dataclass
+class LatencyModel:
+    """
+    响应延迟分布（毫秒）
+
+    Attributes:
+        distribution: fixed / uniform / exponential / lognormal
+        median_ms: 固定延迟或分布的中位数
+        sigma: lognormal 的形状参数，越大长尾越明显
+        min_ms: 下限（uniform的下界）
+        max_ms: 上限（uniform的上界），所有分布都会截断到该值
+    """
+    distribution: str = 'lognormal'
+    median_ms: float = 800.0
+    sigma: float = 0.5
+    min_ms: float = 0.0
+    max_ms: float = 60000.0
+
+    def sample(self, rng: random.Random) -> float:
+        """采样一次延迟，返回秒"""
+        if self.distribution == 'fixed':
+            value = self.median_ms
+        elif self.distribution == 'uniform':
+            value = rng.uniform(self.min_ms, self.max_ms)
+        elif self.distribution == 'exponential':
+            value = rng.expovariate(math.log(2) / self.median_ms) if self.median_ms > 0 else 0.0
+        elif self.distribution == 'lognormal':
+            value = rng.lognormvariate(math.log(self.median_ms), self.sigma) if self.median_ms > 0 else 0.0
+        else:
+            raise ValueError(f"不支持的延迟分布: {self.distribution}")
+        return min(max(value, self.min_ms), self.max_ms) / 1000
+
+
+@dataclass
+class MockGatewayConfig:
+    """模拟网关配置"""
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    route_latency: Dict[str, LatencyModel] = field(default_factory=dict)  # 按接口覆盖：coze/hiagent_create/hiagent_chat/ollama
+    error_rate: float = 0.0  # 返回500的概率
+    throttle_rate: float = 0.0  # 返回429的概率
+    max_concurrency: Optional[int] = None  # 超过并发上限时返回429
+    answers: List[str] = field(default_factory=lambda: ["这是模拟智能体的回答。"])
+    answer_template: Optional[str] = None  # 设置后优先使用模板生成回答
+    packed_answers: bool = True  # 查询为打包提示词（见 prompt_packing.py）时按记录分别回答
+    stream_chunk_chars: int = 8  # 流式响应每块的字符数
+    stream_chunk_delay_ms: float = 20.0  # 流式响应每块之间的间隔
+    model_name: str = 'llama3'
+    seed: Optional[int] = None
+
+
+class GatewayStats:
+    """网关请求统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.statuses: Dict[str, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latency_sum = 0.0
+
+    def enter(self, route: str) -> int:
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.in_flight
+
+    def leave(self, status: int, elapsed: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            self.latency_sum += elapsed
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.statuses.values())
+            return {
+                'requests': dict(self.requests),
+                'statuses': dict(self.statuses),
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'avg_latency_seconds': round(self.latency_sum / total, 4) if total else None,
+            }
+
+
+class MockGatewayServer(ThreadingHTTPServer):
+    """模拟网关HTTP服务"""
+
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(self, address: Tuple[str, int], config: MockGatewayConfig):
+        super().__init__(address, MockGatewayHandler)
+        self.config = config
+        self.stats = GatewayStats()
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._request_no = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def next_request(self) -> Tuple[int, float, float]:
+        """返回 (请求序号, 用于决定错误/限流的随机数, 用于采样延迟的随机种子)"""
+        with self._rng_lock:
+            self._request_no += 1
+            return self._request_no, self._rng.random(), self._rng.random()
+
+    def render_answer(self, query: str, bot_id: str, request_no: int, rng: random.Random) -> str:
+        if self.config.packed_answers and PACKED_RECORD_PATTERN.search(query):
+            return '\n'.join(
+                f'<<<RESULT id={record_id}>>>\n{self._render_single(content, bot_id, request_no, rng)}\n<<<END id={record_id}>>>'
+                for record_id, content in PACKED_RECORD_PATTERN.findall(query))
+        return self._render_single(query, bot_id, request_no, rng)
+
+    def _render_single(self, query: str, bot_id: str, request_no: int, rng: random.Random) -> str:
+        if self.config.answer_template:
+            return self.config.answer_template.format(
+                query=query, query_len=len(query), bot_id=bot_id, request_no=request_no)
+        return rng.choice(self.config.answers)
+
+
+class MockGatewayHandler(BaseHTTPRequestHandler):
+    """按路径分发到不同接口的模拟实现"""
+
+    protocol_version = 'HTTP/1.1'
+    server: MockGatewayServer
+
+    def log_message(self, format, *args):
+        pass
+
+    # ------------------------------------------------------------------
+    # 通用
+    # ------------------------------------------------------------------
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] == '/stats':
+            self._send_json(200, self.server.stats.snapshot())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        if path == COZE_CHAT_PATH:
+            route, handler = 'coze', self._handle_coze
+        elif path.endswith(HIAGENT_CREATE_CONVERSATION_SUFFIX):
+            route, handler = 'hiagent_create', self._handle_hiagent_create
+        elif path.endswith(HIAGENT_CHAT_QUERY_SUFFIX):
+            route, handler = 'hiagent_chat', self._handle_hiagent_chat
+        elif path == OLLAMA_CHAT_PATH:
+            route, handler = 'ollama', self._handle_ollama
+        else:
+            self._read_body()
+            self._send_json(404, {'error': f'unknown path {path}'})
+            return
+
+        start = time.perf_counter()
+        status = 200
+        in_flight = self.server.stats.enter(route)
+        try:
+            body = self._read_body()
+            request_no, fault_roll, latency_seed = self.server.next_request()
+            rng = random.Random(latency_seed)
+            config = self.server.config
+
+            if config.max_concurrency and in_flight > config.max_concurrency:
+                status = self._send_throttled(route)
+                return
+            time.sleep(config.route_latency.get(route, config.latency).sample(rng))
+            if fault_roll < config.throttle_rate:
+                status = self._send_throttled(route)
+            elif fault_roll < config.throttle_rate + config.error_rate:
+                status = 500
+                self._send_json(500, {'code': 500, 'msg': 'mock internal error'})
+            else:
+                status = handler(body, request_no, rng)
+        except (BrokenPipeError, ConnectionResetError):
+            status = 499
+        finally:
+            self.server.stats.leave(status, time.perf_counter() - start)
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw.decode('utf-8')) if raw else {}
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return {}
+
+    def _send_bytes(self, status: int, payload: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, status: int, data: Dict[str, Any]):
+        self._send_bytes(status, json.dumps(data, ensure_ascii=False).encode('utf-8'),
+                         'application/json; charset=utf-8')
+
+    def _send_throttled(self, route: str) -> int:
+        if route == 'coze':
+            data = {'code': 4013, 'msg': 'The requests exceed the limit. Please try again later.'}
+        else:
+            data = {'error': 'rate limited'}
+        self._send_json(429, data)
+        return 429
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, payload: bytes):
+        self.wfile.write(f'{len(payload):x}\r\n'.encode('ascii') + payload + b'\r\n')
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def _split_answer(self, answer: str) -> List[str]:
+        size = max(self.server.config.stream_chunk_chars, 1)
+        return [answer[i:i + size] for i in range(0, len(answer), size)] or ['']
+
+    def _stream_pause(self):
+        delay = self.server.config.stream_chunk_delay_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    # ------------------------------------------------------------------
+    # Coze v2
+    # ------------------------------------------------------------------
+
+    def _handle_coze(self, body: Dict[str, Any], request_no: int, rng: random.Random) -> int:
+        if not body.get('bot_id') or 'query' not in body:
+            self._send_json(200, {'code': 4000, 'msg': 'bot_id and query are required', 'messages': []})
+            return 200
+
+        query = str(body.get('query', ''))
+        conversation_id = str(body.get('conversation_id') or request_no)
+        answer = self.server.render_answer(query, str(body['bot_id']), request_no, rng)
+        messages = [
+            {'role': 'assistant', 'type': 'answer', 'content': answer, 'content_type': 'text'},
+            {'role': 'assistant', 'type': 'verbose',
+             'content': json.dumps({'msg_type': 'generate_answer_finish', 'data': ''}), 'content_type': 'text'},
+        ]
+
+        if not body.get('stream'):
+            self._send_json(200, {'messages': messages, 'conversation_id': conversation_id,
+                                  'code': 0, 'msg': 'success'})
+            return 200
+
+        self._start_stream('text/event-stream; charset=utf-8')
+        for index, piece in enumerate(self._split_answer(answer)):
+            event = {'event': 'message', 'message': dict(messages[0], content=piece),
+                     'is_finish': False, 'index': index, 'conversation_id': conversation_id}
+            self._write_chunk(f'data:{json.dumps(event, ensure_ascii=False)}\n\n'.encode('utf-8'))
+            self._stream_pause()
+        done = {'event': 'done', 'conversation_id': conversation_id}
+        self._write_chunk(f'data:{json.dumps(done)}\n\n'.encode('utf-8'))
+        self._end_stream()
+        return 200
+
+    # ------------------------------------------------------------------
+    # HiAgent
+    # ------------------------------------------------------------------
+
+    def _handle_hiagent_create(self, body: Dict[str, Any], request_no: int, rng: random.Random) -> int:
+        self._send_json(200, {'Conversation': {
+            'AppConversationID': uuid.UUID(int=rng.getrandbits(128)).hex,
+            'ConversationName': '新会话',
+            'CreateTime': datetime.now(timezone.utc).isoformat(),
+        }})
+        return 200
+
+    def _handle_hiagent_chat(self, body: Dict[str, Any], request_no: int, rng: random.Random) -> int:
+        if not body.get('AppConversationID'):
+            self._send_json(400, {'error': 'AppConversationID is required'})
+            return 400
+
+        query = str(body.get('Query', ''))
+        answer = self.server.render_answer(query, str(body.get('UserID', '')), request_no, rng)
+        event = {'event': 'message', 'task_id': uuid.UUID(int=rng.getrandbits(128)).hex,
+                 'id': str(request_no), 'conversation_id': body['AppConversationID'],
+                 'answer': answer, 'created_at': int(time.time())}
+
+        # 与线上一致：Content-Type不带charset，正文为未转义的UTF-8，调用方按
+        # response.text[index('{'):-1] 截取后再 encode('ISO_8859_1').decode('utf-8') 还原中文
+        if body.get('ResponseMode') != 'streaming':
+            self._send_bytes(200, f'data:{json.dumps(event, ensure_ascii=False)}\n'.encode('utf-8'),
+                             'text/event-stream')
+            return 200
+
+        self._start_stream('text/event-stream')
+        for piece in self._split_answer(answer):
+            self._write_chunk(f'data:{json.dumps(dict(event, answer=piece), ensure_ascii=False)}\n\n'.encode('utf-8'))
+            self._stream_pause()
+        end = {'event': 'message_end', 'task_id': event['task_id'], 'id': event['id'],
+               'conversation_id': event['conversation_id']}
+        self._write_chunk(f'data:{json.dumps(end)}\n\n'.encode('utf-8'))
+        self._end_stream()
+        return 200
+
+    # ------------------------------------------------------------------
+    # Ollama
+    # ------------------------------------------------------------------
+
+    def _handle_ollama(self, body: Dict[str, Any], request_no: int, rng: random.Random) -> int:
+        messages = body.get('messages') or []
+        query = str(messages[-1].get('content', '')) if messages else ''
+        model = body.get('model') or self.server.config.model_name
+        answer = self.server.render_answer(query, model, request_no, rng)
+
+        def frame(content: str, done: bool) -> Dict[str, Any]:
+            data = {'model': model, 'created_at': datetime.now(timezone.utc).isoformat(),
+                    'message': {'role': 'assistant', 'content': content}, 'done': done}
+            if done:
+                data.update({'done_reason': 'stop', 'total_duration': 0, 'eval_count': len(answer)})
+            return data
+
+        if body.get('stream') is False:
+            self._send_json(200, frame(answer, True))
+            return 200
+
+        self._start_stream('application/x-ndjson')
+        for piece in self._split_answer(answer):
+            self._write_chunk((json.dumps(frame(piece, False), ensure_ascii=False) + '\n').encode('utf-8'))
+            self._stream_pause()
+        self._write_chunk((json.dumps(frame('', True)) + '\n').encode('utf-8'))
+        self._end_stream()
+        return 200
+
+
+def start_mock_gateway(config: Optional[MockGatewayConfig] = None, host: str = '127.0.0.1',
+                       port: int = 0) -> MockGatewayServer:
+    """
+    在后台线程启动模拟网关
+
+    Args:
+        config: 网关配置
+        host: 监听地址
+        port: 端口，0表示随机端口（通过 server.base_url 获取地址）
+
+    Returns:
+        MockGatewayServer: 服务对象，结束时调用 server.shutdown()
+    """
+    server = MockGatewayServer((host, port), config or MockGatewayConfig())
+    thread = threading.Thread(target=server.serve_forever, name='MockLLMGateway', daemon=True)
+    thread.start()
+    return server
+
+
+@contextmanager
+def mock_gateway(config: Optional[MockGatewayConfig] = None, host: str = '127.0.0.1', port: int = 0):
+    """以上下文管理器方式运行模拟网关，退出时自动关闭"""
+    server = start_mock_gateway(config, host, port)
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟大模型网关（Coze / HiAgent / Ollama）')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8089, help='监听端口')
+    parser.add_argument('--distribution', type=str, default='lognormal',
+                        choices=['fixed', 'uniform', 'exponential', 'lognormal'], help='延迟分布')
+    parser.add_argument('--latency-ms', type=float, default=800.0, help='延迟中位数（毫秒）')
+    parser.add_argument('--sigma', type=float, default=0.5, help='lognormal形状参数')
+    parser.add_argument('--min-ms', type=float, default=0.0, help='延迟下限（毫秒）')
+    parser.add_argument('--max-ms', type=float, default=60000.0, help='延迟上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500的概率')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='返回429的概率')
+    parser.add_argument('--max-concurrency', type=int, help='并发上限，超过返回429')
+    parser.add_argument('--answer', type=str, action='append', help='固定回答，可指定多次随机选择')
+    parser.add_argument('--answer-template', type=str, help='回答模板，如 "收到{query_len}字: {query}"')
+    parser.add_argument('--answers-file', type=str, help='回答文件（JSON数组）')
+    parser.add_argument('--chunk-chars', type=int, default=8, help='流式响应每块字符数')
+    parser.add_argument('--chunk-delay-ms', type=float, default=20.0, help='流式响应块间隔（毫秒）')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    args = parser.parse_args()
+
+    answers = list(args.answer or [])
+    if args.answers_file:
+        with open(args.answers_file, 'r', encoding='utf-8') as f:
+            answers.extend(json.load(f))
+
+    config = MockGatewayConfig(
+        latency=LatencyModel(args.distribution, args.latency_ms, args.sigma, args.min_ms, args.max_ms),
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_concurrency=args.max_concurrency,
+        answer_template=args.answer_template,
+        stream_chunk_chars=args.chunk_chars,
+        stream_chunk_delay_ms=args.chunk_delay_ms,
+        seed=args.seed,
+    )
+    if answers:
+        config.answers = answers
+
+    server = MockGatewayServer((args.host, args.port), config)
+    print(f"模拟网关已启动: {server.base_url}")
+    print(f"  Coze:    POST {server.base_url}{COZE_CHAT_PATH}")
+    print(f"  HiAgent: POST {server.base_url}/api/proxy/api/v1/create_conversation | chat_query")
+    print(f"  Ollama:  POST {server.base_url}{OLLAMA_CHAT_PATH}")
+    print(f"  统计:    GET  {server.base_url}/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n统计信息: {json.dumps(server.stats.snapshot(), ensure_ascii=False)}")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
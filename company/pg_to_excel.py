@@ -1,12 +1,16 @@
 import os
-import psycopg2
-import pandas as pd
 import argparse
 from datetime import datetime
 from db_connection import DatabaseConnection
+from salary_normalizer import render_salary_column
+from lazy_import import lazy_module
 
+# 只有列出表名/导出时才需要，--help 等不加载
+psycopg2 = lazy_module('psycopg2')
+pd = lazy_module('pandas')
 
-def backup_table_to_excel(table_name, fields=None, db_config=None, backup_dir=None):
+
+def backup_table_to_excel(table_name, fields=None, db_config=None, backup_dir=None, salary_fields=None):
     """
     从PostgreSQL数据库的指定表中查询指定字段的数据，并将结果保存到Excel文件中。
     
@@ -14,6 +18,7 @@ def backup_table_to_excel(table_name, fields=None, db_config=None, backup_dir=No
     :param fields: 要查询的字段列表，如果为None，则查询所有字段
     :param db_config: 数据库连接配置，字典格式，包含dbname, user, password, host, port
     :param backup_dir: 备份目录路径，如果为None，则使用当前目录下的'backup'目录
+    :param salary_fields: 需要转换为展示格式（面议、万元格式等）的薪资字段列表
     :return: 备份文件的路径
     """
     # 使用公共数据库连接类
@@ -65,6 +70,11 @@ def backup_table_to_excel(table_name, fields=None, db_config=None, backup_dir=No
         # 创建DataFrame
         df = pd.DataFrame(data, columns=fields)
         
+        # 整列转换薪资字段的展示格式
+        for salary_field in salary_fields or []:
+            if salary_field in df.columns:
+                df[salary_field] = render_salary_column(df[salary_field])
+        
         # 创建备份目录
         if not os.path.exists(backup_dir):
             os.makedirs(backup_dir)
@@ -94,7 +104,7 @@ def batch_backup_tables(tables_config, db_config=None, backup_dir=None):
     """
     批量备份多个表到Excel文件
     
-    :param tables_config: 表配置列表，每个元素是一个字典，包含'table_name'和可选的'fields'
+    :param tables_config: 表配置列表，每个元素是一个字典，包含'table_name'和可选的'fields'、'salary_fields'
     :param db_config: 数据库连接配置
     :param backup_dir: 备份目录路径
     :return: 备份文件路径列表
@@ -104,12 +114,14 @@ def batch_backup_tables(tables_config, db_config=None, backup_dir=None):
     for config in tables_config:
         table_name = config['table_name']
         fields = config.get('fields', None)  # 如果没有指定fields，则为None
+        salary_fields = config.get('salary_fields', None)
         
         backup_file = backup_table_to_excel(
             table_name=table_name,
             fields=fields,
             db_config=db_config,
-            backup_dir=backup_dir
+            backup_dir=backup_dir,
+            salary_fields=salary_fields
         )
         
         if backup_file:
@@ -177,10 +189,11 @@ def get_all_tables(db_config=None):
         return []
 
 
-def parse_arguments():
+def parse_arguments(argv=None):
     """
     解析命令行参数
     
+    :param argv: 参数列表，默认读取 sys.argv
     :return: 解析后的参数
     """
     parser = argparse.ArgumentParser(description='从PostgreSQL数据库备份表数据到Excel文件')
@@ -188,6 +201,7 @@ def parse_arguments():
     # 添加参数
     parser.add_argument('--table', '-t', type=str, help='要备份的表名')
     parser.add_argument('--fields', '-f', type=str, help='要备份的字段，用逗号分隔')
+    parser.add_argument('--salary-fields', type=str, help='需要转换为展示格式的薪资字段，用逗号分隔')
     parser.add_argument('--dbname', type=str, help='数据库名称')
     parser.add_argument('--user', type=str, help='数据库用户名')
     parser.add_argument('--password', type=str, help='数据库密码')
@@ -197,14 +211,16 @@ def parse_arguments():
     parser.add_argument('--list-tables', '-l', action='store_true', help='列出所有表名')
     parser.add_argument('--config-file', '-c', type=str, help='批量备份配置文件路径（JSON格式）')
     
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
-def main():
+def main(argv=None):
     """
     主函数，处理命令行参数并执行相应的操作
+    
+    :param argv: 参数列表，默认读取 sys.argv
     """
-    args = parse_arguments()
+    args = parse_arguments(argv)
     
     # 构建数据库配置
     db_config = {}
@@ -255,12 +271,16 @@ def main():
         fields = None
         if args.fields:
             fields = [field.strip() for field in args.fields.split(',')]
+        salary_fields = None
+        if args.salary_fields:
+            salary_fields = [field.strip() for field in args.salary_fields.split(',')]
         
         backup_table_to_excel(
             table_name=args.table,
             fields=fields,
             db_config=db_config,
-            backup_dir=args.backup_dir
+            backup_dir=args.backup_dir,
+            salary_fields=salary_fields
         )
         return
     
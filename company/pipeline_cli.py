@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据处理流水线统一命令行入口
+
+各子命令只在执行时导入对应的处理模块，pandas、requests、psycopg2 等重量级依赖不会在
+--help 或其他子命令中加载。处理模块本身也按需导入只在个别函数中使用的依赖（见 lazy_import.py）。
+
+用法：
+    python pipeline_cli.py resume                       # 智联简历去重/清洗（ZhilianResumeProcessor）
+    python pipeline_cli.py resume --id 12345            # 只处理单个简历
+    python pipeline_cli.py resume --legacy              # resume_process 多线程简历字段过滤
+    python pipeline_cli.py job --workers 20             # 岗位描述生成（JobProcessor）
+    python pipeline_cli.py job --stats                  # 只输出处理统计
+    python pipeline_cli.py job --filter-only            # job_process 岗位字段过滤
+    python pipeline_cli.py compare --limit 1000         # 岗位JSON与描述文本比对
+    python pipeline_cli.py sync --tables t_service_info # PostgreSQL与Oracle表同步
+    python pipeline_cli.py export -- --table zhilian_job --backup-dir backup   # 备份表到Excel
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+for _path in (BASE_DIR, os.path.join(BASE_DIR, 'resume'), os.path.join(BASE_DIR, 'job')):
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+
+def run_resume(args) -> int:
+    """简历处理"""
+    if args.legacy:
+        from resume_process import process_resumes_multithreaded
+        process_resumes_multithreaded(num_threads=args.threads or 7)
+        return 0
+
+    from zhilian_resume_processor import ZhilianResumeProcessor, ZhilianResumeProcessorConfig
+    config = ZhilianResumeProcessorConfig()
+    if args.threads:
+        config.num_threads = args.threads
+    if args.batch_size:
+        config.batch_size = args.batch_size
+    if args.train_type:
+        config.train_type = args.train_type
+    processor = ZhilianResumeProcessor(config)
+
+    if args.id is not None:
+        result = processor.process_single_resume_by_id(args.id)
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+        return 0 if result.get('success') else 1
+
+    processor.start_processing()
+    return 0
+
+
+def run_job(args) -> int:
+    """岗位处理"""
+    if args.filter_only:
+        from job_process import process_jobs
+        process_jobs()
+        return 0
+
+    from multithread_job_processor import JobProcessor, JobProcessorConfig
+    config = JobProcessorConfig()
+    if args.workers:
+        config.max_workers = args.workers
+    if args.batch_size:
+        config.batch_size = args.batch_size
+    if args.max_retries:
+        config.max_retries = args.max_retries
+    processor = JobProcessor(config)
+
+    stats = processor.get_processing_stats()
+    if stats:
+        print(json.dumps(stats, ensure_ascii=False, indent=2, default=str))
+    if args.stats:
+        return 0
+
+    start_time = time.time()
+    processor.start_processing()
+    stats = processor.get_processing_stats()
+    if stats:
+        print(json.dumps(stats, ensure_ascii=False, indent=2, default=str))
+    print(f"总处理时间: {time.time() - start_time:.2f} 秒")
+    return 0
+
+
+def run_compare(args) -> int:
+    """岗位JSON与描述文本比对"""
+    from job_compare import compare_job_data, compare_job_data_single_thread
+    if args.single_thread:
+        compare_job_data_single_thread(limit=args.limit)
+    else:
+        compare_job_data(limit=args.limit, max_workers=args.workers)
+    return 0
+
+
+def run_sync(args) -> int:
+    """PostgreSQL与Oracle表同步"""
+    import data_syn
+    source, target = ('postgresql', 'oracle') if args.direction == 'pg2ora' else ('oracle', 'postgresql')
+    tables = [name.strip() for name in args.tables.split(',')] if args.tables else None
+    data_syn.main(tables, source_db_type=source, target_db_type=target)
+    return 0
+
+
+def run_export(args) -> int:
+    """备份表到Excel，参数原样交给 pg_to_excel"""
+    import pg_to_excel
+    argv = args.export_args[1:] if args.export_args[:1] == ['--'] else args.export_args
+    pg_to_excel.main(argv)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行解析器"""
+    parser = argparse.ArgumentParser(description='数据处理流水线统一入口')
+    parser.add_argument('--log-level', default='INFO', help='日志级别')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    resume_parser = subparsers.add_parser('resume', help='简历处理')
+    resume_parser.add_argument('--id', type=int, help='只处理指定ID的简历')
+    resume_parser.add_argument('--threads', type=int, help='线程数')
+    resume_parser.add_argument('--batch-size', type=int, help='每批处理的数据量')
+    resume_parser.add_argument('--train-type', type=str, help='训练类型过滤条件')
+    resume_parser.add_argument('--legacy', action='store_true', help='运行 resume_process 的简历字段过滤')
+    resume_parser.set_defaults(handler=run_resume)
+
+    job_parser = subparsers.add_parser('job', help='岗位描述生成')
+    job_parser.add_argument('--workers', type=int, help='线程数')
+    job_parser.add_argument('--batch-size', type=int, help='批次大小')
+    job_parser.add_argument('--max-retries', type=int, help='最大重试次数')
+    job_parser.add_argument('--stats', action='store_true', help='只输出处理统计，不处理数据')
+    job_parser.add_argument('--filter-only', action='store_true', help='运行 job_process 的岗位字段过滤')
+    job_parser.set_defaults(handler=run_job)
+
+    compare_parser = subparsers.add_parser('compare', help='岗位JSON与描述文本比对')
+    compare_parser.add_argument('--limit', type=int, help='最多比对的记录数')
+    compare_parser.add_argument('--workers', type=int, default=4, help='线程数')
+    compare_parser.add_argument('--single-thread', action='store_true', help='单线程比对')
+    compare_parser.set_defaults(handler=run_compare)
+
+    sync_parser = subparsers.add_parser('sync', help='PostgreSQL与Oracle表同步')
+    sync_parser.add_argument('--tables', type=str, help='表名，用逗号分隔，默认使用 data_syn.table_names')
+    sync_parser.add_argument('--direction', choices=('pg2ora', 'ora2pg'), default='pg2ora', help='同步方向')
+    sync_parser.set_defaults(handler=run_sync)
+
+    export_parser = subparsers.add_parser('export', help='备份表到Excel（参数同 pg_to_excel.py）')
+    export_parser.add_argument('export_args', nargs=argparse.REMAINDER, help='传给 pg_to_excel 的参数')
+    export_parser.set_defaults(handler=run_export)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO),
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+处理器指标统计工具
+为各数据处理器（JobProcessor、ZhilianResumeProcessor、DatabaseProcessor、JobSummaryProcessor）
+提供统一的计数器、仪表和延迟直方图，按阶段统计耗时：
+
+- fetch: 从数据库获取/领取待处理数据
+- claim_wait: 等待领取数据的锁
+- parse: JSON解析
+- transform: 数据转换/清洗/翻译
+- api: 调用大模型接口
+- db_write: 写回数据库
+
+指标可以通过本地HTTP接口以Prometheus文本格式查看，处理结束后写出JSON汇总文件。
+
+使用示例：
+    metrics = ProcessorMetrics('job_processor')
+    server = start_metrics_server(9108)
+    with metrics.stage('api'):
+        ...
+    metrics.record_result('success')
+    metrics.write_summary('job_processor_metrics.json')
+    stop_metrics_server(server)
+"""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional, Tuple
+
+STAGES = ('fetch', 'claim_wait', 'parse', 'transform', 'api', 'db_write')
+
+# 秒，覆盖从毫秒级JSON处理到数十秒的大模型调用
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...],
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    """指标基类，按标签值分别保存数据"""
+
+    metric_type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> list:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list:
+        lines = self._header()
+        for key, value in sorted(self.samples().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    """可增可减的仪表（如正在处理的记录数、活跃线程数）"""
+
+    metric_type = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class _HistogramValue:
+    """单组标签的直方图数据"""
+
+    __slots__ = ('bucket_counts', 'count', 'sum', 'max')
+
+    def __init__(self, bucket_count: int):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Histogram(_Metric):
+    """延迟直方图（秒）"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = _HistogramValue(len(self.buckets))
+            data.bucket_counts[index] += 1
+            data.count += 1
+            data.sum += value
+            data.max = max(data.max, value)
+
+    def summarize(self, **labels) -> Optional[Dict[str, float]]:
+        """
+        汇总某组标签的统计值
+
+        Returns:
+            dict: count、sum、avg、max以及按分桶线性插值估算的p50/p95/p99，没有数据时返回None
+        """
+        with self._lock:
+            data = self._values.get(self._key(labels))
+            if data is None:
+                return None
+            bucket_counts = list(data.bucket_counts)
+            count, total, maximum = data.count, data.sum, data.max
+
+        summary = {'count': count, 'sum': round(total, 6), 'avg': round(total / count, 6), 'max': round(maximum, 6)}
+        for quantile in (0.5, 0.95, 0.99):
+            summary[f'p{int(quantile * 100)}'] = round(self._estimate_quantile(bucket_counts, count, maximum, quantile), 6)
+        return summary
+
+    def _estimate_quantile(self, bucket_counts: list, count: int, maximum: float, quantile: float) -> float:
+        rank = quantile * count
+        cumulative = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                upper = min(bound, maximum)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = bound
+        return maximum
+
+    def label_sets(self) -> list:
+        with self._lock:
+            return sorted(self._values)
+
+    def render(self) -> list:
+        lines = self._header()
+        with self._lock:
+            items = sorted((key, list(data.bucket_counts), data.count, data.sum) for key, data in self._values.items())
+        for key, bucket_counts, count, total in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，同名指标只创建一次，多个处理器可共享"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Iterable[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"指标 {name} 已注册为 {metric.metric_type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """以Prometheus文本格式输出全部指标"""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class ProcessorMetrics:
+    """
+    单个处理器的指标封装
+    所有处理器共用同一组指标，通过 processor 标签区分
+    """
+
+    def __init__(self, processor: str, registry: Optional[MetricsRegistry] = None):
+        self.processor = processor
+        self.registry = registry or REGISTRY
+        self.started_at = time.time()
+        self.stage_seconds = self.registry.histogram(
+            'processor_stage_duration_seconds', '各处理阶段耗时（秒）', ('processor', 'stage'))
+        self.stage_errors = self.registry.counter(
+            'processor_stage_errors_total', '各处理阶段异常次数', ('processor', 'stage'))
+        self.records = self.registry.counter(
+            'processor_records_total', '已处理记录数（按结果分类）', ('processor', 'status'))
+        self.in_flight = self.registry.gauge(
+            'processor_records_in_flight', '正在处理的记录数', ('processor',))
+        self.active_workers = self.registry.gauge(
+            'processor_active_workers', '活跃工作线程数', ('processor',))
+
+    @contextmanager
+    def stage(self, name: str):
+        """统计一个阶段的耗时，阶段内抛出异常时同时计入异常次数"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.stage_errors.inc(processor=self.processor, stage=name)
+            raise
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - start, processor=self.processor, stage=name)
+
+    def observe_stage(self, name: str, seconds: float):
+        """直接记录一个阶段的耗时（秒）"""
+        self.stage_seconds.observe(seconds, processor=self.processor, stage=name)
+
+    def observe_timer(self, timer):
+        """把 structured_logging.StageTimer 中记录的各阶段耗时（毫秒）计入直方图"""
+        for name, milliseconds in timer.durations.items():
+            self.observe_stage(name, milliseconds / 1000)
+
+    def record_result(self, status: str, count: int = 1):
+        """记录处理结果，status如 success / failed / error / skipped"""
+        self.records.inc(count, processor=self.processor, status=status)
+
+    @contextmanager
+    def track_record(self):
+        """统计正在处理的记录数"""
+        self.in_flight.inc(processor=self.processor)
+        try:
+            yield
+        finally:
+            self.in_flight.dec(processor=self.processor)
+
+    @contextmanager
+    def track_worker(self):
+        """统计活跃工作线程数"""
+        self.active_workers.inc(processor=self.processor)
+        try:
+            yield
+        finally:
+            self.active_workers.dec(processor=self.processor)
+
+    def summary(self) -> Dict[str, object]:
+        """
+        生成汇总信息
+
+        Returns:
+            dict: 各阶段耗时统计、结果计数、吞吐量，以及耗时占比最高的阶段（bottleneck_stage）
+        """
+        elapsed = time.time() - self.started_at
+        stages = {}
+        for key in self.stage_seconds.label_sets():
+            if key[0] == self.processor:
+                stages[key[1]] = self.stage_seconds.summarize(processor=self.processor, stage=key[1])
+        for key, value in self.stage_errors.samples().items():
+            if key[0] == self.processor and key[1] in stages:
+                stages[key[1]]['errors'] = int(value)
+
+        records = {key[1]: int(value) for key, value in self.records.samples().items() if key[0] == self.processor}
+        total_records = sum(records.values())
+        busiest = max(stages, key=lambda name: stages[name]['sum']) if stages else None
+        return {
+            'processor': self.processor,
+            'elapsed_seconds': round(elapsed, 3),
+            'records': records,
+            'records_per_second': round(total_records / elapsed, 3) if elapsed > 0 else None,
+            'stages': stages,
+            'bottleneck_stage': busiest,
+        }
+
+    def write_summary(self, path: str) -> Dict[str, object]:
+        """将汇总信息写入JSON文件并返回"""
+        summary = self.summary()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1',
+                         registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """
+    在后台线程启动指标HTTP服务，GET /metrics 返回Prometheus文本格式
+
+    Args:
+        port: 监听端口，0表示随机端口（可通过 server.server_address 获取）
+        host: 监听地址，默认只监听本机
+        registry: 指标注册表，默认使用全局注册表
+
+    Returns:
+        ThreadingHTTPServer: 服务对象，结束时调用 stop_metrics_server(server)
+    """
+    registry = registry or REGISTRY
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='MetricsServer', daemon=True)
+    thread.start()
+    return server
+
+
+def stop_metrics_server(server: Optional[ThreadingHTTPServer]):
+    """停止指标HTTP服务并关闭监听socket，server为None时什么都不做"""
+    if server is None:
+        return
+    server.shutdown()
+    server.server_close()
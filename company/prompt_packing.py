@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+多记录提示词打包
+很多 processed_info 很短，每条记录单独调用一次智能体时，请求本身的开销（排队、建连、
+系统提示词）远大于有效内容。打包模式把若干条记录按token预算拼成一个提示词，
+每条记录用带ID的分隔符包裹，要求智能体按同样的分隔符逐条输出结果，
+再按ID拆分、校验回各条记录；校验不通过的记录回退为单条调用。
+
+分隔符格式：
+    <<<RECORD id=123>>>
+    ...记录内容...
+    <<<END id=123>>>
+
+智能体输出格式：
+    <<<RESULT id=123>>>
+    ...该记录的结果...
+    <<<END id=123>>>
+
+使用示例：
+    for batch in pack_records(rows, max_tokens=3000, max_records=5):
+        prompt = build_packed_prompt(batch)
+        answer = call_agent(prompt)
+        results, failed_ids = split_packed_answer(answer, [record_id for record_id, _ in batch])
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Record = Tuple[object, str]
+
+DEFAULT_INSTRUCTION = (
+    "以下共有 {count} 条数据，每条以 <<<RECORD id=编号>>> 开始、以 <<<END id=编号>>> 结束。\n"
+    "请按照你的任务要求分别独立处理每一条数据，不要合并或遗漏。\n"
+    "输出时每条结果以 <<<RESULT id=编号>>> 开始、以 <<<END id=编号>>> 结束，编号与输入一致，"
+    "分隔符之外不要输出其他内容。"
+)
+
+# 单条记录分隔符和说明文字的大致token开销
+RECORD_OVERHEAD_TOKENS = 16
+INSTRUCTION_OVERHEAD_TOKENS = 120
+
+_CJK_PATTERN = re.compile(r'[　-〿㐀-䶿一-鿿＀-￯]')
+_RESULT_PATTERN = re.compile(r'<<<RESULT id=([^>\s]+)>>>\s*(.*?)\s*<<<END id=\1>>>', re.S)
+_MARKER_PATTERN = re.compile(r'<<<(?:RECORD|RESULT|END) id=')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数：中文字符（含全角标点）按1个token计，其余字符按4个一token计
+
+    Args:
+        text: 文本
+
+    Returns:
+        int: 估算的token数
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def pack_records(records: Iterable[Record], max_tokens: int = 3000, max_records: int = 5,
+                 token_counter: Callable[[str], int] = estimate_tokens) -> List[List[Record]]:
+    """
+    按顺序把记录分组，每组的估算token数不超过 max_tokens、条数不超过 max_records
+
+    单条就超过预算的记录单独成组（按单条调用处理）。
+
+    Args:
+        records: (记录ID, 内容) 列表
+        max_tokens: 每个打包提示词的token预算（含说明文字和分隔符）
+        max_records: 每组最多记录数
+        token_counter: token计数函数
+
+    Returns:
+        List[List[Record]]: 分组结果
+    """
+    batches: List[List[Record]] = []
+    current: List[Record] = []
+    used = INSTRUCTION_OVERHEAD_TOKENS
+    for record_id, text in records:
+        cost = token_counter(text or '') + RECORD_OVERHEAD_TOKENS
+        if current and (used + cost > max_tokens or len(current) >= max_records):
+            batches.append(current)
+            current, used = [], INSTRUCTION_OVERHEAD_TOKENS
+        current.append((record_id, text))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_packed_prompt(batch: Sequence[Record], instruction: str = DEFAULT_INSTRUCTION) -> str:
+    """
+    拼接打包提示词
+
+    Args:
+        batch: 一组 (记录ID, 内容)
+        instruction: 说明文字，可使用 {count} 占位符
+
+    Returns:
+        str: 提示词
+    """
+    parts = [instruction.format(count=len(batch))]
+    for record_id, text in batch:
+        parts.append(f'<<<RECORD id={record_id}>>>\n{text}\n<<<END id={record_id}>>>')
+    return '\n\n'.join(parts)
+
+
+def split_packed_answer(answer: str, expected_ids: Sequence[object],
+                        validator: Optional[Callable[[str], bool]] = None) -> Tuple[Dict[object, str], List[object]]:
+    """
+    按ID拆分智能体的打包回答并逐条校验
+
+    以下情况视为该记录校验失败：没有对应结果、同一ID出现多次、结果为空、
+    结果中残留分隔符（说明输出串位），或 validator 返回False。
+
+    Args:
+        answer: 智能体回答
+        expected_ids: 本组记录ID（保持原始类型，按字符串匹配）
+        validator: 额外的结果校验函数
+
+    Returns:
+        Tuple[Dict[object, str], List[object]]: (通过校验的 记录ID -> 结果, 需要回退单条处理的记录ID)
+    """
+    found: Dict[str, List[str]] = {}
+    for record_id, content in _RESULT_PATTERN.findall(answer or ''):
+        found.setdefault(record_id, []).append(content)
+
+    results: Dict[object, str] = {}
+    failed: List[object] = []
+    for record_id in expected_ids:
+        contents = found.get(str(record_id), [])
+        content = contents[0] if len(contents) == 1 else ''
+        if (not content or _MARKER_PATTERN.search(content)
+                or (validator is not None and not validator(content))):
+            failed.append(record_id)
+        else:
+            results[record_id] = content
+    return results, failed
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+处理流水线中的紧凑记录类型与按线程累加的统计
+
+每个工作线程同时持有上千条待处理记录。用 __slots__ 记录类型代替字典后，实例没有
+__dict__，单条记录只占固定的几个槽位。为兼容原来按元组处理记录的代码，记录类型支持
+解包、len() 和下标访问，并且可以与同内容的元组比较相等。
+
+ThreadLocalStats 替代多线程共享的 self.stats 字典：每个线程只累加自己的计数（不加锁），
+读取时再把各线程的计数合并。
+
+使用示例：
+    rows = JobRecord.from_rows(cursor.fetchall())
+    for record_id, processed_info in rows:
+        ...
+    stats = ThreadLocalStats(('processed', 'errors'))
+    stats.inc('processed')
+    stats.merged()  # {'processed': 1, 'errors': 0}
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+class SlottedRecord:
+    """
+    __slots__ 记录类型的基类，子类在 __slots__ 中按元组顺序声明字段
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence]) -> List['SlottedRecord']:
+        """把数据库查询结果（元组列表）转换为记录列表"""
+        return [cls(*row) for row in rows]
+
+    def as_tuple(self) -> tuple:
+        """按字段顺序转换为元组"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __getitem__(self, index):
+        return self.as_tuple()[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (SlottedRecord, tuple)):
+            return self.as_tuple() == tuple(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.as_tuple())
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{self.__class__.__name__}({fields})'
+
+
+class JobRecord(SlottedRecord):
+    """待处理岗位：(id, processed_info)"""
+
+    __slots__ = ('id', 'processed_info')
+
+    def __init__(self, id: int, processed_info: Optional[str]):
+        self.id = id
+        self.processed_info = processed_info
+
+
+class JobSummaryRecord(SlottedRecord):
+    """待替换jobSummary的岗位：(id, processed_info, processed_jobsummary)"""
+
+    __slots__ = ('id', 'processed_info', 'processed_jobsummary')
+
+    def __init__(self, id: int, processed_info: Optional[str], processed_jobsummary: Optional[str]):
+        self.id = id
+        self.processed_info = processed_info
+        self.processed_jobsummary = processed_jobsummary
+
+
+class ResumeRecord(SlottedRecord):
+    """待处理简历：(id, resume_processed_info)"""
+
+    __slots__ = ('id', 'resume_processed_info')
+
+    def __init__(self, id: int, resume_processed_info: Any):
+        self.id = id
+        self.resume_processed_info = resume_processed_info
+
+
+class UpdateResult(SlottedRecord):
+    """待写回的单列更新：(id, value)"""
+
+    __slots__ = ('id', 'value')
+
+    def __init__(self, id: int, value: Any):
+        self.id = id
+        self.value = value
+
+
+class JobResult(SlottedRecord):
+    """
+    智能体处理岗位的结果，字段与 JobProcessor.update_result_to_db 的参数一致
+    """
+
+    __slots__ = ('record_id', 'job_description_detail', 'bot_id', 'start_time', 'end_time',
+                 'elapsed_time', 'success')
+
+    def __init__(self, record_id: int, job_description_detail: str, bot_id: str, start_time: str,
+                 end_time: str, elapsed_time: float, success: bool):
+        self.record_id = record_id
+        self.job_description_detail = job_description_detail
+        self.bot_id = bot_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.elapsed_time = elapsed_time
+        self.success = success
+
+    def to_payload(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典（写入结果日志）"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> 'JobResult':
+        """从结果日志的字典还原"""
+        return cls(**payload)
+
+
+class ThreadLocalStats:
+    """
+    按线程累加的计数器
+
+    inc 只修改当前线程自己的计数列表，热路径上不加锁；每个线程第一次计数时登记一次（加锁）。
+    merged 把所有线程（包括已退出的线程）的计数相加，在处理结束后读取得到准确值，
+    处理过程中读取得到近似值。
+
+    Args:
+        fields: 计数项名称
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        self._index = {name: i for i, name in enumerate(self.fields)}
+        self._local = threading.local()
+        self._shards: List[List[int]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> List[int]:
+        shard = getattr(self._local, 'counts', None)
+        if shard is None:
+            shard = [0] * len(self.fields)
+            self._local.counts = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, amount: int = 1) -> int:
+        """
+        当前线程的计数项加 amount
+
+        Returns:
+            int: 当前线程该计数项的累计值
+        """
+        shard = self._shard()
+        index = self._index[name]
+        shard[index] += amount
+        return shard[index]
+
+    def merged(self) -> Dict[str, int]:
+        """合并所有线程的计数"""
+        with self._lock:
+            shards = list(self._shards)
+        return {name: sum(shard[i] for shard in shards) for i, name in enumerate(self.fields)}
+
+    def reset(self):
+        """所有线程的计数清零"""
+        with self._lock:
+            for shard in self._shards:
+                shard[:] = [0] * len(self.fields)
+
+    def __getitem__(self, name: str) -> int:
+        index = self._index[name]
+        with self._lock:
+            shards = list(self._shards)
+        return sum(shard[index] for shard in shards)
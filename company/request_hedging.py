@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+智能体请求对冲（hedged requests）
+少数慢请求决定了整批数据的完成时间。对冲在主请求超过“近期延迟的第N百分位”仍未返回时，
+向另一个Bot发送一份相同的请求，取先返回的有效结果：
+
+- 对冲延迟：最近 window 次有效响应耗时的 delay_percentile 分位数，限制在 [min_delay, max_delay]；
+  样本数不足 min_samples 时不对冲
+- 预算：每次主请求积累 budget_ratio 个令牌（最多 budget_burst 个），每次对冲消耗1个，
+  额外请求量长期不超过主请求的 budget_ratio 倍，下游整体变慢时不会因为对冲而雪崩
+- 取消：先返回有效结果后，另一份请求若还在排队则直接取消；已发出的HTTP请求无法中断，
+  在后台线程中执行完毕后丢弃结果（只用于更新Bot统计）
+- 落选上限：仍在执行的落选请求达到 max_losers 个时暂停对冲，直到有落选请求结束，
+  避免某个Bot整体变慢时落选请求占满线程池和该Bot的在途名额
+- 指标：对冲触发次数、对冲胜出次数、因预算不足或落选请求过多跳过的次数、当前对冲延迟、执行中的落选请求数
+
+使用示例：
+    hedger = RequestHedger(HedgePolicy(delay_percentile=0.9, budget_ratio=0.1))
+    result = hedger.call(
+        lambda cancel: call_api(primary_bot_id),
+        lambda cancel: call_api(balancer.acquire(exclude=[primary_bot_id])),
+        is_good=lambda value: value[1],
+    )
+    content, success = result.value
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from processing_metrics import MetricsRegistry, REGISTRY
+
+Attempt = Callable[[threading.Event], Any]
+
+
+@dataclass
+class HedgePolicy:
+    """
+    对冲策略
+
+    Attributes:
+        delay_percentile: 主请求超过近期耗时的该分位数后发出对冲
+        min_delay: 对冲延迟下限（秒）
+        max_delay: 对冲延迟上限（秒）
+        min_samples: 至少有多少个耗时样本才开始对冲
+        window: 计算分位数使用的最近样本数
+        budget_ratio: 对冲请求占主请求的最大比例
+        budget_burst: 令牌桶容量，允许短时间内集中对冲的次数
+        max_losers: 最多同时有多少个落选请求仍在执行，达到上限后不再对冲
+    """
+    delay_percentile: float = 0.95
+    min_delay: float = 1.0
+    max_delay: float = 60.0
+    min_samples: int = 20
+    window: int = 500
+    budget_ratio: float = 0.1
+    budget_burst: float = 10.0
+    max_losers: int = 10
+
+
+@dataclass
+class HedgeResult:
+    """
+    对冲调用结果
+
+    Attributes:
+        value: 胜出请求的返回值（两份请求都无效时为主请求的返回值）
+        winner: primary / hedge
+        hedged: 是否发出了对冲请求
+        elapsed: 总耗时（秒）
+    """
+    value: Any
+    winner: str
+    hedged: bool
+    elapsed: float
+
+
+class RequestHedger:
+    """
+    请求对冲执行器（线程安全），两份请求都在内部线程池中执行
+
+    Args:
+        policy: 对冲策略
+        max_workers: 内部线程池大小，一般为处理线程数的2倍加上 policy.max_losers
+        name: 名称，作为指标的 hedger 标签
+        registry: 指标注册表，默认使用全局 REGISTRY
+    """
+
+    def __init__(self, policy: Optional[HedgePolicy] = None, max_workers: int = 40,
+                 name: str = 'coze', registry: Optional[MetricsRegistry] = None):
+        self.policy = policy or HedgePolicy()
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{name}-hedge')
+        self._latencies = deque(maxlen=self.policy.window)
+        self._tokens = self.policy.budget_burst
+        self._losers = 0
+        self._lock = threading.Lock()
+
+        registry = registry or REGISTRY
+        self._calls = registry.counter('hedge_calls_total', '经过对冲执行器的请求数', ('hedger',))
+        self._fired = registry.counter('hedge_fired_total', '发出的对冲请求数', ('hedger',))
+        self._won = registry.counter('hedge_won_total', '对冲请求先于主请求返回有效结果的次数', ('hedger',))
+        self._skipped = registry.counter('hedge_skipped_total', '达到对冲延迟但未对冲的次数', ('hedger', 'reason'))
+        self._delay = registry.gauge('hedge_delay_seconds', '当前对冲延迟（秒）', ('hedger',))
+        self._losers_gauge = registry.gauge('hedge_losers_in_flight', '胜出方确定后仍在执行的落选请求数', ('hedger',))
+
+    # ------------------------------------------------------------------
+    # 延迟与预算
+    # ------------------------------------------------------------------
+
+    def record_latency(self, seconds: float):
+        """记录一次有效响应的耗时，用于计算对冲延迟"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def current_delay(self) -> Optional[float]:
+        """
+        计算当前对冲延迟
+
+        Returns:
+            float: 对冲延迟（秒），样本不足时返回None（不对冲）
+        """
+        with self._lock:
+            if len(self._latencies) < self.policy.min_samples:
+                return None
+            samples = sorted(self._latencies)
+        index = min(len(samples) - 1, max(0, math.ceil(self.policy.delay_percentile * len(samples)) - 1))
+        delay = min(self.policy.max_delay, max(self.policy.min_delay, samples[index]))
+        self._delay.set(delay, hedger=self.name)
+        return delay
+
+    def _deposit(self):
+        with self._lock:
+            self._tokens = min(self.policy.budget_burst, self._tokens + self.policy.budget_ratio)
+
+    def _withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _abandon(self, future: Future):
+        """记录一个已在执行、无法取消的落选请求，执行结束时自动减去"""
+        with self._lock:
+            self._losers += 1
+            self._losers_gauge.set(self._losers, hedger=self.name)
+        future.add_done_callback(self._loser_done)
+
+    def _loser_done(self, future: Future):
+        with self._lock:
+            self._losers -= 1
+            self._losers_gauge.set(self._losers, hedger=self.name)
+
+    def losers_in_flight(self) -> int:
+        """当前仍在执行的落选请求数"""
+        with self._lock:
+            return self._losers
+
+    # ------------------------------------------------------------------
+    # 执行
+    # ------------------------------------------------------------------
+
+    def _run(self, attempt: Attempt, cancel_event: threading.Event):
+        start = time.perf_counter()
+        value = attempt(cancel_event)
+        return value, time.perf_counter() - start
+
+    def call(self, primary: Attempt, hedge: Attempt, is_good: Callable[[Any], bool] = bool) -> HedgeResult:
+        """
+        执行主请求，超过对冲延迟仍未返回时发出对冲请求，返回先到的有效结果
+
+        Args:
+            primary: 主请求，参数为取消事件（胜出方确定后置位）
+            hedge: 对冲请求，参数同上，通常选择与主请求不同的Bot
+            is_good: 判断返回值是否有效，无效结果不会胜出
+
+        Returns:
+            HedgeResult: 调用结果；任一请求抛出异常且没有有效结果时重新抛出主请求的异常
+        """
+        start = time.perf_counter()
+        self._calls.inc(hedger=self.name)
+        self._deposit()
+
+        primary_cancel = threading.Event()
+        primary_future = self._executor.submit(self._run, primary, primary_cancel)
+        delay = self.current_delay()
+        if delay is None:
+            return self._finish(primary_future, start, is_good)
+
+        done, _ = wait([primary_future], timeout=delay)
+        if done:
+            return self._finish(primary_future, start, is_good)
+        if self.losers_in_flight() >= self.policy.max_losers:
+            self._skipped.inc(hedger=self.name, reason='losers')
+            return self._finish(primary_future, start, is_good)
+        if not self._withdraw():
+            self._skipped.inc(hedger=self.name, reason='budget')
+            return self._finish(primary_future, start, is_good)
+
+        self._fired.inc(hedger=self.name)
+        hedge_cancel = threading.Event()
+        hedge_future = self._executor.submit(self._run, hedge, hedge_cancel)
+        attempts = {primary_future: ('primary', primary_cancel), hedge_future: ('hedge', hedge_cancel)}
+
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and is_good(future.result()[0]):
+                    winner, _ = attempts[future]
+                    for other in pending:
+                        attempts[other][1].set()
+                        if not other.cancel():
+                            self._abandon(other)
+                    if winner == 'hedge':
+                        self._won.inc(hedger=self.name)
+                    value, seconds = future.result()
+                    self.record_latency(seconds)
+                    return HedgeResult(value, winner, True, time.perf_counter() - start)
+
+        # 两份请求都没有有效结果，按主请求的结果返回
+        value, _ = primary_future.result()
+        return HedgeResult(value, 'primary', True, time.perf_counter() - start)
+
+    def _finish(self, future: Future, start: float, is_good: Callable[[Any], bool]) -> HedgeResult:
+        value, seconds = future.result()
+        if is_good(value):
+            self.record_latency(seconds)
+        return HedgeResult(value, 'primary', False, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        汇总对冲统计
+
+        Returns:
+            dict: 请求数、对冲次数、对冲胜出次数、对冲比例、预算跳过次数、落选请求过多跳过次数、
+                  执行中的落选请求数、当前对冲延迟
+        """
+        calls = int(self._calls.get(hedger=self.name))
+        fired = int(self._fired.get(hedger=self.name))
+        return {
+            'calls': calls,
+            'hedges_fired': fired,
+            'hedges_won': int(self._won.get(hedger=self.name)),
+            'hedge_rate': round(fired / calls, 4) if calls else None,
+            'skipped_budget': int(self._skipped.get(hedger=self.name, reason='budget')),
+            'skipped_losers': int(self._skipped.get(hedger=self.name, reason='losers')),
+            'losers_in_flight': self.losers_in_flight(),
+            'delay_seconds': self.current_delay(),
+        }
+
+    def close(self):
+        """关闭内部线程池，不等待仍在执行的落选请求"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+智能体结果本地预写日志（write-ahead journal）
+调用智能体拿到结果后先写入本地SQLite日志（WAL模式，synchronous=FULL，每次提交都fsync），
+再由后台回放线程批量写回PostgreSQL。数据库短暂不可用时结果不会丢失，进程重启后继续回放。
+
+- 追加：ResultJournal.append(key, payload)，key 用于去重（同一记录多次写入时只回放最新一条）
+- 回放：JournalReplayer 在后台按 batch_size 批量调用 flush_batch，成功后标记为已回放；
+  批量失败时逐条重试，失败的条目累计失败次数，超过 max_attempts 标记为 dead 并记录日志，不再回放；
+  全部失败时用 is_available 检查数据库：不可用则不计失败次数，指数退避后重试，
+  可用则说明整批都是问题条目，照常累计失败次数（未提供 is_available 时累计失败次数并退避）
+- 重启：新进程打开同一个日志文件即可继续回放上次未完成的条目
+
+使用示例：
+    journal = ResultJournal('job_processor_journal.db')
+    replayer = JournalReplayer(journal, flush_batch=bulk_update, flush_one=update_one)
+    replayer.start()
+    journal.append(str(record_id), {'record_id': record_id, 'result': text})
+    replayer.notify()
+    ...
+    replayer.stop()
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from processing_metrics import MetricsRegistry, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+FLUSHED = 'flushed'
+SUPERSEDED = 'superseded'
+DEAD = 'dead'
+
+
+class JournalEntry(NamedTuple):
+    """日志条目"""
+    seq: int
+    key: str
+    payload: Dict
+    created_at: float
+    attempts: int
+
+
+class ResultJournal:
+    """
+    基于SQLite WAL的追加式结果日志（线程安全）
+
+    Args:
+        path: 日志文件路径
+        synchronous: SQLite同步级别，FULL 保证每次提交落盘，NORMAL 在断电时可能丢失最近的提交
+    """
+
+    def __init__(self, path: str, synchronous: str = 'FULL'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f'PRAGMA synchronous={synchronous}')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                flushed_at REAL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_journal_status ON journal (status, seq)')
+
+    def append(self, key: str, payload: Dict) -> int:
+        """
+        追加一条结果，返回前已落盘
+
+        Args:
+            key: 去重键（如记录ID）
+            payload: 结果内容，需可JSON序列化
+
+        Returns:
+            int: 条目序号
+        """
+        data = json.dumps(payload, ensure_ascii=False)
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO journal (key, payload, created_at) VALUES (?, ?, ?)',
+                (str(key), data, time.time()))
+            return cursor.lastrowid
+
+    def pending(self, limit: int = 500) -> List[JournalEntry]:
+        """
+        取出待回放的条目，同一 key 只保留最新一条，较早的条目标记为 superseded
+
+        Args:
+            limit: 最多返回条数
+
+        Returns:
+            List[JournalEntry]: 按序号排列的待回放条目
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute("""
+                    UPDATE journal SET status = ?, flushed_at = ?
+                    WHERE status = ? AND seq NOT IN (
+                        SELECT MAX(seq) FROM journal WHERE status = ? GROUP BY key
+                    )
+                """, (SUPERSEDED, time.time(), PENDING, PENDING))
+                rows = self._conn.execute(
+                    'SELECT seq, key, payload, created_at, attempts FROM journal '
+                    'WHERE status = ? ORDER BY seq LIMIT ?', (PENDING, limit)).fetchall()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [JournalEntry(seq, key, json.loads(payload), created_at, attempts)
+                for seq, key, payload, created_at, attempts in rows]
+
+    def mark_flushed(self, seqs: Sequence[int]):
+        """标记条目已写回数据库"""
+        self._set_status(seqs, FLUSHED)
+
+    def mark_failed(self, seqs: Sequence[int], max_attempts: int) -> List[int]:
+        """
+        累计条目的失败次数，超过 max_attempts 的标记为 dead
+
+        Returns:
+            List[int]: 本次被标记为 dead 的序号
+        """
+        if not seqs:
+            return []
+        placeholders = ','.join('?' * len(seqs))
+        with self._lock:
+            self._conn.execute(f'UPDATE journal SET attempts = attempts + 1 WHERE seq IN ({placeholders})', list(seqs))
+            dead = [row[0] for row in self._conn.execute(
+                f'SELECT seq FROM journal WHERE seq IN ({placeholders}) AND attempts >= ?',
+                list(seqs) + [max_attempts])]
+        self._set_status(dead, DEAD)
+        return dead
+
+    def _set_status(self, seqs: Sequence[int], status: str):
+        if not seqs:
+            return
+        placeholders = ','.join('?' * len(seqs))
+        with self._lock:
+            self._conn.execute(f'UPDATE journal SET status = ?, flushed_at = ? WHERE seq IN ({placeholders})',
+                               [status, time.time()] + list(seqs))
+
+    def compact(self, keep_seconds: float = 86400.0) -> int:
+        """删除回放完成超过 keep_seconds 的条目（dead 条目保留以便人工处理），返回删除条数"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM journal WHERE status IN (?, ?) AND flushed_at < ?',
+                (FLUSHED, SUPERSEDED, time.time() - keep_seconds))
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """按状态统计条目数"""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM journal GROUP BY status').fetchall()
+        counts = {PENDING: 0, FLUSHED: 0, SUPERSEDED: 0, DEAD: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            self._conn.close()
+
+
+class JournalReplayer:
+    """
+    后台回放线程，把日志中的待回放条目批量写回数据库
+
+    Args:
+        journal: 结果日志
+        flush_batch: 批量写回函数，失败时抛出异常
+        flush_one: 单条写回函数，返回是否成功；批量失败时用于逐条定位问题条目
+        is_available: 检查数据库是否可用，逐条回放全部失败时用于区分数据库不可用和整批问题条目
+        batch_size: 每批回放条数
+        interval: 没有新条目时的轮询间隔（秒）
+        max_attempts: 单条目最多失败次数
+        max_backoff: 数据库不可用时的最大退避时间（秒）
+        compact_after: 回放完成的条目保留多久后删除（秒）
+        name: 名称，作为指标的 journal 标签
+        registry: 指标注册表，默认使用全局 REGISTRY
+    """
+
+    def __init__(self, journal: ResultJournal, flush_batch: Callable[[List[JournalEntry]], None],
+                 flush_one: Optional[Callable[[JournalEntry], bool]] = None, batch_size: int = 200,
+                 interval: float = 1.0, max_attempts: int = 10, max_backoff: float = 60.0,
+                 compact_after: float = 86400.0, name: str = 'results',
+                 registry: Optional[MetricsRegistry] = None,
+                 is_available: Optional[Callable[[], bool]] = None):
+        self.journal = journal
+        self.flush_batch = flush_batch
+        self.flush_one = flush_one
+        self.is_available = is_available
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.compact_after = compact_after
+        self.name = name
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._failures = 0
+
+        registry = registry or REGISTRY
+        self._entries = registry.counter(
+            'journal_entries_total', '结果日志条目数（按回放结果分类）', ('journal', 'status'))
+        self._pending = registry.gauge('journal_pending_entries', '待回放条目数', ('journal',))
+        self._flush_seconds = registry.histogram('journal_flush_duration_seconds', '每批回放耗时（秒）', ('journal',))
+        self._flush_errors = registry.counter('journal_flush_errors_total', '批量回放失败次数', ('journal',))
+
+    def notify(self):
+        """有新条目时唤醒回放线程，攒够一批或到达轮询间隔时写回"""
+        self._entries.inc(journal=self.name, status='appended')
+        self._wakeup.set()
+
+    def start(self):
+        """启动回放线程，先回放上次运行遗留的条目；已启动时不做任何事，可重复调用"""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-journal-replayer', daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True, timeout: float = 30.0):
+        """停止回放线程，flush=True 时在退出前尽量回放完剩余条目"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        self._wakeup.set()
+        if thread is not None:
+            thread.join(timeout)
+        if flush:
+            try:
+                while self.flush_now():
+                    pass
+            except Exception as e:
+                logger.warning(f"退出前回放结果日志失败，剩余条目保留在 {self.journal.path}，下次启动时回放: {e}")
+        self._pending.set(self.journal.counts()[PENDING], journal=self.name)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                flushed = self.flush_now()
+            except Exception as e:
+                flushed = 0
+                self._failures += 1
+                backoff = min(self.max_backoff, self.interval * 2 ** min(self._failures, 10))
+                logger.warning(f"结果日志回放失败（第{self._failures}次），{backoff:.1f}秒后重试: {e}")
+                self._stop.wait(backoff)
+                continue
+            self._failures = 0
+            if flushed < self.batch_size:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+        if self.compact_after is not None:
+            self.journal.compact(self.compact_after)
+
+    def flush_now(self) -> int:
+        """
+        回放一批条目
+
+        Returns:
+            int: 本批取出的条目数（0表示没有待回放条目）
+
+        Raises:
+            Exception: 批量和逐条写回都失败，且数据库不可用或无法判断
+        """
+        with self._flush_lock:
+            entries = self.journal.pending(self.batch_size)
+            if not entries:
+                self._pending.set(0, journal=self.name)
+                return 0
+
+            start = time.perf_counter()
+            try:
+                self.flush_batch(entries)
+            except Exception as e:
+                self._flush_errors.inc(journal=self.name)
+                if self.flush_one is None:
+                    raise
+                logger.warning(f"批量回放 {len(entries)} 条失败，改为逐条回放: {e}")
+                self._flush_individually(entries)
+            else:
+                self.journal.mark_flushed([entry.seq for entry in entries])
+                self._entries.inc(len(entries), journal=self.name, status=FLUSHED)
+            finally:
+                self._flush_seconds.observe(time.perf_counter() - start, journal=self.name)
+            self._pending.set(self.journal.counts()[PENDING], journal=self.name)
+            return len(entries)
+
+    def _flush_individually(self, entries: List[JournalEntry]):
+        flushed, failed = [], []
+        for entry in entries:
+            try:
+                ok = self.flush_one(entry)
+            except Exception as e:
+                logger.warning(f"回放条目 {entry.key} 失败: {e}")
+                ok = False
+            (flushed if ok else failed).append(entry.seq)
+
+        available = None
+        if not flushed:
+            available = self._database_available()
+            if available is False:
+                raise RuntimeError(f"{len(entries)} 条结果全部回放失败，数据库不可用")
+        self.journal.mark_flushed(flushed)
+        self._entries.inc(len(flushed), journal=self.name, status=FLUSHED)
+        dead = self.journal.mark_failed(failed, self.max_attempts)
+        if dead:
+            self._entries.inc(len(dead), journal=self.name, status=DEAD)
+            logger.error(f"结果日志条目 {dead} 超过最大重试次数，已标记为dead，需要人工处理")
+        if available is None and not flushed:
+            # 无法判断数据库是否可用：已累计失败次数，整批问题条目最终会标记为dead，同时退避重试
+            raise RuntimeError(f"{len(entries)} 条结果全部回放失败，数据库可能不可用")
+
+    def _database_available(self) -> Optional[bool]:
+        """返回数据库是否可用，未提供 is_available 时返回None"""
+        if self.is_available is None:
+            return None
+        try:
+            return bool(self.is_available())
+        except Exception as e:
+            logger.warning(f"检查数据库是否可用失败: {e}")
+            return False
@@ -23,6 +23,7 @@ from typing import List, Tuple, Optional, Dict, Any
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from db_connection import get_db_connection, close_db_connection
+from structured_logging import setup_queue_logging
 
 
 class ResumeProcessorConfig:
@@ -42,6 +43,7 @@ class ResumeProcessorConfig:
         # 日志配置
         self.log_level = logging.INFO
         self.log_file = 'resume_processor.log'
+        self.structured_log_file = None  # JSON Lines日志路径，None表示不输出
 
 
 class ResumeProcessor:
@@ -60,32 +62,14 @@ class ResumeProcessor:
         self.logger.info(f"配置: {self.config.max_workers}线程, {self.config.batch_size}批次大小")
     
     def _setup_logging(self):
-        """设置日志"""
-        self.logger = logging.getLogger('ResumeProcessor')
-        self.logger.setLevel(self.config.log_level)
-        
-        # 避免重复添加handler
-        if not self.logger.handlers:
-            # 文件handler
-            file_handler = logging.FileHandler(
-                self.config.log_file, 
-                encoding='utf-8'
-            )
-            file_handler.setLevel(self.config.log_level)
-            
-            # 控制台handler
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(self.config.log_level)
-            
-            # 格式化
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-            )
-            file_handler.setFormatter(formatter)
-            console_handler.setFormatter(formatter)
-            
-            self.logger.addHandler(file_handler)
-            self.logger.addHandler(console_handler)
+        """设置日志（后台线程写日志，避免多线程争用文件/控制台handler）"""
+        self.logger = setup_queue_logging(
+            'ResumeProcessor',
+            log_file=self.config.log_file,
+            level=self.config.log_level,
+            json_log_file=self.config.structured_log_file,
+            console_format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
     
     def get_connection(self):
         """获取数据库连接"""
@@ -15,6 +15,7 @@ import random
 
 import psycopg2
 from db_connection import get_db_connection, close_db_connection
+from hiagent_conversation_pool import create_script_pool
 
 # 创建 logger 对象
 logger = logging.getLogger()
@@ -39,6 +40,8 @@ logger.addHandler(console_handler)
 
 counter = 0
 
+conversation_pool = create_script_pool(api_key='d13tc102gkoadkll1qgg', user_prefix='Resume')
+
 
 # 结果表中创建新的列
 # df = pd.read_excel('C:/Users/liujie/Desktop/resume_data_json_0_5000.xlsx')
@@ -92,10 +95,10 @@ def process_chunk(chunk, threadName, lock, output_dir):
                 logging.info(f"ID {row['id']} 已存在，跳过处理")
                 continue
 
-            user_id = threadName + str(random.randint(1_000_000, 9_999_999))
-            AppConversationID = getApplicationId(user_id)
-            # AppConversationID = getApplicationId(threadName)
-            result = api_call(row, AppConversationID, lock, user_id, counter)
+            with conversation_pool.lease(threadName) as conversation:
+                result = api_call(row, conversation.conversation_id, lock, conversation.user_id, counter)
+            if result[1] == '无':
+                conversation_pool.report_error(threadName)
 
 
             current_row = row.to_list()
@@ -205,30 +208,6 @@ def api_call(row, AppConversationID, lock, user_id, counter):
     return [counter,introduce, threading.current_thread().name,start_time, end_time, format_time(start_time), format_time(end_time), elapsed_time]
 
 
-def getApplicationId(user_id):
-    url = 'http://10.163.21.201:32300/api/proxy/api/v1/create_conversation'
-    data1 = {
-        'Apikey': 'd13tc102gkoadkll1qgg',
-        "Inputs": {
-            "var": "variable"
-        },
-        "UserID": user_id
-    }
-
-    headers = {
-        'Content-Type': 'application/json',
-        'Apikey': 'd13tc102gkoadkll1qgg'
-    }
-
-    response1 = requests.post(url, json=data1, headers=headers)
-
-    if response1.status_code == 200:
-        AppConversationID = response1.json().get("Conversation").get('AppConversationID')
-    else:
-        AppConversationID = ''
-        print('Failed to post data:', response1.status_code)
-    return AppConversationID
-
 
 # 主函数
 def main(output_dir):
@@ -328,10 +307,10 @@ def worker_thread(lock, batch_size=100):
             info = row[1]  # 第二个字段是 resume_processed_info
             call_data = {'id': id, 'info': info}
             try:
-                user_id = threading.current_thread().name + str(random.randint(1_000_000, 9_999_999))
-                AppConversationID = getApplicationId(user_id)
-                # AppConversationID = getApplicationId(threadName)
-                result = api_call(call_data, AppConversationID, lock, user_id, counter)
+                with conversation_pool.lease() as conversation:
+                    result = api_call(call_data, conversation.conversation_id, lock, conversation.user_id, counter)
+                if result[1] == '无':
+                    conversation_pool.report_error()
                 update_result_in_db(id, result)  # 将结果写回数据库
             except Exception as e:
                 logging.error(f"Error processing ID {id}: {e}")
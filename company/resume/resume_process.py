@@ -2,11 +2,11 @@
 
 import json
 import re
-from sqlite3 import connect
-import psycopg2
-import pandas as pd
-from openpyxl import Workbook as wb
 from db_connection import get_db_connection, close_db_connection
+from json_projection import fetch_with_json_projection
+from lazy_import import lazy_module
+
+pd = lazy_module('pandas')  # 只在读写Excel时使用
 
 platform = ""
 
@@ -213,11 +213,15 @@ def deep_clean(data):
 
 
 
-def process_resume_batch(cursor, connection, batch_size=10000):
-    """处理一批简历数据"""
-    cursor.execute("SELECT id, resume_info FROM zhilian_resume WHERE resume_processed_info IS NULL LIMIT %s",
-                  (batch_size,))
-    zhilian_resume = cursor.fetchall()
+def process_resume_batch(cursor, connection, batch_size=10000, use_sql_projection=False):
+    """处理一批简历数据（use_sql_projection=True 时在数据库端只取出 retain_fields 中的字段）"""
+    query = "SELECT id, {column} FROM zhilian_resume WHERE resume_processed_info IS NULL LIMIT %s"
+    if use_sql_projection:
+        zhilian_resume = fetch_with_json_projection(cursor, connection, query, (batch_size,),
+                                                    'resume_info', retain_fields)
+    else:
+        cursor.execute(query.format(column='resume_info'), (batch_size,))
+        zhilian_resume = cursor.fetchall()
     print(f"获取成功{len(zhilian_resume)}条数据")
     return zhilian_resume
 
@@ -8,6 +8,7 @@ import json
 import logging
 import sys
 import os
+import threading
 
 # 添加路径以便导入模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -359,6 +360,24 @@ def test_deduplication_logic():
     deduplicated_project = processor.deduplicate_project_experiences(project_data)
     print(f"项目经历去重: {len(project_data)} -> {len(deduplicated_project)}")
 
+def test_repeated_processors_share_logging():
+    """
+    测试重复创建处理器时日志线程不会累积
+    """
+    print("\n=== 测试日志线程复用 ===")
+    
+    config = ZhilianResumeProcessorConfig()
+    config.log_file = None
+    config.enable_console_log = False
+    ZhilianResumeProcessor(config)
+    thread_count = threading.active_count()
+    
+    for _ in range(5):
+        processor = ZhilianResumeProcessor(config)
+    print(f"创建5个处理器前后线程数: {thread_count} -> {threading.active_count()}")
+    assert threading.active_count() == thread_count
+    assert len(processor.logger.handlers) == 1
+
 def main():
     """
     主测试函数
@@ -374,6 +393,7 @@ def main():
         test_certificate_splitting()
         test_data_comparison()
         test_deduplication_logic()
+        test_repeated_processors_share_logging()
         
         print("\n=== 所有测试完成 ===")
         print("✅ 如果没有错误信息，说明工具类基本功能正常")
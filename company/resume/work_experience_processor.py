@@ -4,10 +4,14 @@
 用于处理workExperiences的timeLabel数据，包括格式转换、去除时间段交叉和计算总年月
 """
 
+import logging
 import re
 from datetime import datetime
 from typing import List, Tuple, Optional
 
+# 逐条时间段的明细日志使用DEBUG级别和惰性格式化，批量处理时不产生格式化和输出开销
+logger = logging.getLogger(__name__)
+
 class WorkExperienceProcessor:
     """
     工作经历处理器类
@@ -99,7 +103,8 @@ class WorkExperienceProcessor:
                 if parsed:
                     start_time, end_time = parsed
                     periods.append((start_time, end_time))
-                    print(f"解析时间段: {time_label} -> {start_time} - {end_time}")
+                    logger.debug("解析时间段: %s -> %s - %s", time_label, start_time, end_time,
+                                 extra={'msg_class': 'period_parse'})
         
         return periods
     
@@ -173,7 +178,12 @@ class WorkExperienceProcessor:
             if current_start <= last_end:  # 只合并重叠的时间段，不合并相邻的月份
                 # 合并时间段
                 merged[-1] = (last_start, max(last_end, current_end))
-                print(f"合并时间段: ({self.months_to_time(last_start)}, {self.months_to_time(last_end)}) + ({self.months_to_time(current_start)}, {self.months_to_time(current_end)}) -> ({self.months_to_time(last_start)}, {self.months_to_time(max(last_end, current_end))})")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("合并时间段: (%s, %s) + (%s, %s) -> (%s, %s)",
+                                 self.months_to_time(last_start), self.months_to_time(last_end),
+                                 self.months_to_time(current_start), self.months_to_time(current_end),
+                                 self.months_to_time(last_start), self.months_to_time(max(last_end, current_end)),
+                                 extra={'msg_class': 'period_merge'})
             else:
                 # 不重叠，添加新的时间段
                 merged.append((current_start, current_end))
@@ -213,7 +223,8 @@ class WorkExperienceProcessor:
             
             if duration > 0:
                 total_months += duration
-                print(f"时间段 {start} - {end}: {duration} 个月")
+                logger.debug("时间段 %s - %s: %s 个月", start, end, duration,
+                             extra={'msg_class': 'period_duration'})
         
         years = total_months // 12
         months = total_months % 12
@@ -237,34 +248,31 @@ class WorkExperienceProcessor:
         Returns:
             dict: 处理结果，包含原始时间段、合并后时间段和总时长
         """
-        print("=== 开始处理工作经历 ===")
+        logger.debug("=== 开始处理工作经历 ===")
         
         # 1. 获取并转换时间段格式
-        print("\n1. 提取时间段:")
+        logger.debug("1. 提取时间段:")
         periods = self.get_work_experience_periods(work_experiences)
         
         if not periods:
-            print("未找到有效的时间段")
+            logger.debug("未找到有效的时间段")
             return {
                 'original_periods': [],
                 'merged_periods': [],
                 'total_duration': '0年0个月'
             }
         
-        print(f"提取到 {len(periods)} 个时间段")
+        logger.debug("提取到 %d 个时间段", len(periods))
         
         # 2. 去除交叉的时间段
-        print("\n2. 合并重叠时间段:")
+        logger.debug("2. 合并重叠时间段:")
         merged_periods = self.merge_overlapping_periods(periods)
-        print(f"合并后剩余 {len(merged_periods)} 个时间段")
-        
-        for start, end in merged_periods:
-            print(f"  {start} - {end}")
+        logger.debug("合并后剩余 %d 个时间段: %s", len(merged_periods), merged_periods)
         
         # 3. 计算总的年月
-        print("\n3. 计算总时长:")
+        logger.debug("3. 计算总时长:")
         total_duration = self.calculate_total_duration(merged_periods)
-        print(f"总工作时长: {total_duration}")
+        logger.debug("总工作时长: %s", total_duration)
         
         return {
             'original_periods': periods,
@@ -274,6 +282,8 @@ class WorkExperienceProcessor:
 
 # 使用示例
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format='%(message)s')
+    
     # 创建处理器实例
     processor = WorkExperienceProcessor()
     
@@ -12,7 +12,6 @@ import time
 import re
 import copy
 import html
-import pandas as pd
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime, date
 from concurrent.futures import ThreadPoolExecutor
@@ -20,8 +19,16 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db_connection import get_db_connection, close_db_connection, DatabaseConnection
+from json_projection import fetch_with_json_projection
+from json_codec import JsonCodec
+from record_types import ResumeRecord, ThreadLocalStats
 from education_experience_processor import EducationExperienceProcessor
 from work_experience_processor import WorkExperienceProcessor
+from structured_logging import SamplingRule, StageTimer, log_extra, setup_queue_logging
+from processing_metrics import ProcessorMetrics, start_metrics_server, stop_metrics_server
+from lazy_import import lazy_module
+
+pd = lazy_module('pandas')  # 只在Excel导出时使用
 
 class ZhilianResumeProcessorConfig:
     """
@@ -41,6 +48,12 @@ class ZhilianResumeProcessorConfig:
         self.enable_data_filtering = True  # 启用数据过滤功能
         self.enable_html_cleaning = True  # 启用HTML清洗功能
         self.enable_excel_export = False  # 启用Excel导出功能
+        # 查询时在数据库端只取出 retain_fields 中的字段（需同时启用数据过滤）。
+        # 开启后未保留字段不参与变化检测，仅因过滤掉多余字段而变化的简历会标记为无变化（13）
+        self.enable_sql_projection = False
+        # 字典压缩存储（见 json_codec.py）：设置字典目录后读取 resume_processed_info 时自动解压，
+        # 写回时压缩；只有所有读取方都支持解压时才能开启。None表示按普通文本读写
+        self.json_codec_dir = None
         
         # 去重配置
         self.deduplicate_education = True  # 去重教育经历
@@ -115,6 +128,14 @@ class ZhilianResumeProcessorConfig:
         self.log_level = logging.INFO
         self.log_file = 'zhilian_resume_processor.log'
         self.enable_console_log = True
+        self.structured_log_file = None  # JSON Lines日志路径，包含各阶段耗时，None表示不输出
+        self.log_sampling_rules = {
+            'record_update': SamplingRule(sample_every=10, max_per_second=20),
+        }
+        
+        # 指标配置
+        self.metrics_port = None  # 指标HTTP端口，None表示不启动
+        self.metrics_summary_file = 'zhilian_resume_processor_metrics.json'  # 指标汇总文件，None表示不写
 
 class ZhilianResumeProcessor:
     """
@@ -135,46 +156,38 @@ class ZhilianResumeProcessor:
         # 初始化子处理器
         self.education_processor = EducationExperienceProcessor()
         self.work_processor = WorkExperienceProcessor()
+        self.codec = JsonCodec.from_directory(self.config.json_codec_dir) if self.config.json_codec_dir else None
         
         # 配置日志
         self._setup_logging()
-        
-        # 统计信息
-        self.stats = {
-            'total_processed': 0,
-            'total_updated': 0,
-            'education_updated': 0,
-            'work_updated': 0,
-            'project_updated': 0,
-            'certificate_updated': 0,
-            'errors': 0
-        }
+        self.metrics = ProcessorMetrics('zhilian_resume_processor')
+        
+        # 统计信息（各线程分别累加，读取时合并）
+        self.stats = ThreadLocalStats((
+            'total_processed',
+            'total_updated',
+            'education_updated',
+            'work_updated',
+            'project_updated',
+            'certificate_updated',
+            'errors'
+        ))
     
     def _setup_logging(self):
         """
         配置日志系统
+        日志由后台线程写出，逐条记录的更新日志按 log_sampling_rules 采样/限速；
+        logger名称固定，新建处理器时停止上一个处理器的日志线程并关闭其文件，不会逐个实例累积
         """
-        self.logger = logging.getLogger(f'{__name__}_{id(self)}')
-        self.logger.setLevel(self.config.log_level)
-        
-        # 清除已有的处理器
-        self.logger.handlers.clear()
-        
-        # 文件处理器
-        if self.config.log_file:
-            file_handler = logging.FileHandler(self.config.log_file, encoding='utf-8')
-            file_handler.setLevel(self.config.log_level)
-            file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-            file_handler.setFormatter(file_formatter)
-            self.logger.addHandler(file_handler)
-        
-        # 控制台处理器
-        if self.config.enable_console_log:
-            console_handler = logging.StreamHandler()
-            console_handler.setLevel(self.config.log_level)
-            console_formatter = logging.Formatter('%(levelname)s - %(message)s')
-            console_handler.setFormatter(console_formatter)
-            self.logger.addHandler(console_handler)
+        self.logger = setup_queue_logging(
+            'ZhilianResumeProcessor',
+            log_file=self.config.log_file,
+            level=self.config.log_level,
+            console=self.config.enable_console_log,
+            json_log_file=self.config.structured_log_file,
+            sampling_rules=self.config.log_sampling_rules,
+            file_format='%(asctime)s - %(levelname)s - %(message)s'
+        )
     
     def parse_time_period(self, time_str: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
@@ -542,7 +555,7 @@ class ZhilianResumeProcessor:
             )
             new_count = len(resume_data['educationExperiences'])
             if new_count != original_count:
-                self.stats['education_updated'] += 1
+                self.stats.inc('education_updated')
                 self.logger.debug(f"教育经历: {original_count} -> {new_count}")
         
         # 处理工作经历
@@ -553,7 +566,7 @@ class ZhilianResumeProcessor:
             )
             new_count = len(resume_data['workExperiences'])
             if new_count != original_count:
-                self.stats['work_updated'] += 1
+                self.stats.inc('work_updated')
                 self.logger.debug(f"工作经历: {original_count} -> {new_count}")
         
         # 处理项目经历
@@ -564,7 +577,7 @@ class ZhilianResumeProcessor:
             )
             new_count = len(resume_data['projectExperiences'])
             if new_count != original_count:
-                self.stats['project_updated'] += 1
+                self.stats.inc('project_updated')
                 self.logger.debug(f"项目经历: {original_count} -> {new_count}")
         
         # 处理证书
@@ -575,7 +588,7 @@ class ZhilianResumeProcessor:
             )
             new_count = len(resume_data['certificates'])
             if new_count != original_count:
-                self.stats['certificate_updated'] += 1
+                self.stats.inc('certificate_updated')
                 self.logger.debug(f"证书: {original_count} -> {new_count}")
         
         # 更新processed_data中的resume数据
@@ -595,7 +608,7 @@ class ZhilianResumeProcessor:
         
         return processed_data
     
-    def fetch_resume_data_from_db(self, batch_size: int = None) -> List[Tuple[int, str]]:
+    def fetch_resume_data_from_db(self, batch_size: int = None) -> List[ResumeRecord]:
         """
         从数据库获取简历数据
         
@@ -603,7 +616,7 @@ class ZhilianResumeProcessor:
             batch_size: 批次大小
             
         Returns:
-            简历数据列表 [(id, resume_processed_info), ...]
+            简历记录列表 [ResumeRecord(id, resume_processed_info), ...]
         """
         if batch_size is None:
             batch_size = self.config.batch_size
@@ -613,20 +626,29 @@ class ZhilianResumeProcessor:
         
         try:
             # 查询未处理的简历数据并标记为正在处理
-            cursor.execute("""
-                SELECT id, resume_processed_info 
+            query = """
+                SELECT id, {column} 
                 FROM zhilian_resume 
                 WHERE train_type = %s 
                 AND (check_type IS NULL OR (check_type != '12' AND check_type != '13'))
                 ORDER BY id 
                 LIMIT %s 
                 FOR UPDATE SKIP LOCKED
-            """, (self.config.train_type, batch_size))
-            
-            rows = cursor.fetchall()
+            """
+            params = (self.config.train_type, batch_size)
+            if self.config.enable_sql_projection and self.config.enable_data_filtering:
+                rows = fetch_with_json_projection(cursor, connection, query, params, 'resume_processed_info',
+                                                  self.config.retain_fields, self.logger)
+            else:
+                cursor.execute(query.format(column='resume_processed_info'), params)
+                rows = cursor.fetchall()
+            if self.codec:
+                rows = [ResumeRecord(resume_id, self.codec.decode(info)) for resume_id, info in rows]
+            else:
+                rows = ResumeRecord.from_rows(rows)
             
             if rows:
-                ids = [row[0] for row in rows]
+                ids = [row.id for row in rows]
                 # 标记这些数据为正在处理
                 cursor.execute("""
                     UPDATE zhilian_resume 
@@ -938,7 +960,8 @@ class ZhilianResumeProcessor:
         finally:
             close_db_connection(cursor, connection)
     
-    def update_resume_data_in_db(self, resume_id: int, processed_data: Dict[str, Any], original_data: Dict[str, Any]):
+    def update_resume_data_in_db(self, resume_id: int, processed_data: Dict[str, Any], original_data: Dict[str, Any],
+                                 timer: Optional[StageTimer] = None):
         """
         更新处理后的简历数据到数据库
         
@@ -946,49 +969,61 @@ class ZhilianResumeProcessor:
             resume_id: 简历ID
             processed_data: 处理后的数据
             original_data: 原始数据
+            timer: 阶段计时器，提供时记录db_write耗时并随日志输出
         """
+        timer = timer or StageTimer()
         connection = get_db_connection()
         cursor = connection.cursor()
         
         try:
             # 将处理后的数据转换为JSON字符串
             processed_json = json.dumps(processed_data, ensure_ascii=False)
+            if self.codec:
+                processed_json = self.codec.encode(processed_json)
             
             # 检查数据是否发生变化
             data_changed = self.has_data_changed(original_data, processed_data)
             
-            if data_changed:
-                # 数据有变化，更新数据和check_type
-                if self.config.update_work_years:
-                    cursor.execute("""
-                        UPDATE zhilian_resume 
-                        SET resume_processed_info = %s, check_type = '12', work_years = '1'
-                        WHERE id = %s
-                    """, (processed_json, resume_id))
+            with timer.stage('db_write'):
+                if data_changed:
+                    # 数据有变化，更新数据和check_type
+                    if self.config.update_work_years:
+                        cursor.execute("""
+                            UPDATE zhilian_resume 
+                            SET resume_processed_info = %s, check_type = '12', work_years = '1'
+                            WHERE id = %s
+                        """, (processed_json, resume_id))
+                    else:
+                        cursor.execute("""
+                            UPDATE zhilian_resume 
+                            SET resume_processed_info = %s, check_type = '12'
+                            WHERE id = %s
+                        """, (processed_json, resume_id))
                 else:
+                    # 数据无变化，只更新check_type为已处理但无变化的状态
                     cursor.execute("""
                         UPDATE zhilian_resume 
-                        SET resume_processed_info = %s, check_type = '12'
+                        SET check_type = '13'
                         WHERE id = %s
-                    """, (processed_json, resume_id))
+                    """, (resume_id,))
                 
-                self.stats['total_updated'] += 1
-                self.logger.info(f"线程:{threading.current_thread().name} 已更新简历ID：{resume_id}（数据有变化）")
-            else:
-                # 数据无变化，只更新check_type为已处理但无变化的状态
-                cursor.execute("""
-                    UPDATE zhilian_resume 
-                    SET check_type = '13'
-                    WHERE id = %s
-                """, (resume_id,))
-                self.logger.info(f"线程:{threading.current_thread().name} 简历ID：{resume_id} 数据无变化，标记为已处理")
+                connection.commit()
             
-            connection.commit()
+            self.metrics.record_result('updated' if data_changed else 'unchanged')
+            extra = log_extra('record_update', timer, record_id=resume_id, changed=data_changed)
+            if data_changed:
+                self.stats.inc('total_updated')
+                self.logger.info(f"线程:{threading.current_thread().name} 已更新简历ID：{resume_id}（数据有变化）",
+                                 extra=extra)
+            else:
+                self.logger.info(f"线程:{threading.current_thread().name} 简历ID：{resume_id} 数据无变化，标记为已处理",
+                                 extra=extra)
             
         except Exception as e:
+            self.metrics.record_result('error')
             self.logger.error(f"更新数据库失败，简历ID {resume_id}: {e}")
             connection.rollback()
-            self.stats['errors'] += 1
+            self.stats.inc('errors')
             
             # 如果更新失败，重置check_type
             try:
@@ -1017,8 +1052,11 @@ class ZhilianResumeProcessor:
         thread_name = threading.current_thread().name
         
         while True:
+            wait_start = time.perf_counter()
             with self.lock:
-                rows = self.fetch_resume_data_from_db(batch_size)
+                self.metrics.observe_stage('claim_wait', time.perf_counter() - wait_start)
+                with self.metrics.stage('fetch'):
+                    rows = self.fetch_resume_data_from_db(batch_size)
             
             if not rows:
                 self.logger.info(f"线程 {thread_name} 没有更多数据，退出")
@@ -1027,34 +1065,40 @@ class ZhilianResumeProcessor:
             self.logger.info(f"线程 {thread_name} 正在处理 {len(rows)} 条简历数据...")
             
             for row in rows:
-                resume_id = row[0]
-                resume_processed_info = row[1]
+                resume_id = row.id
+                resume_processed_info = row.resume_processed_info
                 
+                timer = StageTimer()
                 try:
                     # 解析JSON数据
-                    if isinstance(resume_processed_info, str):
-                        resume_data = json.loads(resume_processed_info)
-                    else:
-                        resume_data = resume_processed_info
+                    with timer.stage('parse'):
+                        if isinstance(resume_processed_info, str):
+                            resume_data = json.loads(resume_processed_info)
+                        else:
+                            resume_data = resume_processed_info
                     
                     if not isinstance(resume_data, dict):
+                        self.metrics.record_result('skipped')
                         self.logger.warning(f"简历ID {resume_id} 的数据格式不正确，跳过处理")
                         continue
                     
-                    # 保存原始数据的副本用于比较
-                    original_data = copy.deepcopy(resume_data)
-                    
-                    # 处理简历数据
-                    processed_data = self.process_resume_data(resume_data)
+                    with timer.stage('transform'):
+                        # 保存原始数据的副本用于比较
+                        original_data = copy.deepcopy(resume_data)
+                        
+                        # 处理简历数据
+                        processed_data = self.process_resume_data(resume_data)
                     
                     # 更新数据库，传入原始数据用于比较
-                    self.update_resume_data_in_db(resume_id, processed_data, original_data)
+                    self.update_resume_data_in_db(resume_id, processed_data, original_data, timer)
+                    self.metrics.observe_timer(timer)
                     
-                    self.stats['total_processed'] += 1
+                    self.stats.inc('total_processed')
                     
                 except json.JSONDecodeError as e:
+                    self.metrics.record_result('error')
                     self.logger.error(f"简历ID {resume_id} JSON解析失败: {e}")
-                    self.stats['errors'] += 1
+                    self.stats.inc('errors')
                     # 标记为处理失败
                     try:
                         connection = get_db_connection()
@@ -1070,8 +1114,9 @@ class ZhilianResumeProcessor:
                         self.logger.error(f"更新错误状态失败: {db_error}")
                         
                 except Exception as e:
+                    self.metrics.record_result('error')
                     self.logger.error(f"处理简历ID {resume_id} 时出错: {e}")
-                    self.stats['errors'] += 1
+                    self.stats.inc('errors')
                     # 重置check_type以便重新处理
                     try:
                         connection = get_db_connection()
@@ -1086,6 +1131,11 @@ class ZhilianResumeProcessor:
                     except Exception as db_error:
                         self.logger.error(f"重置check_type失败: {db_error}")
     
+    def _metered_worker_thread(self, batch_size: int = None):
+        """统计活跃线程数的工作线程入口"""
+        with self.metrics.track_worker():
+            self.worker_thread(batch_size)
+    
     def start_processing(self, num_threads: int = None, batch_size: int = None):
         """
         启动多线程处理简历数据
@@ -1105,10 +1155,14 @@ class ZhilianResumeProcessor:
         self.logger.info(f"配置信息: 去重={self.config.enable_deduplication}, 至今处理={self.config.enable_zhijin_processing}, 证书分割={self.config.enable_certificate_splitting}")
         
         start_time = time.time()
+        metrics_server = None
+        if self.config.metrics_port:
+            metrics_server = start_metrics_server(self.config.metrics_port)
+            self.logger.info(f"指标接口: http://127.0.0.1:{self.config.metrics_port}/metrics")
         
         for i in range(num_threads):
             thread = threading.Thread(
-                target=self.worker_thread,
+                target=self._metered_worker_thread,
                 args=(batch_size,),
                 name=f"ZhilianWorker-{i+1}"
             )
@@ -1120,6 +1174,11 @@ class ZhilianResumeProcessor:
             thread.join()
         
         end_time = time.time()
+        stop_metrics_server(metrics_server)
+        if self.config.metrics_summary_file:
+            summary = self.metrics.write_summary(self.config.metrics_summary_file)
+            self.logger.info(f"指标汇总已写入 {self.config.metrics_summary_file}，"
+                             f"耗时最多的阶段: {summary['bottleneck_stage']}")
         
         self.logger.info("所有简历数据处理完成")
         self.logger.info(f"总处理时间: {end_time - start_time:.2f} 秒")
@@ -1129,14 +1188,15 @@ class ZhilianResumeProcessor:
         """
         打印处理统计信息
         """
+        stats = self.stats.merged()
         self.logger.info("=== 处理统计信息 ===")
-        self.logger.info(f"总处理记录数: {self.stats['total_processed']}")
-        self.logger.info(f"总更新记录数: {self.stats['total_updated']}")
-        self.logger.info(f"教育经历更新数: {self.stats['education_updated']}")
-        self.logger.info(f"工作经历更新数: {self.stats['work_updated']}")
-        self.logger.info(f"项目经历更新数: {self.stats['project_updated']}")
-        self.logger.info(f"证书更新数: {self.stats['certificate_updated']}")
-        self.logger.info(f"错误记录数: {self.stats['errors']}")
+        self.logger.info(f"总处理记录数: {stats['total_processed']}")
+        self.logger.info(f"总更新记录数: {stats['total_updated']}")
+        self.logger.info(f"教育经历更新数: {stats['education_updated']}")
+        self.logger.info(f"工作经历更新数: {stats['work_updated']}")
+        self.logger.info(f"项目经历更新数: {stats['project_updated']}")
+        self.logger.info(f"证书更新数: {stats['certificate_updated']}")
+        self.logger.info(f"错误记录数: {stats['errors']}")
     
     def process_single_resume_by_id(self, resume_id: int) -> Dict[str, Any]:
         """
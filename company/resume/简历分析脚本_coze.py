@@ -18,6 +18,7 @@ import random
 
 import psycopg2
 from db_connection import get_db_connection, close_db_connection
+from bot_balancer import BotBalancer
 
 # 创建 logger 对象
 logger = logging.getLogger()
@@ -41,8 +42,6 @@ logger.addHandler(console_handler)
 
 
 counter = 0
-bot_id_index = 0  # 用于轮询bot_ids的索引
-bot_id_lock = threading.Lock()  # 用于保护bot_id_index的线程锁
 
 
 # 结果表中创建新的列
@@ -103,6 +102,9 @@ bot_id_lock = threading.Lock()  # 用于保护bot_id_index的线程锁
 
 bot_ids = ['7523601587949158446']
 
+# 按延迟和在途请求数选择Bot，连续失败的Bot自动熔断，各Bot统计跨次运行保留
+bot_balancer = BotBalancer(bot_ids, state_file='resume_analysis_bot_stats.json', name='resume_analysis')
+
 # 读取Excel文件
 def read_excel():
     global df
@@ -200,7 +202,6 @@ def format_time(timestamp):
 
 # 模拟API调用的函数
 def api_call(row, AppConversationID, lock, user_id, counter):
-    global bot_id_index, bot_id_lock
     # global counter
     start_time = time.time()  # 开始计时
 
@@ -218,11 +219,9 @@ def api_call(row, AppConversationID, lock, user_id, counter):
     #     'Apikey': 'd13tc102gkoadkll1qgg',
     # }
 
-    # 轮询获取bot_id
-    with bot_id_lock:
-        current_bot_id = bot_ids[bot_id_index]
-        bot_id_index = (bot_id_index + 1) % len(bot_ids)  # 轮询到下一个bot_id
-        logging.info(f"线程 {threading.current_thread().name} 使用 bot_id: {current_bot_id}")
+    # 选择bot_id
+    current_bot_id = bot_balancer.acquire()
+    logging.info(f"线程 {threading.current_thread().name} 使用 bot_id: {current_bot_id}")
 
     # 调用API
     url = 'https://api.coze.cn/open_api/v2/chat'
@@ -237,7 +236,7 @@ def api_call(row, AppConversationID, lock, user_id, counter):
     
     data = {
         "conversation_id": str(random.randint(10000000000, 99999999999)),
-        "bot_id": current_bot_id,  # 使用轮询获取的bot_id
+        "bot_id": current_bot_id,  # 使用均衡器选择的bot_id
         "user": user_id,
         "query": row['info'],
         "stream": False,
@@ -245,7 +244,11 @@ def api_call(row, AppConversationID, lock, user_id, counter):
     }
 
 
-    response = requests.post(url, json=data, headers=headers)
+    try:
+        response = requests.post(url, json=data, headers=headers)
+    except Exception:
+        bot_balancer.release(current_bot_id, time.time() - start_time, False)
+        raise
 
     introduce = '无'
 
@@ -292,6 +295,7 @@ def api_call(row, AppConversationID, lock, user_id, counter):
 
     end_time = time.time()  # 结束计时
     elapsed_time = round(end_time - start_time, 2)  # 精确到小数点后两位
+    bot_balancer.release(current_bot_id, end_time - start_time, introduce != '无')
 
     # lock.acquire()
     # try:
@@ -359,6 +363,7 @@ def main(output_dir):
     # 将结果写入新的Excel文件
     # output_file = os.path.join(output_dir, '智能体分发结果.xlsx')
     # new_wb.save(output_file)
+    bot_balancer.save_state()
     print("执行完毕")
 
 
@@ -465,6 +470,7 @@ def start_processing_with_threads(num_threads=20, batch_size=10):
     for thread in threads:
         thread.join()
 
+    bot_balancer.save_state()
     print("All data has been processed.")
 
 
@@ -492,6 +498,7 @@ def start_with_restarting_pool(num_threads=20, max_retries=5, batch_size=10):
                 future.result()
             except Exception as e:
                 logging.error(f"任务执行失败: {e}")
+    bot_balancer.save_state()
 
 def get_excel_files(folder_path):
     excel_files = []
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+薪资标准化工具
+统一薪资范围（如 "5001-10000"）的解析、标准化和展示格式转换，
+同时提供逐条处理的标量接口和基于 pandas/NumPy 的整列接口。
+
+整列接口先对取值去重（pd.factorize），只在唯一值上做向量化计算，
+再按编码回填到整列，薪资字段重复度很高，百万级数据也只需处理几千个唯一值。
+"""
+
+import re
+from typing import Any, Optional, Tuple
+
+# 薪资范围格式：数字-数字（与历史代码保持一致，只匹配开头，允许带后缀如"元/月"）
+SALARY_RANGE_PATTERN = re.compile(r'(\d+)-(\d+)')
+SALARY_RANGE_COLUMN_PATTERN = r'^\s*(\d+)-(\d+)'
+
+NEGOTIABLE_LABEL = "面议"
+WAN_UNIT = 10000
+
+# 整列接口用 int64 计算，18位以内的数字一定不会溢出
+MAX_INT64_DIGITS = 18
+
+
+def parse_salary_range(salary_str: Any) -> Optional[Tuple[int, int]]:
+    """
+    解析薪资范围字符串
+
+    Args:
+        salary_str: 薪资范围字符串，如 "5001-10000"
+
+    Returns:
+        (最低薪资, 最高薪资)，无法解析时返回None
+    """
+    if not salary_str or not isinstance(salary_str, str):
+        return None
+
+    match = SALARY_RANGE_PATTERN.match(salary_str.strip())
+    if not match:
+        return None
+
+    return int(match.group(1)), int(match.group(2))
+
+
+def normalize_salary_range(salary_range: Any) -> Any:
+    """
+    处理薪资范围格式，将类似5001-10000转换为5000-10000
+
+    Args:
+        salary_range: 原始薪资范围
+
+    Returns:
+        标准化后的薪资范围，无法解析时原样返回
+    """
+    bounds = parse_salary_range(salary_range)
+    if bounds is None:
+        return salary_range
+
+    min_salary, max_salary = bounds
+
+    # 将最小薪资调整为千位整数，如果是x001格式，改为x000
+    if min_salary % 1000 == 1:
+        min_salary = min_salary - 1
+
+    return f"{min_salary}-{max_salary}"
+
+
+def format_wan(salary: int) -> str:
+    """将以元为单位的薪资转换为万元数值字符串，如240000转换为24，15000转换为1.5"""
+    wan = salary / WAN_UNIT
+    if wan == int(wan):
+        return str(int(wan))
+    return f"{wan:.1f}"
+
+
+def convert_salary_to_wan_format(salary_str: Any) -> Optional[str]:
+    """
+    将薪资范围转换为万元格式，如240000-250000转换为24-25万，0-0转换为面议，5000-5000转换为5000
+
+    Args:
+        salary_str: 薪资范围字符串
+
+    Returns:
+        转换后的字符串，不需要转换时返回None
+    """
+    bounds = parse_salary_range(salary_str)
+    if bounds is None:
+        return None
+
+    min_salary, max_salary = bounds
+
+    # 特殊处理：0-0 转换为面议
+    if min_salary == 0 and max_salary == 0:
+        return NEGOTIABLE_LABEL
+
+    # 特殊处理：相同数值的范围，如5000-5000转换为5000
+    if min_salary == max_salary:
+        return str(min_salary)
+
+    # 如果薪资大于等于10000，转换为万元格式
+    if min_salary >= WAN_UNIT and max_salary >= WAN_UNIT:
+        return f"{format_wan(min_salary)}-{format_wan(max_salary)}万"
+
+    return None
+
+
+def render_salary_range(salary_str: Any) -> Any:
+    """
+    生成用于展示的薪资文本：优先使用万元/面议格式，否则使用标准化后的范围
+
+    Args:
+        salary_str: 薪资范围字符串
+
+    Returns:
+        展示用薪资文本，无法解析时原样返回
+    """
+    wan_format = convert_salary_to_wan_format(salary_str)
+    if wan_format is not None:
+        return wan_format
+    return normalize_salary_range(salary_str)
+
+
+# ---------------------------------------------------------------------------
+# 整列接口（pandas/NumPy）
+# ---------------------------------------------------------------------------
+
+def _factorize(values):
+    """对薪资列去重编码，返回(原始Series, 编码数组, 唯一值Series)"""
+    import pandas as pd
+
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return series, codes, pd.Series(uniques, dtype=object)
+
+
+def _parse_uniques(uniques):
+    """
+    在唯一值上向量化解析最低/最高薪资，返回(是否匹配, 最低薪资, 最高薪资, 是否超长)
+
+    数字超过 MAX_INT64_DIGITS 位的值放不进 int64，不计入匹配，而是标记为超长，
+    由调用方用 _apply_scalar 逐个回退到标量接口
+    """
+    import numpy as np
+
+    is_str = np.fromiter((isinstance(value, str) for value in uniques), dtype=bool, count=len(uniques))
+    extracted = uniques.where(is_str).str.extract(SALARY_RANGE_COLUMN_PATTERN)
+    matched = extracted[0].notna().to_numpy()
+    oversized = matched & (
+        (extracted[0].str.len() > MAX_INT64_DIGITS) | (extracted[1].str.len() > MAX_INT64_DIGITS)
+    ).to_numpy()
+    matched = matched & ~oversized
+
+    min_salary = np.zeros(len(uniques), dtype=np.int64)
+    max_salary = np.zeros(len(uniques), dtype=np.int64)
+    min_salary[matched] = extracted[0][matched].astype(np.int64).to_numpy()
+    max_salary[matched] = extracted[1][matched].astype(np.int64).to_numpy()
+    return matched, min_salary, max_salary, oversized
+
+
+def _apply_scalar(unique_results, uniques, oversized, scalar_func):
+    """超长数字的唯一值逐个调用标量接口，保证与逐条处理结果一致"""
+    import numpy as np
+
+    for index in np.flatnonzero(oversized):
+        unique_results[index] = scalar_func(uniques.iloc[index])
+    return unique_results
+
+
+def _broadcast(series, codes, unique_results, fallback_missing: bool):
+    """将唯一值上的计算结果按编码回填到整列"""
+    import numpy as np
+    import pandas as pd
+
+    result = np.empty(len(series), dtype=object)
+    present = codes >= 0
+    result[present] = unique_results[codes[present]]
+    result[~present] = series.to_numpy()[~present] if fallback_missing else None
+    return pd.Series(result, index=series.index, dtype=object)
+
+
+def _format_wan_column(salary):
+    """向量化的 format_wan"""
+    import numpy as np
+
+    whole = salary % WAN_UNIT == 0
+    formatted = np.empty(len(salary), dtype=object)
+    formatted[whole] = (salary[whole] // WAN_UNIT).astype(str)
+    formatted[~whole] = np.char.mod('%.1f', salary[~whole] / WAN_UNIT)
+    return formatted
+
+
+def parse_salary_column(values):
+    """
+    整列解析薪资范围
+
+    Args:
+        values: 薪资范围序列（list、ndarray 或 pd.Series）
+
+    Returns:
+        pd.DataFrame: 包含 min_salary、max_salary 两列（可空整数），
+        无法解析或超出 int64 范围的行为<NA>
+    """
+    import pandas as pd
+
+    series, codes, uniques = _factorize(values)
+    matched, min_salary, max_salary, _ = _parse_uniques(uniques)
+
+    row_matched = (codes >= 0) & matched[codes]
+    safe_codes = codes.clip(min=0)
+    return pd.DataFrame({
+        'min_salary': pd.array(min_salary[safe_codes], dtype='Int64'),
+        'max_salary': pd.array(max_salary[safe_codes], dtype='Int64'),
+    }, index=series.index).where(pd.Series(row_matched, index=series.index), pd.NA)
+
+
+def _normalize_uniques(uniques, matched, min_salary, max_salary):
+    """在唯一值上计算标准化结果"""
+    import numpy as np
+
+    min_salary = np.where(min_salary % 1000 == 1, min_salary - 1, min_salary)
+    unique_results = uniques.to_numpy(dtype=object).copy()
+    unique_results[matched] = np.char.add(
+        np.char.add(min_salary[matched].astype(str), '-'), max_salary[matched].astype(str)
+    )
+    return unique_results
+
+
+def _wan_format_uniques(uniques, matched, min_salary, max_salary):
+    """在唯一值上计算万元格式结果，不需要转换的为None"""
+    import numpy as np
+
+    negotiable = matched & (min_salary == 0) & (max_salary == 0)
+    same_value = matched & ~negotiable & (min_salary == max_salary)
+    wan = matched & ~negotiable & ~same_value & (min_salary >= WAN_UNIT) & (max_salary >= WAN_UNIT)
+
+    unique_results = np.full(len(uniques), None, dtype=object)
+    unique_results[negotiable] = NEGOTIABLE_LABEL
+    unique_results[same_value] = min_salary[same_value].astype(str)
+    if wan.any():
+        unique_results[wan] = np.char.add(
+            np.char.add(np.char.add(_format_wan_column(min_salary[wan]).astype(str), '-'),
+                        _format_wan_column(max_salary[wan]).astype(str)),
+            '万'
+        )
+    return unique_results
+
+
+def normalize_salary_column(values):
+    """
+    整列标准化薪资范围，结果与逐条调用 normalize_salary_range 一致
+
+    Args:
+        values: 薪资范围序列
+
+    Returns:
+        pd.Series: 标准化后的薪资范围，无法解析的值原样保留
+    """
+    series, codes, uniques = _factorize(values)
+    matched, min_salary, max_salary, oversized = _parse_uniques(uniques)
+    unique_results = _normalize_uniques(uniques, matched, min_salary, max_salary)
+    _apply_scalar(unique_results, uniques, oversized, normalize_salary_range)
+    return _broadcast(series, codes, unique_results, fallback_missing=True)
+
+
+def wan_format_salary_column(values):
+    """
+    整列转换为万元格式，结果与逐条调用 convert_salary_to_wan_format 一致
+
+    Args:
+        values: 薪资范围序列
+
+    Returns:
+        pd.Series: 转换后的字符串，不需要转换的行为None
+    """
+    series, codes, uniques = _factorize(values)
+    matched, min_salary, max_salary, oversized = _parse_uniques(uniques)
+    unique_results = _wan_format_uniques(uniques, matched, min_salary, max_salary)
+    _apply_scalar(unique_results, uniques, oversized, convert_salary_to_wan_format)
+    return _broadcast(series, codes, unique_results, fallback_missing=False)
+
+
+def render_salary_column(values):
+    """
+    整列生成展示用薪资文本，结果与逐条调用 render_salary_range 一致
+
+    Args:
+        values: 薪资范围序列
+
+    Returns:
+        pd.Series: 展示用薪资文本
+    """
+    import numpy as np
+
+    series, codes, uniques = _factorize(values)
+    matched, min_salary, max_salary, oversized = _parse_uniques(uniques)
+    parsed = (matched, min_salary, max_salary)
+    unique_results = _wan_format_uniques(uniques, *parsed)
+    pending = np.array([result is None for result in unique_results], dtype=bool)
+    unique_results[pending] = _normalize_uniques(uniques, *parsed)[pending]
+    _apply_scalar(unique_results, uniques, oversized, render_salary_range)
+    return _broadcast(series, codes, unique_results, fallback_missing=True)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+薪资标准化性能对比脚本
+
+对100万条薪资字符串分别使用逐条接口和整列接口进行标准化、万元格式转换和展示格式生成，
+校验两者结果一致并输出耗时对比。
+"""
+
+import argparse
+import json
+import random
+import time
+
+import pandas as pd
+
+from salary_normalizer import (
+    normalize_salary_range,
+    convert_salary_to_wan_format,
+    render_salary_range,
+    normalize_salary_column,
+    wan_format_salary_column,
+    render_salary_column,
+)
+
+
+def generate_salary_strings(count: int, seed: int = 42) -> list:
+    """生成测试用薪资字符串，取值分布接近智联岗位数据"""
+    rng = random.Random(seed)
+    special_values = ["0-0", "面议", "", None]
+    salaries = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            salaries.append(rng.choice(special_values))
+        elif roll < 0.10:
+            value = rng.randrange(3000, 60000, 100)
+            salaries.append(f"{value}-{value}")
+        else:
+            min_salary = rng.randrange(3000, 50000, 1000) + rng.choice([0, 1])
+            max_salary = min_salary - min_salary % 1000 + rng.randrange(1000, 30000, 500)
+            salaries.append(f"{min_salary}-{max_salary}")
+    return salaries
+
+
+def run_benchmark(count: int = 1_000_000, seed: int = 42) -> dict:
+    """执行对比测试并返回结果"""
+    salaries = generate_salary_strings(count, seed)
+    series = pd.Series(salaries, dtype=object)
+    print(f"测试数据: {count} 条, 唯一值 {series.nunique(dropna=False)} 个")
+
+    cases = [
+        ("normalize", normalize_salary_range, normalize_salary_column),
+        ("wan_format", convert_salary_to_wan_format, wan_format_salary_column),
+        ("render", render_salary_range, render_salary_column),
+    ]
+
+    results = {'record_count': count, 'cases': {}}
+    for name, scalar_func, column_func in cases:
+        start_time = time.perf_counter()
+        scalar_result = [scalar_func(value) for value in salaries]
+        scalar_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        column_result = column_func(series).tolist()
+        column_time = time.perf_counter() - start_time
+
+        if scalar_result != column_result:
+            raise AssertionError(f"{name} 整列结果与逐条结果不一致")
+
+        results['cases'][name] = {
+            'scalar_seconds': round(scalar_time, 4),
+            'column_seconds': round(column_time, 4),
+            'speedup': round(scalar_time / column_time, 2) if column_time > 0 else None,
+        }
+        print(f"{name:<12} 逐条: {scalar_time:.3f}s  整列: {column_time:.3f}s  "
+              f"加速比: {scalar_time / column_time:.1f}x")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='薪资标准化逐条/整列性能对比')
+    parser.add_argument('--count', type=int, default=1_000_000, help='薪资字符串数量')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--output', type=str, help='结果保存路径（JSON）')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.count, args.seed)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
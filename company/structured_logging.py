@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+非阻塞结构化日志工具
+工作线程只把日志记录放入内存队列（QueueHandler），由后台线程（QueueListener）统一写文件和控制台，
+避免多线程处理时在同步文件/控制台handler上争锁。
+
+同时支持：
+1. 按消息类别（msg_class）采样和限速，高频的逐条记录日志不会刷屏
+2. 输出JSON Lines格式的结构化日志，附带各处理阶段耗时（stages）
+
+使用示例：
+    logger = setup_queue_logging('JobProcessor', log_file='job_processor.log',
+                                 json_log_file='job_processor.jsonl',
+                                 sampling_rules={'record_start': SamplingRule(sample_every=10)})
+    timer = StageTimer()
+    with timer.stage('api'):
+        ...
+    logger.info("记录处理完成", extra=log_extra('record_done', timer, record_id=1))
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# LogRecord 自带的属性，输出JSON时不作为额外字段
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+DEFAULT_FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_CONSOLE_FORMAT = '%(levelname)s - %(message)s'
+
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
+_listeners_lock = threading.Lock()
+
+
+@dataclass
+class SamplingRule:
+    """
+    单个消息类别的采样/限速规则
+
+    Attributes:
+        sample_every: 每N条保留1条（1表示不采样）
+        max_per_second: 每秒最多输出条数（None表示不限速）
+    """
+    sample_every: int = 1
+    max_per_second: Optional[float] = None
+
+
+class _ClassState:
+    """单个消息类别的计数状态"""
+
+    __slots__ = ('seen', 'tokens', 'last_refill', 'dropped')
+
+    def __init__(self, capacity: float):
+        self.seen = 0
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.dropped = 0
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按消息类别采样和限速的过滤器
+
+    只处理通过 extra={'msg_class': ...} 标记了类别且在规则中配置过的日志，
+    WARNING及以上级别的日志始终放行。
+    """
+
+    def __init__(self, rules: Optional[Dict[str, SamplingRule]] = None):
+        super().__init__()
+        self.rules = dict(rules or {})
+        self._states: Dict[str, _ClassState] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        msg_class = getattr(record, 'msg_class', None)
+        if msg_class is None or record.levelno >= logging.WARNING:
+            return True
+
+        rule = self.rules.get(msg_class)
+        if rule is None:
+            return True
+
+        with self._lock:
+            state = self._states.get(msg_class)
+            # 令牌桶容量至少为1：限速低于每秒1条（如0.2/s）时也能每5秒放行1条，而不是全部丢弃；
+            # 初始为满桶，第一条日志总能输出
+            capacity = max(1.0, rule.max_per_second) if rule.max_per_second is not None else 0
+            if state is None:
+                state = self._states[msg_class] = _ClassState(capacity)
+
+            state.seen += 1
+            if rule.sample_every > 1 and (state.seen - 1) % rule.sample_every != 0:
+                state.dropped += 1
+                return False
+
+            if rule.max_per_second is not None:
+                now = time.monotonic()
+                state.tokens = min(capacity,
+                                   state.tokens + (now - state.last_refill) * rule.max_per_second)
+                state.last_refill = now
+                if state.tokens < 1:
+                    state.dropped += 1
+                    return False
+                state.tokens -= 1
+
+        # 记录被采样的比例，便于下游按比例还原
+        record.sample_every = rule.sample_every
+        return True
+
+    def get_dropped_counts(self) -> Dict[str, int]:
+        """获取各消息类别被丢弃的日志条数"""
+        with self._lock:
+            return {msg_class: state.dropped for msg_class, state in self._states.items()}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """将日志记录格式化为单行JSON，extra中的字段（如stages、record_id）一并输出"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and key not in data:
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class StageTimer:
+    """
+    记录单条数据各处理阶段的耗时（毫秒）
+
+    同名阶段多次进入时耗时累加。
+    """
+
+    __slots__ = ('durations', '_start')
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """计时上下文，退出时把耗时累加到对应阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        """手动累加某阶段耗时（秒）"""
+        self.durations[name] = self.durations.get(name, 0.0) + round(seconds * 1000, 3)
+
+    @property
+    def total_ms(self) -> float:
+        """从创建到现在的总耗时（毫秒）"""
+        return round((time.perf_counter() - self._start) * 1000, 3)
+
+
+def log_extra(msg_class: str, timer: Optional[StageTimer] = None, **fields: Any) -> Dict[str, Any]:
+    """
+    构造 logger.info(..., extra=...) 使用的字段
+
+    Args:
+        msg_class: 消息类别，用于采样/限速
+        timer: 阶段计时器，提供时附带 stages 和 total_ms
+        **fields: 其他结构化字段，如 record_id
+
+    Returns:
+        dict: extra字段
+    """
+    extra = {'msg_class': msg_class}
+    if timer is not None:
+        extra['stages'] = dict(timer.durations)
+        extra['total_ms'] = timer.total_ms
+    extra.update(fields)
+    return extra
+
+
+def setup_queue_logging(name: str, log_file: Optional[str] = None, level: int = logging.INFO,
+                        console: bool = True, json_log_file: Optional[str] = None,
+                        sampling_rules: Optional[Dict[str, SamplingRule]] = None,
+                        file_format: str = DEFAULT_FILE_FORMAT,
+                        console_format: str = DEFAULT_CONSOLE_FORMAT,
+                        queue_size: int = 10000) -> logging.Logger:
+    """
+    为指定logger配置基于队列的非阻塞日志
+
+    logger上只挂一个QueueHandler（带采样过滤器），真正的文件、控制台、JSON handler由后台
+    QueueListener线程执行。同名logger重复配置时先停止旧的监听线程。
+    队列写满时丢弃日志而不是阻塞工作线程。
+
+    Args:
+        name: logger名称
+        log_file: 文本日志文件路径，None表示不写文本文件
+        level: 日志级别
+        console: 是否输出到控制台
+        json_log_file: JSON Lines日志文件路径，None表示不输出
+        sampling_rules: 各消息类别的采样/限速规则
+        file_format: 文本日志格式
+        console_format: 控制台日志格式
+        queue_size: 队列最大长度
+
+    Returns:
+        logging.Logger: 配置好的logger
+    """
+    stop_queue_logging(name)
+
+    handlers = []
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(logging.Formatter(file_format))
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(console_format))
+        handlers.append(console_handler)
+    if json_log_file:
+        json_handler = logging.FileHandler(json_log_file, encoding='utf-8')
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+    for handler in handlers:
+        handler.setLevel(level)
+
+    queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(SamplingFilter(sampling_rules))
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.handlers.clear()
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    with _listeners_lock:
+        _listeners[name] = listener
+    return logger
+
+
+def stop_queue_logging(name: Optional[str] = None):
+    """
+    停止后台日志线程并把队列中剩余日志写完
+
+    Args:
+        name: logger名称，None表示停止全部
+    """
+    with _listeners_lock:
+        names = list(_listeners) if name is None else [name]
+        listeners = [_listeners.pop(key) for key in names if key in _listeners]
+
+    for listener in listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def get_sampling_filter(logger: logging.Logger) -> Optional[SamplingFilter]:
+    """获取logger上的采样过滤器，用于查看丢弃统计"""
+    for handler in logger.handlers:
+        for log_filter in handler.filters:
+            if isinstance(log_filter, SamplingFilter):
+                return log_filter
+    return None
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列写满时丢弃日志，保证工作线程不被日志阻塞"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+atexit.register(stop_queue_logging)
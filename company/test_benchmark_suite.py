@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试套件与合成语料生成器测试
+"""
+
+import json
+import unittest
+
+from benchmark_corpus import CorpusConfig, CorpusGenerator, generate_corpus
+from benchmark_suite import (
+    BenchmarkSpec,
+    compare_with_baseline,
+    measure_inflight_memory,
+    merge_baseline,
+    parse_importtime,
+    run_benchmark,
+)
+
+
+class TestCorpusGenerator(unittest.TestCase):
+    """合成语料测试"""
+
+    def test_reproducible(self):
+        first = generate_corpus(resume_count=20, job_count=20, seed=7)
+        second = generate_corpus(resume_count=20, job_count=20, seed=7)
+        self.assertEqual(json.dumps(first.resumes, ensure_ascii=False), json.dumps(second.resumes, ensure_ascii=False))
+        self.assertEqual(first.jobs, second.jobs)
+        self.assertNotEqual(first.resumes, generate_corpus(resume_count=20, job_count=20, seed=8).resumes)
+
+    def test_features_follow_config(self):
+        corpus = CorpusGenerator(CorpusConfig(resume_count=200, job_count=10, duplicate_rate=1.0,
+                                              zhijin_rate=1.0, html_noise_rate=1.0, work_per_resume=3)).generate()
+        resume = corpus.resumes[0]['resume']
+        self.assertEqual(len(resume['workExperiences']), 6)
+        self.assertEqual(resume['workExperiences'][0], resume['workExperiences'][1])
+        self.assertIn('至今', resume['workExperiences'][-1]['timeLabel'])
+        text = json.dumps(corpus.resumes, ensure_ascii=False)
+        self.assertTrue('<' in text or '&' in text or '​' in text)
+
+        clean = generate_corpus(resume_count=50, job_count=0, duplicate_rate=0, zhijin_rate=0, html_noise_rate=0)
+        text = json.dumps(clean.resumes, ensure_ascii=False)
+        self.assertNotIn('至今', text)
+        self.assertNotIn('<', text)
+
+    def test_job_comparison_pairs(self):
+        corpus = generate_corpus(resume_count=0, job_count=5)
+        self.assertEqual(len(corpus.job_comparisons), 5)
+        job, text = corpus.job_comparisons[0]
+        self.assertIn('薪资', job)
+        self.assertIsInstance(text, str)
+
+
+class TestBenchmarkRunner(unittest.TestCase):
+    """基准运行与基线对比测试"""
+
+    def setUp(self):
+        self.corpus = generate_corpus(resume_count=5, job_count=5)
+
+    def test_run_mutating_benchmark_uses_copies(self):
+        seen = []
+
+        def setup(corpus):
+            def run(resumes):
+                seen.append(id(resumes))
+                resumes.clear()
+            return corpus.resumes, run, len(corpus.resumes)
+
+        result = run_benchmark(BenchmarkSpec('test.mutate', setup, mutates_input=True), self.corpus, repeat=3)
+        self.assertEqual(result.status, 'ok')
+        self.assertEqual(len(result.samples), 3)
+        self.assertEqual(len(set(seen)), 4)
+        self.assertEqual(len(self.corpus.resumes), 5)
+
+    def test_missing_dependency_is_skipped(self):
+        def setup(corpus):
+            import module_that_does_not_exist  # noqa: F401
+
+        result = run_benchmark(BenchmarkSpec('test.skip', setup), self.corpus)
+        self.assertEqual(result.status, 'skipped')
+
+    def test_regression_detection(self):
+        meta = {'corpus': {'seed': 1}}
+        baseline = {'meta': meta, 'benchmarks': {
+            'a': {'status': 'ok', 'median_seconds': 1.0, 'threshold': 0.25},
+            'b': {'status': 'ok', 'median_seconds': 1.0, 'threshold': 0.25},
+        }}
+        report = {'meta': meta, 'benchmarks': {
+            'a': {'status': 'ok', 'median_seconds': 1.2},
+            'b': {'status': 'ok', 'median_seconds': 1.3},
+            'c': {'status': 'ok', 'median_seconds': 9.0},
+        }}
+        comparisons = {item['name']: item for item in compare_with_baseline(report, baseline)}
+        self.assertFalse(comparisons['a']['regressed'])
+        self.assertTrue(comparisons['b']['regressed'])
+        self.assertNotIn('c', comparisons)
+
+        merged = merge_baseline(baseline, report)
+        self.assertEqual(merged['benchmarks']['b']['median_seconds'], 1.3)
+        self.assertEqual(merged['benchmarks']['c']['threshold'], 0.25)
+
+    def test_parse_importtime(self):
+        stderr = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:       100 |        100 |   _json',
+            'import time:       300 |        400 | json',
+            'import time:        50 |         50 |     pandas.core',
+            'import time:       500 |        550 |   pandas',
+            'import time:        20 |         20 |   lazy_import',
+            'import time:        30 |       1000 | my_module',
+        ])
+        parsed = parse_importtime(stderr, 'my_module')
+        self.assertEqual(parsed['total_us'], 1000)
+        self.assertEqual(parsed['heaviest'], [('pandas', 550), ('lazy_import', 20)])
+        self.assertIsNone(parse_importtime(stderr, 'missing')['total_us'])
+
+    def test_inflight_memory(self):
+        results = measure_inflight_memory(count=2000, name_filter='job_result')
+        self.assertEqual([item['variant'] for item in results], ['job_result.before', 'job_result.after'])
+        self.assertTrue(all(item['count'] == 2000 and item['rss_bytes'] >= 0 for item in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
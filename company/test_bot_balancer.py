@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Coze Bot 负载均衡器测试
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from bot_balancer import BotBalancer
+from processing_metrics import MetricsRegistry
+
+
+def _balancer(bot_ids=('a', 'b', 'c'), **kwargs):
+    kwargs.setdefault('explore_rate', 0)
+    kwargs.setdefault('registry', MetricsRegistry())
+    return BotBalancer(bot_ids, **kwargs)
+
+
+def _call(balancer, elapsed, success=True, exclude=()):
+    bot_id = balancer.acquire(exclude)
+    balancer.release(bot_id, elapsed, success)
+    return bot_id
+
+
+class TestSelection(unittest.TestCase):
+    """选择策略测试"""
+
+    def test_ewma_prefers_fast_bot(self):
+        balancer = _balancer()
+        _call(balancer, 0.2, exclude=('b', 'c'))
+        _call(balancer, 3.0, exclude=('a', 'c'))
+        _call(balancer, 1.0, exclude=('a', 'b'))
+        self.assertEqual({_call(balancer, 0.2) for _ in range(20)}, {'a'})
+
+    def test_outstanding_requests_spread_load(self):
+        balancer = _balancer(('a', 'b'))
+        _call(balancer, 1.0, exclude=('b',))
+        _call(balancer, 1.5, exclude=('a',))
+        # a 有1个在途请求后得分 1.0*2 > b 的 1.5*1；b 有1个在途后得分 1.5*2 > a 的 1.0*2
+        self.assertEqual([balancer.acquire() for _ in range(3)], ['a', 'b', 'a'])
+
+    def test_untried_bots_are_used_first(self):
+        balancer = _balancer()
+        self.assertEqual({balancer.acquire() for _ in range(3)}, {'a', 'b', 'c'})
+
+    def test_round_robin(self):
+        balancer = _balancer(policy='round_robin')
+        self.assertEqual([_call(balancer, 0.1) for _ in range(6)], ['a', 'b', 'c'] * 2)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """熔断测试"""
+
+    def test_open_half_open_close(self):
+        balancer = _balancer(('a', 'b'), failure_threshold=2, open_seconds=0.05)
+        for _ in range(2):
+            _call(balancer, 0.1, success=False, exclude=('b',))
+        self.assertEqual(balancer.snapshot()['a']['state'], 'open')
+        self.assertEqual({_call(balancer, 0.5) for _ in range(5)}, {'b'})
+
+        time.sleep(0.06)
+        probe = balancer.acquire(exclude=('b',))
+        self.assertEqual(probe, 'a')
+        self.assertEqual(balancer.snapshot()['a']['state'], 'half_open')
+        # 半开状态只放行一个探测请求
+        early_probe = balancer.acquire(exclude=('b',))
+        self.assertEqual(early_probe, 'a')  # 全部不可用时提前探测最早恢复的Bot
+        balancer.release(probe, 0.1, True)
+        balancer.release(early_probe, 0.1, True)
+        self.assertEqual(balancer.snapshot()['a']['state'], 'closed')
+
+    def test_requests_from_before_open_are_not_probes(self):
+        balancer = _balancer(('a', 'b'), failure_threshold=1, open_seconds=60)
+        old = balancer.acquire(exclude=('b',))
+        _call(balancer, 0.1, success=False, exclude=('b',))
+        self.assertEqual(balancer.snapshot()['a']['state'], 'open')
+        self.assertFalse(old.is_probe)
+
+        balancer._stats['a'].open_until = 0
+        probe = balancer.acquire(exclude=('b',))
+        self.assertTrue(probe.is_probe)
+        # 熔断前发出的请求返回后，既不占用探测名额也不改变熔断状态
+        balancer.release(old, 0.1, True)
+        self.assertEqual(balancer.snapshot()['a']['state'], 'half_open')
+        self.assertEqual(balancer.acquire(), 'b')
+
+        balancer.release(probe, 0.1, True)
+        self.assertEqual(balancer.snapshot()['a']['state'], 'closed')
+
+    def test_failed_probe_doubles_open_time(self):
+        balancer = _balancer(('a',), failure_threshold=1, open_seconds=0.01)
+        _call(balancer, 0.1, success=False)
+        time.sleep(0.02)
+        _call(balancer, 0.1, success=False)
+        stats = balancer.snapshot()['a']
+        self.assertEqual(stats['state'], 'open')
+        self.assertAlmostEqual(stats['open_seconds'], 0.02)
+
+    def test_lease_records_exception_as_failure(self):
+        registry = MetricsRegistry()
+        balancer = _balancer(('a',), registry=registry)
+        with self.assertRaises(RuntimeError):
+            with balancer.lease():
+                raise RuntimeError('timeout')
+        self.assertEqual(balancer.snapshot()['a']['failure_count'], 1)
+        self.assertIn('bot_requests_total{balancer="coze",bot_id="a",status="failed"} 1',
+                      registry.render_prometheus())
+
+
+class TestPersistence(unittest.TestCase):
+    """统计持久化测试"""
+
+    def test_state_survives_restart(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'bot_stats.json')
+            balancer = _balancer(state_file=path, failure_threshold=1, open_seconds=60)
+            _call(balancer, 0.5, exclude=('b', 'c'))
+            _call(balancer, 2.0, exclude=('a', 'c'))
+            _call(balancer, 0.1, success=False, exclude=('a', 'b'))
+            balancer.save_state()
+
+            restored = _balancer(('a', 'b', 'c', 'd'), state_file=path)
+            snapshot = restored.snapshot()
+            self.assertEqual(snapshot['a']['ewma_latency'], 0.5)
+            self.assertEqual(snapshot['b']['success_count'], 1)
+            self.assertEqual(snapshot['c']['state'], 'open')
+            self.assertIsNone(snapshot['d']['ewma_latency'])
+
+    def test_concurrent_saves_leave_valid_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'bot_stats.json')
+            balancer = _balancer(state_file=path)
+            threads = [threading.Thread(target=lambda: [balancer.save_state() for _ in range(20)])
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(os.listdir(temp_dir), ['bot_stats.json'])
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(set(json.load(f)['bots']), {'a', 'b', 'c'})
+
+
+if __name__ == '__main__':
+    unittest.main()
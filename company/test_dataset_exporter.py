@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+训练数据集分片导出器测试
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from dataset_exporter import (
+    ShardedDatasetWriter,
+    iter_jsonl_dataset,
+    load_shard_tokens,
+    file_sha256,
+    example_to_text,
+)
+
+
+class FakeTokenizer:
+    """按字符编码的测试分词器"""
+    name = "fake-char"
+
+    def encode(self, text, allowed_special=None):
+        return [ord(ch) % 65536 for ch in text]
+
+
+def build_example(index):
+    return {
+        "system": ["你是一个简历精灵"],
+        "context": [f"第{index}份简历描述" + hashlib.sha256(str(index).encode()).hexdigest() * 4],
+        "target": json.dumps({"姓名": f"张三{index}"}, ensure_ascii=False)
+    }
+
+
+class TestShardedDatasetWriter(unittest.TestCase):
+    """分片写入器测试"""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_shards_and_manifest(self):
+        with ShardedDatasetWriter(self.output_dir, max_shard_bytes=2048) as writer:
+            for record_id in range(1, 201):
+                writer.write(record_id, build_example(record_id))
+
+        with open(os.path.join(self.output_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        self.assertEqual(manifest["total_count"], 200)
+        self.assertEqual(manifest["last_id"], 200)
+        self.assertGreater(len(manifest["shards"]), 1)
+        self.assertEqual(sum(shard["count"] for shard in manifest["shards"]), 200)
+        self.assertEqual(manifest["shards"][0]["min_id"], 1)
+        self.assertEqual(manifest["shards"][-1]["max_id"], 200)
+        for shard in manifest["shards"]:
+            shard_path = os.path.join(self.output_dir, shard["file"])
+            self.assertEqual(file_sha256(shard_path), shard["sha256"])
+            self.assertEqual(os.path.getsize(shard_path), shard["bytes"])
+
+        rows = list(iter_jsonl_dataset(self.output_dir))
+        self.assertEqual([row["id"] for row in rows], list(range(1, 201)))
+        self.assertEqual(rows[0]["target"], build_example(1)["target"])
+
+    def test_resume_skips_exported_ids(self):
+        writer = ShardedDatasetWriter(self.output_dir, max_shard_bytes=1024 * 1024)
+        for record_id in range(1, 51):
+            writer.write(record_id, build_example(record_id))
+        writer.close()
+
+        # 模拟中断：写入了一部分但没有封片
+        with self.assertRaises(RuntimeError):
+            with ShardedDatasetWriter(self.output_dir) as interrupted:
+                interrupted.write(51, build_example(51))
+                raise RuntimeError("中断")
+
+        resumed = ShardedDatasetWriter(self.output_dir)
+        self.assertEqual(resumed.last_id, 50)
+        self.assertFalse(resumed.write(50, build_example(50)))
+        for record_id in range(51, 61):
+            self.assertTrue(resumed.write(record_id, build_example(record_id)))
+        resumed.close()
+
+        rows = list(iter_jsonl_dataset(self.output_dir))
+        self.assertEqual([row["id"] for row in rows], list(range(1, 61)))
+        self.assertFalse([name for name in os.listdir(self.output_dir) if name.endswith(".tmp")])
+
+    def test_ids_must_increase(self):
+        writer = ShardedDatasetWriter(self.output_dir)
+        writer.write(10, build_example(10))
+        with self.assertRaises(ValueError):
+            writer.write(5, build_example(5))
+
+    def test_token_files(self):
+        tokenizer = FakeTokenizer()
+        with ShardedDatasetWriter(self.output_dir, tokenizer=tokenizer) as writer:
+            for record_id in range(1, 4):
+                writer.write(record_id, build_example(record_id))
+
+        shard = writer.manifest["shards"][0]
+        self.assertEqual(writer.manifest["tokenizer"], "fake-char")
+        tokens = load_shard_tokens(self.output_dir, shard)
+        self.assertEqual(len(tokens), 3)
+        self.assertEqual(tokens[1], tokenizer.encode(example_to_text(build_example(2))))
+
+    def test_jsonl_shard_is_gzip(self):
+        with ShardedDatasetWriter(self.output_dir) as writer:
+            writer.write(1, build_example(1))
+        shard_path = os.path.join(self.output_dir, writer.manifest["shards"][0]["file"])
+        with gzip.open(shard_path, "rt", encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.readline())["id"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+HiAgent 会话复用池测试
+"""
+
+import threading
+import time
+import unittest
+
+from hiagent_conversation_pool import (
+    ConversationCreateError,
+    HiAgentConversationPool,
+    create_conversation,
+)
+from mock_llm_gateway import LatencyModel, MockGatewayConfig, mock_gateway
+from processing_metrics import MetricsRegistry
+
+
+class _FakeCreator:
+    """记录调用次数的会话创建函数"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, user_id):
+        with self._lock:
+            self.calls.append(user_id)
+            if self.fail:
+                raise ConversationCreateError('boom')
+            return f'conv-{len(self.calls)}'
+
+
+def _wait_idle(pool, count, timeout=2.0):
+    deadline = time.time() + timeout
+    while pool.stats()['idle'] < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestConversationPool(unittest.TestCase):
+    """会话复用与轮换测试"""
+
+    def test_reuse_and_rotate_after_max_turns(self):
+        creator = _FakeCreator()
+        pool = HiAgentConversationPool('key', max_turns=3, prefill=0, create_func=creator,
+                                       registry=MetricsRegistry())
+        ids = [pool.acquire('slot').conversation_id for _ in range(7)]
+        self.assertEqual(ids, ['conv-1'] * 3 + ['conv-2'] * 3 + ['conv-3'])
+        stats = pool.stats()
+        self.assertEqual(stats['acquires'], {'reuse': 4, 'prefilled': 0, 'created': 3})
+        self.assertEqual(stats['rotations']['max_turns'], 2)
+        self.assertEqual(stats['create_latency']['count'], 3)
+
+    def test_default_uses_new_conversation_per_record(self):
+        creator = _FakeCreator()
+        pool = HiAgentConversationPool('key', prefill=0, create_func=creator, registry=MetricsRegistry())
+        ids = [pool.acquire('slot').conversation_id for _ in range(3)]
+        self.assertEqual(ids, ['conv-1', 'conv-2', 'conv-3'])
+        self.assertEqual(pool.stats()['acquires']['reuse'], 0)
+
+    def test_prefilled_conversations_and_error_rotation(self):
+        creator = _FakeCreator()
+        pool = HiAgentConversationPool('key', max_turns=10, prefill=2, user_prefix='pre',
+                                       create_func=creator, registry=MetricsRegistry())
+        pool.start()
+        try:
+            _wait_idle(pool, 2)
+            first = pool.acquire('slot')
+            self.assertTrue(first.user_id.startswith('pre'))
+            with self.assertRaises(RuntimeError):
+                with pool.lease('slot'):
+                    raise RuntimeError('chat_query failed')
+            _wait_idle(pool, 2)
+            second = pool.acquire('slot')
+            self.assertNotEqual(first.conversation_id, second.conversation_id)
+            stats = pool.stats()
+            self.assertEqual(stats['acquires']['created'], 0)
+            self.assertEqual(stats['acquires']['prefilled'], 2)
+            self.assertEqual(stats['rotations']['error'], 1)
+            self.assertEqual(stats['hit_rate'], 1.0)
+        finally:
+            pool.close()
+
+    def test_create_failure_raises(self):
+        registry = MetricsRegistry()
+        pool = HiAgentConversationPool('key', prefill=0, create_func=_FakeCreator(fail=True), registry=registry)
+        with self.assertRaises(ConversationCreateError):
+            pool.acquire('slot')
+        self.assertEqual(pool.stats()['creations']['failed'], 1)
+        self.assertIn('hiagent_conversation_create_total{pool="hiagent",status="failed"} 1',
+                      registry.render_prometheus())
+
+
+class TestCreateConversation(unittest.TestCase):
+    """通过模拟网关创建会话"""
+
+    def test_against_mock_gateway(self):
+        config = MockGatewayConfig(latency=LatencyModel('fixed', median_ms=0))
+        with mock_gateway(config) as server:
+            base_url = server.base_url + '/api/proxy/api/v1'
+            conversation_id = create_conversation(base_url, 'key', 'user-1')
+            self.assertTrue(conversation_id)
+            stats = server.stats.snapshot()
+
+            pool = HiAgentConversationPool('key', base_url=base_url, max_turns=5, prefill=0,
+                                           registry=MetricsRegistry())
+            self.assertEqual(pool.acquire('a').conversation_id, pool.acquire('a').conversation_id)
+        self.assertEqual(stats['requests'].get('hiagent_create'), 1)
+
+        with self.assertRaises(ConversationCreateError):
+            create_conversation(base_url, 'key', 'user-1', timeout=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+JSON列字典压缩测试
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from json_codec import DictionaryStore, JsonCodec, train_dictionary, zstandard
+
+
+def _samples(count=50):
+    return [json.dumps({
+        'user': {'name': f'候选人{index}', 'genderLabel': '男' if index % 2 else '女', 'cityLabel': '北京'},
+        'resume': {'workExperiences': [
+            {'orgName': f'公司{index}', 'jobTitle': '软件工程师', 'description': '负责后端服务开发与维护' * 3,
+             'timeLabel': '2020.01 - 2023.06'},
+        ]},
+    }, ensure_ascii=False, indent=4) for index in range(count)]
+
+
+class CodecTestCase(unittest.TestCase):
+    algorithm = 'zlib'
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = DictionaryStore(self.tmpdir)
+        self.dict_id = self.store.add(self.algorithm, train_dictionary(_samples(200), self.algorithm, dict_size=8 * 1024))
+        self.codec = JsonCodec(self.store)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+class TestZlibCodec(CodecTestCase):
+    """zlib预置字典编解码测试"""
+
+    def test_roundtrip_and_compresses(self):
+        for text in _samples(5):
+            encoded = self.codec.encode(text)
+            self.assertTrue(encoded.startswith(f'zd1:{self.dict_id}:'))
+            self.assertLess(len(encoded.encode('utf-8')), len(text.encode('utf-8')) / 2)
+            self.assertEqual(self.codec.decode(encoded), text)
+
+    def test_plain_short_and_non_text_values_pass_through(self):
+        self.assertEqual(self.codec.encode('短文本'), '短文本')
+        self.assertEqual(self.codec.decode('{"plain": true}'), '{"plain": true}')
+        self.assertIsNone(self.codec.encode(None))
+        self.assertEqual(self.codec.decode({'already': 'parsed'}), {'already': 'parsed'})
+        encoded = self.codec.encode(_samples(1)[0])
+        self.assertEqual(self.codec.encode(encoded), encoded)
+
+    def test_old_dictionary_still_decodes_after_retraining(self):
+        text = _samples(1)[0]
+        old_value = self.codec.encode(text)
+        new_id = self.store.add('zlib', train_dictionary(_samples(20)[::-1] + ['"新字段": "新值"'] * 2, 'zlib'))
+        self.assertNotEqual(new_id, self.dict_id)
+        self.assertEqual(self.store.current_id(), new_id)
+
+        new_codec = JsonCodec.from_directory(self.tmpdir)
+        self.assertTrue(new_codec.encode(text).startswith(f'zd1:{new_id}:'))
+        self.assertEqual(new_codec.decode(old_value), text)
+
+    def test_unknown_dictionary_raises(self):
+        with self.assertRaises(ValueError):
+            self.codec.decode('zd1:zlib-00000000:AAAA')
+
+
+@unittest.skipIf(zstandard is None, "未安装 zstandard")
+class TestZstdCodec(CodecTestCase):
+    """zstd训练字典编解码测试"""
+    algorithm = 'zstd'
+
+    def test_roundtrip(self):
+        text = _samples(1)[0]
+        self.assertEqual(self.codec.decode(self.codec.encode(text)), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
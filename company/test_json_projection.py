@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+JSON字段投影下推测试
+"""
+
+import json
+import os
+import sys
+import unittest
+from unittest.mock import Mock
+
+from json_projection import build_json_projection, fetch_with_json_projection
+
+
+RESUME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resume')
+
+
+class DataError(Exception):
+    pgcode = '22P02'
+
+
+class TestBuildJsonProjection(unittest.TestCase):
+    """投影表达式生成测试"""
+
+    def test_top_level_field(self):
+        self.assertEqual(
+            build_json_projection('processed_info', {'jobSummary': True}),
+            "(CASE json_typeof((processed_info)::json) "
+            "WHEN 'object' THEN (SELECT COALESCE(json_object_agg(k1, v1 ORDER BY p1), '{}'::json) "
+            "FROM json_each((processed_info)::json) WITH ORDINALITY AS f1(k1, v1, p1) "
+            "WHERE k1 IN ('jobSummary')) "
+            "ELSE (processed_info)::json END)::text AS processed_info"
+        )
+
+    def test_nested_object_and_array_fields(self):
+        sql = build_json_projection('resume_info', {
+            'user': {'name': True},
+            'resume': {'workExperiences': {'orgName': True, 'jobTitle': True}},
+        }, alias='info')
+        self.assertTrue(sql.endswith('::text AS info'))
+        self.assertNotIn('jsonb', sql)  # jsonb 会重排字段顺序
+        self.assertNotIn('strip_nulls', sql)  # 值为null的字段需要保留
+        self.assertIn("WHERE k1 IN ('user', 'resume')", sql)
+        self.assertIn("CASE k1 WHEN 'user' THEN CASE json_typeof(v1)", sql)
+        self.assertIn("json_array_elements(v2) WITH ORDINALITY AS t2(e2, o2)", sql)
+        self.assertIn("json_each(e2) WITH ORDINALITY AS f3(k3, v3, p3) WHERE k3 IN ('orgName', 'jobTitle')", sql)
+        self.assertEqual(sql.count('('), sql.count(')'))
+
+    def test_rejects_unsafe_keys(self):
+        with self.assertRaises(ValueError):
+            build_json_projection('resume_info', {"name'); DROP TABLE x; --": True})
+
+
+class TestFetchWithJsonProjection(unittest.TestCase):
+    """查询与回退测试"""
+
+    SQL = "SELECT id, {column} FROM zhilian_job LIMIT %s"
+
+    def test_projected_query(self):
+        cursor, connection = Mock(), Mock()
+        cursor.fetchall.return_value = [(1, '{"jobSummary": "摘要"}')]
+        rows = fetch_with_json_projection(cursor, connection, self.SQL, (10,), 'processed_info', {'jobSummary': True})
+        self.assertEqual(rows, [(1, '{"jobSummary": "摘要"}')])
+        sql, params = cursor.execute.call_args[0]
+        self.assertIn('json_object_agg', sql)
+        self.assertEqual(params, (10,))
+
+    def test_invalid_json_falls_back_to_full_column(self):
+        cursor, connection = Mock(), Mock()
+        cursor.execute.side_effect = [DataError('invalid input syntax for type json'), None]
+        cursor.fetchall.return_value = [(1, '{not json')]
+        rows = fetch_with_json_projection(cursor, connection, self.SQL, (10,), 'processed_info', {'jobSummary': True})
+        self.assertEqual(rows, [(1, '{not json')])
+        connection.rollback.assert_called_once()
+        self.assertEqual(cursor.execute.call_args[0], ("SELECT id, processed_info FROM zhilian_job LIMIT %s", (10,)))
+
+    def test_other_errors_are_raised(self):
+        cursor, connection = Mock(), Mock()
+        cursor.execute.side_effect = ConnectionError('连接断开')
+        with self.assertRaises(ConnectionError):
+            fetch_with_json_projection(cursor, connection, self.SQL, (10,), 'processed_info', {'jobSummary': True})
+        connection.rollback.assert_not_called()
+
+
+
+class TestProjectionMatchesFilterResumeData(unittest.TestCase):
+    """投影结果经 filter_resume_data 处理后与直接处理整列一致（需要可连接的数据库）"""
+
+    DOCUMENT = json.dumps({
+        'resume': {
+            'workExperiences': [{'timeLabel': '2020-2022', 'orgName': '某公司', 'jobTitle': None, 'salary': 1},
+                                '无', None],
+            'educationExperiences': None,
+        },
+        'user': {'email': None, 'name': '张三', 'age': 30, 'unlockedPhone': '138****0000', 'tags': {'x': 1}},
+        'extra': 1,
+    }, ensure_ascii=False)
+
+    def setUp(self):
+        try:
+            from db_connection import get_db_connection, close_db_connection
+            if RESUME_DIR not in sys.path:
+                sys.path.append(RESUME_DIR)
+            from resume_process import filter_resume_data, retain_fields
+            connection = get_db_connection()
+        except Exception as e:
+            self.skipTest(f"数据库不可用: {e}")
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.addCleanup(close_db_connection, self.cursor, connection)
+        self.filter_resume_data = filter_resume_data
+        self.retain_fields = retain_fields
+
+    def test_null_fields_and_key_order_survive(self):
+        self.cursor.execute(
+            f"SELECT {build_json_projection('doc', self.retain_fields)} FROM (SELECT %s::text AS doc) AS t",
+            (self.DOCUMENT,))
+        projected = self.cursor.fetchone()[0]
+        expected = self.filter_resume_data(json.loads(self.DOCUMENT), self.retain_fields)
+        actual = self.filter_resume_data(json.loads(projected), self.retain_fields)
+        self.assertEqual(json.dumps(actual, ensure_ascii=False), json.dumps(expected, ensure_ascii=False))
+        self.assertIsNone(actual['user']['email'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟大模型网关测试
+按各调用脚本的解析方式验证Coze、HiAgent、Ollama三种响应格式
+"""
+
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from mock_llm_gateway import LatencyModel, MockGatewayConfig, mock_gateway
+
+FAST = LatencyModel(distribution='fixed', median_ms=0)
+
+
+def _post(url, data, timeout=5):
+    request = urllib.request.Request(url, data=json.dumps(data).encode('utf-8'), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+class TestMockGateway(unittest.TestCase):
+    """模拟网关测试"""
+
+    def test_coze_blocking_and_stream(self):
+        config = MockGatewayConfig(latency=FAST, answer_template="{bot_id}:{query}", stream_chunk_delay_ms=0)
+        with mock_gateway(config) as server:
+            url = server.base_url + '/open_api/v2/chat'
+            with _post(url, {'bot_id': 'b1', 'query': '你好', 'stream': False}) as response:
+                body = json.loads(response.read().decode('utf-8'))
+            answers = [m['content'] for m in body['messages'] if m.get('type') == 'answer']
+            self.assertEqual(''.join(answers), 'b1:你好')
+
+            with _post(url, {'bot_id': 'b1', 'query': '一二三四五六七八九十', 'stream': True}) as response:
+                events = [json.loads(line[5:]) for line in response.read().decode('utf-8').splitlines()
+                          if line.startswith('data:')]
+            self.assertEqual(events[-1]['event'], 'done')
+            self.assertEqual(''.join(e['message']['content'] for e in events[:-1]), 'b1:一二三四五六七八九十')
+
+    def test_hiagent_conversation_and_query(self):
+        config = MockGatewayConfig(latency=FAST, answers=["简历自述内容"])
+        with mock_gateway(config) as server:
+            base = server.base_url + '/api/proxy/api/v1'
+            with _post(base + '/create_conversation', {'Inputs': {'var': 'variable'}, 'UserID': 'u1'}) as response:
+                conversation_id = json.loads(response.read())['Conversation']['AppConversationID']
+            self.assertTrue(conversation_id)
+
+            with _post(base + '/chat_query', {'Query': 'q', 'AppConversationID': conversation_id,
+                                              'ResponseMode': 'blocking', 'UserID': 'u1'}) as response:
+                # 与 requests 一致：text/* 且无charset时按ISO-8859-1解码
+                self.assertNotIn('charset', response.headers['Content-Type'])
+                text = response.read().decode('ISO-8859-1')
+            result = json.loads(text[text.index('{'):-1]).get('answer')
+            self.assertEqual(result.encode('ISO_8859_1').decode('utf-8'), "简历自述内容")
+
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                _post(base + '/chat_query', {'Query': 'q'})
+            self.assertEqual(context.exception.code, 400)
+
+    def test_ollama_ndjson(self):
+        config = MockGatewayConfig(latency=FAST, answers=["Llamas eat grass and hay."], stream_chunk_delay_ms=0)
+        with mock_gateway(config) as server:
+            data = {'model': 'llama3', 'messages': [{'role': 'user', 'content': 'What do Llamas eat?'}]}
+            response_data = ""
+            with _post(server.base_url + '/api/chat', data) as response:
+                while True:
+                    line = response.readline().decode('utf-8')
+                    if not line:
+                        break
+                    response_data += json.loads(line)['message']['content']
+            self.assertEqual(response_data, "Llamas eat grass and hay.")
+
+            with _post(server.base_url + '/api/chat', dict(data, stream=False)) as response:
+                self.assertTrue(json.loads(response.read())['done'])
+
+    def test_throttle_error_and_concurrency(self):
+        with mock_gateway(MockGatewayConfig(latency=FAST, throttle_rate=1.0)) as server:
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                _post(server.base_url + '/open_api/v2/chat', {'bot_id': 'b', 'query': 'q'})
+            self.assertEqual(context.exception.code, 429)
+
+        with mock_gateway(MockGatewayConfig(latency=FAST, error_rate=1.0)) as server:
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                _post(server.base_url + '/api/chat', {'messages': []})
+            self.assertEqual(context.exception.code, 500)
+
+        slow = LatencyModel(distribution='fixed', median_ms=300)
+        with mock_gateway(MockGatewayConfig(latency=slow, max_concurrency=2)) as server:
+            codes = []
+            lock = threading.Lock()
+
+            def call():
+                try:
+                    with _post(server.base_url + '/open_api/v2/chat', {'bot_id': 'b', 'query': 'q'}) as response:
+                        code = response.status
+                except urllib.error.HTTPError as e:
+                    code = e.code
+                with lock:
+                    codes.append(code)
+
+            threads = [threading.Thread(target=call) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(codes.count(200), 2)
+            self.assertEqual(codes.count(429), 3)
+            self.assertEqual(server.stats.snapshot()['requests']['coze'], 5)
+
+    def test_latency_distributions(self):
+        import random
+        rng = random.Random(1)
+        samples = sorted(LatencyModel('lognormal', median_ms=100, sigma=0.5).sample(rng) for _ in range(2000))
+        self.assertAlmostEqual(samples[1000], 0.1, delta=0.01)
+        self.assertLessEqual(LatencyModel('uniform', min_ms=5, max_ms=10).sample(rng), 0.01)
+        self.assertEqual(LatencyModel('fixed', median_ms=20).sample(rng), 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+统一命令行入口与按需导入测试
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+from lazy_import import lazy_module
+from pipeline_cli import build_parser, run_export
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestLazyModule(unittest.TestCase):
+    """按需导入测试"""
+
+    def test_loads_on_first_attribute(self):
+        module = lazy_module('colorsys')
+        self.assertFalse(module.is_loaded)
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertTrue(module.is_loaded)
+
+    def test_missing_module_fails_on_use(self):
+        module = lazy_module('module_that_does_not_exist')
+        with self.assertRaises(ImportError):
+            module.anything
+
+
+class TestPipelineCli(unittest.TestCase):
+    """命令行解析测试"""
+
+    def test_subcommands(self):
+        parser = build_parser()
+        args = parser.parse_args(['resume', '--id', '42'])
+        self.assertEqual((args.command, args.id, args.legacy), ('resume', 42, False))
+        args = parser.parse_args(['job', '--workers', '8', '--stats'])
+        self.assertEqual((args.workers, args.stats), (8, True))
+        args = parser.parse_args(['sync', '--tables', 'a,b', '--direction', 'ora2pg'])
+        self.assertEqual((args.tables, args.direction), ('a,b', 'ora2pg'))
+
+    def test_export_passes_arguments_through(self):
+        args = build_parser().parse_args(['export', '--', '--table', 'zhilian_job', '-d', 'backup'])
+        with patch.dict(sys.modules, {'pg_to_excel': Mock()}):
+            run_export(args)
+            sys.modules['pg_to_excel'].main.assert_called_once_with(['--table', 'zhilian_job', '-d', 'backup'])
+
+    def test_startup_does_not_import_heavy_dependencies(self):
+        code = ("import sys, pipeline_cli; "
+                "print(sorted(m for m in ('pandas', 'openpyxl', 'requests', 'psycopg2') if m in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
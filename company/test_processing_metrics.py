@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+处理器指标统计工具测试
+"""
+
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from processing_metrics import MetricsRegistry, ProcessorMetrics, start_metrics_server, stop_metrics_server
+from structured_logging import StageTimer
+
+
+class TestProcessorMetrics(unittest.TestCase):
+    """指标统计测试"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.metrics = ProcessorMetrics('test_processor', self.registry)
+
+    def test_stage_histogram_and_errors(self):
+        for seconds in (0.002, 0.004, 0.02, 3.0):
+            self.metrics.observe_stage('api', seconds)
+        with self.assertRaises(ValueError):
+            with self.metrics.stage('parse'):
+                raise ValueError("bad json")
+
+        summary = self.metrics.summary()
+        self.assertEqual(summary['stages']['api']['count'], 4)
+        self.assertAlmostEqual(summary['stages']['api']['sum'], 3.026)
+        self.assertEqual(summary['stages']['api']['max'], 3.0)
+        self.assertLessEqual(summary['stages']['api']['p50'], 0.01)
+        self.assertEqual(summary['stages']['parse']['errors'], 1)
+        self.assertEqual(summary['bottleneck_stage'], 'api')
+
+    def test_observe_timer_and_results(self):
+        timer = StageTimer()
+        timer.add('db_write', 0.25)
+        self.metrics.observe_timer(timer)
+        self.metrics.record_result('success', 3)
+        self.metrics.record_result('failed')
+
+        summary = self.metrics.summary()
+        self.assertEqual(summary['records'], {'success': 3, 'failed': 1})
+        self.assertAlmostEqual(summary['stages']['db_write']['sum'], 0.25)
+
+    def test_prometheus_text(self):
+        self.metrics.observe_stage('fetch', 0.003)
+        with self.metrics.track_record():
+            self.metrics.record_result('success')
+        text = self.registry.render_prometheus()
+        self.assertIn('# TYPE processor_stage_duration_seconds histogram', text)
+        self.assertIn('processor_stage_duration_seconds_bucket{processor="test_processor",stage="fetch",le="0.0025"} 0', text)
+        self.assertIn('processor_stage_duration_seconds_bucket{processor="test_processor",stage="fetch",le="+Inf"} 1', text)
+        self.assertIn('processor_stage_duration_seconds_count{processor="test_processor",stage="fetch"} 1', text)
+        self.assertIn('processor_records_total{processor="test_processor",status="success"} 1', text)
+        self.assertIn('processor_records_in_flight{processor="test_processor"} 0', text)
+
+    def test_http_endpoint_and_summary_file(self):
+        self.metrics.observe_stage('transform', 0.01)
+        server = start_metrics_server(0, registry=self.registry)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+                self.assertIn('text/plain', response.headers['Content-Type'])
+                self.assertIn('stage="transform"', response.read().decode('utf-8'))
+        finally:
+            stop_metrics_server(server)
+        # 监听socket已关闭
+        self.assertEqual(server.socket.fileno(), -1)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'metrics.json')
+            self.metrics.write_summary(path)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['processor'], 'test_processor')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+多记录提示词打包测试
+"""
+
+import unittest
+
+from prompt_packing import (
+    INSTRUCTION_OVERHEAD_TOKENS,
+    RECORD_OVERHEAD_TOKENS,
+    build_packed_prompt,
+    estimate_tokens,
+    pack_records,
+    split_packed_answer,
+)
+
+
+def _answer(results):
+    return '\n'.join(f'<<<RESULT id={record_id}>>>\n{text}\n<<<END id={record_id}>>>' for record_id, text in results)
+
+
+class TestPacking(unittest.TestCase):
+    """分组与拼接测试"""
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('软件工程师'), 5)
+        self.assertEqual(estimate_tokens('abcdefgh'), 2)
+
+    def test_pack_respects_record_and_token_limits(self):
+        records = [(index, '岗' * 100) for index in range(7)]
+        batches = pack_records(records, max_tokens=10000, max_records=3)
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+
+        budget = INSTRUCTION_OVERHEAD_TOKENS + 2 * (100 + RECORD_OVERHEAD_TOKENS)
+        batches = pack_records(records, max_tokens=budget, max_records=10)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 2, 1])
+        self.assertEqual([record_id for batch in batches for record_id, _ in batch], list(range(7)))
+
+    def test_oversized_record_is_packed_alone(self):
+        records = [(1, '短'), (2, '长' * 5000), (3, '短')]
+        self.assertEqual([[record_id for record_id, _ in batch] for batch in pack_records(records, max_tokens=500)],
+                         [[1], [2], [3]])
+
+    def test_prompt_contains_delimited_records(self):
+        prompt = build_packed_prompt([(11, '岗位A'), (12, '岗位B')])
+        self.assertIn('共有 2 条数据', prompt)
+        self.assertIn('<<<RECORD id=11>>>\n岗位A\n<<<END id=11>>>', prompt)
+        self.assertIn('<<<RECORD id=12>>>\n岗位B\n<<<END id=12>>>', prompt)
+
+
+class TestSplitAnswer(unittest.TestCase):
+    """回答拆分与校验测试"""
+
+    def test_split_all_valid(self):
+        results, failed = split_packed_answer(_answer([(1, '结果一'), (2, '结果二')]), [1, 2])
+        self.assertEqual(results, {1: '结果一', 2: '结果二'})
+        self.assertEqual(failed, [])
+
+    def test_missing_empty_duplicate_and_invalid_fall_back(self):
+        answer = _answer([(1, '结果一'), (2, ''), (3, '甲'), (3, '乙'), (4, '无效')])
+        results, failed = split_packed_answer(answer, [1, 2, 3, 4, 5], validator=lambda text: text != '无效')
+        self.assertEqual(results, {1: '结果一'})
+        self.assertEqual(failed, [2, 3, 4, 5])
+
+    def test_bleeding_delimiters_fail_validation(self):
+        answer = '<<<RESULT id=1>>>\n结果一 <<<RESULT id=2>>> 结果二\n<<<END id=1>>>'
+        results, failed = split_packed_answer(answer, [1, 2])
+        self.assertEqual(results, {})
+        self.assertEqual(failed, [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑记录类型与按线程累加统计测试
+"""
+
+import threading
+import unittest
+
+from record_types import JobRecord, JobResult, JobSummaryRecord, ThreadLocalStats, UpdateResult
+
+
+class TestSlottedRecords(unittest.TestCase):
+    """记录类型测试"""
+
+    def test_tuple_compatible(self):
+        rows = JobRecord.from_rows([(1, '{"a": 1}'), (2, None)])
+        self.assertEqual(rows, [(1, '{"a": 1}'), (2, None)])
+        record_id, processed_info = rows[0]
+        self.assertEqual((record_id, processed_info), (1, '{"a": 1}'))
+        self.assertEqual((rows[1][0], len(rows[1])), (2, 2))
+        self.assertEqual(dict(rows), {1: '{"a": 1}', 2: None})
+        self.assertEqual(JobSummaryRecord(3, 'info', 'summary').processed_jobsummary, 'summary')
+        self.assertEqual(UpdateResult(3, 'x'), JobRecord(3, 'x'))
+
+    def test_no_instance_dict(self):
+        record = JobRecord(1, 'x')
+        self.assertFalse(hasattr(record, '__dict__'))
+        with self.assertRaises(AttributeError):
+            record.extra = 1
+
+    def test_job_result_payload_roundtrip(self):
+        result = JobResult(7, '详情', 'bot-1', 'start', 'end', 1.5, True)
+        payload = result.to_payload()
+        self.assertEqual(payload['record_id'], 7)
+        self.assertEqual(payload['success'], True)
+        self.assertEqual(JobResult.from_payload(payload), result)
+
+
+class TestThreadLocalStats(unittest.TestCase):
+    """按线程累加统计测试"""
+
+    def test_merge_across_threads(self):
+        stats = ThreadLocalStats(('processed', 'errors'))
+
+        def work():
+            for _ in range(1000):
+                stats.inc('processed')
+            stats.inc('errors', 2)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(stats.merged(), {'processed': 8000, 'errors': 16})
+        self.assertEqual(stats['processed'], 8000)
+        self.assertEqual(stats.inc('processed'), 1)
+
+        stats.reset()
+        self.assertEqual(stats.merged(), {'processed': 0, 'errors': 0})
+        with self.assertRaises(KeyError):
+            stats.inc('unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+请求对冲测试
+"""
+
+import threading
+import time
+import unittest
+
+from processing_metrics import MetricsRegistry
+from request_hedging import HedgePolicy, RequestHedger
+
+
+def _hedger(**policy):
+    policy.setdefault('min_samples', 5)
+    policy.setdefault('min_delay', 0.01)
+    return RequestHedger(HedgePolicy(**policy), max_workers=4, registry=MetricsRegistry())
+
+
+def _warm_up(hedger, seconds=0.01, count=5):
+    for _ in range(count):
+        hedger.record_latency(seconds)
+
+
+def _sleeper(seconds, value, started=None):
+    def attempt(cancel):
+        if started is not None:
+            started.append(value)
+        time.sleep(seconds)
+        return value
+    return attempt
+
+
+class TestRequestHedger(unittest.TestCase):
+    """对冲行为测试"""
+
+    def tearDown(self):
+        time.sleep(0.05)  # 等待落选请求执行完，避免线程池关闭时仍有任务
+
+    def test_no_hedge_before_enough_samples(self):
+        hedger = _hedger()
+        started = []
+        result = hedger.call(_sleeper(0.05, 'primary'), _sleeper(0, 'hedge', started))
+        self.assertEqual((result.value, result.hedged), ('primary', False))
+        self.assertEqual(started, [])
+        hedger.close()
+
+    def test_hedge_wins_when_primary_is_slow(self):
+        hedger = _hedger()
+        _warm_up(hedger)
+        cancelled = threading.Event()
+
+        def slow_primary(cancel):
+            time.sleep(0.3)
+            if cancel.is_set():
+                cancelled.set()
+            return 'primary'
+
+        result = hedger.call(slow_primary, _sleeper(0.01, 'hedge'))
+        self.assertEqual((result.value, result.winner, result.hedged), ('hedge', 'hedge', True))
+        self.assertLess(result.elapsed, 0.2)
+        stats = hedger.stats()
+        self.assertEqual((stats['hedges_fired'], stats['hedges_won']), (1, 1))
+        time.sleep(0.35)
+        self.assertTrue(cancelled.is_set())
+        hedger.close()
+
+    def test_fast_primary_does_not_hedge(self):
+        hedger = _hedger(min_delay=0.2)
+        _warm_up(hedger)
+        started = []
+        result = hedger.call(_sleeper(0.01, 'primary'), _sleeper(0, 'hedge', started))
+        self.assertEqual((result.winner, result.hedged), ('primary', False))
+        self.assertEqual(started, [])
+        hedger.close()
+
+    def test_bad_result_does_not_win(self):
+        hedger = _hedger()
+        _warm_up(hedger)
+        result = hedger.call(_sleeper(0.1, (True,)), _sleeper(0.02, (False,)), is_good=lambda value: value[0])
+        self.assertEqual((result.value, result.winner), ((True,), 'primary'))
+        self.assertEqual(hedger.stats()['hedges_won'], 0)
+        hedger.close()
+
+    def test_budget_limits_extra_load(self):
+        hedger = _hedger(delay_percentile=0.5, budget_ratio=0.0, budget_burst=2)
+        _warm_up(hedger)
+        winners = [hedger.call(_sleeper(0.15, 'primary'), _sleeper(0.01, 'hedge')).winner for _ in range(4)]
+        self.assertEqual(winners, ['hedge', 'hedge', 'primary', 'primary'])
+        stats = hedger.stats()
+        self.assertEqual(stats['hedges_fired'], 2)
+        self.assertEqual(stats['skipped_budget'], 2)
+        hedger.close()
+
+    def test_running_losers_pause_hedging(self):
+        hedger = _hedger(max_losers=1)
+        _warm_up(hedger)
+        release = threading.Event()
+
+        def stuck_primary(cancel):
+            release.wait(1)
+            return 'primary'
+
+        self.assertEqual(hedger.call(stuck_primary, _sleeper(0.01, 'hedge')).winner, 'hedge')
+        self.assertEqual(hedger.losers_in_flight(), 1)
+        started = []
+        result = hedger.call(_sleeper(0.05, 'primary'), _sleeper(0, 'hedge', started))
+        self.assertEqual((result.winner, result.hedged), ('primary', False))
+        self.assertEqual(started, [])
+        self.assertEqual(hedger.stats()['skipped_losers'], 1)
+
+        release.set()
+        time.sleep(0.05)
+        self.assertEqual(hedger.losers_in_flight(), 0)
+        self.assertEqual(hedger.call(_sleeper(0.15, 'primary'), _sleeper(0.01, 'hedge')).winner, 'hedge')
+        hedger.close()
+
+    def test_delay_follows_percentile(self):
+        hedger = _hedger(delay_percentile=0.9, min_samples=10, min_delay=0.0)
+        for index in range(1, 11):
+            hedger.record_latency(index / 10)
+        self.assertAlmostEqual(hedger.current_delay(), 0.9)
+        hedger.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+结果本地日志与回放测试
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from processing_metrics import MetricsRegistry
+from result_journal import JournalReplayer, ResultJournal
+
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'journal.db')
+        self.journal = ResultJournal(self.path)
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.tmpdir)
+
+    def _replayer(self, flush_batch, flush_one=None, **kwargs):
+        return JournalReplayer(self.journal, flush_batch, flush_one, interval=0.01,
+                               registry=MetricsRegistry(), **kwargs)
+
+
+class TestResultJournal(JournalTestCase):
+    """日志读写与去重测试"""
+
+    def test_pending_survives_reopen_and_dedupes(self):
+        self.journal.append('1', {'result': '旧'})
+        self.journal.append('2', {'result': '二'})
+        self.journal.append('1', {'result': '新'})
+        self.journal.close()
+
+        self.journal = ResultJournal(self.path)
+        entries = self.journal.pending()
+        self.assertEqual([(entry.key, entry.payload['result']) for entry in entries], [('2', '二'), ('1', '新')])
+        self.assertEqual(self.journal.counts()['superseded'], 1)
+
+    def test_flushed_entries_are_not_pending(self):
+        seq = self.journal.append('1', {})
+        self.journal.append('2', {})
+        self.journal.mark_flushed([seq])
+        self.assertEqual([entry.key for entry in self.journal.pending()], ['2'])
+        self.assertEqual(self.journal.compact(keep_seconds=-1), 1)
+
+    def test_mark_failed_marks_dead_after_max_attempts(self):
+        seq = self.journal.append('1', {})
+        self.assertEqual(self.journal.mark_failed([seq], max_attempts=2), [])
+        self.assertEqual(self.journal.mark_failed([seq], max_attempts=2), [seq])
+        self.assertEqual(self.journal.pending(), [])
+        self.assertEqual(self.journal.counts()['dead'], 1)
+
+
+class TestJournalReplayer(JournalTestCase):
+    """回放测试"""
+
+    def test_flush_in_batches(self):
+        batches = []
+        for index in range(5):
+            self.journal.append(str(index), {'id': index})
+        replayer = self._replayer(lambda entries: batches.append([entry.payload['id'] for entry in entries]),
+                                  batch_size=2)
+        replayer.stop(flush=True)
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+        self.assertEqual(self.journal.counts()['pending'], 0)
+
+    def test_outage_keeps_entries_pending(self):
+        def failing(entries):
+            raise ConnectionError('数据库不可用')
+
+        self.journal.append('1', {})
+        replayer = self._replayer(failing, flush_one=lambda entry: False, is_available=lambda: False)
+        with self.assertRaises(RuntimeError):
+            replayer.flush_now()
+        replayer.stop(flush=True)
+        self.assertEqual(self.journal.counts()['pending'], 1)
+        self.assertEqual(self.journal.pending()[0].attempts, 0)
+
+    def test_batch_of_only_bad_entries_goes_dead(self):
+        def batch(entries):
+            raise ValueError('数据错误')
+
+        self.journal.append('1', {})
+        self.journal.append('2', {})
+        replayer = self._replayer(batch, lambda entry: False, max_attempts=2, is_available=lambda: True)
+        self.assertEqual(replayer.flush_now(), 2)
+        self.assertEqual(replayer.flush_now(), 2)
+        self.assertEqual(replayer.flush_now(), 0)
+        self.assertEqual(self.journal.counts()['dead'], 2)
+
+    def test_all_failed_without_availability_check_backs_off_and_counts(self):
+        def batch(entries):
+            raise ValueError('数据错误')
+
+        self.journal.append('1', {})
+        replayer = self._replayer(batch, lambda entry: False, max_attempts=2)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                replayer.flush_now()
+        self.assertEqual(self.journal.counts()['dead'], 1)
+
+    def test_bad_entry_is_isolated(self):
+        def batch(entries):
+            if any(entry.payload['bad'] for entry in entries):
+                raise ValueError('数据错误')
+
+        flushed = []
+
+        def one(entry):
+            if entry.payload['bad']:
+                return False
+            flushed.append(entry.key)
+            return True
+
+        self.journal.append('1', {'bad': False})
+        self.journal.append('2', {'bad': True})
+        self.journal.append('3', {'bad': False})
+        replayer = self._replayer(batch, one, max_attempts=1)
+        self.assertEqual(replayer.flush_now(), 3)
+        self.assertEqual(flushed, ['1', '3'])
+        self.assertEqual(self.journal.counts(), {'pending': 0, 'flushed': 2, 'superseded': 0, 'dead': 1})
+
+    def test_background_thread_flushes_new_entries(self):
+        flushed = []
+        replayer = self._replayer(lambda entries: flushed.extend(entry.key for entry in entries))
+        replayer.start()
+        self.journal.append('1', {})
+        replayer.notify()
+        replayer.stop(flush=True)
+        self.assertEqual(flushed, ['1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+薪资标准化工具测试
+覆盖 test_17600_salary.py / test_salary_0_0.py / test_same_salary_range.py 中的特殊情况，
+并验证整列接口与逐条接口结果一致
+"""
+
+import unittest
+
+from salary_normalizer import (
+    parse_salary_range,
+    normalize_salary_range,
+    convert_salary_to_wan_format,
+    render_salary_range,
+)
+
+try:
+    import pandas as pd
+    from salary_normalizer import (
+        parse_salary_column,
+        normalize_salary_column,
+        wan_format_salary_column,
+        render_salary_column,
+    )
+except ImportError:
+    pd = None
+
+
+SAMPLE_SALARIES = [
+    "0-0", "5000-5000", "8000-8000", "17600-17600", "50000-50000", "120000-120000",
+    "5000-8000", "5001-10000", "10001-25000", "15000-20000", "15500-25000",
+    "240000-250000", " 6001-8000元/月", "面议", "", None, 12000, "abc-def", "5000-8000",
+]
+
+
+class TestSalaryScalar(unittest.TestCase):
+    """标量接口测试"""
+
+    def test_parse(self):
+        self.assertEqual(parse_salary_range("5001-10000"), (5001, 10000))
+        self.assertEqual(parse_salary_range(" 6001-8000元/月"), (6001, 8000))
+        self.assertIsNone(parse_salary_range("面议"))
+        self.assertIsNone(parse_salary_range(None))
+        self.assertIsNone(parse_salary_range(12000))
+
+    def test_normalize(self):
+        self.assertEqual(normalize_salary_range("5001-10000"), "5000-10000")
+        self.assertEqual(normalize_salary_range("10001-25000"), "10000-25000")
+        self.assertEqual(normalize_salary_range("5000-8000"), "5000-8000")
+        self.assertEqual(normalize_salary_range("面议"), "面议")
+        self.assertIsNone(normalize_salary_range(None))
+
+    def test_wan_format(self):
+        self.assertEqual(convert_salary_to_wan_format("0-0"), "面议")
+        self.assertEqual(convert_salary_to_wan_format("17600-17600"), "17600")
+        self.assertEqual(convert_salary_to_wan_format("5000-5000"), "5000")
+        self.assertEqual(convert_salary_to_wan_format("240000-250000"), "24-25万")
+        self.assertEqual(convert_salary_to_wan_format("15000-20000"), "1.5-2万")
+        self.assertIsNone(convert_salary_to_wan_format("5000-8000"))
+        self.assertIsNone(convert_salary_to_wan_format("面议"))
+
+    def test_render(self):
+        self.assertEqual(render_salary_range("0-0"), "面议")
+        self.assertEqual(render_salary_range("5001-8000"), "5000-8000")
+        self.assertEqual(render_salary_range("10000-15000"), "1-1.5万")
+
+
+@unittest.skipIf(pd is None, "pandas未安装")
+class TestSalaryColumn(unittest.TestCase):
+    """整列接口测试"""
+
+    def test_normalize_column_matches_scalar(self):
+        result = normalize_salary_column(SAMPLE_SALARIES).tolist()
+        self.assertEqual(result, [normalize_salary_range(value) for value in SAMPLE_SALARIES])
+
+    def test_wan_format_column_matches_scalar(self):
+        result = wan_format_salary_column(SAMPLE_SALARIES).tolist()
+        self.assertEqual(result, [convert_salary_to_wan_format(value) for value in SAMPLE_SALARIES])
+
+    def test_render_column_matches_scalar(self):
+        result = render_salary_column(SAMPLE_SALARIES).tolist()
+        self.assertEqual(result, [render_salary_range(value) for value in SAMPLE_SALARIES])
+
+    def test_oversized_values_match_scalar(self):
+        values = ["5001-99999999999999999999999", "123456789012345678901-123456789012345678901",
+                  "100000000000000000000-200000000000000000000", "5001-10000"]
+        self.assertEqual(normalize_salary_column(values).tolist(),
+                         [normalize_salary_range(value) for value in values])
+        self.assertEqual(wan_format_salary_column(values).tolist(),
+                         [convert_salary_to_wan_format(value) for value in values])
+        self.assertEqual(render_salary_column(values).tolist(),
+                         [render_salary_range(value) for value in values])
+        frame = parse_salary_column(values)
+        self.assertTrue(pd.isna(frame.loc[0, 'min_salary']))
+        self.assertEqual(frame.loc[3, 'min_salary'], 5001)
+
+    def test_parse_column(self):
+        frame = parse_salary_column(pd.Series(["5001-10000", "面议", None], index=[10, 11, 12]))
+        self.assertEqual(list(frame.index), [10, 11, 12])
+        self.assertEqual(frame.loc[10, 'min_salary'], 5001)
+        self.assertEqual(frame.loc[10, 'max_salary'], 10000)
+        self.assertTrue(pd.isna(frame.loc[11, 'min_salary']))
+        self.assertTrue(pd.isna(frame.loc[12, 'max_salary']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+非阻塞结构化日志工具测试
+"""
+
+import json
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from structured_logging import (
+    SamplingRule,
+    SamplingFilter,
+    StageTimer,
+    get_sampling_filter,
+    log_extra,
+    setup_queue_logging,
+    stop_queue_logging,
+)
+
+
+def _make_record(msg_class=None, level=logging.INFO):
+    record = logging.LogRecord('test', level, __file__, 0, 'message', (), None)
+    if msg_class is not None:
+        record.msg_class = msg_class
+    return record
+
+
+class TestSamplingFilter(unittest.TestCase):
+    """采样/限速过滤器测试"""
+
+    def test_sample_every(self):
+        log_filter = SamplingFilter({'record_start': SamplingRule(sample_every=10)})
+        passed = sum(log_filter.filter(_make_record('record_start')) for _ in range(100))
+        self.assertEqual(passed, 10)
+        self.assertEqual(log_filter.get_dropped_counts(), {'record_start': 90})
+
+    def test_rate_limit(self):
+        log_filter = SamplingFilter({'record_done': SamplingRule(max_per_second=5)})
+        passed = sum(log_filter.filter(_make_record('record_done')) for _ in range(50))
+        self.assertLessEqual(passed, 6)
+        self.assertGreaterEqual(passed, 5)
+
+    def test_rate_limit_below_one_per_second(self):
+        with mock.patch('structured_logging.time.monotonic', return_value=1000.0) as clock:
+            log_filter = SamplingFilter({'heartbeat': SamplingRule(max_per_second=0.2)})
+            passed = sum(log_filter.filter(_make_record('heartbeat')) for _ in range(10))
+            self.assertEqual(passed, 1)
+
+            clock.return_value = 1004.0
+            self.assertFalse(log_filter.filter(_make_record('heartbeat')))
+            clock.return_value = 1005.0
+            self.assertTrue(log_filter.filter(_make_record('heartbeat')))
+            self.assertFalse(log_filter.filter(_make_record('heartbeat')))
+
+    def test_unclassified_and_warning_always_pass(self):
+        log_filter = SamplingFilter({'record_start': SamplingRule(sample_every=1000)})
+        self.assertTrue(all(log_filter.filter(_make_record()) for _ in range(10)))
+        self.assertTrue(all(log_filter.filter(_make_record('other')) for _ in range(10)))
+        log_filter.filter(_make_record('record_start'))
+        self.assertTrue(all(log_filter.filter(_make_record('record_start', logging.WARNING))
+                            for _ in range(10)))
+
+
+class TestQueueLogging(unittest.TestCase):
+    """队列日志输出测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'test.log')
+        self.json_file = os.path.join(self.temp_dir.name, 'test.jsonl')
+
+    def tearDown(self):
+        stop_queue_logging('test_structured_logging')
+        self.temp_dir.cleanup()
+
+    def test_json_lines_with_stages(self):
+        logger = setup_queue_logging(
+            'test_structured_logging', log_file=self.log_file, console=False,
+            json_log_file=self.json_file,
+            sampling_rules={'record_start': SamplingRule(sample_every=2)}
+        )
+        timer = StageTimer()
+        with timer.stage('api'):
+            pass
+        timer.add('db_write', 0.5)
+
+        for record_id in range(4):
+            logger.info(f"开始处理记录 {record_id}", extra=log_extra('record_start', record_id=record_id))
+        logger.info("记录处理完成", extra=log_extra('record_done', timer, record_id=7))
+        stop_queue_logging('test_structured_logging')
+
+        with open(self.json_file, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['record_id'] for line in lines], [0, 2, 7])
+        self.assertEqual(lines[0]['sample_every'], 2)
+        self.assertEqual(lines[-1]['msg'], "记录处理完成")
+        self.assertEqual(set(lines[-1]['stages']), {'api', 'db_write'})
+        self.assertEqual(lines[-1]['stages']['db_write'], 500.0)
+
+        with open(self.log_file, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual(get_sampling_filter(logger).get_dropped_counts(), {'record_start': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()